@@ -0,0 +1,111 @@
+import mmap
+import tempfile
+
+import numpy as np
+
+
+class AudioBuffer:
+    """
+    Growable contiguous 1-D audio buffer.
+
+    Blocks are copied straight into one preallocated array that grows
+    geometrically, so the finished recording is available as a view without
+    a final concatenate. With an integer dtype (e.g. int16, half the memory
+    of float32) float blocks in [-1, 1] are quantized to full scale on append.
+
+    Once the buffer would grow past spill_bytes it moves to an np.memmap over
+    an anonymous temporary file (deleted as soon as the mapping goes away).
+    Written pages are flushed and released from memory as recording goes on,
+    so resident memory stays flat however long the recording runs, and
+    view() returns zero-copy memmap views of the file.
+    """
+
+    GROWTH_FACTOR = 1.5
+    # Flush and drop written pages of a spilled buffer every this many bytes.
+    RELEASE_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, capacity=16000 * 30, dtype=np.float32, spill_bytes=None, spill_dir=None):
+        self.dtype = np.dtype(dtype)
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        if spill_bytes:
+            capacity = min(capacity, spill_bytes // self.dtype.itemsize)
+        self._data = np.empty(max(1, int(capacity)), dtype=self.dtype)
+        self._size = 0
+        self._file = None
+        self._released = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    @property
+    def spilled(self):
+        """True once the samples live in a memory-mapped file instead of RAM."""
+        return self._file is not None
+
+    def _reserve(self, needed):
+        if needed <= len(self._data):
+            return
+        capacity = len(self._data)
+        while capacity < needed:
+            capacity = int(capacity * self.GROWTH_FACTOR) + 1
+        if self.spill_bytes and capacity * self.dtype.itemsize > self.spill_bytes:
+            self._spill(capacity)
+            return
+        grown = np.empty(capacity, dtype=self.dtype)
+        grown[:self._size] = self._data[:self._size]
+        self._data = grown
+
+    def _spill(self, capacity):
+        """Map a (larger) file-backed array; the file grows in place, nothing is copied twice."""
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="v2t-", suffix=".raw", dir=self.spill_dir)
+            data = np.memmap(self._file, dtype=self.dtype, mode="w+", shape=(capacity,))
+            data[:self._size] = self._data[:self._size]
+        else:
+            self._data.flush()
+            data = np.memmap(self._file, dtype=self.dtype, mode="r+", shape=(capacity,))
+        self._data = data
+
+    def _release(self):
+        """Write back and drop the pages that have been filled since the last release."""
+        end = self._size * self.dtype.itemsize // mmap.PAGESIZE * mmap.PAGESIZE
+        if end - self._released < self.RELEASE_BYTES:
+            return
+        self._data.flush()
+        mapping = self._data.base
+        advice = getattr(mmap, "MADV_DONTNEED", None)
+        if advice is not None and hasattr(mapping, "madvise"):
+            mapping.madvise(advice, self._released, end - self._released)
+        self._released = end
+
+    def append(self, block):
+        """Copy a 1-D block to the end of the buffer."""
+        frames = len(block)
+        if frames == 0:
+            return
+        self._reserve(self._size + frames)
+        if self.dtype.kind == "i" and np.asarray(block).dtype.kind == "f":
+            block = self._quantize(block)
+        self._data[self._size:self._size + frames] = block
+        self._size += frames
+        if self._file is not None:
+            self._release()
+
+    def _quantize(self, block):
+        info = np.iinfo(self.dtype)
+        scaled = np.multiply(block, -float(info.min), dtype=np.float32)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, info.min, info.max, out=scaled)
+        return scaled
+
+    def view(self, start=0, end=None):
+        """Return a contiguous view of the recorded samples [start, end) (a memmap once spilled)."""
+        if end is None or end > self._size:
+            end = self._size
+        start = max(0, min(start, end))
+        return self._data[start:end]
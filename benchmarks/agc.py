@@ -0,0 +1,135 @@
+"""
+Benchmark the streaming AGC stage against whole-clip peak normalization.
+
+Reports the CPU cost of AutomaticGainControl per second of audio for a few
+capture block sizes, and its effect on level consistency across quiet, loud
+and click-spoiled fixtures. With --speech/--reference (a recorded utterance
+and its transcript) and a loadable Whisper model it also reports word error
+rate and decode time for both approaches.
+
+    uv run python benchmarks/agc.py
+    uv run python benchmarks/agc.py --speech sample.wav --reference "hello world"
+"""
+
+import argparse
+
+import numpy as np
+
+from common import (
+    SAMPLE_RATE,
+    cost_per_audio_second,
+    load_transcriber,
+    load_wav,
+    print_table,
+    rms,
+    run_blocks,
+    scale_to_peak,
+    synthetic_speech,
+    timed_transcribe,
+    word_error_rate,
+)
+from preprocess import AutomaticGainControl
+from transcriber import prepare_audio
+
+
+def make_fixtures(speech):
+    """Quiet, normal, loud and click-spoiled versions of one utterance."""
+    click = scale_to_peak(speech, 0.02)
+    position = len(click) // 4
+    click[position:position + 8] = 0.95
+    return {
+        "quiet (-34 dBFS peak)": scale_to_peak(speech, 0.02),
+        "normal (-10 dBFS peak)": scale_to_peak(speech, 0.3),
+        "loud (-0.5 dBFS peak)": scale_to_peak(speech, 0.95),
+        "quiet + click": click,
+    }
+
+
+def bench_cost(seconds):
+    audio = synthetic_speech(seconds, peak=0.3)
+    rows = []
+    for block in (256, 512, 1600, 4096):
+        def run(data, block=block):
+            run_blocks(AutomaticGainControl(), data, block)
+
+        cost = cost_per_audio_second(run, audio)
+        rows.append((block, f"{cost * 1000:.2f} ms", f"{cost * 100:.3f} %"))
+    print(f"AGC cost ({seconds:.0f} s of audio)")
+    print_table(("block", "CPU per audio second", "of one core"), rows)
+    print()
+
+
+def frame_rms(audio, frame=160):
+    """RMS of each 10 ms frame."""
+    frames = audio[:len(audio) // frame * frame].reshape(-1, frame)
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+
+def speech_level(audio, source, range_db=30.0):
+    """90th percentile frame RMS of audio over the frames where source is within range_db of its loudest."""
+    reference = frame_rms(source)
+    active = reference > reference.max() * 10 ** (-range_db / 20)
+    return float(np.percentile(frame_rms(audio)[:len(active)][active], 90))
+
+
+def bench_levels(fixtures):
+    rows = []
+    for name, audio in fixtures.items():
+        peak_normalized = prepare_audio(audio.copy())
+        agc = run_blocks(AutomaticGainControl(), audio)
+        rows.append((
+            name,
+            f"{speech_level(audio, audio):.4f}",
+            f"{speech_level(peak_normalized, audio):.4f}",
+            f"{speech_level(agc, audio):.4f}",
+            f"{rms(agc):.4f}",
+            f"{np.max(np.abs(agc)):.2f}",
+        ))
+    # AGC brings each 10 ms frame of speech up to at most 0.1 RMS and holds
+    # its gain through pauses, so the whole-clip RMS is lower than that.
+    print("Speech level (90th percentile of 10 ms frame RMS outside pauses; AGC targets 0.1)")
+    print_table(("fixture", "input", "peak norm", "AGC", "AGC whole clip", "AGC peak"), rows)
+    print()
+
+
+def bench_accuracy(fixtures, reference):
+    transcriber = load_transcriber()
+    if transcriber is None:
+        return
+    rows = []
+    for name, audio in fixtures.items():
+        text_peak, time_peak = timed_transcribe(transcriber, audio)
+        agc = run_blocks(AutomaticGainControl(), audio)
+        text_agc, time_agc = timed_transcribe(transcriber, agc, normalize=False)
+        rows.append((
+            name,
+            f"{word_error_rate(reference, text_peak):.2f}",
+            f"{word_error_rate(reference, text_agc):.2f}",
+            f"{time_peak:.2f} s",
+            f"{time_agc:.2f} s",
+        ))
+    print(f"Transcription accuracy ({transcriber.get_model_name()})")
+    print_table(("fixture", "WER peak", "WER AGC", "decode peak", "decode AGC"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic audio length for the cost run")
+    parser.add_argument("--speech", help="WAV file with a recorded utterance")
+    parser.add_argument("--reference", help="Reference transcript for --speech")
+    args = parser.parse_args()
+
+    bench_cost(args.seconds)
+
+    speech = load_wav(args.speech) if args.speech else synthetic_speech(8.0)
+    fixtures = make_fixtures(speech)
+    bench_levels(fixtures)
+
+    if args.speech and args.reference:
+        bench_accuracy(fixtures, args.reference)
+    else:
+        print(f"Pass --speech and --reference to measure WER at {SAMPLE_RATE} Hz.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+SAMPLE_RATE = 16000
+
+from sources import synthetic_speech  # noqa: E402  (re-exported for the benchmarks)
+
+
+def scale_to_peak(audio, peak):
+    """Return a copy of the audio scaled to the given absolute peak."""
+    current = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    if current == 0:
+        return audio.astype(np.float32, copy=True)
+    return (audio * (peak / current)).astype(np.float32)
+
+
+def load_wav(path):
+    """Load a WAV/FLAC file as mono float32 at 16 kHz."""
+    import soundfile as sf
+    from preprocess import PolyphaseResampler
+
+    audio, samplerate = sf.read(path, dtype="float32", always_2d=True)
+    audio = np.ascontiguousarray(audio[:, 0])
+    if samplerate != SAMPLE_RATE:
+        resampler = PolyphaseResampler(samplerate, SAMPLE_RATE)
+        audio = np.concatenate((resampler.process(audio), resampler.flush()))
+    return audio
+
+
+def run_blocks(stage, audio, block=512):
+    """Feed audio through a pre-processing stage block by block."""
+    out = [stage.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+    flush = getattr(stage, "flush", None)
+    if flush is not None:
+        out.append(flush())
+    return np.concatenate(out) if out else np.empty(0, dtype=np.float32)
+
+
+def cost_per_audio_second(fn, audio, samplerate=SAMPLE_RATE, repeat=3):
+    """Best-of-N CPU seconds spent per second of audio."""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(audio)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / (len(audio) / samplerate)
+
+
+def rms(audio):
+    return float(np.sqrt(np.mean(np.square(audio, dtype=np.float64)))) if len(audio) else 0.0
+
+
+def word_error_rate(reference, hypothesis):
+    """Word error rate (edit distance over words / reference length)."""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word.strip(".,!?") != hyp_word.strip(".,!?")),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_transcriber():
+    """Load the configured AudioTranscriber, or return None if it is unavailable."""
+    try:
+        from transcriber import AudioTranscriber
+
+        return AudioTranscriber()
+    except Exception as e:
+        print(f"Transcriber unavailable, skipping decode measurements ({e})")
+        return None
+
+
+def timed_transcribe(transcriber, audio, **kwargs):
+    """Return (text, decode seconds) for one utterance."""
+    start = time.perf_counter()
+    text = transcriber.transcribe(audio.copy(), **kwargs)
+    return text, time.perf_counter() - start
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,139 @@
+"""
+Benchmark the SpectralGate noise suppression stage.
+
+Mixes speech with fan-like noise (brown noise plus mains hum) and
+open-office-like noise (band-limited noise bursts) at several SNRs, with a
+noise-only pre-roll for the profile. Reports the denoiser's CPU cost per
+second of audio and the residual noise. With a loadable Whisper model it also
+reports decode time and output length with and without denoising (longer
+output on noisy input usually means hallucinated text); --reference adds WER.
+
+    uv run python benchmarks/denoise.py
+    uv run python benchmarks/denoise.py --speech sample.wav --reference "hello world"
+"""
+
+import argparse
+
+import numpy as np
+
+from common import (
+    SAMPLE_RATE,
+    cost_per_audio_second,
+    load_transcriber,
+    load_wav,
+    print_table,
+    rms,
+    run_blocks,
+    synthetic_speech,
+    timed_transcribe,
+    word_error_rate,
+)
+from preprocess import AutomaticGainControl, SpectralGate
+
+PREROLL_SECONDS = 0.5
+
+
+def fan_noise(n, rng):
+    brown = np.cumsum(rng.standard_normal(n))
+    brown -= np.convolve(brown, np.ones(801) / 801, mode="same")
+    t = np.arange(n) / SAMPLE_RATE
+    hum = 0.3 * np.sin(2 * np.pi * 60 * t) + 0.15 * np.sin(2 * np.pi * 120 * t)
+    noise = brown / (np.std(brown) or 1.0) + hum
+    return noise.astype(np.float32)
+
+
+def office_noise(n, rng):
+    white = rng.standard_normal(n)
+    band = np.convolve(white, np.hanning(9), mode="same") - np.convolve(white, np.hanning(65) / 8, mode="same")
+    bursts = np.repeat(rng.uniform(0.3, 1.0, n // 4000 + 1), 4000)[:n]
+    return (band * bursts).astype(np.float32)
+
+
+def make_fixtures(speech, seed=0):
+    rng = np.random.default_rng(seed)
+    preroll = int(PREROLL_SECONDS * SAMPLE_RATE)
+    total = preroll + len(speech)
+    fixtures = {}
+    for kind, make in (("fan", fan_noise), ("office", office_noise)):
+        noise = make(total, rng)
+        for snr_db in (20, 10, 5):
+            level = rms(speech) / (10 ** (snr_db / 20)) / (rms(noise) or 1.0)
+            mixed = noise * level
+            mixed[preroll:] += speech
+            fixtures[f"{kind} {snr_db} dB"] = (mixed.astype(np.float32), noise * level)
+    return fixtures
+
+
+def denoise(audio):
+    return run_blocks(SpectralGate(preroll_ms=PREROLL_SECONDS * 1000), audio)
+
+
+def bench_cost(seconds):
+    audio = synthetic_speech(seconds)
+    rows = []
+    for block in (256, 512, 1600, 4096):
+        cost = cost_per_audio_second(
+            lambda data, block=block: run_blocks(SpectralGate(), data, block), audio
+        )
+        rows.append((block, f"{cost * 1000:.2f} ms", f"{cost * 100:.3f} %"))
+    print(f"Denoiser cost ({seconds:.0f} s of audio)")
+    print_table(("block", "CPU per audio second", "of one core"), rows)
+    print()
+
+
+def bench_suppression(fixtures):
+    preroll = int(PREROLL_SECONDS * SAMPLE_RATE)
+    rows = []
+    for name, (mixed, noise) in fixtures.items():
+        out = denoise(mixed)
+        # Residual noise: run the noise alone through a gate with the same profile.
+        gate = SpectralGate(preroll_ms=PREROLL_SECONDS * 1000)
+        residual = run_blocks(gate, noise)[preroll:]
+        reduction = 20 * np.log10((rms(noise[preroll:]) or 1e-12) / (rms(residual) or 1e-12))
+        rows.append((name, f"{rms(mixed[preroll:]):.4f}", f"{rms(out[preroll:]):.4f}", f"{reduction:.1f} dB"))
+    print("Noise suppression")
+    print_table(("fixture", "input RMS", "output RMS", "noise reduction"), rows)
+    print()
+
+
+def bench_decode(fixtures, reference):
+    transcriber = load_transcriber()
+    if transcriber is None:
+        return
+    rows = []
+    for name, (mixed, _) in fixtures.items():
+        plain = run_blocks(AutomaticGainControl(), mixed)
+        cleaned = run_blocks(AutomaticGainControl(), denoise(mixed))
+        text_plain, time_plain = timed_transcribe(transcriber, plain, normalize=False)
+        text_clean, time_clean = timed_transcribe(transcriber, cleaned, normalize=False)
+        row = [name, f"{time_plain:.2f} s", f"{time_clean:.2f} s", len(text_plain), len(text_clean)]
+        if reference:
+            row += [f"{word_error_rate(reference, text_plain):.2f}", f"{word_error_rate(reference, text_clean):.2f}"]
+        rows.append(row)
+    headers = ["fixture", "decode raw", "decode denoised", "chars raw", "chars denoised"]
+    if reference:
+        headers += ["WER raw", "WER denoised"]
+    print(f"Decode ({transcriber.get_model_name()})")
+    print_table(headers, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic audio length for the cost run")
+    parser.add_argument("--speech", help="WAV file with a recorded utterance")
+    parser.add_argument("--reference", help="Reference transcript for --speech")
+    parser.add_argument("--no-decode", action="store_true", help="Skip the Whisper decode comparison")
+    args = parser.parse_args()
+
+    bench_cost(args.seconds)
+
+    speech = load_wav(args.speech) if args.speech else synthetic_speech(8.0)
+    fixtures = make_fixtures(speech)
+    bench_suppression(fixtures)
+
+    if not args.no_decode:
+        bench_decode(fixtures, args.reference)
+
+
+if __name__ == "__main__":
+    main()
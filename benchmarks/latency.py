@@ -0,0 +1,83 @@
+"""
+End-to-end latency benchmark that needs no microphone.
+
+Plays an utterance (synthetic speech, or --speech FILE) through AudioRecorder
+with a FileSource, so audio takes the real callback, queue and
+pre-processing path. When the utterance has been delivered the hotkey is
+"released": the script calls stop() and measures how long the recorder
+takes to hand over the audio, then (with a loadable Whisper model) how long
+decoding takes. The profile, speed and utterance are fixed, so runs are
+repeatable on a headless Linux box.
+
+    uv run python benchmarks/latency.py
+    uv run python benchmarks/latency.py --speech sample.wav --profile low_latency --runs 20
+    uv run python benchmarks/latency.py --speed 4 --no-decode
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import SAMPLE_RATE, load_transcriber, load_wav, print_table, synthetic_speech
+import log
+from recorder import CAPTURE_PROFILES, AudioRecorder
+from sources import FileSource, SourceFactory
+
+
+def run_once(recorder, transcriber):
+    """One utterance; returns (stop ms, decode ms or None, callback stats)."""
+    recorder.start()
+    recorder.stream.finished.wait()
+    released = time.perf_counter()
+    audio = recorder.stop()
+    stopped = time.perf_counter()
+    decode = None
+    if transcriber is not None:
+        transcriber.transcribe(audio, peak=recorder.last_stats.peak, normalize=not recorder.last_stats.gain_controlled)
+        decode = (time.perf_counter() - stopped) * 1000
+    return (stopped - released) * 1000, decode, recorder.get_callback_stats()
+
+
+def percentiles(values):
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}", f"{max(values):.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speech", help="Utterance to play (WAV/FLAC); default is 4 s of synthetic speech")
+    parser.add_argument("--profile", choices=sorted(CAPTURE_PROFILES), default="balanced", help="Capture profile")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--runs", type=int, default=10, help="Number of utterances")
+    parser.add_argument("--no-decode", action="store_true", help="Skip the Whisper decode")
+    args = parser.parse_args()
+    # Per-utterance log lines would interleave with the results; keep warnings such as xruns.
+    log.set_level("WARNING")
+
+    speech = load_wav(args.speech) if args.speech else synthetic_speech(4.0)
+    source = SourceFactory(FileSource, speech, SAMPLE_RATE, samplerate=SAMPLE_RATE, speed=args.speed)
+    recorder = AudioRecorder(profile=args.profile, source=source)
+    transcriber = None if args.no_decode else load_transcriber()
+
+    stops, decodes, xruns = [], [], 0
+    for _ in range(args.runs):
+        stop_ms, decode_ms, stats = run_once(recorder, transcriber)
+        stops.append(stop_ms)
+        xruns += stats["xruns"]
+        if decode_ms is not None:
+            decodes.append(decode_ms)
+
+    print(
+        f"Release-to-text latency: {len(speech) / SAMPLE_RATE:.1f} s utterance, profile {args.profile} "
+        f"({recorder.blocksize} frames), speed {args.speed or 'max'}, {args.runs} runs, {xruns} xruns"
+    )
+    rows = [("recorder stop", *percentiles(stops))]
+    if decodes:
+        rows.append(("decode", *percentiles(decodes)))
+        rows.append(("total", *percentiles([s + d for s, d in zip(stops, decodes)])))
+    print_table(("step (ms)", "p50", "p95", "p99", "max"), rows)
+
+
+if __name__ == "__main__":
+    main()
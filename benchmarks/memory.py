@@ -0,0 +1,98 @@
+"""
+Benchmark resident memory of a long recording in float32 and int16 capture.
+
+Feeds an hour (by default) of synthetic speech through the recorder's
+pre-processing pipeline block by block, the way the audio callback does, and
+reports the traced memory held by the finished recording, the peak during
+recording, and the extra memory needed to hand it to the decoder as float32
+(none in float32 mode, one float32 copy in int16 mode). NumPy buffers are
+visible to tracemalloc, so the numbers cover the audio itself. The spill rows
+move the recording to a memory-mapped temporary file past --spill-mb; its
+pages are file-backed and released as recording goes on, so they do not
+count as held memory.
+
+    uv run python benchmarks/memory.py
+    uv run python benchmarks/memory.py --minutes 10 --no-agc
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import SAMPLE_RATE, print_table, synthetic_speech
+from preprocess import AudioPreprocessor, AutomaticGainControl
+from transcriber import prepare_audio
+
+BLOCK = 512
+
+
+def record(dtype, minutes, agc, spill_bytes=None):
+    """Record `minutes` of audio; returns (preprocessor, audio, stats, peak bytes, seconds)."""
+    chunk = synthetic_speech(10.0, peak=0.3)
+    if dtype == np.int16:
+        chunk = (chunk * 32767).astype(np.int16)
+    blocks = [chunk[i:i + BLOCK, None] for i in range(0, len(chunk) - BLOCK + 1, BLOCK)]
+    total = int(minutes * 60 * SAMPLE_RATE) // BLOCK
+
+    stages = [AutomaticGainControl()] if agc else []
+    preprocessor = AudioPreprocessor(stages=stages, trim_silence=False, dtype=dtype, spill_bytes=spill_bytes)
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for index in range(total):
+        # The callback queues a copy of each block.
+        preprocessor.process(blocks[index % len(blocks)].copy())
+    audio, stats = preprocessor.finish()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return preprocessor, audio, stats, peak, elapsed
+
+
+def measure(dtype, minutes, agc, spill_bytes=None):
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        preprocessor, audio, stats, record_peak, elapsed = record(dtype, minutes, agc, spill_bytes)
+        held, _ = tracemalloc.get_traced_memory()
+
+        tracemalloc.reset_peak()
+        prepared = prepare_audio(audio, peak=stats.peak, normalize=not stats.gain_controlled)
+        _, convert_peak = tracemalloc.get_traced_memory()
+        del prepared
+    finally:
+        tracemalloc.stop()
+
+    mib = 1024 * 1024
+    buffer = preprocessor.buffer
+    on_disk = buffer.capacity * buffer.dtype.itemsize if buffer.spilled else 0
+    return (
+        np.dtype(dtype).name + (f" + spill {spill_bytes // mib} MiB" if spill_bytes else ""),
+        f"{len(audio) / SAMPLE_RATE / 60:.0f} min",
+        f"{(held - baseline) / mib:.0f} MiB",
+        f"{(record_peak - baseline) / mib:.0f} MiB",
+        f"{(convert_peak - held) / mib:.0f} MiB",
+        f"{on_disk / mib:.0f} MiB",
+        f"{elapsed:.1f} s",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60.0, help="Length of the simulated recording")
+    parser.add_argument("--no-agc", action="store_true", help="Record without the AGC stage")
+    parser.add_argument("--spill-mb", type=float, default=64.0, help="Spill threshold for the memmap rows")
+    args = parser.parse_args()
+
+    spill_bytes = int(args.spill_mb * 1024 * 1024)
+    rows = [
+        measure(dtype, args.minutes, not args.no_agc, spill)
+        for spill in (None, spill_bytes)
+        for dtype in (np.float32, np.int16)
+    ]
+    print(f"Recording memory ({'no AGC' if args.no_agc else 'AGC'}, {BLOCK}-sample blocks)")
+    print_table(("capture", "audio", "held", "peak recording", "extra at decode handoff", "on disk", "record time"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark 16 kHz resampling: our PolyphaseResampler vs. LinearResampler
+offline, and vs. PortAudio's (host) resampling on real hardware.
+
+Offline, a multi-tone test signal is generated analytically at the native
+rate and at 16 kHz, so the resampled output can be compared with the exact
+band-limited result. Tones above 8 kHz must be removed rather than folded
+back into the speech band; the alias rejection column shows how well they
+are.
+
+With --live, the script captures SECONDS of audio from the input device twice
+- once asking PortAudio for 16 kHz and once at the native rate followed by
+PolyphaseResampler - and reports the process CPU time of each. It also plays
+a 1 kHz + 10 kHz test signal on the output device while capturing, and
+reports the level of the 1 kHz tone and of the 6 kHz alias of the 10 kHz tone
+in both captures. Use a loopback device (e.g. BlackHole) for clean numbers.
+
+    uv run python benchmarks/resample.py
+    uv run python benchmarks/resample.py --live 10 --input BlackHole --output BlackHole
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import SAMPLE_RATE, cost_per_audio_second, print_table, rms, run_blocks
+from preprocess import LinearResampler, PolyphaseResampler
+
+RATES = (44100, 48000)
+PASSBAND_TONES = (200, 450, 1000, 2300, 3700, 5100, 6300)
+ALIAS_TONES = (9000, 12000, 20000)
+
+
+def tones(frequencies, seconds, samplerate):
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    audio = sum(np.sin(2 * np.pi * f * t + f) for f in frequencies) / len(frequencies)
+    return audio.astype(np.float32)
+
+
+def resample_with(kind, rate, audio, block):
+    if kind == "polyphase":
+        return run_blocks(PolyphaseResampler(rate), audio, block)
+    return run_blocks(LinearResampler(rate), audio, block)
+
+
+def bench_cost(seconds):
+    rows = []
+    for rate in RATES:
+        audio = tones(PASSBAND_TONES, seconds, rate)
+        for block in (rate // 100, 1024, 4096):
+            row = [rate, block]
+            for kind in ("polyphase", "linear"):
+                cost = cost_per_audio_second(
+                    lambda data, kind=kind: resample_with(kind, rate, data, block), audio, samplerate=rate
+                )
+                row.append(f"{cost * 1000:.2f} ms")
+            rows.append(row)
+    print(f"Resampling cost per audio second ({seconds:.0f} s of audio)")
+    print_table(("input rate", "block", "polyphase", "linear"), rows)
+    print()
+
+
+def snr_db(reference, audio):
+    error = rms(audio - reference)
+    return 20 * np.log10((rms(reference) or 1e-12) / (error or 1e-12))
+
+
+def bench_quality(seconds=2.0):
+    rows = []
+    # Skip the filter warm-up at both ends.
+    edge = SAMPLE_RATE // 50
+    for rate in RATES:
+        reference = tones(PASSBAND_TONES, seconds, SAMPLE_RATE)
+        native = tones(PASSBAND_TONES, seconds, rate)
+        for kind in ("polyphase", "linear"):
+            out = resample_with(kind, rate, native, rate // 100)[:len(reference)]
+            passband = snr_db(reference[edge:len(out) - edge], out[edge:-edge])
+            rejection = []
+            for frequency in ALIAS_TONES:
+                if frequency >= rate / 2:
+                    continue
+                tone = tones((frequency,), seconds, rate)
+                leaked = resample_with(kind, rate, tone, rate // 100)[edge:-edge]
+                rejection.append(20 * np.log10((rms(tone) or 1e-12) / (rms(leaked) or 1e-12)))
+            rows.append((rate, kind, f"{passband:.1f} dB", f"{min(rejection):.1f} dB"))
+    print("Resampling quality (multi-tone 200 Hz - 6.3 kHz; tones at 9/12/20 kHz)")
+    print_table(("input rate", "resampler", "passband SNR", "alias rejection"), rows)
+    print()
+
+
+def tone_level_db(audio, frequency, samplerate=SAMPLE_RATE):
+    """Level of one frequency in dBFS (Hann-windowed FFT peak)."""
+    window = np.hanning(len(audio))
+    spectrum = np.abs(np.fft.rfft(audio * window)) / (window.sum() / 2)
+    bin_index = int(round(frequency * len(audio) / samplerate))
+    level = spectrum[max(0, bin_index - 2):bin_index + 3].max()
+    return 20 * np.log10(level or 1e-12)
+
+
+def capture(sd, seconds, samplerate, device, process=None, play=None, output=None):
+    """
+    Capture from the input device, optionally playing a signal at the output
+    device's rate; returns (audio, CPU seconds).
+    """
+    blocks = []
+
+    def callback(indata, frames, time_info, status):
+        blocks.append(indata[:, 0].copy())
+
+    player = None
+    if play is not None:
+        position = [0]
+
+        def out_callback(outdata, frames, time_info, status):
+            chunk = play[position[0]:position[0] + frames]
+            outdata[:len(chunk), 0] = chunk
+            outdata[len(chunk):] = 0
+            position[0] += frames
+
+        out_rate = int(sd.query_devices(output, kind="output")["default_samplerate"])
+        player = sd.OutputStream(samplerate=out_rate, channels=1, device=output, callback=out_callback)
+
+    started = time.process_time()
+    with sd.InputStream(samplerate=samplerate, channels=1, device=device, callback=callback):
+        if player is not None:
+            player.start()
+        time.sleep(seconds)
+        if player is not None:
+            player.stop()
+            player.close()
+    audio = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
+    if process is not None:
+        audio = process(audio)
+    return audio, time.process_time() - started
+
+
+def bench_live(seconds, device, output):
+    import sounddevice as sd
+
+    native = int(sd.query_devices(device, kind="input")["default_samplerate"])
+    out_rate = int(sd.query_devices(output, kind="output")["default_samplerate"])
+    print(f"Live capture: input {native} Hz, output {out_rate} Hz, {seconds:.0f} s each")
+
+    def ours(audio):
+        return run_blocks(PolyphaseResampler(native), audio, native // 100)
+
+    signal = 0.25 * tones((1000, 10000), seconds + 1, out_rate)
+
+    rows = []
+    for name, rate, process in (("PortAudio 16 kHz", SAMPLE_RATE, None), (f"native {native} Hz + polyphase", native, ours)):
+        _, cpu = capture(sd, seconds, rate, device, process)
+        audio, _ = capture(sd, seconds, rate, device, process, play=signal, output=output)
+        audio = audio[SAMPLE_RATE // 2:]
+        rows.append((
+            name,
+            f"{cpu / seconds * 100:.2f} %",
+            f"{tone_level_db(audio, 1000):.1f} dBFS",
+            f"{tone_level_db(audio, 6000):.1f} dBFS",
+        ))
+    print_table(("path", "process CPU", "1 kHz tone", "6 kHz alias of 10 kHz"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic audio length for the cost run")
+    parser.add_argument("--live", type=float, metavar="SECONDS", help="Also compare with PortAudio on real devices")
+    parser.add_argument("--input", help="Input device name or index for --live")
+    parser.add_argument("--output", help="Output device name or index for --live")
+    args = parser.parse_args()
+
+    bench_cost(args.seconds)
+    bench_quality()
+    if args.live:
+        bench_live(args.live, args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class CallbackStats:
+    """
+    Health counters for the PortAudio input callback.
+
+    record() is called only from the audio thread and never takes a lock or
+    allocates arrays: counters are plain attributes and callback durations and
+    inter-callback intervals go into preallocated rings. snapshot() may run on
+    any thread; it copies the rings and derives percentiles there, so a
+    reading taken while a callback is running can be one block stale.
+    """
+
+    def __init__(self, samplerate, blocksize=0, history=2048):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self._durations = np.zeros(history, dtype=np.float64)
+        self._intervals = np.zeros(history, dtype=np.float64)
+        # Totals over the whole session; reset() only clears the current stream.
+        self.total_callbacks = 0
+        self.total_xruns = 0
+        self.reset()
+
+    def reset(self):
+        """Start counting a new stream."""
+        self.callbacks = 0
+        self.xruns = 0
+        self.input_overflows = 0
+        self.frames = 0
+        self._first_start = None
+        self._first_frames = 0
+        self._last_start = None
+        self._intervals_recorded = 0
+
+    def record(self, frames, status, started, finished):
+        """Record one callback (perf_counter timestamps at entry and exit)."""
+        if status:
+            self.xruns += 1
+            self.total_xruns += 1
+            if getattr(status, "input_overflow", False):
+                self.input_overflows += 1
+
+        slot = self.callbacks % len(self._durations)
+        self._durations[slot] = finished - started
+        if self._last_start is None:
+            self._first_start = started
+            self._first_frames = frames
+        else:
+            self._intervals[self._intervals_recorded % len(self._intervals)] = started - self._last_start
+            self._intervals_recorded += 1
+        self._last_start = started
+        self.frames += frames
+        self.callbacks += 1
+        self.total_callbacks += 1
+
+    @property
+    def last_callback(self):
+        """perf_counter timestamp of the latest callback, or None."""
+        return self._last_start
+
+    def expected_frames(self):
+        """Frames the device should have delivered between the first and last callback."""
+        if self._first_start is None:
+            return 0
+        elapsed = self._last_start - self._first_start
+        return int(round(elapsed * self.samplerate)) + self._first_frames
+
+    def snapshot(self):
+        """Return the current counters and timing percentiles (milliseconds) as a dict."""
+        callbacks = self.callbacks
+        durations = self._durations[:min(callbacks, len(self._durations))] * 1000
+        intervals = self._intervals[:min(self._intervals_recorded, len(self._intervals))] * 1000
+        expected = self.expected_frames()
+
+        stats = {
+            "callbacks": callbacks,
+            "xruns": self.xruns,
+            "input_overflows": self.input_overflows,
+            "frames": self.frames,
+            "expected_frames": expected,
+            "dropped_frames": max(0, expected - self.frames),
+            "total_callbacks": self.total_callbacks,
+            "total_xruns": self.total_xruns,
+        }
+        if len(durations):
+            p50, p95, p99 = np.percentile(durations, (50, 95, 99))
+            stats.update(duration_p50_ms=p50, duration_p95_ms=p95, duration_p99_ms=p99, duration_max_ms=durations.max())
+        if len(intervals):
+            nominal = self.blocksize / self.samplerate * 1000 if self.blocksize else np.median(intervals)
+            stats.update(
+                period_ms=float(intervals.mean()),
+                jitter_ms=float(np.abs(intervals - nominal).mean()),
+                jitter_max_ms=float(np.abs(intervals - nominal).max()),
+            )
+        return stats
+
+    def summary(self):
+        """One-line human-readable summary."""
+        stats = self.snapshot()
+        parts = [f"{stats['callbacks']} callbacks", f"{stats['xruns']} xruns"]
+        if stats["dropped_frames"]:
+            parts.append(f"{stats['dropped_frames']} frames missing")
+        if "duration_p50_ms" in stats:
+            parts.append(
+                f"callback p50/p95/p99 {stats['duration_p50_ms']:.3f}/{stats['duration_p95_ms']:.3f}/"
+                f"{stats['duration_p99_ms']:.3f} ms"
+            )
+        if "period_ms" in stats:
+            parts.append(f"block period {stats['period_ms']:.1f} ms (jitter {stats['jitter_ms']:.2f} ms)")
+        return ", ".join(parts)
@@ -13,3 +13,201 @@ MODEL = os.environ.get("V2T_MODEL", "small.en")
 #   "simple" - simple sine wave tones (880Hz/440Hz)
 #   "click" - short click sounds
 SOUND_TYPE = os.environ.get("V2T_SOUND", "bloop")
+
+# Automatic model downgrade
+# Set V2T_FALLBACK_MODEL to a smaller model (e.g. "base.en" or a path) to let
+# the app switch to it while decoding falls behind, e.g. during a busy build.
+# Leave empty to always use MODEL.
+FALLBACK_MODEL = os.environ.get("V2T_FALLBACK_MODEL", "")
+
+# Real-time factor (decode time / audio duration) thresholds for switching.
+# The app downgrades once the last RTF_WINDOW utterances all decode slower
+# than RTF_DOWNGRADE and upgrades once the configured model is estimated to
+# run below RTF_UPGRADE again. Keep RTF_UPGRADE well below RTF_DOWNGRADE so
+# the app doesn't flap between models.
+RTF_DOWNGRADE = float(os.environ.get("V2T_RTF_DOWNGRADE", "1.0"))
+RTF_UPGRADE = float(os.environ.get("V2T_RTF_UPGRADE", "0.5"))
+RTF_WINDOW = int(os.environ.get("V2T_RTF_WINDOW", "3"))
+
+# Silence trimming
+# Speech boundaries are detected while recording; leading/trailing silence is
+# trimmed before decoding (keeping V2T_VAD_PAD_MS of padding) so whisper.cpp
+# spends no time on it. Set V2T_VAD_TRIM=0 to decode the full recording.
+VAD_TRIM = os.environ.get("V2T_VAD_TRIM", "1").strip().lower() not in ("0", "false", "off", "no")
+VAD_PAD_MS = int(os.environ.get("V2T_VAD_PAD_MS", "300"))
+
+# Automatic gain control
+# Level audio per block while recording (streaming AGC with a short lookahead)
+# instead of peak-normalizing the whole clip after release. Set V2T_AGC=0 to
+# fall back to peak normalization in the transcriber.
+AGC = os.environ.get("V2T_AGC", "1").strip().lower() not in ("0", "false", "off", "no")
+
+# Noise suppression
+# Set V2T_DENOISE=1 to run a spectral-gating denoiser with a high-pass filter
+# before AGC. It helps with fan and open-office noise, which otherwise makes
+# Whisper produce longer (hallucinated) output that takes longer to decode.
+# The noise profile is learned from the first V2T_DENOISE_PREROLL_MS of each
+# recording.
+DENOISE = os.environ.get("V2T_DENOISE", "0").strip().lower() in ("1", "true", "on", "yes")
+DENOISE_PREROLL_MS = int(os.environ.get("V2T_DENOISE_PREROLL_MS", "250"))
+HIGHPASS_HZ = float(os.environ.get("V2T_HIGHPASS_HZ", "80"))
+
+# Native-rate capture
+# Many USB and Bluetooth microphones run at 44.1 or 48 kHz, and asking
+# PortAudio for 16 kHz makes the host audio layer resample in the callback
+# path. Set V2T_NATIVE_RATE=1 to capture at the input device's default rate
+# and downsample to 16 kHz with our own polyphase filter on the
+# pre-processing thread instead.
+NATIVE_RATE = os.environ.get("V2T_NATIVE_RATE", "0").strip().lower() in ("1", "true", "on", "yes")
+
+# Capture profile
+# Set V2T_CAPTURE_PROFILE to choose the PortAudio block size, latency and
+# sample format explicitly instead of relying on host defaults:
+#   "low_latency" - 10 ms blocks, low device latency (fast level meter, short
+#                   tail at stop)
+#   "balanced" (default) - 30 ms blocks, moderate latency
+#   "power_saver" - 100 ms blocks, high latency, int16 samples (fewer wakeups)
+CAPTURE_PROFILE = os.environ.get("V2T_CAPTURE_PROFILE", "balanced").strip().lower()
+
+# Capture sample format
+# "float32" or "int16" overrides the profile's format. int16 capture stores
+# raw and queued audio at half the size, which matters for long toggle-mode
+# recordings; audio is converted to float32 in one step right before decoding.
+CAPTURE_DTYPE = os.environ.get("V2T_CAPTURE_DTYPE", "").strip().lower()
+if CAPTURE_DTYPE not in ("float32", "int16"):
+    CAPTURE_DTYPE = ""
+
+# Disk spill for long recordings
+# Once a recording grows past V2T_SPILL_MB it is moved to a memory-mapped
+# temporary file (deleted automatically), so resident memory stays flat in
+# hours-long toggle-mode sessions. Set V2T_SPILL_DIR to choose where the file
+# is created, or V2T_SPILL_MB=0 to keep everything in RAM.
+SPILL_MB = float(os.environ.get("V2T_SPILL_MB", "64"))
+SPILL_DIR = os.environ.get("V2T_SPILL_DIR", "") or None
+
+# Multi-channel capture
+# Set V2T_CHANNELS to capture several inputs (array mics, audio interfaces).
+# Only one mono stream goes downstream, so transcription cost is unchanged:
+# V2T_CHANNEL_MODE="best" (default) follows the channel with the best SNR,
+# "mix" weights all channels by their SNR.
+CHANNELS = max(1, int(os.environ.get("V2T_CHANNELS", "1")))
+CHANNEL_MODE = os.environ.get("V2T_CHANNEL_MODE", "best").strip().lower()
+if CHANNEL_MODE not in ("best", "mix"):
+    CHANNEL_MODE = "best"
+
+# Input device monitoring
+# A background thread keeps an input stream for the current default device
+# open (not started) so the next hotkey press does not pay for enumeration
+# or stream setup. Devices are re-enumerated when a stream fails to start or
+# loses its device. By default that is the only time: a headset plugged in
+# and made the system default while the current microphone still works is
+# NOT picked up until that microphone fails or the app restarts. Set
+# V2T_DEVICE_POLL_S to also re-enumerate that often while idle (0 = off;
+# re-initializing PortAudio wakes the CPU and makes ALSA probe every card,
+# so use an interval of several seconds or more, such as 10).
+DEVICE_POLL_SECONDS = float(os.environ.get("V2T_DEVICE_POLL_S", "0"))
+
+# Audio source
+# V2T_AUDIO_SOURCE replaces the microphone with a deterministic source that
+# feeds the same callback path, for repeatable latency benchmarks on machines
+# without audio hardware: "file:PATH" (WAV/FLAC), "synthetic[:SECONDS]"
+# (generated speech-like signal) or "replay:PATH" (captured callback blocks).
+# V2T_SOURCE_SPEED sets the playback speed: 1 is real time, 0 is as fast as
+# possible.
+AUDIO_SOURCE = os.environ.get("V2T_AUDIO_SOURCE", "").strip()
+SOURCE_SPEED = max(0.0, float(os.environ.get("V2T_SOURCE_SPEED", "1")))
+
+# Session flight recorder
+# Set V2T_SESSION_DIR to write every session to a compact binary file in that
+# directory (session-YYYYmmdd-HHMMSS.v2ts): the raw audio of each recording,
+# hotkey timestamps, overlay state changes and per-stage timings. Replay one
+# with `python replay.py FILE` to reproduce a slow session. Off by default;
+# the file contains everything you said while recording.
+SESSION_DIR = os.environ.get("V2T_SESSION_DIR", "").strip()
+
+# Slow-utterance traces
+# The app keeps timings for the last V2T_TRACE_RING utterances in memory
+# (stage timings, audio length, model, thread count, queue depth). When
+# release-to-inject latency goes over V2T_SLO_MS, that utterance's audio and
+# the recent traces are written to V2T_SLOW_DIR. 0 disables the dumps.
+TRACE_RING = max(1, int(os.environ.get("V2T_TRACE_RING", "100")))
+SLO_MS = float(os.environ.get("V2T_SLO_MS", "0"))
+SLOW_DIR = os.path.expanduser(os.environ.get("V2T_SLOW_DIR", "") or "~/.v2t/slow")
+
+# Utterance trace export
+# Every utterance gets an ID and timed spans (hotkey, recorder_stop,
+# queue_wait, preprocess, decode, inject). Set V2T_TRACE_FILE to append them
+# to a rotating JSONL file (summarize with `python trace_stats.py`), and/or
+# V2T_TRACE_OTLP to post them as OTLP/HTTP JSON to a local collector, e.g.
+# http://localhost:4318/v1/traces. Both are off by default.
+TRACE_FILE = os.path.expanduser(os.environ.get("V2T_TRACE_FILE", "").strip())
+TRACE_OTLP = os.environ.get("V2T_TRACE_OTLP", "").strip()
+
+# Metrics endpoint
+# Set V2T_METRICS to serve Prometheus metrics (utterances per minute, queue
+# depth, active transcriptions, decode RTF, injection time, xruns, overlay
+# frame time, RSS): "PORT" or "HOST:PORT" for HTTP (host defaults to
+# 127.0.0.1) or "unix:PATH" for a Unix socket. Off by default.
+METRICS = os.environ.get("V2T_METRICS", "").strip()
+
+# Built-in profiling
+# Set V2T_PROFILE to profile the hot paths (audio callback, transcription
+# worker, overlay animation tick, text injection) without attaching external
+# tools: "sample" samples their stacks every V2T_PROFILE_INTERVAL_MS and
+# writes collapsed stacks (flamegraph.pl, speedscope); "cprofile" writes
+# pstats files, one per hot path. A file is written every
+# V2T_PROFILE_WINDOW_S seconds and at exit, to V2T_PROFILE_DIR. Off by default.
+PROFILE = os.environ.get("V2T_PROFILE", "").strip().lower()
+PROFILE_DIR = os.path.expanduser(os.environ.get("V2T_PROFILE_DIR", "") or "~/.v2t/profiles")
+PROFILE_WINDOW_S = max(1.0, float(os.environ.get("V2T_PROFILE_WINDOW_S", "60")))
+PROFILE_INTERVAL_MS = max(1.0, float(os.environ.get("V2T_PROFILE_INTERVAL_MS", "5")))
+
+# Logging
+# Log records are queued and written by a background thread, so the audio
+# callback, hotkey listener and transcription worker never block on output.
+# V2T_LOG_LEVEL is debug, info (default), warning or error. V2T_LOG_FORMAT is
+# "text" (default) or "json" for one JSON object per line. V2T_LOG_RATE caps
+# the records per second from any one log call (0 = unlimited); the rest are
+# counted and reported with the next record that gets through.
+LOG_LEVEL = os.environ.get("V2T_LOG_LEVEL", "").strip().upper() or "INFO"
+LOG_FORMAT = os.environ.get("V2T_LOG_FORMAT", "").strip().lower() or "text"
+LOG_RATE = max(0, int(os.environ.get("V2T_LOG_RATE", "20")))
+
+# Shared transcription daemon
+# Set V2T_DAEMON_SOCKET to a Unix socket path to send audio to a daemon
+# started with `python main.py --daemon` instead of loading a Whisper model
+# in this process; several clients then share one loaded model. The daemon
+# listens on the same variable (default ~/.v2t/daemon.sock).
+DAEMON_SOCKET = os.path.expanduser(os.environ.get("V2T_DAEMON_SOCKET", "").strip())
+
+# HTTP transcription endpoint
+# Set V2T_HTTP ("PORT" or "HOST:PORT", host defaults to 127.0.0.1) to serve
+# the loaded model to other tools on the host as an OpenAI-compatible
+# POST /v1/audio/transcriptions, from the app or from --daemon.
+# V2T_HTTP_CONCURRENCY requests are processed at once and up to
+# V2T_HTTP_QUEUE more wait their turn (shared round-robin between clients);
+# further requests get 503. Uploads are limited to V2T_HTTP_MAX_MB. Off by default.
+HTTP = os.environ.get("V2T_HTTP", "").strip()
+HTTP_CONCURRENCY = max(1, int(os.environ.get("V2T_HTTP_CONCURRENCY", "1")))
+HTTP_QUEUE = max(0, int(os.environ.get("V2T_HTTP_QUEUE", "8")))
+HTTP_MAX_MB = max(1.0, float(os.environ.get("V2T_HTTP_MAX_MB", "25")))
+
+# Remote workers
+# Set V2T_WORKERS to comma-separated "HOST:PORT" addresses of machines
+# running `python main.py --worker HOST:PORT` to decode there instead of
+# locally. Each utterance goes, FLAC-compressed, to the least-loaded healthy
+# worker; workers are health-checked every V2T_WORKER_CHECK_S seconds. If
+# none is available, or one takes longer than V2T_WORKER_TIMEOUT_S plus the
+# audio's duration, the utterance is decoded with a local model. That model
+# is loaded in the background at startup; set V2T_WORKER_PRELOAD=0 to save
+# its memory and load it on the first fallback instead.
+WORKERS = [address.strip() for address in os.environ.get("V2T_WORKERS", "").split(",") if address.strip()]
+WORKER_TIMEOUT_S = max(0.1, float(os.environ.get("V2T_WORKER_TIMEOUT_S", "5")))
+WORKER_CHECK_S = max(0.1, float(os.environ.get("V2T_WORKER_CHECK_S", "5")))
+WORKER_PRELOAD = os.environ.get("V2T_WORKER_PRELOAD", "1").strip().lower() not in ("0", "false", "off", "no")
+
+# Single instance
+# Only one app runs per user: it holds a lock and a control socket in
+# V2T_INSTANCE_DIR (default ~/.v2t). Launching again (or `main.py --toggle`,
+# `--status`, `--quit`) talks to the running app instead of starting another.
+INSTANCE_DIR = os.path.expanduser(os.environ.get("V2T_INSTANCE_DIR", "") or "~/.v2t")
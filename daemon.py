@@ -0,0 +1,465 @@
+"""
+Headless transcription daemon and its client.
+
+One process (python main.py --daemon) owns a loaded AudioTranscriber and
+serves it on a Unix domain socket, so several capture-and-inject clients
+share one model and its warm caches instead of each loading their own.
+Clients set V2T_DAEMON_SOCKET and VoiceToTextApp uses DaemonTranscriber in
+place of a local model.
+
+Protocol: every message is a fixed header followed by a payload of the
+length given in the header; a connection carries any number of requests,
+answered in order.
+
+    request   REQUEST (magic, version, op, dtype, flags, peak, payload length)
+              payload: 16 kHz mono PCM or FLAC (OP_TRANSCRIBE), or nothing (OP_INFO)
+    response  RESPONSE (status, preprocess seconds, decode seconds, payload length)
+              payload: UTF-8 text, JSON for OP_INFO, or an error message
+"""
+
+import io
+import json
+import math
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from log import get_logger
+from preprocess import TARGET_SAMPLE_RATE
+
+log = get_logger("daemon")
+
+MAGIC = b"V2TD"
+VERSION = 1
+REQUEST = struct.Struct("!4sBBBBfI")
+RESPONSE = struct.Struct("!BddI")
+
+OP_TRANSCRIBE = 1
+OP_INFO = 2
+
+DTYPES = {1: np.dtype(np.float32), 2: np.dtype(np.int16)}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+# FLAC-compressed 16-bit audio, for clients on the network (see encode_flac).
+DTYPE_FLAC = 3
+FLAC_SCALE = struct.Struct("!f")
+
+FLAG_NORMALIZE = 1
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Largest accepted payload: over ten minutes of 16 kHz float32 audio.
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+DEFAULT_SOCKET = "~/.v2t/daemon.sock"
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def recv_exact(sock, size):
+    """Read exactly size bytes into a new buffer; raises ConnectionError on EOF."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("connection closed")
+        received += count
+    return buffer
+
+
+def _send(sock, header, payload=b""):
+    payload = memoryview(payload).cast("B")
+    sock.sendall(header)
+    if payload.nbytes:
+        sock.sendall(payload)
+
+
+def encode_flac(audio):
+    """
+    Compress 1-D float32 or int16 audio as 16-bit FLAC, prefixed with the
+    float scale that restores it. Float audio is quantized relative to its
+    own peak, so quiet recordings keep the full 16 bits of resolution.
+    """
+    import soundfile as sf
+
+    if audio.dtype == np.int16:
+        pcm, scale = audio, 1.0
+    else:
+        peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+        if peak == 0.0:
+            pcm, scale = np.zeros(len(audio), dtype=np.int16), 1.0
+        else:
+            pcm = np.rint(audio * (32767 / peak)).astype(np.int16)
+            scale = peak * 32768 / 32767
+    buffer = io.BytesIO()
+    sf.write(buffer, pcm, TARGET_SAMPLE_RATE, format="FLAC", subtype="PCM_16")
+    return FLAC_SCALE.pack(scale) + buffer.getvalue()
+
+
+def decode_flac(payload):
+    """Inverse of encode_flac: float32 audio in full-scale-1.0 units."""
+    import soundfile as sf
+
+    (scale,) = FLAC_SCALE.unpack_from(payload)
+    try:
+        audio, _ = sf.read(io.BytesIO(memoryview(payload)[FLAC_SCALE.size:]), dtype="float32")
+    except Exception as e:
+        raise ProtocolError(f"bad FLAC payload: {e}")
+    if scale != 1.0:
+        audio *= np.float32(scale)
+    return audio
+
+
+def _error(message):
+    body = str(message).encode()
+    return RESPONSE.pack(STATUS_ERROR, 0.0, 0.0, len(body)), body
+
+
+class _DaemonHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        with self.server.daemon._connections_lock:
+            self.server.daemon._connections.add(self.request)
+
+    def finish(self):
+        with self.server.daemon._connections_lock:
+            self.server.daemon._connections.discard(self.request)
+
+    def handle(self):
+        daemon = self.server.daemon
+        while True:
+            try:
+                header = recv_exact(self.request, REQUEST.size)
+            except (ConnectionError, OSError):
+                return
+            try:
+                magic, version, op, dtype, flags, peak, length = REQUEST.unpack(header)
+                if magic != MAGIC or version != VERSION:
+                    raise ProtocolError(f"unsupported protocol {magic!r} v{version}")
+                if length > MAX_PAYLOAD:
+                    raise ProtocolError(f"payload of {length} bytes is over the {MAX_PAYLOAD} byte limit")
+                payload = recv_exact(self.request, length) if length else bytearray()
+            except ProtocolError as e:
+                # The stream can't be trusted past a bad header.
+                try:
+                    _send(self.request, *_error(e))
+                except OSError:
+                    pass
+                return
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = daemon.handle(op, dtype, flags, peak, payload)
+            except ProtocolError as e:
+                response = _error(e)
+            except Exception as e:
+                log.exception("Daemon request failed", op=op, error=e)
+                response = _error(e)
+            try:
+                _send(self.request, *response)
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # A Unix socket refuses connections until listen(), which
+        # server_activate() calls after this, so restricting the file here
+        # leaves no window in which other local users could connect. (The
+        # umask would do it at bind time, but it is process-wide and would
+        # also apply to files other threads create meanwhile.)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+class TranscriptionDaemon:
+    """
+    Serves one transcriber to any number of clients on a Unix socket.
+
+    Each connection gets its own thread; decodes are serialized on the one
+    model, using lock if given (shared with the HTTP endpoint). The socket
+    is created owner-only (0600). pending counts the transcriptions being
+    decoded or waiting for the model.
+    """
+
+    def __init__(self, transcriber, path, lock=None):
+        self.transcriber = transcriber
+        self.path = path
+        self.requests = 0
+        self.pending = 0
+        self._decode_lock = lock or threading.Lock()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._server = self._listen()
+        self._server.daemon = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="daemon", daemon=True)
+
+    def _listen(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._remove_stale_socket()
+        return _UnixServer(self.path, _DaemonHandler)
+
+    def _wake(self):
+        """Make a throwaway connection so serve_forever() looks up."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as waker:
+            try:
+                waker.connect(self.path)
+            except OSError:
+                pass
+
+    def _cleanup(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)  # Left behind by a daemon that died.
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+        finally:
+            probe.close()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop accepting, disconnect the clients and remove the socket."""
+        stopping = threading.Thread(target=self._server.shutdown)
+        stopping.start()
+        # serve_forever() only checks for shutdown between accepts (or every
+        # 0.5 s); a throwaway connection makes it check right away.
+        while stopping.is_alive():
+            self._wake()
+            stopping.join(0.01)
+        self._server.server_close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._cleanup()
+
+    def info(self):
+        return {
+            "model": str(self.transcriber.get_model_name()),
+            "active_model": str(self.transcriber.get_active_model_name()),
+            "threads": self.transcriber.get_thread_count(),
+            "requests": self.requests,
+            "pending": self.pending,
+        }
+
+    def handle(self, op, dtype, flags, peak, payload):
+        """Answer one request; returns (header, payload) for the response."""
+        if op == OP_INFO:
+            body = json.dumps(self.info()).encode()
+            return RESPONSE.pack(STATUS_OK, 0.0, 0.0, len(body)), body
+        if op != OP_TRANSCRIBE:
+            raise ProtocolError(f"unknown op {op}")
+        if dtype == DTYPE_FLAC:
+            audio = decode_flac(payload)
+        elif dtype not in DTYPES:
+            raise ProtocolError(f"unknown sample format {dtype}")
+        elif len(payload) % DTYPES[dtype].itemsize:
+            raise ProtocolError("payload is not a whole number of samples")
+        else:
+            # The buffer was received for this request, so the transcriber may
+            # normalize it in place.
+            audio = np.frombuffer(payload, dtype=DTYPES[dtype])
+        with self._connections_lock:
+            self.pending += 1
+        try:
+            with self._decode_lock:
+                text = self.transcriber.transcribe(
+                    audio, peak=None if math.isnan(peak) else peak, normalize=bool(flags & FLAG_NORMALIZE),
+                )
+                timings = dict(self.transcriber.last_timings)
+                self.requests += 1
+        finally:
+            with self._connections_lock:
+                self.pending -= 1
+        preprocess = decode = 0.0
+        if "preprocess" in timings:
+            preprocess = timings["preprocess"][1] - timings["preprocess"][0]
+        if "decode" in timings:
+            decode = timings["decode"][1] - timings["decode"][0]
+        log.info(
+            "Transcribed for client",
+            audio_seconds=round(len(audio) / TARGET_SAMPLE_RATE, 2), decode_ms=round(decode * 1000, 1),
+        )
+        body = text.encode()
+        return RESPONSE.pack(STATUS_OK, preprocess, decode, len(body)), body
+
+
+class DaemonTranscriber:
+    """
+    AudioTranscriber stand-in that sends audio to a TranscriptionDaemon.
+
+    Keeps one connection open and reconnects once if the daemon restarted.
+    Like AudioTranscriber, transcribe() logs failures and returns "".
+    With compress=True audio is sent as FLAC.
+    """
+
+    def __init__(self, path, timeout=60.0, compress=False):
+        self.path = path
+        self.timeout = timeout
+        self.compress = compress
+        self.last_timings = {}
+        self._sock = None
+        self._lock = threading.Lock()
+        self._info = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _request(self, op, dtype=0, flags=0, peak=float("nan"), payload=b"", timeout=None):
+        header = REQUEST.pack(MAGIC, VERSION, op, dtype, flags, peak, memoryview(payload).nbytes)
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.settimeout(timeout or self.timeout)
+                try:
+                    _send(self._sock, header, payload)
+                    status, preprocess, decode, length = RESPONSE.unpack(recv_exact(self._sock, RESPONSE.size))
+                    body = bytes(recv_exact(self._sock, length)) if length else b""
+                    break
+                except OSError as e:
+                    # Mid-message the stream is unusable; start over on a new connection.
+                    self._sock.close()
+                    self._sock = None
+                    if attempt or not isinstance(e, ConnectionError):
+                        raise
+        if status != STATUS_OK:
+            raise RuntimeError(body.decode(errors="replace"))
+        return preprocess, decode, body
+
+    def _daemon_info(self):
+        if self._info is None:
+            try:
+                _, _, body = self._request(OP_INFO)
+                self._info = json.loads(body)
+            except (OSError, RuntimeError, ValueError) as e:
+                log.warning("Transcription daemon unavailable", socket=self.path, error=e)
+                return {}
+        return self._info
+
+    def get_model_name(self):
+        return self._daemon_info().get("model", f"daemon:{self.path}")
+
+    def get_active_model_name(self):
+        try:
+            _, _, body = self._request(OP_INFO)
+            return json.loads(body)["active_model"]
+        except (OSError, RuntimeError, ValueError, KeyError):
+            return self.get_model_name()
+
+    def get_thread_count(self):
+        return self._daemon_info().get("threads")
+
+    def request_transcription(self, audio_data, peak=None, normalize=True, timeout=None):
+        """Like transcribe(), but raises OSError or RuntimeError on failure."""
+        self.last_timings = {}
+        if len(audio_data) == 0:
+            return ""
+        audio = np.asarray(audio_data)
+        if audio.dtype not in DTYPE_CODES:
+            audio = audio.astype(np.float32)
+        audio = np.ascontiguousarray(audio.reshape(-1))
+        if self.compress:
+            dtype, payload = DTYPE_FLAC, encode_flac(audio)
+        else:
+            dtype, payload = DTYPE_CODES[audio.dtype], audio
+        preprocess, decode, body = self._request(
+            OP_TRANSCRIBE, dtype, FLAG_NORMALIZE if normalize else 0,
+            float("nan") if peak is None else float(peak), payload, timeout,
+        )
+        # The daemon reports durations; place them just before the reply arrived.
+        end = time.perf_counter()
+        self.last_timings["decode"] = (end - decode, end)
+        self.last_timings["preprocess"] = (end - decode - preprocess, end - decode)
+        return body.decode()
+
+    def transcribe(self, audio_data, peak=None, normalize=True):
+        try:
+            return self.request_transcription(audio_data, peak, normalize)
+        except (OSError, RuntimeError) as e:
+            log.error("Transcription daemon request failed", socket=self.path, error=e)
+            return ""
+
+
+def serve(path, transcriber=None, http="", server_class=TranscriptionDaemon):
+    """
+    Run the daemon until SIGINT or SIGTERM; http also serves it on that
+    address. server_class may be a TranscriptionDaemon subclass listening
+    elsewhere (workers.WorkerServer).
+    """
+    import config
+    from events import EventLoop
+    from http_server import ModelLock, TranscriptionHTTPServer
+
+    if transcriber is None:
+        from transcriber import AudioTranscriber
+
+        transcriber = AudioTranscriber()
+    # Daemon clients are dictating; HTTP requests wait behind them.
+    server = server_class(transcriber, path, lock=ModelLock() if http else None)
+    http_server = None
+    if http:
+        http_server = TranscriptionHTTPServer(
+            transcriber, http, lock=server._decode_lock,
+            concurrency=config.HTTP_CONCURRENCY, queue_size=config.HTTP_QUEUE,
+            max_bytes=int(config.HTTP_MAX_MB * 1024 * 1024),
+        ).start()
+        log.info("HTTP transcription endpoint", address=http)
+    server.start()
+    log.info("Transcription daemon listening", socket=path, model=transcriber.get_model_name())
+
+    loop = EventLoop()
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            handlers[signum] = signal.signal(signum, lambda signum, frame: loop.shutdown_event.set())
+    previous_wakeup = loop.install_signal_wakeup()
+    try:
+        loop.run()
+    finally:
+        loop.restore_signal_wakeup(previous_wakeup)
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        if http_server:
+            http_server.stop()
+        server.stop()
+        log.info("Transcription daemon stopped", requests=server.requests)
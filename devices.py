@@ -0,0 +1,144 @@
+import threading
+import time
+
+from log import get_logger
+
+log = get_logger("devices")
+
+# PortAudio is process-global and not safe to call from several threads at
+# once, least of all while it re-enumerates. Every call into it - opening,
+# starting and closing streams, device queries, re-initialization and the
+# feedback sounds - goes through this lock. It is reentrant so a holder can
+# call helpers that take it again.
+PORTAUDIO_LOCK = threading.RLock()
+
+
+class DeviceManager:
+    """
+    Cached view of the audio devices, with default-input change detection.
+
+    PortAudio enumerates devices once when it is initialized, so a headset
+    plugged in mid-session is only seen after re-initializing it. refresh()
+    does that and re-queries the default input. Re-initializing tears down
+    every stream and makes ALSA probe each card, so it is only done when a
+    stream fails, or every poll_interval seconds if that is set (0 = never,
+    so a new default device is not noticed while the current one works).
+    The manager's background thread (see start()) runs the checks, so the
+    hotkey path only ever reads the cache. The sounddevice module is passed
+    in as the backend.
+    """
+
+    def __init__(self, backend, poll_interval=0.0):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._default_input = None
+        self.error = None
+        self._devices = None
+        self._refreshed = time.monotonic()
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def _query_default_input(self):
+        try:
+            with PORTAUDIO_LOCK:
+                return dict(self.backend.query_devices(kind='input')), None
+        except Exception as e:
+            return None, e
+
+    def default_input(self):
+        """Return the cached default input device info (a dict), or None if there is none."""
+        with self._lock:
+            if self._default_input is None and self.error is None:
+                self._default_input, self.error = self._query_default_input()
+            return self._default_input
+
+    def default_input_name(self):
+        """Return the default input device name, or an 'Unknown (error: ...)' string."""
+        info = self.default_input()
+        if info is None:
+            return f"Unknown (error: {self.error})"
+        return info.get('name', 'Unknown')
+
+    def devices(self):
+        """Return the cached device list."""
+        with self._lock:
+            if self._devices is None:
+                with PORTAUDIO_LOCK:
+                    self._devices = self.backend.query_devices()
+            return self._devices
+
+    def _reinitialize(self):
+        terminate = getattr(self.backend, '_terminate', None)
+        initialize = getattr(self.backend, '_initialize', None)
+        if terminate is not None and initialize is not None:
+            terminate()
+            initialize()
+
+    def poll_due(self):
+        """Seconds until the next periodic refresh (<= 0 when due), or None if polling is off."""
+        if not self.poll_interval:
+            return None
+        return self._refreshed + self.poll_interval - time.monotonic()
+
+    def refresh(self):
+        """
+        Re-enumerate devices and return (old, new) default input info if the
+        default input changed, otherwise None. Callers must hold
+        PORTAUDIO_LOCK and make sure no stream is open, because PortAudio is
+        re-initialized.
+        """
+        with PORTAUDIO_LOCK:
+            self._reinitialize()
+            info, error = self._query_default_input()
+        self._refreshed = time.monotonic()
+        with self._lock:
+            previous = self._default_input
+            self._default_input, self.error = info, error
+            self._devices = None
+        if _identity(previous) == _identity(info):
+            return None
+        return previous, info
+
+    def start(self, on_tick):
+        """
+        Call on_tick() on a background thread when woken. on_tick returns the
+        number of seconds until it wants to run again, or None to sleep until
+        the next wake().
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_tick,), daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Run the next tick now instead of waiting for the poll interval."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, on_tick):
+        timeout = None
+        while not self._stopped.is_set():
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                timeout = on_tick()
+            except Exception as e:
+                log.error("Audio device check failed", error=e)
+                timeout = self.poll_interval or None
+
+
+def _identity(info):
+    if info is None:
+        return None
+    return info.get('name'), info.get('index'), info.get('default_samplerate')
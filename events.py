@@ -0,0 +1,180 @@
+"""
+Self-pipe event core.
+
+Any thread can post(kind, value): the event goes on a queue and a byte goes
+into a pipe. The thread that owns the loop sleeps until the pipe is
+readable, either in select() (run(), headless) or through a Qt
+QSocketNotifier that calls dispatch() (the overlay), and then runs the
+handlers for the queued events. Nothing polls, so an idle app does not
+wake up at all.
+
+Signals are routed through the same pipe with signal.set_wakeup_fd(), so
+Ctrl+C wakes the loop immediately even while Qt's event loop (which never
+returns to Python on its own) is running.
+"""
+
+import os
+import queue
+import select
+import signal
+import threading
+import time
+import weakref
+
+from log import get_logger
+
+log = get_logger("events")
+
+
+def _close(*fds):
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+class Wakeup:
+    """A non-blocking pipe: wake() from any thread makes fileno() readable."""
+
+    def __init__(self):
+        self._read, self.write_fd = os.pipe()
+        os.set_blocking(self._read, False)
+        os.set_blocking(self.write_fd, False)
+        weakref.finalize(self, _close, self._read, self.write_fd)
+
+    def fileno(self):
+        return self._read
+
+    def wake(self):
+        try:
+            os.write(self.write_fd, b"\0")
+        except BlockingIOError:
+            pass  # The pipe is full, so a wakeup is already pending.
+        except OSError:
+            pass  # Closed during interpreter shutdown.
+
+    def drain(self):
+        """Read and return everything written since the last drain."""
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self._read, 4096)
+            except (BlockingIOError, InterruptedError):
+                return data
+            if not chunk:
+                return data
+            data += chunk
+
+
+class _ShutdownEvent(threading.Event):
+    """threading.Event that also wakes the loop and notes when shutdown was requested."""
+
+    def __init__(self, loop):
+        super().__init__()
+        self._loop = loop
+        self.requested = None
+
+    def set(self):
+        if self.requested is None:
+            self.requested = time.perf_counter()
+        super().set()
+        self._loop.post("shutdown")
+
+
+class EventLoop:
+    """
+    Runs handlers registered with on(kind, handler) for events posted from
+    any thread, on the thread that calls run() or dispatch().
+
+    shutdown_event is a threading.Event whose set() wakes the loop; run()
+    returns once it is set. wakeups counts every time the loop woke,
+    idle_wakeups those that found no event (e.g. a signal whose handler did
+    nothing), and shutdown_latency is the time from shutdown_event.set() to
+    the loop noticing it.
+    """
+
+    def __init__(self):
+        self._wakeup = Wakeup()
+        self._events = queue.SimpleQueue()
+        self._handlers = {}
+        self.shutdown_event = _ShutdownEvent(self)
+        self.wakeups = 0
+        self.idle_wakeups = 0
+        self.dispatched = 0
+        self.signals = 0
+        self.shutdown_latency = None
+
+    def fileno(self):
+        return self._wakeup.fileno()
+
+    def on(self, kind, handler):
+        """Call handler(value) on the loop thread for each posted event of this kind."""
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def post(self, kind, value=None):
+        """Queue an event and wake the loop; safe from any thread."""
+        self._events.put((kind, value))
+        self._wakeup.wake()
+
+    def dispatch(self):
+        """Handle the pending events; returns False once shutdown has been requested."""
+        data = self._wakeup.drain()
+        self.wakeups += 1
+        # set_wakeup_fd writes the signal number; our own wakeups write 0.
+        self.signals += len(data) - data.count(0)
+        handled = 0
+        while True:
+            try:
+                kind, value = self._events.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            for handler in self._handlers.get(kind, ()):
+                try:
+                    handler(value)
+                except Exception as e:
+                    log.exception("Event handler failed", event=kind, error=e)
+        self.dispatched += handled
+        if not handled:
+            self.idle_wakeups += 1
+        if self.shutdown_event.is_set():
+            if self.shutdown_latency is None and self.shutdown_event.requested is not None:
+                self.shutdown_latency = time.perf_counter() - self.shutdown_event.requested
+            return False
+        return True
+
+    def run(self):
+        """Sleep until woken and dispatch, until shutdown_event is set."""
+        if self.shutdown_event.is_set():
+            self.dispatch()
+            return
+        while True:
+            select.select([self._wakeup], [], [])
+            if not self.dispatch():
+                return
+
+    def install_signal_wakeup(self):
+        """
+        Make signals wake the loop (main thread only). Returns the previous
+        wakeup fd, to pass to restore_signal_wakeup(), or None if this is
+        not the main thread.
+        """
+        try:
+            return signal.set_wakeup_fd(self._wakeup.write_fd, warn_on_full_buffer=False)
+        except ValueError:
+            return None
+
+    def restore_signal_wakeup(self, previous):
+        if previous is not None:
+            signal.set_wakeup_fd(previous)
+
+    def stats(self):
+        latency = self.shutdown_latency
+        return {
+            "wakeups": self.wakeups,
+            "idle_wakeups": self.idle_wakeups,
+            "events": self.dispatched,
+            "signals": self.signals,
+            "shutdown_latency_ms": None if latency is None else round(latency * 1000, 3),
+        }
@@ -1,12 +1,15 @@
 import math
 import queue
 import sys
+import time
 from ctypes import c_void_p
 
-from PySide6.QtCore import QRect, QRectF, Qt, QTimer
+from PySide6.QtCore import QRect, QRectF, QSocketNotifier, Qt, QTimer
 from PySide6.QtGui import QColor, QCursor, QFont, QGuiApplication, QIcon, QPainter, QPainterPath, QPen
 from PySide6.QtWidgets import QApplication, QHBoxLayout, QLabel, QWidget
 
+from profiling import profiled
+
 
 class _PillWindow(QWidget):
     def __init__(self, overlay):
@@ -38,8 +41,14 @@ class _PillWindow(QWidget):
         super().leaveEvent(event)
 
     def paintEvent(self, event):
+        started = time.perf_counter()
         super().paintEvent(event)
+        self._paint()
+        on_frame = self.overlay.on_frame
+        if on_frame is not None:
+            on_frame(time.perf_counter() - started)
 
+    def _paint(self):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
 
@@ -113,23 +122,29 @@ class _TipWindow(QWidget):
         bold_font = QFont("Helvetica", 20)
         bold_font.setBold(True)
 
-        left = QLabel(left_text)
-        left.setFont(base_font)
-        left.setStyleSheet("color: #f2f2f2; background: transparent;")
-        layout.addWidget(left)
+        self._left = QLabel(left_text)
+        self._left.setFont(base_font)
+        self._left.setStyleSheet("color: #f2f2f2; background: transparent;")
+        layout.addWidget(self._left)
 
-        key = QLabel(key_text)
-        key.setFont(bold_font)
-        key.setStyleSheet("color: #f38fd7; background: transparent;")
-        layout.addWidget(key)
+        self._key = QLabel(key_text)
+        self._key.setFont(bold_font)
+        self._key.setStyleSheet("color: #f38fd7; background: transparent;")
+        layout.addWidget(self._key)
 
-        right = QLabel(right_text)
-        right.setFont(base_font)
-        right.setStyleSheet("color: #f2f2f2; background: transparent;")
-        layout.addWidget(right)
+        self._right = QLabel(right_text)
+        self._right.setFont(base_font)
+        self._right.setStyleSheet("color: #f2f2f2; background: transparent;")
+        layout.addWidget(self._right)
 
         self.setLayout(layout)
 
+    def set_text(self, left_text, key_text, right_text):
+        self._left.setText(left_text)
+        self._key.setText(key_text)
+        self._right.setText(right_text)
+        self.adjustSize()
+
     def enterEvent(self, event):
         self.overlay._on_tip_enter()
         super().enterEvent(event)
@@ -162,6 +177,7 @@ class FloatingOverlay:
     STATE_RECORDING = "recording"
     STATE_TRANSCRIBING = "transcribing"
     _VALID_STATES = {STATE_IDLE, STATE_RECORDING, STATE_TRANSCRIBING}
+    ACTIVE_TICK_MS = 50
 
     def __init__(self, get_level, mode="push_to_talk", hotkey_label="Right Command", app_icon_path=None):
         self.get_level = get_level
@@ -171,6 +187,7 @@ class FloatingOverlay:
 
         self.state = self.STATE_IDLE
         self._state_updates = queue.SimpleQueue()
+        self._mode_updates = queue.SimpleQueue()
         self._phase = 0.0
         self._running = False
         self._hovering_pill = False
@@ -185,6 +202,8 @@ class FloatingOverlay:
         self._pill_opacity_idle = 0.60
         self._pill_opacity_active = 0.70
         self._smoothed_level = 0.0
+        # Called with each pill frame's paint time in seconds (metrics).
+        self.on_frame = None
 
         self._app = QApplication.instance()
         self._owns_app = self._app is None
@@ -200,8 +219,10 @@ class FloatingOverlay:
         self._tick_timer = QTimer()
         self._tick_timer.timeout.connect(self._tick)
 
-        self._shutdown_timer = QTimer()
-        self._shutdown_timer.timeout.connect(self._watch_shutdown)
+        # State changes and shutdown arrive through the app's event loop
+        # (see run()); nothing is polled for them.
+        self._events = None
+        self._notifier = None
 
     def _apply_icon(self):
         if not self.app_icon_path:
@@ -223,10 +244,22 @@ class FloatingOverlay:
     def set_state_threadsafe(self, state):
         if state in self._VALID_STATES:
             self._state_updates.put(state)
+            if self._events is not None:
+                self._events.post("overlay")
 
-    def run(self, shutdown_event):
+    def set_mode_threadsafe(self, mode):
+        """Switch the hover hint to another recording mode."""
+        self._mode_updates.put(mode)
+        if self._events is not None:
+            self._events.post("overlay")
+
+    def run(self, events):
+        """Show the overlay and run Qt until events.shutdown_event is set (events is an events.EventLoop)."""
         self._running = True
-        self._shutdown_event = shutdown_event
+        self._events = events
+        events.on("overlay", lambda _: self._apply_state_updates())
+        self._notifier = QSocketNotifier(events.fileno(), QSocketNotifier.Type.Read)
+        self._notifier.activated.connect(self._on_events)
 
         self._position_pill()
         self._apply_pill_opacity()
@@ -234,8 +267,16 @@ class FloatingOverlay:
         self._pill.raise_()
         self._apply_native_window_hints(self._pill)
         self._apply_native_window_hints(self._tip)
-        self._tick_timer.start(50)
-        self._shutdown_timer.start(100)
+        # Idle, nothing ticks: the pill is re-anchored when the screens
+        # change and whenever the state changes (e.g. recording starts with
+        # the cursor on another screen).
+        self._app.screenAdded.connect(self._on_screens_changed)
+        self._app.screenRemoved.connect(self._on_screens_changed)
+        self._app.primaryScreenChanged.connect(self._on_screens_changed)
+        self._apply_state_updates()
+        self._schedule_tick()
+        # A shutdown requested before this point is still pending in the
+        # pipe, so the notifier fires as soon as Qt starts.
 
         if self._owns_app:
             self._app.exec()
@@ -246,7 +287,8 @@ class FloatingOverlay:
 
         self._running = False
         self._tick_timer.stop()
-        self._shutdown_timer.stop()
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
 
         self._tip.hide()
         self._pill.hide()
@@ -257,12 +299,49 @@ class FloatingOverlay:
         if self._owns_app:
             self._app.quit()
 
-    def _watch_shutdown(self):
-        if not self._running:
-            return
-        if self._shutdown_event.is_set():
+    def _on_events(self):
+        if not self._events.dispatch():
             self.close()
 
+    def _tick_interval(self):
+        # Animate at 20 fps while recording, transcribing or showing the
+        # tip; when idle the pill is static and the timer is stopped.
+        if self.state == self.STATE_IDLE and not self._tip.isVisible():
+            return None
+        return self.ACTIVE_TICK_MS
+
+    def _schedule_tick(self):
+        interval = self._tick_interval()
+        if interval is None:
+            self._tick_timer.stop()
+        elif not self._tick_timer.isActive() or self._tick_timer.interval() != interval:
+            self._tick_timer.start(interval)
+
+    def _on_screens_changed(self, *args):
+        if self._running:
+            self._follow_screen()
+
+    def _apply_state_updates(self):
+        new_mode = None
+        while not self._mode_updates.empty():
+            new_mode = self._mode_updates.get()
+        if new_mode and new_mode != self.mode:
+            self.mode = new_mode
+            self._tip.set_text(*self._hint_parts())
+            if self._tip.isVisible():
+                self._position_tip()
+
+        new_state = None
+        while not self._state_updates.empty():
+            new_state = self._state_updates.get()
+
+        if new_state and new_state != self.state:
+            self.state = new_state
+            self._follow_screen()
+            self._apply_pill_opacity()
+            self._update_tip_visibility()
+            self._pill.update()
+
     def _on_pill_enter(self):
         self._hovering_pill = True
         self._update_tip_visibility()
@@ -291,6 +370,7 @@ class FloatingOverlay:
             self._apply_native_window_hints(self._tip)
         else:
             self._tip.hide()
+        self._schedule_tick()
 
     def _target_screen(self):
         screen = QGuiApplication.screenAt(QCursor.pos())
@@ -339,10 +419,15 @@ class FloatingOverlay:
         y = max(geometry.y() + self._screen_margin_x, y)
         self._tip.move(x, y)
 
+    @profiled("overlay_tick")
     def _tick(self):
         if not self._running:
             return
 
+        self._follow_screen()
+        self._pill.update()
+
+    def _follow_screen(self):
         geometry = self._screen_geometry()
         anchor = (
             geometry.x(),
@@ -355,17 +440,6 @@ class FloatingOverlay:
             if self._tip.isVisible():
                 self._position_tip()
 
-        new_state = None
-        while not self._state_updates.empty():
-            new_state = self._state_updates.get()
-
-        if new_state and new_state != self.state:
-            self.state = new_state
-            self._apply_pill_opacity()
-            self._update_tip_visibility()
-
-        self._pill.update()
-
     def _apply_pill_opacity(self):
         if self.state == self.STATE_IDLE:
             self._pill.setWindowOpacity(self._pill_opacity_idle)
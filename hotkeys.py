@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+from log import get_logger
+
+log = get_logger("hotkeys")
+
+
+class HotkeyDispatcher:
+    """
+    Moves key handling off the keyboard listener thread.
+
+    press() and release() are the pynput listener callbacks: they only
+    timestamp the event and put it on a queue, so the OS never waits on
+    sounds, device opens or buffer copies. A controller thread takes events
+    off the queue in order and calls handler(kind, key, timestamp), where
+    kind is "press" or "release" and timestamp is the event's perf_counter
+    time. command() queues other kinds of event (e.g. a "toggle" from the
+    control socket) in the same order, so the state machine stays on one
+    thread.
+
+    Time spent inside each listener callback and the delay from event to
+    handler are observed on callback_time and dispatch_delay (anything with
+    observe(seconds), e.g. a metrics.Histogram) and summarized by summary().
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.callback_time = None
+        self.dispatch_delay = None
+        # SimpleQueue.put never blocks and takes no Python-level lock.
+        self._events = queue.SimpleQueue()
+        self._thread = None
+        self.events = 0
+        self._callback_total = 0.0
+        self._callback_max = 0.0
+        self._delay_max = 0.0
+
+    def press(self, key):
+        self._push("press", key)
+
+    def release(self, key):
+        self._push("release", key)
+
+    def command(self, kind, value=None):
+        """Queue handler(kind, value, now) without counting it as a listener callback."""
+        self._events.put((kind, value, time.perf_counter()))
+
+    def _push(self, kind, key):
+        timestamp = time.perf_counter()
+        self._events.put((kind, key, timestamp))
+        elapsed = time.perf_counter() - timestamp
+        # Only the listener thread writes these.
+        self.events += 1
+        self._callback_total += elapsed
+        if elapsed > self._callback_max:
+            self._callback_max = elapsed
+        if self.callback_time is not None:
+            self.callback_time.observe(elapsed)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="hotkey-controller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Handle the events already queued, then stop the controller thread."""
+        if self._thread is not None:
+            self._events.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            kind, key, timestamp = event
+            delay = time.perf_counter() - timestamp
+            self._delay_max = max(self._delay_max, delay)
+            if self.dispatch_delay is not None:
+                self.dispatch_delay.observe(delay)
+            try:
+                self.handler(kind, key, timestamp)
+            except Exception as e:
+                log.exception("Hotkey handler failed", event=kind, error=e)
+
+    def summary(self):
+        """Listener callback and dispatch times in microseconds."""
+        mean = self._callback_total / self.events if self.events else 0.0
+        return {
+            "events": self.events,
+            "callback_mean_us": round(mean * 1e6, 1),
+            "callback_max_us": round(self._callback_max * 1e6, 1),
+            "dispatch_max_us": round(self._delay_max * 1e6, 1),
+        }
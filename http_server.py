@@ -0,0 +1,491 @@
+"""
+OpenAI-compatible transcription endpoint for other tools on the host.
+
+Serves POST /v1/audio/transcriptions from the already-loaded transcriber,
+so local tools reuse the warm model instead of loading their own:
+
+    curl -F file=@note.wav http://127.0.0.1:8765/v1/audio/transcriptions
+
+The multipart upload is parsed as it streams in (file parts spill to a
+temporary file past a few MiB). Requests are admitted up to
+concurrency + queue_size at a time, beyond which they get 503. Admitted
+requests wait for one of `concurrency` slots, handed out round-robin across
+clients, so one busy client cannot starve the others. Clients are told
+apart by the X-Client-ID header, else the API key, else the peer address
+and User-Agent (local tools all come from 127.0.0.1). Local dictation
+shares the model through a ModelLock and goes ahead of waiting HTTP
+requests. Every response carries a Server-Timing header with the queue,
+upload, audio decoding, preprocess and decode durations.
+"""
+
+import collections
+import contextlib
+import hashlib
+import http.server
+import json
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from log import get_logger
+from preprocess import TARGET_SAMPLE_RATE, PolyphaseResampler
+
+log = get_logger("http")
+
+PATH = "/v1/audio/transcriptions"
+READ_CHUNK = 64 * 1024
+# File parts up to this size stay in memory.
+SPOOL_BYTES = 4 * 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+RESPONSE_FORMATS = ("json", "text", "verbose_json")
+
+
+class RequestError(Exception):
+    """A request that is answered with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_header_params(value):
+    """Split 'form-data; name="file"; filename="a.wav"' into ("form-data", {...})."""
+    main, _, rest = value.partition(";")
+    params = {}
+    for match in re.finditer(r'(\w+)\*?=(?:"((?:[^"\\]|\\.)*)"|([^;\s]*))', rest):
+        params[match.group(1).lower()] = match.group(2) if match.group(2) is not None else match.group(3)
+    return main.strip().lower(), params
+
+
+def parse_multipart(
+    read, boundary, length, max_field_bytes=MAX_FIELD_BYTES, spool_bytes=SPOOL_BYTES, file_names=None,
+):
+    """
+    Parse a multipart/form-data body of `length` bytes from read(n) as it
+    arrives. Returns (fields, files): fields maps names to strings, files
+    maps names to (filename, content_type, file object at offset 0). If
+    file_names is given, other file parts are skipped without being
+    stored. The whole body is consumed, epilogue included, so a kept-alive
+    connection starts its next request at the right place.
+    """
+    delimiter = b"\r\n--" + boundary.encode("latin-1")
+    buffer = bytearray(b"\r\n")  # The first boundary has no leading CRLF.
+    remaining = length
+
+    def fill():
+        nonlocal remaining
+        if remaining <= 0:
+            return False
+        chunk = read(min(READ_CHUNK, remaining))
+        if not chunk:
+            raise RequestError(400, "upload ended early")
+        remaining -= len(chunk)
+        buffer.extend(chunk)
+        return True
+
+    def skip_to_delimiter(sink=None):
+        """Move bytes up to the next delimiter into sink; consume the delimiter."""
+        while True:
+            index = buffer.find(delimiter)
+            if index >= 0:
+                if sink is not None:
+                    sink(buffer[:index])
+                del buffer[:index + len(delimiter)]
+                return
+            # Keep a tail that could be the start of a split delimiter.
+            keep = len(delimiter) - 1
+            if sink is not None and len(buffer) > keep:
+                sink(buffer[:-keep])
+                del buffer[:-keep]
+            if not fill():
+                raise RequestError(400, "multipart boundary not found")
+
+    def take_line_end():
+        while len(buffer) < 2:
+            if not fill():
+                raise RequestError(400, "truncated multipart body")
+        ending = bytes(buffer[:2])
+        del buffer[:2]
+        return ending
+
+    fields, files = {}, {}
+    try:
+        skip_to_delimiter()  # Preamble.
+        while True:
+            ending = take_line_end()
+            if ending == b"--":
+                break
+            if ending != b"\r\n":
+                raise RequestError(400, "malformed multipart boundary")
+            while b"\r\n\r\n" not in buffer:
+                if len(buffer) > max_field_bytes or not fill():
+                    raise RequestError(400, "malformed multipart part headers")
+            raw_headers, _, _ = bytes(buffer).partition(b"\r\n\r\n")
+            del buffer[:len(raw_headers) + 4]
+            headers = {}
+            for line in raw_headers.decode("utf-8", "replace").split("\r\n"):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            _, params = _parse_header_params(headers.get("content-disposition", ""))
+            name = params.get("name", "")
+            if "filename" in params:
+                if file_names is not None and name not in file_names:
+                    skip_to_delimiter()
+                    continue
+                spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+                try:
+                    skip_to_delimiter(spool.write)
+                except BaseException:
+                    spool.close()
+                    raise
+                spool.seek(0)
+                if name in files:
+                    files[name][2].close()
+                files[name] = (params["filename"], headers.get("content-type", ""), spool)
+            else:
+                value = bytearray()
+
+                def collect(data):
+                    if len(value) + len(data) > max_field_bytes:
+                        raise RequestError(413, f"form field '{name}' is too large")
+                    value.extend(data)
+
+                skip_to_delimiter(collect)
+                fields[name] = value.decode("utf-8", "replace")
+        # Drain the epilogue.
+        while fill():
+            buffer.clear()
+    except BaseException:
+        for _, _, spool in files.values():
+            spool.close()
+        raise
+    return fields, files
+
+
+def decode_audio(file):
+    """Decode an uploaded audio file to 16 kHz mono float32."""
+    import soundfile as sf
+
+    try:
+        audio, rate = sf.read(file, dtype="float32", always_2d=True)
+    except Exception as e:
+        raise RequestError(400, f"could not decode audio: {e}")
+    audio = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+    if rate != TARGET_SAMPLE_RATE:
+        resampler = PolyphaseResampler(rate, TARGET_SAMPLE_RATE)
+        audio = np.concatenate((resampler.process(audio), resampler.flush()))
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class FairScheduler:
+    """
+    Hands out `slots` concurrent slots; waiting requests are served
+    round-robin across clients, oldest first within a client.
+    """
+
+    def __init__(self, slots=1):
+        self.slots = slots
+        self.active = 0
+        self._waiting = collections.OrderedDict()  # client -> deque of events
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self):
+        with self._lock:
+            return sum(len(tickets) for tickets in self._waiting.values())
+
+    def acquire(self, client, timeout=None):
+        """Wait for a slot; returns False if timeout passed first."""
+        with self._lock:
+            if self.active < self.slots and not self._waiting:
+                self.active += 1
+                return True
+            ticket = threading.Event()
+            self._waiting.setdefault(client, collections.deque()).append(ticket)
+        if ticket.wait(timeout):
+            return True
+        with self._lock:
+            if ticket.is_set():
+                return True  # Granted just as the wait timed out.
+            tickets = self._waiting[client]
+            tickets.remove(ticket)
+            if not tickets:
+                del self._waiting[client]
+        return False
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            while self.active < self.slots and self._waiting:
+                client, tickets = next(iter(self._waiting.items()))
+                ticket = tickets.popleft()
+                # The client goes to the back of the rotation.
+                del self._waiting[client]
+                if tickets:
+                    self._waiting[client] = tickets
+                self.active += 1
+                ticket.set()
+
+
+class ModelLock:
+    """
+    Lock around a model shared by dictation and HTTP requests.
+
+    A plain `with lock:` (dictation, daemon clients) is served before any
+    request waiting in background(), so the person at the keyboard never
+    queues behind other tools' uploads. A decode that is already running
+    is not interrupted.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._held = False
+        self._urgent = 0
+
+    def acquire(self):
+        with self._condition:
+            self._urgent += 1
+            while self._held:
+                self._condition.wait()
+            self._urgent -= 1
+            self._held = True
+        return True
+
+    def release(self):
+        with self._condition:
+            self._held = False
+            self._condition.notify_all()
+
+    def locked(self):
+        return self._held
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @contextlib.contextmanager
+    def background(self):
+        """Hold the lock once no urgent acquirer is waiting."""
+        with self._condition:
+            while self._held or self._urgent:
+                self._condition.wait()
+            self._held = True
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def client_key(headers, address):
+    """Fairness key for a request: X-Client-ID, else the API key, else peer address and User-Agent."""
+    client = headers.get("X-Client-ID")
+    if client:
+        return client
+    scheme, _, token = (headers.get("Authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token.strip():
+        # Keys are only compared, and logged as a short digest.
+        return "key:" + hashlib.sha256(token.strip().encode()).hexdigest()[:12]
+    agent = headers.get("User-Agent")
+    return f"{address} {agent}" if agent else address
+
+
+class _TranscriptionHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server.transcription
+        started = time.perf_counter()
+        timings = {}
+        admitted = False
+        try:
+            if self.path.split("?", 1)[0] != PATH:
+                raise RequestError(404, "not found")
+            admitted = server.admit()
+            if not admitted:
+                raise RequestError(503, "too many requests queued")
+            text, info = server.transcribe_request(self, timings)
+        except RequestError as e:
+            self._error(e.status, str(e), timings, started)
+            return
+        except Exception as e:
+            log.exception("Transcription request failed", error=e)
+            self._error(500, "internal error", timings, started)
+            return
+        finally:
+            if admitted:
+                server.leave()
+        timings["total"] = time.perf_counter() - started
+
+        response_format = info.pop("response_format")
+        if response_format == "text":
+            body, content_type = (text + "\n").encode(), "text/plain; charset=utf-8"
+        else:
+            payload = {"text": text}
+            if response_format == "verbose_json":
+                payload.update(info, timings_ms={name: round(s * 1000, 2) for name, s in timings.items()})
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        self._send(200, body, content_type, timings)
+
+    def do_GET(self):
+        self._error(405, "use POST", {}, time.perf_counter())
+
+    def _error(self, status, message, timings, started):
+        timings["total"] = time.perf_counter() - started
+        body = json.dumps({"error": {"message": message, "code": status}}).encode()
+        self._send(status, body, "application/json", timings, retry=status == 503)
+        self.close_connection = True
+
+    def _send(self, status, body, content_type, timings, retry=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Server-Timing", ", ".join(f"{name};dur={s * 1000:.2f}" for name, s in timings.items()))
+        if retry:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class TranscriptionHTTPServer:
+    """
+    Serves a transcriber over HTTP on a background thread.
+
+    address is "PORT" or "HOST:PORT" (HOST defaults to 127.0.0.1). lock
+    guards the transcriber, and must be the lock its other users hold,
+    since a model decodes one clip at a time; with a ModelLock, requests
+    wait behind those other users. concurrency requests are
+    processed at once, up to queue_size more wait, and further requests
+    are turned away with 503. Requests wait at most queue_timeout seconds.
+    """
+
+    def __init__(self, transcriber, address, lock=None, concurrency=1, queue_size=8,
+                 max_bytes=25 * 1024 * 1024, queue_timeout=60.0):
+        self.transcriber = transcriber
+        self.lock = lock or ModelLock()
+        self.scheduler = FairScheduler(concurrency)
+        self.capacity = concurrency + queue_size
+        self.max_bytes = max_bytes
+        self.queue_timeout = queue_timeout
+        self.requests = 0
+        self.rejected = 0
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+        host, _, port = address.rpartition(":")
+        self._server = _HTTPServer((host or "127.0.0.1", int(port)), _TranscriptionHandler)
+        self._server.transcription = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="http", daemon=True)
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def admit(self):
+        with self._count_lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def leave(self):
+        with self._count_lock:
+            self._in_flight -= 1
+
+    def _read_upload(self, handler, timings):
+        content_type, params = _parse_header_params(handler.headers.get("Content-Type", ""))
+        length = handler.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(411, "Content-Length required")
+        try:
+            length = int(length)
+        except ValueError:
+            raise RequestError(400, "invalid Content-Length")
+        if length < 0:
+            raise RequestError(400, "invalid Content-Length")
+        if length > self.max_bytes:
+            raise RequestError(413, f"upload is over {self.max_bytes} bytes")
+
+        start = time.perf_counter()
+        if content_type == "multipart/form-data":
+            if "boundary" not in params:
+                raise RequestError(400, "multipart boundary missing")
+            fields, files = parse_multipart(handler.rfile.read, params["boundary"], length, file_names=("file",))
+            if "file" not in files:
+                raise RequestError(400, "missing 'file' field")
+            upload = files["file"][2]
+        else:
+            # A bare audio body (e.g. curl --data-binary @note.wav -H 'Content-Type: audio/wav').
+            fields = dict(part.split("=", 1) for part in handler.path.partition("?")[2].split("&") if "=" in part)
+            upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+            remaining = length
+            while remaining > 0:
+                chunk = handler.rfile.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    raise RequestError(400, "upload ended early")
+                upload.write(chunk)
+                remaining -= len(chunk)
+            upload.seek(0)
+        timings["upload"] = time.perf_counter() - start
+        return fields, upload
+
+    def _hold_model(self):
+        """Take the model lock behind dictation if it is a ModelLock; a plain lock is simply taken."""
+        background = getattr(self.lock, "background", None)
+        return background() if background is not None else self.lock
+
+    def transcribe_request(self, handler, timings):
+        fields, upload = self._read_upload(handler, timings)
+        response_format = fields.get("response_format", "json")
+        if response_format not in RESPONSE_FORMATS:
+            raise RequestError(400, f"response_format must be one of {', '.join(RESPONSE_FORMATS)}")
+        client = client_key(handler.headers, handler.client_address[0])
+
+        start = time.perf_counter()
+        if not self.scheduler.acquire(client, self.queue_timeout):
+            raise RequestError(503, "timed out waiting for the model")
+        timings["queue"] = time.perf_counter() - start
+        try:
+            start = time.perf_counter()
+            with upload:
+                audio = decode_audio(upload)
+            timings["audio"] = time.perf_counter() - start
+            start = time.perf_counter()
+            with self._hold_model():
+                timings["model_wait"] = time.perf_counter() - start
+                text = self.transcriber.transcribe(audio)
+                steps = dict(self.transcriber.last_timings)
+                model = str(self.transcriber.get_active_model_name())
+        finally:
+            self.scheduler.release()
+        for name in ("preprocess", "decode"):
+            if name in steps:
+                timings[name] = steps[name][1] - steps[name][0]
+        with self._count_lock:
+            self.requests += 1
+        duration = len(audio) / TARGET_SAMPLE_RATE
+        log.info("HTTP transcription", client=client, audio_seconds=round(duration, 2))
+        return text, {"response_format": response_format, "duration": duration, "model": model}
@@ -4,12 +4,18 @@ import sys
 import subprocess
 import os
 
+from log import get_logger
+from profiling import profiled
+
+log = get_logger("injector")
+
 class TextInjector:
     def __init__(self):
         self.keyboard = Controller()
         self.is_mac = sys.platform == 'darwin'
         self._use_applescript = self.is_mac and os.environ.get("V2T_DISABLE_APPLESCRIPT") != "1"
 
+    @profiled("type_text")
     def type_text(self, text):
         """
         Type the given text into the currently focused window.
@@ -54,26 +60,16 @@ class TextInjector:
                 # If AppleScript is blocked by permissions, stop retrying it every time.
                 if "not allowed to send keystrokes" in error_details:
                     self._use_applescript = False
-                    print(
+                    log.warning(
                         "AppleScript text injection is not permitted for this process. "
-                        "Falling back to pynput for this session.",
-                        flush=True
-                    )
-                    print(
+                        "Falling back to pynput for this session. "
                         "To fix this: System Settings > Privacy & Security > Accessibility "
-                        "and enable your terminal app (Terminal/iTerm/VS Code).",
-                        flush=True
-                    )
-                    print(
+                        "and enable your terminal app (Terminal/iTerm/VS Code). "
                         "Also check: System Settings > Privacy & Security > Automation "
-                        "and allow control of System Events.",
-                        flush=True
+                        "and allow control of System Events."
                     )
                 else:
-                    print(
-                        f"AppleScript injection failed: {error_details}. Falling back to pynput.",
-                        flush=True
-                    )
+                    log.warning("AppleScript injection failed, falling back to pynput", error=error_details)
 
         # Fallback or non-macOS
         self.keyboard.type(text)
@@ -0,0 +1,142 @@
+"""
+Single-instance lock and control socket.
+
+The first launch takes an exclusive flock on instance.lock and listens on
+instance.sock next to it (both in ~/.v2t). The kernel releases the lock
+when the process exits however it dies, so there is no stale-lock cleanup
+and no window in which two launches both think they are first. A second
+launch fails to take the lock, sends its command to the running instance
+over the socket and exits without loading a model:
+
+    python main.py --toggle     # start or stop recording
+    python main.py --status
+    python main.py              # forwards its V2T_* settings
+
+Messages are one JSON object per line: {"command": ..., "args": {...}} in,
+{"ok": true, ...} or {"ok": false, "error": ...} out.
+"""
+
+import fcntl
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from log import get_logger
+
+log = get_logger("instance")
+
+LOCK_NAME = "instance.lock"
+SOCKET_NAME = "instance.sock"
+# The holder binds the socket just after taking the lock; a second launch
+# retries connecting for this long.
+CONNECT_WAIT_S = 2.0
+
+
+class InstanceLock:
+    """Exclusive, non-blocking flock on directory/instance.lock."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, LOCK_NAME)
+        self.socket_path = os.path.join(directory, SOCKET_NAME)
+        self._fd = None
+
+    def acquire(self):
+        """Take the lock; returns False if another process holds it."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # The pid is informational (e.g. for `kill`); the lock is what counts.
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(64 * 1024)
+        try:
+            request = json.loads(line)
+            handler = self.server.control.handler
+            if handler is None:
+                raise RuntimeError("still starting")
+            reply = dict(handler(request["command"], request.get("args") or {}) or {}, ok=True)
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(reply, default=str).encode() + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Owner-only before listen() (until then connections are refused);
+        # see daemon._UnixServer for why this does not use the umask.
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+class ControlServer:
+    """
+    Answers commands from later launches on the lock holder's socket.
+
+    handler(command, args) returns a dict merged into the reply, or raises
+    to report an error; until it is set, commands are refused as "still
+    starting". Only start this while holding the InstanceLock, which is
+    what makes removing an old socket file safe.
+    """
+
+    def __init__(self, path, handler=None):
+        self.path = path
+        self.handler = handler
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = _UnixServer(path, _ControlHandler)
+        self._server.control = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="control", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def send(path, command, args=None, timeout=5.0):
+    """Send a command to the running instance and return its reply."""
+    deadline = time.monotonic() + CONNECT_WAIT_S
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps({"command": command, "args": args or {}}).encode() + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("the running instance closed the connection")
+    return json.loads(line)
@@ -0,0 +1,210 @@
+"""
+Non-blocking structured logging.
+
+Log calls from the audio callback, the hotkey listener or the transcription
+worker only format a record and put it on a bounded queue; a background
+thread writes it to stdout. A slow terminal or a full pipe therefore never
+stalls capture or hotkey handling. If the queue is full, records are
+dropped and counted rather than waited for.
+
+    log = get_logger("recorder")
+    log.info("Recording started", samplerate=48000)
+    # 14:01:12.345 INFO    recorder: Recording started samplerate=48000
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+import config
+
+# Records waiting for the writer; past this, new records are dropped.
+QUEUE_SIZE = 10000
+
+_setup_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def _field(value):
+    text = str(value)
+    if not text or any(c.isspace() or c in '"=' for c in text):
+        return json.dumps(text)
+    return text
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats a record and its fields as text (key=value) or as one JSON object per line."""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        message = record.getMessage()
+        if self.json_lines:
+            entry = {
+                "time": round(record.created, 3),
+                "level": record.levelname.lower(),
+                "logger": record.name,
+                "message": message,
+            }
+            entry.update(fields)
+            return json.dumps(entry, default=str)
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{stamp}.{int(record.msecs):03d} {record.levelname:<7} {record.name.removeprefix('v2t.')}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={_field(value)}" for key, value in fields.items())
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per call site through per `interval`
+    seconds; the first record after a suppressed burst carries a
+    suppressed=N field. A limit of 0 disables rate limiting.
+    """
+
+    def __init__(self, limit, interval=1.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.limit:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.fields = dict(getattr(record, "fields", None) or {}, suppressed=suppressed)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        # handle() holds the handler lock here, so dropped needs no extra lock.
+        dropped = self.dropped
+        if dropped:
+            record.fields = dict(getattr(record, "fields", None) or {}, dropped=dropped)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped -= dropped
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to sys.stdout as it is at write time, so redirection is honoured."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _setup():
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is not None:
+            return
+        level = logging.getLevelName(config.LOG_LEVEL)
+        root = logging.getLogger("v2t")
+        root.setLevel(level if isinstance(level, int) else logging.INFO)
+        root.propagate = False
+
+        output = _StdoutHandler()
+        output.setFormatter(StructuredFormatter(json_lines=config.LOG_FORMAT == "json"))
+        handler = _QueueHandler(queue.Queue(QUEUE_SIZE))
+        handler.addFilter(RateLimitFilter(config.LOG_RATE))
+        root.addHandler(handler)
+        _listener = logging.handlers.QueueListener(handler.queue, output)
+        _listener.start()
+        _handler = handler
+        atexit.register(stop)
+
+
+def flush():
+    """Wait until every queued record has been written."""
+    if _listener is not None and _listener._thread is not None:
+        _handler.queue.join()
+
+
+def stop():
+    """Write the remaining records and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def set_level(level):
+    """Change the level of every app logger, e.g. set_level("WARNING") in a benchmark."""
+    _setup()
+    logging.getLogger("v2t").setLevel(level)
+
+
+def dropped():
+    """Records dropped because the queue was full and not yet reported."""
+    return _handler.dropped if _handler is not None else 0
+
+
+class Logger:
+    """Logger taking a fixed message plus keyword fields: log.info("Model loaded", model=name)."""
+
+    def __init__(self, name):
+        _setup()
+        self._logger = logging.getLogger(f"v2t.{name}")
+
+    def _log(self, level, message, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            # stacklevel 3 points the record (and the rate limit) at our caller.
+            self._logger.log(level, message, extra={"fields": fields}, exc_info=exc_info, stacklevel=3)
+
+    def debug(self, message, **fields):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message, **fields):
+        self._log(logging.ERROR, message, fields)
+
+    def exception(self, message, **fields):
+        """Log an error with the current exception's traceback."""
+        self._log(logging.ERROR, message, fields, exc_info=True)
+
+
+def get_logger(name):
+    return Logger(name)
@@ -1,3 +1,4 @@
+import argparse
 from pynput import keyboard
 import threading
 import time
@@ -5,40 +6,146 @@ import sys
 import signal
 import os
 from pathlib import Path
+import config
+import profiling
+from log import get_logger
+from preprocess import TARGET_SAMPLE_RATE
 from recorder import AudioRecorder
 from transcriber import AudioTranscriber
 from injector import TextInjector
+from instance import ControlServer, InstanceLock, send
+from daemon import DEFAULT_SOCKET, DaemonTranscriber, serve
+from events import EventLoop
+from hotkeys import HotkeyDispatcher
 from sounds import play_start_sound, play_stop_sound
 from permissions import request_macos_permissions
+from session import SessionRecorder, session_path
+from tracing import TraceRecorder, exporters_from_config
+from workers import DEFAULT_PORT, WorkerPool, WorkerServer
+from http_server import ModelLock, TranscriptionHTTPServer
+from metrics import MetricsServer, Registry, UtteranceMetrics, process_rss_bytes
+
+log = get_logger("main")
 
 
 class VoiceToTextApp:
-    def __init__(self):
-        self.recorder = AudioRecorder()
-        self.transcriber = AudioTranscriber()
-        self.injector = TextInjector()
+    def __init__(self, recorder=None, transcriber=None, injector=None, overlay=None, session=None, play_sounds=True):
+        # Components can be passed in (replay.py uses fakes for the devices).
+        self.recorder = recorder or AudioRecorder()
+        self.transcriber = transcriber or self._create_transcriber()
+        self.injector = injector or TextInjector()
+        self.play_sounds = play_sounds
         self.is_recording = False
-        self.shutdown_event = threading.Event()
+        # Shutdown, signals and finished utterances wake the main thread
+        # through this loop instead of being polled.
+        self.events = EventLoop()
+        self.events.on("transcribed", self._on_transcribed)
+        self.shutdown_event = self.events.shutdown_event
 
         # Recording mode: "toggle" or "push_to_talk"
         # Set via V2T_MODE environment variable (default: push_to_talk)
-        self.mode = os.environ.get("V2T_MODE", "push_to_talk").lower()
-        if self.mode not in ("toggle", "push_to_talk", "ptt"):
-            print(f"Warning: Unknown V2T_MODE '{self.mode}', using 'push_to_talk'")
-            self.mode = "push_to_talk"
-        if self.mode == "ptt":
-            self.mode = "push_to_talk"
+        self.mode = self._parse_mode(os.environ.get("V2T_MODE", "push_to_talk"))
+        self.started = time.time()
 
         # Hotkey configuration: Right Command only.
         self.HOTKEY = {keyboard.Key.cmd_r}
         self.hotkey_down = set()
+        # The keyboard listener only queues key events; the recording state
+        # machine (on_press/on_release) runs on the dispatcher's thread.
+        self.hotkeys = HotkeyDispatcher(self._handle_hotkey)
 
         # Keep transcriptions in order and avoid concurrent text injection races.
+        # Dictation takes the model ahead of waiting HTTP requests (V2T_HTTP).
         self._transcribe_count_lock = threading.Lock()
-        self._transcribe_worker_lock = threading.Lock()
+        self._transcribe_worker_lock = ModelLock()
         self._active_transcriptions = 0
 
-        self.overlay = self._create_overlay()
+        self.overlay = overlay or self._create_overlay()
+
+        self.session = session or self._open_session()
+        self.recorder.session = self.session
+        # Recent utterance traces; slow ones are dumped to disk.
+        self.traces = TraceRecorder(
+            capacity=config.TRACE_RING,
+            slo_ms=config.SLO_MS,
+            dump_dir=config.SLOW_DIR,
+            exporters=exporters_from_config(config.TRACE_FILE, config.TRACE_OTLP),
+        )
+        self.metrics = self._register_metrics()
+        self.metrics_server = None
+        self.http_server = None
+
+    def _create_transcriber(self):
+        if config.DAEMON_SOCKET:
+            # A thin client: the daemon owns the model.
+            return DaemonTranscriber(config.DAEMON_SOCKET)
+        if config.WORKERS:
+            return WorkerPool(
+                config.WORKERS, AudioTranscriber, timeout=config.WORKER_TIMEOUT_S, check_interval=config.WORKER_CHECK_S,
+                preload=config.WORKER_PRELOAD,
+            ).start()
+        return AudioTranscriber()
+
+    def _register_metrics(self):
+        registry = Registry()
+        self.traces.exporters.append(UtteranceMetrics(registry))
+        registry.gauge(
+            "v2t_active_transcriptions", "Utterances being decoded or waiting to be",
+            function=lambda: self._active_transcriptions,
+        )
+        registry.gauge(
+            "v2t_transcription_queue_depth", "Utterances waiting for the transcription worker",
+            function=lambda: max(0, self._active_transcriptions - 1),
+        )
+        registry.counter(
+            "v2t_audio_xruns_total", "Audio input overruns reported by the audio callback",
+            function=lambda: self.recorder.callback_stats.total_xruns,
+        )
+        # Health of the current (or last) recording's stream; 0 until it has
+        # seen callbacks.
+        for name, key, scale, help_text in (
+            ("v2t_audio_callback_duration_p50_seconds", "duration_p50_ms", 0.001, "Median audio callback duration"),
+            ("v2t_audio_callback_duration_p95_seconds", "duration_p95_ms", 0.001, "95th percentile audio callback duration"),
+            ("v2t_audio_callback_duration_p99_seconds", "duration_p99_ms", 0.001, "99th percentile audio callback duration"),
+            ("v2t_audio_callback_jitter_seconds", "jitter_ms", 0.001, "Mean deviation of the callback interval from the block period"),
+            ("v2t_audio_callback_jitter_max_seconds", "jitter_max_ms", 0.001, "Largest deviation of the callback interval from the block period"),
+            ("v2t_audio_frames_captured", "frames", 1, "Frames delivered by the audio callback"),
+            ("v2t_audio_frames_expected", "expected_frames", 1, "Frames expected from the stream's running time"),
+        ):
+            registry.gauge(
+                name, help_text,
+                function=lambda key=key, scale=scale: self.recorder.get_callback_stats().get(key, 0) * scale,
+            )
+        registry.gauge("v2t_process_resident_memory_bytes", "Resident set size", function=process_rss_bytes)
+        registry.counter(
+            "v2t_event_wakeups_total", "Main event loop wakeups", function=lambda: self.events.wakeups,
+        )
+        registry.counter(
+            "v2t_event_idle_wakeups_total", "Main event loop wakeups with nothing to do",
+            function=lambda: self.events.idle_wakeups,
+        )
+        frame_time = registry.histogram(
+            "v2t_overlay_frame_seconds", "Overlay paint time per frame",
+            (0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1),
+        )
+        if self.overlay:
+            self.overlay.on_frame = frame_time.observe
+        self.hotkeys.callback_time = registry.histogram(
+            "v2t_hotkey_callback_seconds", "Time the keyboard listener spends in each callback",
+            (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+        )
+        self.hotkeys.dispatch_delay = registry.histogram(
+            "v2t_hotkey_dispatch_seconds", "Key event to recording state machine",
+            (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+        )
+        return registry
+
+    def _parse_mode(self, value):
+        mode = value.strip().lower()
+        if mode not in ("toggle", "push_to_talk", "ptt"):
+            log.warning("Unknown V2T_MODE, using push_to_talk", mode=mode)
+            return "push_to_talk"
+        return "push_to_talk" if mode == "ptt" else mode
 
     def _env_flag(self, key, default=True):
         value = os.environ.get(key)
@@ -60,9 +167,25 @@ class VoiceToTextApp:
                 app_icon_path=self._resolve_app_icon_path(),
             )
         except Exception as e:
-            print(f"Warning: GUI overlay disabled ({e})", flush=True)
+            log.warning("GUI overlay disabled", error=e)
             return None
 
+    def _open_session(self):
+        if not config.SESSION_DIR:
+            return None
+        path = session_path(config.SESSION_DIR)
+        try:
+            session = SessionRecorder(path, {
+                "mode": self.mode,
+                "model": str(self.transcriber.get_model_name()),
+                "profile": str(getattr(self.recorder, "profile", "")),
+            })
+        except OSError as e:
+            log.warning("Session recording disabled", error=e)
+            return None
+        log.info("Recording session", path=path)
+        return session
+
     def _resolve_app_icon_path(self):
         base = Path(__file__).resolve().parent
         candidates = (
@@ -76,6 +199,8 @@ class VoiceToTextApp:
         return None
 
     def _set_overlay_state(self, state):
+        if self.session:
+            self.session.overlay(state)
         if self.overlay:
             self.overlay.set_state_threadsafe(state)
 
@@ -128,9 +253,30 @@ class VoiceToTextApp:
         value = getattr(key, "value", None)
         return getattr(value, "vk", key)
 
-    def on_press(self, key):
+    def _handle_hotkey(self, kind, key, timestamp):
+        if kind == "press":
+            self.on_press(key, timestamp)
+        elif kind == "release":
+            self.on_release(key, timestamp)
+        elif kind == "toggle":
+            self.toggle_recording(timestamp)
+        elif kind == "mode":
+            if self.is_recording:
+                self.stop_recording_and_transcribe(timestamp)
+            self.hotkey_down.clear()
+            self.mode = key
+            if self.overlay:
+                self.overlay.set_mode_threadsafe(key)
+            log.info("Recording mode changed", mode=key)
+
+    def on_press(self, key, pressed=None):
+        """Handle a key press (pressed is the event's perf_counter time, defaulting to now)."""
+        if pressed is None:
+            pressed = time.perf_counter()
         if not self._is_hotkey(key):
             return
+        if self.session:
+            self.session.hotkey("press", pressed)
 
         key_id = self._key_id(key)
         already_held = bool(self.hotkey_down)
@@ -142,16 +288,21 @@ class VoiceToTextApp:
 
         if self.mode == "toggle":
             if self.is_recording:
-                self.stop_recording_and_transcribe()
+                self.stop_recording_and_transcribe(pressed)
             else:
                 self.start_recording()
         else:  # push_to_talk
             if not self.is_recording:
                 self.start_recording()
 
-    def on_release(self, key):
+    def on_release(self, key, released=None):
+        """Handle a key release (released is the event's perf_counter time, defaulting to now)."""
+        if released is None:
+            released = time.perf_counter()
         if not self._is_hotkey(key):
             return
+        if self.session:
+            self.session.hotkey("release", released)
 
         key_id = self._key_id(key)
         self.hotkey_down.discard(key_id)
@@ -161,88 +312,325 @@ class VoiceToTextApp:
             return
 
         if self.mode == "push_to_talk" and self.is_recording:
-            self.stop_recording_and_transcribe()
+            self.stop_recording_and_transcribe(released)
+
+    def toggle_recording(self, at=None):
+        """Start or stop recording regardless of mode (e.g. for `main.py --toggle`)."""
+        if self.is_recording:
+            self.stop_recording_and_transcribe(at or time.perf_counter())
+        else:
+            self.start_recording()
+
+    def handle_command(self, command, args):
+        """
+        Answer a command forwarded by a second launch (instance.py). Runs on
+        the control socket's thread, so recording changes are queued to the
+        hotkey controller.
+        """
+        if command == "status":
+            return {
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "mode": self.mode,
+                "model": str(self.transcriber.get_model_name()),
+                "recording": self.is_recording,
+                "active_transcriptions": self._active_transcriptions,
+            }
+        if command == "toggle":
+            self.hotkeys.command("toggle")
+            return {}
+        if command == "quit":
+            self.shutdown_event.set()
+            return {}
+        if command == "config":
+            return self._apply_forwarded_config(args.get("env") or {})
+        raise ValueError(f"unknown command {command!r}")
+
+    def _apply_forwarded_config(self, env):
+        """
+        Apply the V2T_* settings a second launch was started with. Only the
+        recording mode changes live, and is compared with the current mode
+        (it may have been changed since startup); other settings are
+        compared with this process's environment and reported back as
+        needing a restart.
+        """
+        applied, restart = [], []
+        for key, value in sorted(env.items()):
+            if not key.startswith("V2T_"):
+                continue
+            if key == "V2T_MODE":
+                mode = self._parse_mode(value)
+                if mode != self.mode:
+                    self.hotkeys.command("mode", mode)
+                    applied.append(key)
+            elif os.environ.get(key) != value:
+                restart.append(key)
+        log.info("Configuration forwarded", applied=",".join(applied), restart_required=",".join(restart))
+        return {"pid": os.getpid(), "applied": applied, "restart_required": restart}
 
     def start_recording(self):
-        print("Hotkey pressed! Starting recording...", flush=True)
-        play_start_sound()
+        log.info("Hotkey pressed, starting recording")
+        if self.play_sounds:
+            play_start_sound()
         self.is_recording = True
         self.recorder.start()
         self._on_recording_start()
 
-    def stop_recording_and_transcribe(self):
-        print("Hotkey released! Stopping recording...", flush=True)
-        play_stop_sound()
+    def stop_recording_and_transcribe(self, released=None):
+        """Stop recording and hand the audio to a transcription thread; released is the hotkey event's perf_counter time."""
+        trace = self.traces.start(released)
+        log.info("Hotkey released, stopping recording")
+        if self.play_sounds:
+            play_stop_sound()
         self.is_recording = False
+        started = time.perf_counter()
+        self._record_span(trace, "hotkey", trace.released, started)
         audio_data = self.recorder.stop()
+        self._record_span(trace, "recorder_stop", started, time.perf_counter())
 
         if len(audio_data) == 0:
-            print("No audio recorded.", flush=True)
+            log.info("No audio recorded")
             self._on_recording_stop()
             return
 
         self._begin_transcription()
         self._on_recording_stop()
 
-        print("Transcribing...", flush=True)
+        # Peak was tracked (and AGC applied) while recording, so decoding can
+        # start right away.
+        stats = self.recorder.last_stats
+        peak = stats.peak if stats is not None else None
+        normalize = not (stats is not None and stats.gain_controlled)
+        if stats is not None:
+            for name, seconds in stats.stage_seconds.items():
+                self._record_timing(trace, f"stage.{name}", seconds * 1000)
+        trace.audio_seconds = len(audio_data) / TARGET_SAMPLE_RATE
+        trace.threads = threading.active_count()
+        with self._transcribe_count_lock:
+            trace.queue_depth = self._active_transcriptions
+
+        log.info("Transcribing", audio_seconds=round(trace.audio_seconds, 2))
+        trace.queued = time.perf_counter()
         try:
-            threading.Thread(target=self._process_audio, args=(audio_data,), daemon=True).start()
+            threading.Thread(
+                target=self._process_audio, args=(audio_data, peak, normalize), kwargs={"trace": trace}, daemon=True
+            ).start()
         except Exception:
             self._end_transcription()
             raise
 
-    def _process_audio(self, audio_data):
+    def _record_timing(self, trace, name, ms):
+        trace.add(name, ms)
+        if self.session:
+            self.session.timing(name, ms)
+
+    def _record_span(self, trace, name, start, end):
+        trace.span(name, start, end)
+        if self.session:
+            self.session.timing(name, (end - start) * 1000)
+
+    @profiling.profiled("process_audio")
+    def _process_audio(self, audio_data, peak=None, normalize=True, trace=None):
+        if trace is None:
+            trace = self.traces.start()
+        queued = trace.queued or time.perf_counter()
+        # The transcriber normalizes float audio in place; a slow-utterance
+        # dump should hold what was captured.
+        captured = audio_data.copy() if self.traces.dumping else audio_data
         try:
             with self._transcribe_worker_lock:
-                text = self.transcriber.transcribe(audio_data)
-                print(f"Transcribed: '{text}'", flush=True)
+                self._record_span(trace, "queue_wait", queued, time.perf_counter())
+                text = self.transcriber.transcribe(audio_data, peak=peak, normalize=normalize)
+                for name in ("preprocess", "decode"):
+                    if name in self.transcriber.last_timings:
+                        self._record_span(trace, name, *self.transcriber.last_timings[name])
+                log.info("Transcribed", text=text)
+                injecting = time.perf_counter()
                 if text:
                     self.injector.type_text(text)
+                self._record_span(trace, "inject", injecting, time.perf_counter())
+                trace.model = str(self.transcriber.get_active_model_name())
+                trace.decode_threads = self.transcriber.get_thread_count()
         except Exception as e:
-            print(f"Error during processing: {e}", flush=True)
+            log.exception("Error during processing", error=e)
         finally:
             self._end_transcription()
+        # Dumping a slow utterance happens after the text is typed and outside the worker lock.
+        self.traces.finish(trace, captured)
+        self.events.post("transcribed", trace)
+
+    def _on_transcribed(self, trace):
+        """Runs on the main thread when a worker has finished an utterance."""
+        log.debug("Utterance finished", id=trace.id, latency_ms=round(trace.latency_ms or 0, 1))
 
     def run(self):
-        print("Voice-to-Text App Running...")
-        print(f"Model: {self.transcriber.get_model_name()}")
-        print(f"Audio input: {self.recorder.get_input_device_info()}")
-        print(f"Mode: {self.mode}")
-        print(f"GUI overlay: {'enabled' if self.overlay else 'disabled'}")
+        log.info(
+            "Voice-to-Text App Running",
+            model=self.transcriber.get_model_name(),
+            mode=self.mode,
+            overlay="enabled" if self.overlay else "disabled",
+        )
+        log.info("Audio input", device=self.recorder.get_input_device_info())
+        log.info("Capture profile", profile=self.recorder.probe_capture())
+        if config.METRICS:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, config.METRICS).start()
+                log.info("Metrics endpoint", address=config.METRICS)
+            except (OSError, ValueError) as e:
+                log.warning("Metrics endpoint disabled", error=e)
+        if config.HTTP:
+            try:
+                # Shares the worker lock, so HTTP requests and dictation take turns on the model.
+                self.http_server = TranscriptionHTTPServer(
+                    self.transcriber, config.HTTP, lock=self._transcribe_worker_lock,
+                    concurrency=config.HTTP_CONCURRENCY, queue_size=config.HTTP_QUEUE,
+                    max_bytes=int(config.HTTP_MAX_MB * 1024 * 1024),
+                ).start()
+                log.info("HTTP transcription endpoint", address=config.HTTP)
+            except (OSError, ValueError) as e:
+                log.warning("HTTP transcription endpoint disabled", error=e)
+        if config.PROFILE:
+            try:
+                profiler = profiling.start(
+                    config.PROFILE, config.PROFILE_DIR, config.PROFILE_WINDOW_S, config.PROFILE_INTERVAL_MS / 1000,
+                )
+                log.info("Profiling", mode=profiler.mode, directory=config.PROFILE_DIR)
+            except (OSError, ValueError) as e:
+                log.warning("Profiling disabled", error=e)
         if self.mode == "toggle":
-            print("Press Right Command to toggle recording (Start/Stop).")
+            log.info("Press Right Command to toggle recording (Start/Stop)")
         else:
-            print("Hold Right Command to record, release to transcribe.")
-        print("Press Ctrl+C to exit.")
+            log.info("Hold Right Command to record, release to transcribe")
+        log.info("Press Ctrl+C to exit")
 
-        listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+        self.hotkeys.start()
+        listener = keyboard.Listener(on_press=self.hotkeys.press, on_release=self.hotkeys.release)
         listener.start()
+        self.recorder.start_device_monitor()
+        previous_wakeup = self.events.install_signal_wakeup()
 
         try:
             if self.overlay:
                 self._set_overlay_state("idle")
-                self.overlay.run(self.shutdown_event)
+                self.overlay.run(self.events)
             else:
-                while not self.shutdown_event.is_set():
-                    time.sleep(0.1)
+                self.events.run()
         finally:
+            self.events.restore_signal_wakeup(previous_wakeup)
             listener.stop()
+            self.hotkeys.stop()
+            log.info("Hotkey listener callbacks", **self.hotkeys.summary())
+            self.recorder.stop_device_monitor()
             if self.is_recording:
                 self.recorder.stop()
                 self.is_recording = False
             if self.overlay:
                 self.overlay.close()
+            if self.session:
+                self.session.close()
+            if self.metrics_server:
+                self.metrics_server.stop()
+            if self.http_server:
+                self.http_server.stop()
+            if isinstance(self.transcriber, WorkerPool):
+                self.transcriber.close()
+                log.info("Remote workers", **self.transcriber.stats())
+            profiling.stop()
+            log.info("Event loop", **self.events.stats())
+
+
+def forward_command(socket_path, command):
+    """Send a command to the running instance and print its reply; returns the exit status."""
+    args = {}
+    if command == "config":
+        args["env"] = {key: value for key, value in os.environ.items() if key.startswith("V2T_")}
+    try:
+        reply = send(socket_path, command, args)
+    except (OSError, ValueError) as e:
+        print(f"Voice-to-Text is already running but did not answer: {e}")
+        return 1
+    if not reply.pop("ok", False):
+        print(f"Voice-to-Text could not {command}: {reply.get('error')}")
+        return 1
+    if command == "status":
+        for key, value in reply.items():
+            print(f"{key}: {value}")
+    elif command == "config":
+        print(f"Voice-to-Text is already running (pid {reply.get('pid')})")
+        if reply.get("applied"):
+            print(f"Applied: {', '.join(reply['applied'])}")
+        if reply.get("restart_required"):
+            print(f"Restart it to apply: {', '.join(reply['restart_required'])}")
+    elif command == "toggle":
+        print("Toggled recording")
+    elif command == "quit":
+        print("Voice-to-Text is quitting")
+    return 0
+
+
+def print_banner():
+    """Startup hints for a launch that is not forwarding to a running instance."""
+    mode = os.environ.get("V2T_MODE", "push_to_talk")
+    print("🎙️  Starting Voice-to-Text...")
+    print(f"Mode: {mode}")
+    print(f"GUI overlay: {os.environ.get('V2T_GUI', '1')}")
+    if mode.strip().lower() == "toggle":
+        print("Press Right Command to toggle recording (Start/Stop)")
+    else:
+        print("Hold Right Command to record, release to transcribe")
+    print("Press Ctrl+C to quit")
+    print()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push-to-talk voice to text.")
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="Run headless and serve transcriptions to V2T_DAEMON_SOCKET clients",
+    )
+    parser.add_argument("--socket", help=f"Daemon socket path (default: V2T_DAEMON_SOCKET or {DEFAULT_SOCKET})")
+    parser.add_argument(
+        "--worker", nargs="?", const=str(DEFAULT_PORT), metavar="[HOST:]PORT",
+        help=f"Run headless and serve transcriptions to V2T_WORKERS clients over TCP (default port {DEFAULT_PORT})",
+    )
+    for name, help_text in (
+        ("toggle", "Start or stop recording in the running instance"),
+        ("status", "Show the running instance's state"),
+        ("quit", "Stop the running instance"),
+    ):
+        parser.add_argument(f"--{name}", dest="command", action="store_const", const=name, help=help_text)
+    args = parser.parse_args()
+    if args.daemon:
+        serve(os.path.expanduser(args.socket or config.DAEMON_SOCKET or DEFAULT_SOCKET), http=config.HTTP)
+        sys.exit(0)
+    if args.worker:
+        serve(args.worker, http=config.HTTP, server_class=WorkerServer)
+        sys.exit(0)
+
+    # Only one app per user: a second launch hands its command (or its
+    # settings) to the first and exits before loading a model.
+    lock = InstanceLock(config.INSTANCE_DIR)
+    if not lock.acquire():
+        sys.exit(forward_command(lock.socket_path, args.command or "config"))
+    if args.command:
+        print("Voice-to-Text is not running")
+        sys.exit(1)
+    control = ControlServer(lock.socket_path).start()
+    print_banner()
+
     if not request_macos_permissions():
         sys.exit(1)
     app = VoiceToTextApp()
+    control.handler = app.handle_command
 
     def signal_handler(signum, frame):
         app.shutdown_event.set()
 
     signal.signal(signal.SIGINT, signal_handler)
 
-    app.run()
-    print("Exiting...")
+    try:
+        app.run()
+    finally:
+        control.stop()
+        lock.release()
+    log.info("Exiting")
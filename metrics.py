@@ -0,0 +1,259 @@
+import bisect
+import collections
+import http.server
+import os
+import socketserver
+import sys
+import threading
+import time
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter; function, if given, is read at scrape time instead."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        if self.function is not None:
+            return float(self.function())
+        return self._value
+
+    def samples(self):
+        return [(self.name, "", self.value)]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or be computed at scrape time."""
+
+    kind = "gauge"
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", f'le="{_format(bound)}"', cumulative))
+        samples.append((f"{self.name}_sum", "", total))
+        samples.append((f"{self.name}_count", "", cumulative))
+        return samples
+
+
+class Registry:
+    """Named metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, function=None):
+        return self._add(Counter(name, help_text, function))
+
+    def gauge(self, name, help_text, function=None):
+        return self._add(Gauge(name, help_text, function))
+
+    def histogram(self, name, help_text, buckets):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                labels = "{" + labels + "}" if labels else ""
+                lines.append(f"{name}{labels} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes():
+    """
+    Resident set size of this process: current on Linux (/proc), the peak
+    (getrusage) elsewhere, which is cheap enough to read on every scrape.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, the other Unixes kilobytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class UtteranceMetrics:
+    """
+    Utterance counters and latency histograms, fed with finished traces
+    (it is a tracing.TraceRecorder exporter).
+    """
+
+    def __init__(self, registry, window_seconds=60.0):
+        self.window_seconds = window_seconds
+        self._finished = collections.deque()
+        self._lock = threading.Lock()
+        self.utterances = registry.counter("v2t_utterances_total", "Utterances transcribed")
+        registry.gauge(
+            "v2t_utterances_per_minute", "Utterances finished in the last minute", function=self.per_minute,
+        )
+        self.latency = registry.histogram(
+            "v2t_utterance_latency_seconds", "Hotkey release to injected text",
+            (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0),
+        )
+        self.decode_rtf = registry.histogram(
+            "v2t_decode_rtf", "Decode time divided by audio duration",
+            (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0),
+        )
+        self.inject = registry.histogram(
+            "v2t_inject_seconds", "Text injection duration",
+            (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        )
+
+    def per_minute(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._finished and now - self._finished[0] > self.window_seconds:
+                self._finished.popleft()
+            count = len(self._finished)
+        return count * 60.0 / self.window_seconds
+
+    def export(self, trace):
+        with self._lock:
+            self._finished.append(time.monotonic())
+        self.utterances.inc()
+        if trace.latency_ms is not None:
+            self.latency.observe(trace.latency_ms / 1000)
+        if "decode" in trace.stages and trace.audio_seconds:
+            self.decode_rtf.observe(trace.stages["decode"] / 1000 / trace.audio_seconds)
+        if "inject" in trace.stages:
+            self.inject.observe(trace.stages["inject"] / 1000)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address.
+        return request, ("unix", 0)
+
+
+class MetricsServer:
+    """
+    Serves a registry as Prometheus text on a background thread.
+
+    address is "PORT" or "HOST:PORT" (HOST defaults to 127.0.0.1, so the
+    endpoint stays local) or "unix:PATH" for a Unix socket.
+    """
+
+    def __init__(self, registry, address):
+        self.address = address
+        if address.startswith("unix:"):
+            self.path = address[len("unix:"):]
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = _UnixHTTPServer(self.path, _MetricsHandler)
+        else:
+            self.path = None
+            host, _, port = address.rpartition(":")
+            self._server = _HTTPServer((host or "127.0.0.1", int(port)), _MetricsHandler)
+        self._server.registry = registry
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return None if self.path else self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
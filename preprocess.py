@@ -0,0 +1,710 @@
+"""
+Incremental audio pre-processing that runs while recording.
+
+AudioRecorder's callback only queues raw blocks. An AudioPreprocessor worker
+thread drains that queue as audio arrives, runs the pipeline stages (e.g.
+resampling to 16 kHz), appends the result to one contiguous buffer and keeps
+peak/RMS statistics and speech boundaries up to date. When the hotkey is
+released only the last few blocks are left to process, so the transcriber can
+start decoding right away.
+
+A stage is any object with process(block) -> block and reset(). Stages that
+hold samples back (e.g. for lookahead) also implement flush() -> block, which
+is called once the recording has ended.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_buffer import AudioBuffer
+from log import get_logger
+
+log = get_logger("preprocess")
+
+TARGET_SAMPLE_RATE = 16000
+
+
+def to_float32(block):
+    """Convert integer PCM to float32 in [-1, 1) in one vectorized step."""
+    return np.multiply(block, 1.0 / -float(np.iinfo(block.dtype).min), dtype=np.float32)
+
+
+class LinearResampler:
+    """
+    Streaming linear-interpolation resampler (keeps phase across blocks).
+
+    Reference implementation for benchmarks/resample.py only; the app uses
+    PolyphaseResampler. It has no anti-aliasing filter, so content above
+    8 kHz folds into the speech band: do not use it for capture.
+    """
+
+    name = "resample"
+
+    def __init__(self, input_rate, output_rate=TARGET_SAMPLE_RATE):
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self._step = input_rate / output_rate
+        self.reset()
+
+    def reset(self):
+        self._last = None
+        # Position of the next output sample, relative to the last input sample.
+        self._position = 0.0
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if len(block) == 0:
+            return block
+        if self._last is None:
+            samples = block
+        else:
+            samples = np.concatenate(([self._last], block))
+
+        last_index = len(samples) - 1
+        start = self._position
+        count = int((last_index - start) // self._step) + 1 if start <= last_index else 0
+        positions = start + self._step * np.arange(count)
+        out = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+        self._position = start + self._step * count - last_index
+        self._last = samples[-1]
+        return out
+
+
+class PolyphaseResampler:
+    """
+    Streaming polyphase resampler with a Kaiser-windowed sinc low-pass filter.
+
+    The rate ratio is reduced to up/down (48 kHz -> 16 kHz is 1/3, 44.1 kHz is
+    160/441) and only the filter taps that land on real input samples are
+    evaluated: each output sample is one dot product between a window of input
+    samples and one phase of the filter bank. The filter is centered, so the
+    output is aligned with the input; flush() emits the last samples.
+    """
+
+    name = "resample"
+
+    def __init__(self, input_rate, output_rate=TARGET_SAMPLE_RATE, zeros=24, beta=8.0, rolloff=0.95):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        common = math.gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // common
+        self.down = self.input_rate // common
+
+        # Filter in the upsampled domain, cutting off just below the lower
+        # of the two Nyquist frequencies.
+        rate = max(self.up, self.down)
+        self._half = zeros * rate
+        length = 2 * self._half + 1
+        cutoff = 0.5 * rolloff / rate
+        n = np.arange(length) - self._half
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta) * self.up
+
+        # bank[phase, i] multiplies input sample base - (taps - 1) + i, so a
+        # window of consecutive input samples is dotted with one row.
+        self.taps = -(-length // self.up)
+        padded = np.zeros(self.taps * self.up)
+        padded[:length] = taps
+        self._bank = np.ascontiguousarray(padded.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Stream index of the first sample in _history (negative: zero padding).
+        self._origin = -(self.taps - 1)
+        self._next_output = 0
+        self._received = 0
+
+    def _available(self, last_input):
+        """Number of outputs whose filter window ends at or before last_input."""
+        limit = (last_input + 1) * self.up - self._half
+        if limit <= 0:
+            return 0
+        return -(-limit // self.down)
+
+    def _run(self, block, limit=None):
+        samples = np.concatenate((self._history, block))
+        origin = self._origin
+        available = self._available(origin + len(samples) - 1)
+        if limit is not None:
+            available = min(available, limit)
+        count = max(0, available - self._next_output)
+
+        if count:
+            positions = np.arange(self._next_output, self._next_output + count, dtype=np.int64) * self.down + self._half
+            rows = positions // self.up - (self.taps - 1) - origin
+            windows = sliding_window_view(samples, self.taps)
+            if self.up == 1:
+                # Integer decimation: the windows form a strided view.
+                out = windows[rows[0]::self.down][:count] @ self._bank[0]
+            else:
+                out = np.einsum("ij,ij->i", windows[rows], self._bank[positions % self.up])
+            out = out.astype(np.float32, copy=False)
+        else:
+            out = np.empty(0, dtype=np.float32)
+
+        self._next_output += count
+        keep = self.taps - 1
+        self._history = samples[len(samples) - keep:].copy() if keep else samples[:0].copy()
+        self._origin = origin + len(samples) - keep
+        return out
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if len(block) == 0:
+            return block
+        self._received += len(block)
+        return self._run(block)
+
+    def flush(self):
+        """Push zeros through the filter to emit the samples it still holds."""
+        expected = -(-self._received * self.up // self.down)
+        padding = np.zeros(-(-self._half // self.up) + 1, dtype=np.float32)
+        return self._run(padding, limit=expected)
+
+
+class AutomaticGainControl:
+    """
+    Streaming automatic gain control with bounded lookahead.
+
+    Gain is computed per 10 ms frame from the frame RMS (towards target_rms)
+    and peak (never above peak_limit). The gain applied to a frame is the
+    minimum over the next lookahead frames, so it is already down when a
+    click or plosive arrives, and it rises again by at most release_db_per_s.
+    A single loud transient therefore only dips the gain briefly instead of
+    spoiling the level of the whole clip. Output is delayed by the lookahead;
+    flush() emits the held-back tail.
+
+    Background noise is not leveled up to speech volume: the gain is held
+    on frames quieter than speech_min_rms, and those frames are lifted to
+    at most max_noise_rms. The cap only applies to the quiet frames
+    themselves, so speech after a pause resumes at the held gain.
+
+    All frames of a block are processed at once: the release limit
+    g[i] = min(target[i], g[i - 1] * r[i]) is a cumulative minimum in the
+    log domain.
+    """
+
+    name = "agc"
+
+    def __init__(
+        self,
+        samplerate=TARGET_SAMPLE_RATE,
+        target_rms=0.1,
+        peak_limit=0.9,
+        max_gain=30.0,
+        min_gain=0.05,
+        lookahead_ms=50,
+        release_db_per_s=30.0,
+        frame_ms=10,
+        max_noise_rms=0.01,
+        speech_min_rms=0.003,
+    ):
+        self.frame = max(1, int(samplerate * frame_ms / 1000))
+        self.lookahead = max(0, int(round(lookahead_ms / frame_ms)))
+        self.target_rms = target_rms
+        self.peak_limit = peak_limit
+        self.max_gain = max_gain
+        self.min_gain = min_gain
+        self.max_noise_rms = max_noise_rms
+        self.speech_min_rms = speech_min_rms
+        self._log_release = np.log(10.0) * release_db_per_s * (frame_ms / 1000) / 20.0
+        self._ramp = (np.arange(1, self.frame + 1, dtype=np.float32) / self.frame)[None, :]
+        self.reset()
+
+    def reset(self):
+        self._pending = np.empty(0, dtype=np.float32)
+        # Start high so the first quiet word is not lost; lookahead pulls the
+        # gain down before anything loud is output.
+        self._gain = self.max_gain
+        self._primed = False
+        self._applied = None
+
+    def _frame_targets(self, frames):
+        """Per-frame gain targets, noise caps, and whether each frame is loud enough to be speech."""
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.frame)
+        peak = np.abs(frames).max(axis=1)
+        speech = rms > self.speech_min_rms
+        with np.errstate(divide="ignore"):
+            target = np.minimum(np.where(speech, self.target_rms / rms, np.inf), self.peak_limit / peak)
+            noise_cap = np.where(speech, np.inf, self.max_noise_rms / rms)
+        return np.clip(target, self.min_gain, self.max_gain), noise_cap, speech
+
+    def _apply(self, count, final):
+        pending = self._pending
+        total_frames = len(pending) // self.frame
+        if final:
+            total_frames = -(-len(pending) // self.frame)
+            padded = np.zeros(total_frames * self.frame, dtype=np.float32)
+            padded[:len(pending)] = pending
+            pending = padded
+        frames = pending[:total_frames * self.frame].reshape(total_frames, self.frame)
+        targets, noise_cap, speech = self._frame_targets(frames)
+        if final:
+            targets = np.concatenate((targets, np.full(self.lookahead, np.inf)))
+        # Gain for frame i may not exceed the target of any frame up to
+        # `lookahead` frames ahead.
+        window = np.lib.stride_tricks.sliding_window_view(targets, self.lookahead + 1)
+        limited = window[:count].min(axis=1)
+        if not self._primed:
+            # The initial gain has not seen any audio; don't ramp down from it.
+            self._gain = min(self._gain, float(limited[0]))
+            self._primed = True
+
+        # The gain only recovers on speech frames; between words it is held.
+        steps = np.cumsum(speech[:count] * self._log_release)
+        log_gain = np.minimum.accumulate(
+            np.concatenate(([np.log(self._gain)], np.log(limited) - steps))
+        )[1:] + steps
+        self._gain = float(np.exp(log_gain[-1]))
+        gains = np.maximum(np.minimum(np.exp(log_gain), noise_cap[:count]), self.min_gain)
+
+        if self._applied is None:
+            self._applied = float(gains[0])
+        starts = np.concatenate(([self._applied], gains[:-1]))
+        sample_gains = starts[:, None] + (gains - starts)[:, None] * self._ramp
+        out = (frames[:count] * sample_gains).astype(np.float32).ravel()
+        np.clip(out, -1.0, 1.0, out=out)
+
+        self._applied = float(gains[-1])
+        return out
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self._pending = np.concatenate((self._pending, block))
+        count = len(self._pending) // self.frame - self.lookahead
+        if count <= 0:
+            return np.empty(0, dtype=np.float32)
+        out = self._apply(count, final=False)
+        self._pending = self._pending[count * self.frame:]
+        return out
+
+    def flush(self):
+        if len(self._pending) == 0:
+            return np.empty(0, dtype=np.float32)
+        length = len(self._pending)
+        count = -(-length // self.frame)
+        out = self._apply(count, final=True)[:length]
+        self._pending = np.empty(0, dtype=np.float32)
+        return out
+
+
+class SpectralGate:
+    """
+    Streaming spectral-gating noise suppressor with a high-pass filter.
+
+    Audio is analysed in 32 ms frames with 50% overlap (sqrt-Hann windows, so
+    overlap-add reconstructs the input exactly when nothing is gated). Bins
+    below highpass_hz are removed; other bins are attenuated when they are not
+    clearly above the learned noise profile. All frames of a block are
+    transformed in one rfft/irfft call.
+
+    The noise profile is learned from the first preroll_ms of each recording
+    (before the user starts talking) and from learn_noise(), e.g. fed by a warm
+    input stream between recordings. It is kept across recordings and blended
+    so a word spoken during the pre-roll does not wipe out a good profile.
+    Until a profile exists only the high-pass filter is applied.
+    """
+
+    name = "denoise"
+
+    def __init__(
+        self,
+        samplerate=TARGET_SAMPLE_RATE,
+        frame_size=512,
+        highpass_hz=80.0,
+        threshold=2.0,
+        attenuation=0.1,
+        preroll_ms=250,
+        profile_blend=0.3,
+    ):
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.threshold = threshold
+        self.attenuation = attenuation
+        self.profile_blend = profile_blend
+        self.preroll_frames = max(1, int(samplerate * preroll_ms / 1000) // self.hop)
+        self.noise_profile = None
+
+        self._window = np.sqrt(np.hanning(frame_size + 1)[:-1]).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame_size, 1.0 / samplerate)
+        self._highpass = (freqs >= highpass_hz).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        """Start a new recording; the learned noise profile is kept."""
+        # Prime with one hop of zeros so the first samples get a full
+        # overlap-add; the matching hop of output is dropped again.
+        self._pending = np.zeros(self.hop, dtype=np.float32)
+        self._tail = np.zeros(self.hop, dtype=np.float32)
+        self._skip = self.hop
+        self._received = 0
+        self._emitted = 0
+        self._preroll = []
+
+    def _frames(self, samples, count):
+        view = np.lib.stride_tricks.sliding_window_view(samples, self.frame_size)
+        return view[:count * self.hop:self.hop]
+
+    def learn_noise(self, audio):
+        """Update the noise profile from audio known to contain no speech."""
+        audio = np.asarray(audio, dtype=np.float32)
+        count = (len(audio) - self.frame_size) // self.hop + 1
+        if count <= 0:
+            return
+        spectra = np.abs(np.fft.rfft(self._frames(audio, count) * self._window, axis=1))
+        self._blend_profile(np.median(spectra, axis=0))
+
+    def _blend_profile(self, estimate):
+        if self.noise_profile is None:
+            self.noise_profile = estimate
+        else:
+            blend = self.profile_blend
+            self.noise_profile = (1.0 - blend) * self.noise_profile + blend * estimate
+
+    def _mask(self, magnitude):
+        if self.noise_profile is None:
+            return np.broadcast_to(self._highpass, magnitude.shape)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (self.threshold * self.noise_profile) / magnitude
+        ratio = np.minimum(np.nan_to_num(ratio, nan=1.0, posinf=1.0), 1.0)
+        mask = np.sqrt(1.0 - ratio * ratio)
+        mask = np.maximum(mask, self.attenuation)
+        # Smooth across neighbouring bins to reduce musical noise.
+        mask[:, 1:-1] = (mask[:, :-2] + mask[:, 1:-1] + mask[:, 2:]) / 3.0
+        return mask * self._highpass
+
+    def _run(self, samples, count):
+        frames = self._frames(samples, count) * self._window
+        spectra = np.fft.rfft(frames, axis=1)
+        magnitude = np.abs(spectra)
+
+        if len(self._preroll) < self.preroll_frames:
+            self._preroll.extend(magnitude[:self.preroll_frames - len(self._preroll)])
+            if len(self._preroll) == self.preroll_frames:
+                self._blend_profile(np.median(np.array(self._preroll), axis=0))
+
+        out = np.fft.irfft(spectra * self._mask(magnitude), n=self.frame_size, axis=1)
+        out = (out * self._window).astype(np.float32)
+
+        # 50% overlap-add: first half of each frame plus second half of the previous one.
+        tails = np.concatenate((self._tail[None, :], out[:-1, self.hop:]))
+        self._tail = out[-1, self.hop:].copy()
+        return (out[:, :self.hop] + tails).ravel()
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self._received += len(block)
+        self._pending = np.concatenate((self._pending, block))
+        count = (len(self._pending) - self.frame_size) // self.hop + 1
+        if count <= 0:
+            return np.empty(0, dtype=np.float32)
+        out = self._run(self._pending, count)
+        self._pending = self._pending[count * self.hop:]
+        if self._skip:
+            dropped = min(self._skip, len(out))
+            out = out[dropped:]
+            self._skip -= dropped
+        self._emitted += len(out)
+        return out
+
+    def flush(self):
+        remaining = self._received - self._emitted
+        if remaining <= 0:
+            return np.empty(0, dtype=np.float32)
+        out = self.process(np.zeros(self.frame_size, dtype=np.float32))
+        return out[:remaining]
+
+
+class ChannelSelector:
+    """
+    Reduces a multi-channel block to one channel, picking or mixing inputs by SNR.
+
+    Each channel's block energy is compared with its own noise floor (a
+    minimum follower that rises slowly), giving a smoothed per-block SNR for
+    all channels at once. mode="best" follows the channel with the highest SNR
+    (switching only when another channel is switch_db better); mode="mix"
+    weights channels by their SNR. Weight changes are ramped across a block so
+    switches do not click.
+    """
+
+    name = "channels"
+
+    def __init__(self, channels, mode="best", samplerate=TARGET_SAMPLE_RATE, smoothing=0.8, switch_db=3.0, floor_rise_db_per_s=3.0):
+        if mode not in ("best", "mix"):
+            raise ValueError(f"Unknown channel mode '{mode}'")
+        self.channels = channels
+        self.mode = mode
+        self.samplerate = samplerate
+        self.smoothing = smoothing
+        self.switch_db = switch_db
+        self.floor_rise_db_per_s = floor_rise_db_per_s
+        self.reset()
+
+    def reset(self):
+        self._noise = None
+        self.snr_db = np.zeros(self.channels)
+        self.selected = 0
+        self.switches = 0
+        if self.mode == "mix":
+            self._weights = np.full(self.channels, 1.0 / self.channels, dtype=np.float32)
+        else:
+            self._weights = np.zeros(self.channels, dtype=np.float32)
+            self._weights[0] = 1.0
+
+    def _update_snr(self, block):
+        energy = np.einsum("ij,ij->j", block, block, dtype=np.float64) / len(block) + 1e-12
+        if self._noise is None:
+            self._noise = energy
+        else:
+            rise = 10 ** (self.floor_rise_db_per_s * len(block) / self.samplerate / 10)
+            self._noise = np.minimum(energy, self._noise * rise)
+        snr = 10 * np.log10(energy / self._noise)
+        self.snr_db = self.smoothing * self.snr_db + (1 - self.smoothing) * snr
+
+    def _target_weights(self):
+        if self.mode == "best":
+            best = int(np.argmax(self.snr_db))
+            if best != self.selected and self.snr_db[best] > self.snr_db[self.selected] + self.switch_db:
+                self.selected = best
+                self.switches += 1
+            weights = np.zeros(self.channels, dtype=np.float32)
+            weights[self.selected] = 1.0
+            return weights
+
+        linear = np.maximum(10 ** (self.snr_db / 10) - 1, 0)
+        total = linear.sum()
+        if total <= 0:
+            return np.full(self.channels, 1.0 / self.channels, dtype=np.float32)
+        self.selected = int(np.argmax(linear))
+        return (linear / total).astype(np.float32)
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 1:
+            return block
+        if len(block) == 0:
+            return np.empty(0, dtype=np.float32)
+
+        self._update_snr(block)
+        previous = self._weights
+        target = self._target_weights()
+        self._weights = target
+        if np.array_equal(previous, target):
+            return np.ascontiguousarray(block @ target)
+        ramp = (np.arange(1, len(block) + 1, dtype=np.float32) / len(block))[:, None]
+        weights = previous + ramp * (target - previous)
+        return np.einsum("ij,ij->i", block, weights)
+
+    def describe(self):
+        snr = ", ".join(f"{value:.0f}" for value in self.snr_db)
+        if self.mode == "mix":
+            return f"mixing {self.channels} channels (SNR dB: {snr})"
+        return f"channel {self.selected + 1} of {self.channels} (SNR dB: {snr}; {self.switches} switches)"
+
+
+class AudioStats:
+    """Running statistics for one recording."""
+
+    def __init__(self, samplerate=TARGET_SAMPLE_RATE):
+        self.samplerate = samplerate
+        self.samples = 0
+        self.peak = 0.0
+        self.sum_squares = 0.0
+        self.noise_floor = None
+        self.speech_start = None
+        self.speech_end = None
+        # True when an AGC stage already leveled the audio, so the transcriber
+        # must not peak-normalize it again.
+        self.gain_controlled = False
+        # CPU seconds spent in each pipeline stage.
+        self.stage_seconds = {}
+
+    @property
+    def rms(self):
+        if self.samples == 0:
+            return 0.0
+        return float(np.sqrt(self.sum_squares / self.samples))
+
+    @property
+    def duration(self):
+        return self.samples / self.samplerate
+
+    @property
+    def has_speech(self):
+        return self.speech_start is not None
+
+    def stage_cost(self):
+        """Return CPU milliseconds per second of audio for each stage."""
+        if self.samples == 0:
+            return {}
+        return {name: seconds * 1000.0 / self.duration for name, seconds in self.stage_seconds.items()}
+
+
+class AudioPreprocessor:
+    """Runs pre-processing stages and statistics on a helper thread while recording."""
+
+    def __init__(
+        self,
+        samplerate=TARGET_SAMPLE_RATE,
+        stages=None,
+        trim_silence=True,
+        pad_ms=300,
+        vad_min_rms=0.003,
+        vad_floor_ratio=4.0,
+        resampler=None,
+        dtype=np.float32,
+        spill_bytes=None,
+        spill_dir=None,
+        channel_selector=None,
+    ):
+        self.samplerate = samplerate
+        # Reduces multi-channel blocks to mono before the stages; without
+        # one the first channel is used.
+        self.channel_selector = channel_selector
+        # Storage dtype of the recording; int16 halves resident memory for
+        # long sessions. Stages and statistics always work on float32.
+        self.dtype = np.dtype(dtype)
+        # Recordings larger than this move to a memory-mapped temporary file.
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self.stages = list(stages) if stages is not None else []
+        if samplerate != TARGET_SAMPLE_RATE:
+            resampler = resampler or PolyphaseResampler
+            self.stages.insert(0, resampler(samplerate, TARGET_SAMPLE_RATE))
+        # Statistics and VAD look at the signal before gain control, so AGC
+        # lifting background noise does not make it look like speech.
+        self._tap = next(
+            (index for index, stage in enumerate(self.stages) if isinstance(stage, AutomaticGainControl)),
+            len(self.stages),
+        )
+        self.trim_silence = trim_silence
+        self.pad_frames = int(TARGET_SAMPLE_RATE * pad_ms / 1000)
+        self.vad_min_rms = vad_min_rms
+        self.vad_floor_ratio = vad_floor_ratio
+        self._thread = None
+        self._queue = None
+        self.reset()
+
+    def reset(self):
+        """Start a new recording with a fresh buffer (the previous one belongs to the caller)."""
+        self.buffer = AudioBuffer(dtype=self.dtype, spill_bytes=self.spill_bytes, spill_dir=self.spill_dir)
+        self.stats = AudioStats()
+        self.stats.gain_controlled = any(isinstance(stage, AutomaticGainControl) for stage in self.stages)
+        for stage in self.stages:
+            stage.reset()
+        if self.channel_selector is not None:
+            self.channel_selector.reset()
+
+    def start(self, source_queue):
+        """Start draining raw blocks from source_queue on a helper thread."""
+        self.reset()
+        self._queue = source_queue
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            try:
+                self.process(block)
+            except Exception as e:
+                log.exception("Audio pre-processing error", error=e)
+
+    def process(self, block):
+        """Run one raw block through the stages and update buffer and statistics."""
+        block = np.asarray(block)
+        if block.ndim > 1:
+            if self.channel_selector is not None and block.shape[1] > 1:
+                if block.dtype.kind == "i":
+                    block = to_float32(block)
+                block = self._run_stage(self.channel_selector, self.channel_selector.process, block)
+            else:
+                block = block[:, 0]
+        if block.dtype.kind == "i":
+            block = to_float32(block)
+        self._pipeline(block)
+
+    def _pipeline(self, block, first=0):
+        """Run block through the stages from index first on, then store it."""
+        for index in range(first, len(self.stages)):
+            if index == self._tap:
+                self._update_stats(block)
+            stage = self.stages[index]
+            block = self._run_stage(stage, stage.process, block)
+        if self._tap == len(self.stages):
+            self._update_stats(block)
+        if len(block):
+            self.buffer.append(block)
+
+    def _run_stage(self, stage, method, *args):
+        started = time.thread_time()
+        block = method(*args)
+        name = getattr(stage, "name", type(stage).__name__)
+        spent = self.stats.stage_seconds.get(name, 0.0)
+        self.stats.stage_seconds[name] = spent + time.thread_time() - started
+        return block
+
+    def _flush_stages(self):
+        """Push the samples held back by lookahead stages through the rest of the pipeline."""
+        for index, stage in enumerate(self.stages):
+            flush = getattr(stage, "flush", None)
+            if flush is None:
+                continue
+            self._pipeline(self._run_stage(stage, flush), index + 1)
+
+    def _update_stats(self, block):
+        """Update peak, level and VAD from a block at the analysis point (before AGC)."""
+        stats = self.stats
+        frames = len(block)
+        if frames == 0:
+            return
+        # Stages after the analysis point keep the length, so positions
+        # counted here index the stored buffer.
+        start = stats.samples
+        peak = max(float(block.max()), -float(block.min()))
+        sum_squares = float(np.dot(block, block))
+        stats.samples += frames
+        stats.sum_squares += sum_squares
+        if peak > stats.peak:
+            stats.peak = peak
+
+        # Energy VAD: a block is speech when it is well above the quietest
+        # block seen so far.
+        block_rms = (sum_squares / frames) ** 0.5
+        if stats.noise_floor is None or block_rms < stats.noise_floor:
+            stats.noise_floor = block_rms
+        threshold = max(self.vad_min_rms, stats.noise_floor * self.vad_floor_ratio)
+        if block_rms > threshold:
+            if stats.speech_start is None:
+                stats.speech_start = start
+            stats.speech_end = start + frames
+
+    def finish(self):
+        """
+        Process whatever is still queued and return (audio, stats).
+
+        The audio is a contiguous 1-D view (in the storage dtype) trimmed to
+        the detected speech (plus padding) when trimming is enabled.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._flush_stages()
+
+        stats = self.stats
+        if self.trim_silence and stats.has_speech:
+            audio = self.buffer.view(
+                stats.speech_start - self.pad_frames,
+                stats.speech_end + self.pad_frames,
+            )
+        else:
+            audio = self.buffer.view()
+        return audio, stats
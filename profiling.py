@@ -0,0 +1,247 @@
+import cProfile
+import functools
+import itertools
+import os
+import profile as pyprofile
+import sys
+import threading
+import time
+
+from log import get_logger
+
+log = get_logger("profiling")
+
+# The running profiler, if V2T_PROFILE is on. profiled() looks it up on
+# every call, so an idle hook costs one global read.
+_active = None
+
+
+def profiled(name):
+    """Mark a hot path (audio callback, decode worker, overlay tick, injection) for V2T_PROFILE."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return function(*args, **kwargs)
+            return profiler.call(name, function, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def start(mode, directory, window_seconds=60.0, interval=0.005):
+    """Start profiling the marked hot paths; mode is "sample" or "cprofile"."""
+    global _active
+    if _active is not None:
+        return _active
+    if mode == "sample":
+        profiler = SamplingProfiler(directory, window_seconds, interval)
+    elif mode == "cprofile":
+        profiler = CProfileProfiler(directory, window_seconds)
+    else:
+        raise ValueError(f"Unknown profile mode '{mode}' (expected sample or cprofile)")
+    profiler.start()
+    _active = profiler
+    return profiler
+
+
+def stop():
+    """Stop profiling and write the last window."""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+class Profiler:
+    """
+    Writes one file per profiling window from a background thread, so the
+    profiled threads never do file I/O. Subclasses implement call() and
+    _write(stamp).
+    """
+
+    def __init__(self, directory, window_seconds=60.0):
+        self.directory = directory
+        self.window_seconds = window_seconds
+        self.files = []
+        self._windows = itertools.count(1)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _tick_interval(self):
+        return self.window_seconds
+
+    def _tick(self):
+        pass
+
+    def _run(self):
+        next_flush = time.monotonic() + self.window_seconds
+        while not self._stopped.wait(self._tick_interval()):
+            self._tick()
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush += self.window_seconds
+
+    def flush(self):
+        """Write the current window, if it has data."""
+        # Milliseconds, the pid and a window counter keep names unique across
+        # quick flushes and several processes profiling into one directory.
+        now = time.time()
+        stamp = (
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now % 1 * 1000):03d}"
+            f"-{os.getpid()}-{next(self._windows)}"
+        )
+        try:
+            self._write(stamp)
+        except OSError as e:
+            log.error("Could not write profile", error=e)
+
+    def _path(self, name):
+        path = os.path.join(self.directory, name)
+        self.files.append(path)
+        return path
+
+
+def _frame_name(code):
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler(Profiler):
+    """
+    Samples the stacks of threads that are inside a marked hot path every
+    `interval` seconds (sys._current_frames()) and writes them as collapsed
+    stacks ("region;outer;...;inner count"), which flamegraph.pl and
+    speedscope read. Profiled threads only set and clear a dict entry.
+    """
+
+    mode = "sample"
+
+    def __init__(self, directory, window_seconds=60.0, interval=0.005):
+        super().__init__(directory, window_seconds)
+        self.interval = interval
+        self._regions = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def call(self, name, function, args, kwargs):
+        thread_id = threading.get_ident()
+        if thread_id in self._regions:
+            return function(*args, **kwargs)
+        self._regions[thread_id] = name
+        try:
+            return function(*args, **kwargs)
+        finally:
+            del self._regions[thread_id]
+
+    def _tick_interval(self):
+        return self.interval
+
+    def _tick(self):
+        regions = dict(self._regions)
+        if not regions:
+            return
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id, name in regions.items():
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stacks.append(";".join([name] + stack[::-1]))
+        with self._lock:
+            for stack in stacks:
+                self._counts[stack] = self._counts.get(stack, 0) + 1
+            self.samples += len(stacks)
+
+    def _write(self, stamp):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        with open(self._path(f"profile-{stamp}.collapsed"), "w") as f:
+            for stack, count in sorted(counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _thread_profile():
+    """
+    A deterministic profiler that only sees the calling thread.
+
+    From Python 3.12 cProfile is built on sys.monitoring and records every
+    thread in the process, so a region's stats would pick up the overlay
+    tick, audio callbacks and anything else running meanwhile. There the
+    pure-Python profiler is used instead: it hooks sys.setprofile, which is
+    per thread. It is slower, which inflates the absolute times, but call
+    counts and the relative cost of functions still hold.
+    """
+    if sys.version_info >= (3, 12):
+        return pyprofile.Profile()
+    return cProfile.Profile()
+
+
+def _run_profiled(profile, function, args, kwargs):
+    if isinstance(profile, cProfile.Profile):
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+    return profile.runcall(function, *args, **kwargs)
+
+
+class CProfileProfiler(Profiler):
+    """
+    Profiles marked hot paths deterministically (cProfile, or the profile
+    module where cProfile would be process-wide; see _thread_profile) and
+    writes one pstats file per region and window. Only the thread running
+    the region is recorded. One region is profiled at a time, so a call
+    that starts while another region is being profiled runs unprofiled
+    and is counted in `skipped`.
+    """
+
+    mode = "cprofile"
+
+    def __init__(self, directory, window_seconds=60.0):
+        super().__init__(directory, window_seconds)
+        self._busy = threading.Lock()
+        self._owner = None
+        self._profiles = {}
+        self.skipped = 0
+
+    def call(self, name, function, args, kwargs):
+        if self._owner == threading.get_ident():
+            return function(*args, **kwargs)
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return function(*args, **kwargs)
+        self._owner = threading.get_ident()
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = _thread_profile()
+        try:
+            return _run_profiled(profile, function, args, kwargs)
+        finally:
+            self._owner = None
+            self._busy.release()
+
+    def _write(self, stamp):
+        with self._busy:
+            profiles, self._profiles = self._profiles, {}
+        for name, profile in profiles.items():
+            profile.dump_stats(self._path(f"profile-{stamp}-{name}.pstats"))
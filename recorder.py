@@ -1,39 +1,301 @@
-import sounddevice as sd
 import numpy as np
 import queue
 import threading
+import time
+import config
+import sources
+from log import get_logger
+from profiling import profiled
+from callback_stats import CallbackStats
+from devices import PORTAUDIO_LOCK, DeviceManager
+from preprocess import TARGET_SAMPLE_RATE, AudioPreprocessor, AutomaticGainControl, ChannelSelector, SpectralGate
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    # No PortAudio (e.g. a headless CI box); file and replay sources still work.
+    sd = None
+
+log = get_logger("recorder")
+
+# Capture profiles: PortAudio block length, suggested latency (seconds, or
+# "low"/"high" for the device's own defaults) and sample format.
+CAPTURE_PROFILES = {
+    "low_latency": {"block_ms": 10, "latency": "low", "dtype": "float32"},
+    "balanced": {"block_ms": 30, "latency": 0.06, "dtype": "float32"},
+    "power_saver": {"block_ms": 100, "latency": "high", "dtype": "int16"},
+}
 
 class AudioRecorder:
-    def __init__(self, samplerate=16000, channels=1):
-        self.samplerate = samplerate
-        self.channels = channels
+    # Leave PortAudio alone this long after a recording starts or stops, so
+    # a periodic re-enumeration never cuts off the start/stop sounds.
+    DEVICE_SETTLE_SECONDS = 2.0
+    # A recording stream with no callback for this long has lost its device.
+    STALL_SECONDS = 1.0
+
+    def __init__(self, samplerate=16000, channels=None, dtype=None, profile=None, source=None):
+        self.devices = DeviceManager(sd, poll_interval=config.DEVICE_POLL_SECONDS)
+        # Opens input streams instead of sd.InputStream (see sources.py).
+        self.source = source or sources.from_spec(config.AUDIO_SOURCE, speed=config.SOURCE_SPEED)
+        if config.NATIVE_RATE:
+            samplerate = self.get_native_samplerate(samplerate)
+        self.channels = channels or config.CHANNELS
+        self.profile = profile or config.CAPTURE_PROFILE
+        if self.profile not in CAPTURE_PROFILES:
+            log.warning("Unknown V2T_CAPTURE_PROFILE, using balanced", profile=self.profile)
+            self.profile = "balanced"
+        settings = CAPTURE_PROFILES[self.profile]
+        self.latency = settings["latency"]
+        self.dtype = np.dtype(dtype or config.CAPTURE_DTYPE or settings["dtype"])
+        # Scale from sample values to the [-1, 1] range of the level meter.
+        self._level_scale = 1.0 / 32768 if self.dtype == np.int16 else 1.0
         self.q = queue.Queue()
         self.recording = False
         self.stream = None
         self._level_lock = threading.Lock()
         self._current_level = 0.0
+        # Guards self.stream and the standby stream, which the device monitor
+        # opens in the background so start() does not have to. This is the
+        # process-wide PortAudio lock, so stream changes never overlap
+        # re-enumeration or the feedback sounds.
+        self._stream_lock = PORTAUDIO_LOCK
+        self._standby = None
+        self._last_activity = 0.0
+        self.last_stats = None
+        # Optional session.SessionRecorder that gets a copy of every recorded block.
+        self.session = None
+        self._configure(samplerate)
+
+    def _configure(self, samplerate):
+        """Set up everything that depends on the capture sample rate."""
+        self.samplerate = samplerate
+        self.blocksize = max(1, round(samplerate * CAPTURE_PROFILES[self.profile]["block_ms"] / 1000))
+        # int16 blocks are converted into this scratch buffer for the meter,
+        # so the callback does not allocate temporaries.
+        self._meter_scratch = np.empty(self.blocksize * self.channels, dtype=np.float32)
+        previous = getattr(self, "callback_stats", None)
+        self.callback_stats = CallbackStats(samplerate, self.blocksize)
+        if previous is not None:
+            # The session totals back Prometheus counters, which must not
+            # drop back to 0 when the device is reconfigured.
+            self.callback_stats.total_callbacks = previous.total_callbacks
+            self.callback_stats.total_xruns = previous.total_xruns
+        # Pre-processing runs on a helper thread while recording so stop()
+        # only has the last few blocks left to process.
+        stages = []
+        if config.DENOISE:
+            stages.append(SpectralGate(
+                highpass_hz=config.HIGHPASS_HZ,
+                preroll_ms=config.DENOISE_PREROLL_MS,
+            ))
+        if config.AGC:
+            stages.append(AutomaticGainControl())
+        channel_selector = None
+        if self.channels > 1:
+            channel_selector = ChannelSelector(self.channels, mode=config.CHANNEL_MODE, samplerate=samplerate)
+        self.preprocessor = AudioPreprocessor(
+            samplerate,
+            stages=stages,
+            trim_silence=config.VAD_TRIM,
+            pad_ms=config.VAD_PAD_MS,
+            dtype=self.dtype,
+            spill_bytes=int(config.SPILL_MB * 1024 * 1024) or None,
+            spill_dir=config.SPILL_DIR,
+            channel_selector=channel_selector,
+        )
 
     def get_input_device_info(self):
-        """Get information about the current default input device."""
+        """Get the name of the current default input device (cached)."""
+        if self.source is not None:
+            return self.source.describe()
+        return self.devices.default_input_name()
+
+    def _open_stream(self, callback):
+        if self.source is not None:
+            return self.source(
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype=self.dtype.name,
+                blocksize=self.blocksize,
+                latency=self.latency,
+                callback=callback
+            )
+        if sd is None:
+            raise RuntimeError("sounddevice/PortAudio is unavailable; set V2T_AUDIO_SOURCE to capture from a file")
+        return sd.InputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype=self.dtype.name,
+            blocksize=self.blocksize,
+            latency=self.latency,
+            callback=callback
+        )
+
+    def probe_capture(self, seconds=0.5):
+        """
+        Open the stream briefly with the capture profile and measure the real
+        block period and callback duration. Returns a one-line summary.
+        """
+        requested = f"{self.profile}: {self.blocksize} frames ({self.blocksize / self.samplerate * 1000:.1f} ms), {self.dtype.name}"
+        self.callback_stats.reset()
         try:
-            device_info = sd.query_devices(kind='input')
-            return device_info['name']
+            with self._stream_lock:
+                stream = self._open_stream(self._callback)
+                stream.start()
+            time.sleep(seconds)
+            with self._stream_lock:
+                stream.stop()
+                latency = stream.latency
+                stream.close()
         except Exception as e:
-            return f"Unknown (error: {e})"
+            return f"{requested}; probe failed ({e})"
+
+        stats = self.callback_stats.snapshot()
+        self.callback_stats.reset()
+        if "period_ms" not in stats:
+            return f"{requested}; no callbacks measured"
+        return (
+            f"{requested}; latency {float(latency) * 1000:.1f} ms; "
+            f"block period {stats['period_ms']:.1f} ms (jitter max {stats['jitter_max_ms']:.1f}); "
+            f"callback {stats['duration_p50_ms']:.3f} ms (max {stats['duration_max_ms']:.3f})"
+        )
+
+    def get_callback_stats(self):
+        """
+        Return audio callback health for the current (or last) stream: xruns,
+        frames captured vs. expected, callback duration percentiles and
+        inter-callback jitter, plus session totals.
+        """
+        return self.callback_stats.snapshot()
+
+    def get_native_samplerate(self, fallback=16000):
+        """Return the default input device's native sample rate."""
+        if self.source is not None:
+            return self.source.samplerate or fallback
+        info = self.devices.default_input()
+        if info is None:
+            log.warning("Could not query native sample rate", error=self.devices.error, samplerate=fallback)
+            return fallback
+        return int(info['default_samplerate'])
+
+    def start_device_monitor(self):
+        """Keep a standby stream open in the background and watch the recording stream for device loss."""
+        if self.source is not None:
+            return
+        self.devices.start(self._check_devices)
+        self.devices.wake()
+
+    def stop_device_monitor(self):
+        self.devices.stop()
+        with self._stream_lock:
+            self._close_standby()
+
+    def _close_standby(self):
+        if self._standby is not None:
+            try:
+                self._standby.close()
+            except Exception:
+                pass
+            self._standby = None
+
+    def _check_devices(self):
+        """
+        Device monitor tick (background thread). Returns the seconds until
+        the next tick, or None to wait until woken (by start() or stop()).
+        """
+        if self.recording:
+            if self._stream_lost():
+                self._recover_stream()
+            return self.STALL_SECONDS
+
+        poll = self.devices.poll_due()
+        settle = self._last_activity + self.DEVICE_SETTLE_SECONDS - time.monotonic()
+        with self._stream_lock:
+            if self.recording:
+                return self.STALL_SECONDS
+            if poll is not None and poll <= 0 and settle <= 0:
+                # Opt-in periodic check for a newly plugged-in device.
+                # PortAudio must not have open streams while it re-enumerates.
+                self._close_standby()
+                self._refresh_devices()
+            if self._standby is None:
+                try:
+                    self._standby = self._open_stream(self._callback)
+                except Exception as e:
+                    log.error("Could not open input stream", error=e)
+        poll = self.devices.poll_due()
+        if poll is None:
+            return None
+        return max(poll, settle, 0.1)
+
+    def _refresh_devices(self):
+        """Re-enumerate devices (holding the stream lock) and apply a default-device change."""
+        change = self.devices.refresh()
+        if change is not None:
+            self._on_device_change(*change)
+        return change
+
+    def _on_device_change(self, previous, current):
+        old = previous['name'] if previous else 'none'
+        new = current['name'] if current else 'none'
+        log.info("Default input device changed", previous=old, current=new)
+        if config.NATIVE_RATE and current is not None:
+            rate = int(current['default_samplerate'])
+            if rate != self.samplerate:
+                self._configure(rate)
+
+    def _stream_lost(self):
+        stream = self.stream
+        if stream is None:
+            return False
+        if not stream.active:
+            return True
+        last = self.callback_stats.last_callback
+        return last is not None and time.perf_counter() - last > self.STALL_SECONDS
+
+    def _recover_stream(self):
+        """Re-open the recording stream on the (new) default device, keeping the recording."""
+        with self._stream_lock:
+            if not self.recording or not self._stream_lost():
+                return
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+            change = self.devices.refresh()
+            name = self.devices.default_input_name()
+            # Keep the capture rate until the recording ends; the host
+            # resamples if the new device runs at another rate.
+            self.stream = self._open_stream(self._callback)
+            self.stream.start()
+        if change is not None:
+            log.warning("Input device lost while recording; continuing", device=name)
+        else:
+            log.warning("Input stream stalled; re-opened", device=name)
 
     def get_current_level(self):
         """Return a normalized live input level in range [0.0, 1.0]."""
         with self._level_lock:
             return self._current_level
 
-    def _callback(self, indata, frames, time, status):
+    def _meter_rms(self, indata):
+        """RMS of a block without temporary arrays (np.dot on a flat view)."""
+        samples = indata.reshape(-1)
+        if samples.dtype != np.float32:
+            if len(samples) > len(self._meter_scratch):
+                self._meter_scratch = np.empty(len(samples), dtype=np.float32)
+            scratch = self._meter_scratch[:len(samples)]
+            scratch[...] = samples
+            samples = scratch
+        return (float(np.dot(samples, samples)) / len(samples)) ** 0.5 * self._level_scale
+
+    @profiled("audio_callback")
+    def _callback(self, indata, frames, time_info, status):
         """This is called (from a separate thread) for each audio block."""
-        if status:
-            print(status, flush=True)
+        started = time.perf_counter()
 
         if indata.size:
-            rms = float(np.sqrt(np.mean(np.square(indata))))
-            normalized = min(1.0, rms * 8.0)
+            normalized = min(1.0, self._meter_rms(indata) * 8.0)
         else:
             normalized = 0.0
 
@@ -41,50 +303,124 @@ class AudioRecorder:
             self._current_level = normalized if self.recording else 0.0
 
         if self.recording:
-            self.q.put(indata.copy())
+            block = indata.copy()
+            self.q.put(block)
+            if self.session is not None:
+                self.session.audio(started, block, status)
+
+        # Status flags (overflows) are counted here and reported from stop(),
+        # not printed from the audio thread.
+        self.callback_stats.record(frames, status, started, time.perf_counter())
 
     def start(self):
         """Start recording audio."""
         if self.recording:
             return
-        self.recording = True
         self.q.queue.clear()
         with self._level_lock:
             self._current_level = 0.0
-        self.stream = sd.InputStream(
-            samplerate=self.samplerate,
-            channels=self.channels,
-            callback=self._callback
-        )
-        self.stream.start()
-        print("Recording started...", flush=True)
+        # The device monitor rebuilds the pipeline (_configure) under this
+        # lock when the default device changes, so the stream and the
+        # preprocessor are chosen and started together while holding it.
+        # Blocks captured before the preprocessor starts wait in the queue.
+        with self._stream_lock:
+            self.recording = True
+            stream, self._standby = self._standby, None
+            try:
+                self.stream = self._start_stream(stream)
+            except Exception:
+                self.recording = False
+                raise
+            self.preprocessor.start(self.q)
+        self.devices.wake()
+        self._last_activity = time.monotonic()
+        if self.samplerate != TARGET_SAMPLE_RATE:
+            log.info("Recording started (resampling to 16 kHz)", samplerate=self.samplerate)
+        else:
+            log.info("Recording started")
+
+    def _start_stream(self, stream):
+        """
+        Start the standby stream, or a new one if there is none. If that
+        fails the device may have gone away since the standby stream was
+        opened, so devices are re-enumerated and a new stream is tried once.
+        The preprocessor has not started yet, so a device change may still
+        rebuild the pipeline for the new device's rate.
+        """
+        try:
+            if stream is None:
+                stream = self._open_stream(self._callback)
+            self._begin(stream)
+            return stream
+        except Exception as e:
+            if self.source is not None or sd is None:
+                raise
+            log.warning("Could not start input stream; re-enumerating devices", error=e)
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self._refresh_devices()
+        stream = self._open_stream(self._callback)
+        self._begin(stream)
+        return stream
+
+    def _begin(self, stream):
+        """Start a stream with fresh callback stats, marking it in the session file."""
+        self.callback_stats.reset()
+        if self.session is not None:
+            self.session.stream_started(self.samplerate, self.channels, self.dtype.name)
+        try:
+            stream.start()
+        except Exception:
+            if self.session is not None:
+                self.session.stream_stopped()
+            raise
 
     def stop(self):
-        """Stop recording and return the audio data."""
+        """
+        Stop recording and return the audio data.
+
+        The result is a contiguous 1-D buffer at 16 kHz owned by the caller.
+        In float32 mode the transcriber hands it to whisper.cpp (and normalizes
+        it in place) without further copies; in int16 mode it is converted to
+        float32 in a single pass right before decoding. Recordings past
+        V2T_SPILL_MB come back as a zero-copy view of a memory-mapped
+        temporary file. Statistics for the recording (peak, RMS, speech
+        boundaries) are available as last_stats.
+        """
         if not self.recording:
             with self._level_lock:
                 self._current_level = 0.0
-            return np.array([])
+            return np.empty(0, dtype=self.dtype)
         
         self.recording = False
         with self._level_lock:
             self._current_level = 0.0
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
-        
-        print("Recording stopped.", flush=True)
+        with self._stream_lock:
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+        if self.session is not None:
+            self.session.stream_stopped()
+        self._last_activity = time.monotonic()
+        # Let the device monitor open the next standby stream.
+        self.devices.wake()
         
-        # Collect all data from the queue
-        data = []
-        while not self.q.empty():
-            data.append(self.q.get())
-        
-        if not data:
-            return np.array([])
-            
-        return np.concatenate(data, axis=0)
+        log.info("Recording stopped", callback=self.callback_stats.summary())
+
+        # The helper thread has already processed everything but the tail.
+        audio, self.last_stats = self.preprocessor.finish()
+        if self.preprocessor.channel_selector is not None:
+            log.info("Input channels", selection=self.preprocessor.channel_selector.describe())
+        cost = self.last_stats.stage_cost()
+        if cost:
+            log.info("Pre-processing cost (ms/s)", **{name: round(ms, 1) for name, ms in cost.items()})
+        if len(audio) == 0:
+            return np.empty(0, dtype=self.dtype)
+        return audio
 
 if __name__ == "__main__":
     # Test the recorder
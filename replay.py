@@ -0,0 +1,211 @@
+"""
+Replay a session file written with V2T_SESSION_DIR.
+
+Drives VoiceToTextApp through the recorded hotkey sequence with the recorded
+audio (ReplaySource, original block sizes, timing and overflows), a fake
+overlay and a fake text injector, so a slow session can be reproduced and
+profiled on any machine. Decoding uses the configured Whisper model unless
+--no-decode is given. The replay writes its own session file and prints
+its timings next to the recorded ones.
+
+    uv run python replay.py ~/v2t-sessions/session-20261019-140112.v2ts
+    uv run python replay.py SESSION --list
+    uv run python replay.py SESSION --speed 4 --no-decode
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Hotkeys come from the file, not the keyboard; lets pynput import without a display.
+os.environ.setdefault("PYNPUT_BACKEND", "dummy")
+
+from session import SessionRecorder, read_session  # noqa: E402
+from sources import ReplaySource  # noqa: E402
+
+# Longest wait for a recording's audio before replaying the key that stopped it.
+STOP_TIMEOUT = 5.0
+
+
+class SessionSource:
+    """Source factory that plays the session's recordings in order, one per stream."""
+
+    def __init__(self, recordings, speed=1.0):
+        self.recordings = list(recordings)
+        self.speed = speed
+        self.samplerate = self.recordings[0]["samplerate"] if self.recordings else None
+        self._next = 0
+
+    def __call__(self, **stream_kwargs):
+        blocks, rate = [], stream_kwargs.get("samplerate")
+        if self._next < len(self.recordings):
+            recording = self.recordings[self._next]
+            blocks, rate = recording["blocks"], recording["samplerate"]
+        self._next += 1
+        return ReplaySource(blocks, rate, name=f"recording {self._next}", speed=self.speed, **stream_kwargs)
+
+    def describe(self):
+        return f"Replay of {len(self.recordings)} recordings (speed {self.speed or 'max'})"
+
+
+class ReplayOverlay:
+    """Overlay stand-in that keeps the states it was asked to show."""
+
+    def __init__(self):
+        self.states = []
+
+    def set_state_threadsafe(self, state):
+        self.states.append(state)
+
+    def set_mode_threadsafe(self, mode):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayInjector:
+    """Text injector stand-in that keeps the text instead of typing it."""
+
+    def __init__(self):
+        self.typed = []
+
+    def type_text(self, text):
+        self.typed.append(text)
+
+
+class NullTranscriber:
+    """Transcriber stand-in for --no-decode."""
+
+    def __init__(self):
+        self.last_timings = {}
+
+    def get_model_name(self):
+        return "none"
+
+    def get_active_model_name(self):
+        return "none"
+
+    def get_thread_count(self):
+        return None
+
+    def transcribe(self, audio_data, peak=None, normalize=True):
+        now = time.perf_counter()
+        self.last_timings = {"preprocess": (now, now), "decode": (now, now)}
+        return ""
+
+
+def print_timeline(session):
+    started = session.metadata.get("started", 0)
+    print(f"Session started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}, {session.metadata}")
+    for timestamp, kind, value in session.events:
+        wall = time.strftime("%H:%M:%S", time.localtime(started + timestamp))
+        if kind == "timing":
+            value = f"{value[0]} {value[1]:.1f} ms"
+        print(f"{wall} +{timestamp:9.3f} s  {kind:8} {value}")
+    for index, recording in enumerate(session.recordings, 1):
+        frames = sum(len(block) for _, block, _ in recording["blocks"])
+        overflows = sum(overflow for _, _, overflow in recording["blocks"])
+        print(
+            f"Recording {index}: {frames / recording['samplerate']:.2f} s at {recording['samplerate']} Hz, "
+            f"{recording['channels']} ch {recording['dtype']}, {len(recording['blocks'])} blocks, {overflows} overflows"
+        )
+
+
+def replay(session, speed=1.0, decode=True, output=None):
+    """Run the session's hotkey sequence through VoiceToTextApp; returns the replay's session file path."""
+    from pynput import keyboard
+
+    from main import VoiceToTextApp
+    from recorder import AudioRecorder
+
+    source = SessionSource(session.recordings, speed)
+    first = session.recordings[0] if session.recordings else {}
+    recorder = AudioRecorder(
+        samplerate=first.get("samplerate", 16000),
+        channels=first.get("channels"),
+        dtype=first.get("dtype"),
+        profile=session.metadata.get("profile") or None,
+        source=source,
+    )
+    if decode:
+        from transcriber import AudioTranscriber
+
+        transcriber = AudioTranscriber()
+    else:
+        transcriber = NullTranscriber()
+    output = output or os.path.join(tempfile.mkdtemp(prefix="v2t-replay-"), "replay.v2ts")
+    recorded = SessionRecorder(output, dict(session.metadata, replay_of=True))
+    overlay = ReplayOverlay()
+    injector = ReplayInjector()
+    app = VoiceToTextApp(
+        recorder=recorder, transcriber=transcriber, injector=injector, overlay=overlay,
+        session=recorded, play_sounds=False,
+    )
+    app.mode = session.metadata.get("mode", app.mode)
+
+    key = keyboard.Key.cmd_r
+    hotkeys = session.hotkeys()
+    # Start at the first hotkey press rather than at app startup.
+    origin = time.perf_counter() - (hotkeys[0][0] / speed if hotkeys and speed else 0)
+    for timestamp, action in hotkeys:
+        delay = origin + timestamp / (speed or float("inf")) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Every block of a recording was captured before the key that ended
+        # it, so let the source deliver them all before stopping.
+        stream = recorder.stream
+        if app.is_recording and stream is not None:
+            stream.finished.wait(STOP_TIMEOUT)
+        if action == "press":
+            app.on_press(key)
+        else:
+            app.on_release(key)
+    if app.is_recording:
+        app.stop_recording_and_transcribe()
+
+    # Wait for the last transcription and injection to finish.
+    while app._active_transcriptions:
+        time.sleep(0.05)
+    recorded.close()
+    print(f"Overlay states: {' -> '.join(overlay.states)}")
+    print(f"Injected text: {injector.typed}")
+    return output
+
+
+def compare(original, replayed):
+    timings = original.timings()
+    replayed_timings = replayed.timings()
+    print(f"{'timing (ms)':24} {'recorded p50':>13} {'replay p50':>11} {'recorded max':>13} {'replay max':>11}")
+    for name in sorted(set(timings) | set(replayed_timings)):
+        row = [name]
+        for values in (timings.get(name), replayed_timings.get(name)):
+            row.append(f"{np.median(values):.1f}" if values else "-")
+        for values in (timings.get(name), replayed_timings.get(name)):
+            row.append(f"{max(values):.1f}" if values else "-")
+        print(f"{row[0]:24} {row[1]:>13} {row[2]:>11} {row[3]:>13} {row[4]:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session", help="Session file (.v2ts)")
+    parser.add_argument("--list", action="store_true", help="Print the session timeline and exit")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = as recorded, 0 = as fast as possible)")
+    parser.add_argument("--no-decode", action="store_true", help="Skip Whisper decoding")
+    parser.add_argument("--output", help="Where to write the replay's own session file")
+    args = parser.parse_args()
+
+    session = read_session(args.session)
+    if args.list:
+        print_timeline(session)
+        return
+    output = replay(session, args.speed, not args.no_decode, args.output)
+    print(f"Replay session written to {output}")
+    compare(session, read_session(output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Session file layout: MAGIC, a version byte, a u32 length and a JSON header,
+# then records of (type u8, seconds since session start f64, payload length
+# u32) followed by the payload. Audio payloads are one overflow byte plus the
+# raw callback block, in the format announced by the preceding STREAM record.
+MAGIC = b"V2TS"
+VERSION = 1
+RECORD = struct.Struct("<BdI")
+HEADER = struct.Struct("<BI")
+
+AUDIO = 1
+HOTKEY = 2
+OVERLAY = 3
+TIMING = 4
+STREAM = 5
+
+
+def session_path(directory):
+    """Path for a new session file, named after the local start time."""
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S.v2ts"))
+
+
+class SessionRecorder:
+    """
+    Opt-in flight recorder: raw captured audio, hotkey events, overlay state
+    changes and per-stage timings, written to one compact binary file.
+
+    Every method only timestamps the event and puts it on a queue (audio()
+    is called from the audio callback), a writer thread does the file I/O.
+    Timestamps are perf_counter seconds since the session started; the
+    header records the wall-clock start time so a reported "slow at 14:03"
+    can be found.
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self._origin = time.perf_counter()
+        header = dict(metadata or {}, started=time.time(), version=VERSION)
+        payload = json.dumps(header).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + HEADER.pack(VERSION, len(payload)) + payload)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def _now(self):
+        return time.perf_counter() - self._origin
+
+    def audio(self, started, block, status):
+        """Record one callback block (started is the callback's perf_counter timestamp)."""
+        self._queue.put((AUDIO, started - self._origin, (bool(status), block)))
+
+    def hotkey(self, action, at=None):
+        """Record a hotkey press or release (at is the key event's perf_counter time)."""
+        t = self._now() if at is None else at - self._origin
+        self._queue.put((HOTKEY, t, action.encode()))
+
+    def overlay(self, state):
+        self._queue.put((OVERLAY, self._now(), state.encode()))
+
+    def timing(self, name, ms):
+        self._queue.put((TIMING, self._now(), struct.pack("<d", ms) + name.encode()))
+
+    def stream_started(self, samplerate, channels, dtype):
+        info = {"event": "start", "samplerate": samplerate, "channels": channels, "dtype": dtype}
+        self._queue.put((STREAM, self._now(), json.dumps(info).encode()))
+
+    def stream_stopped(self):
+        self._queue.put((STREAM, self._now(), b'{"event": "stop"}'))
+
+    def close(self):
+        """Write everything still queued and close the file."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            while item is not None:
+                kind, timestamp, payload = item
+                if kind == AUDIO:
+                    overflow, block = payload
+                    data = np.ascontiguousarray(block).tobytes()
+                    self._file.write(RECORD.pack(kind, timestamp, len(data) + 1) + bytes((overflow,)) + data)
+                else:
+                    self._file.write(RECORD.pack(kind, timestamp, len(payload)) + payload)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            # Flush after each burst, so a crash loses at most the last events.
+            self._file.flush()
+            if item is None:
+                return
+
+
+class Session:
+    """
+    A session file read back by read_session().
+
+    events is a time-ordered list of (seconds, kind, value) for hotkeys
+    ("press"/"release"), overlay states and timings ((name, ms)), and
+    recordings holds one dict per stream with its format and its captured
+    blocks as (seconds since the stream's first block, block, overflow).
+    """
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.events = []
+        self.recordings = []
+
+    def hotkeys(self):
+        return [(t, value) for t, kind, value in self.events if kind == "hotkey"]
+
+    def timings(self):
+        """Return {name: [ms, ...]} for every timing in the session."""
+        timings = {}
+        for _, kind, value in self.events:
+            if kind == "timing":
+                name, ms = value
+                timings.setdefault(name, []).append(ms)
+        return timings
+
+
+def read_session(path):
+    """Parse a session file written by SessionRecorder."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a session file")
+    version, length = HEADER.unpack_from(data, len(MAGIC))
+    if version != VERSION:
+        raise ValueError(f"Unsupported session file version {version}")
+    offset = len(MAGIC) + HEADER.size
+    session = Session(json.loads(data[offset:offset + length]))
+    offset += length
+
+    recording = None
+    while offset + RECORD.size <= len(data):
+        kind, timestamp, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        payload = data[offset:offset + length]
+        offset += length
+        if len(payload) < length:
+            break  # Truncated by a crash.
+        if kind == AUDIO and recording is not None:
+            dtype = np.dtype(recording["dtype"])
+            block = np.frombuffer(payload, dtype=dtype, offset=1).reshape(-1, recording["channels"])
+            blocks = recording["blocks"]
+            if not blocks:
+                recording["first_block"] = timestamp
+            blocks.append((timestamp - recording["first_block"], block, bool(payload[0])))
+        elif kind == STREAM:
+            info = json.loads(payload)
+            if info["event"] == "start":
+                recording = dict(info, start=timestamp, blocks=[])
+                session.recordings.append(recording)
+            else:
+                recording = None
+            session.events.append((timestamp, "stream", info["event"]))
+        elif kind == HOTKEY:
+            session.events.append((timestamp, "hotkey", payload.decode()))
+        elif kind == OVERLAY:
+            session.events.append((timestamp, "overlay", payload.decode()))
+        elif kind == TIMING:
+            (ms,) = struct.unpack_from("<d", payload)
+            session.events.append((timestamp, "timing", (payload[8:].decode(), ms)))
+    session.events.sort(key=lambda event: event[0])
+    return session
@@ -6,12 +6,15 @@ To add a new sound type:
 2. Implement play_start() and play_stop() functions
 3. Add it to SOUND_PROVIDERS below
 
-Select sound type via V2T_SOUND environment variable.
+Select sound type via V2T_SOUND environment variable. Providers are called
+holding devices.PORTAUDIO_LOCK, so their sd.play() never runs while the
+recorder opens streams or re-enumerates devices.
 """
 
 from importlib import import_module
 
 from config import SOUND_TYPE
+from devices import PORTAUDIO_LOCK
 
 # Registry of available sound providers
 # Maps V2T_SOUND value -> module name
@@ -34,9 +37,11 @@ _provider = _get_provider()
 
 def play_start_sound():
     """Play the start/activation sound."""
-    _provider.play_start()
+    with PORTAUDIO_LOCK:
+        _provider.play_start()
 
 
 def play_stop_sound():
     """Play the stop/confirmation sound."""
-    _provider.play_stop()
+    with PORTAUDIO_LOCK:
+        _provider.play_stop()
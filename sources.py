@@ -0,0 +1,293 @@
+import threading
+import time
+
+import numpy as np
+
+from preprocess import TARGET_SAMPLE_RATE, PolyphaseResampler
+
+
+class SourceStatus:
+    """Stand-in for sounddevice.CallbackFlags: false unless a flag is set."""
+
+    def __init__(self, input_overflow=False):
+        self.input_overflow = input_overflow
+
+    def __bool__(self):
+        return self.input_overflow
+
+    def __repr__(self):
+        return "input overflow" if self.input_overflow else ""
+
+
+class AudioSource:
+    """
+    Input stream that delivers audio from something other than a microphone.
+
+    It has the parts of the sounddevice.InputStream interface AudioRecorder
+    uses (start/stop/close, active, latency) and calls the same callback with
+    (indata, frames, time_info, status) from its own thread, so recordings go
+    through the real callback, queue and pre-processing path. Subclasses
+    implement _blocks(), yielding (seconds since start, block, status).
+    At speed=1 blocks are paced in real time; higher speeds run faster and
+    speed=0 delivers them as fast as the callback returns.
+    """
+
+    def __init__(self, samplerate, channels=1, dtype="float32", blocksize=0, latency=None, callback=None, speed=1.0):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        # Without an explicit block size, deliver 10 ms blocks.
+        self.blocksize = blocksize or max(1, samplerate // 100)
+        self.latency = self.blocksize / samplerate
+        self.callback = callback
+        self.speed = speed
+        self.finished = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._position = None
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def _blocks(self):
+        raise NotImplementedError
+
+    def _silence(self, offset):
+        """Silent blocks after the end of the audio, like a microphone in a quiet room."""
+        block = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        period = self.blocksize / self.samplerate
+        while True:
+            yield offset, block, SourceStatus()
+            offset += period
+
+    def _run(self):
+        # Resume where the previous start() left off, as a PortAudio stream would.
+        if self._position is None:
+            self._position = self._blocks()
+        started = time.perf_counter()
+        first = None
+        for offset, block, status in self._position:
+            if first is None:
+                first = offset
+            if self.speed:
+                delay = started + (offset - first) / self.speed - time.perf_counter()
+                if delay > 0 and self._stopped.wait(delay):
+                    return
+            if self._stopped.is_set():
+                return
+            self.callback(block, len(block), None, status)
+        self._stopped.wait()
+
+
+class FileSource(AudioSource):
+    """
+    Plays an in-memory recording (or a WAV via load()) into the callback.
+
+    The audio is converted once, up front, to the requested rate, channel
+    count and sample format, then cut into blocksize blocks. When it runs out
+    `finished` is set and the source keeps delivering silence (at speed 0 it
+    simply goes quiet) until it is stopped.
+    """
+
+    def __init__(self, audio, source_rate, samplerate=None, name="audio", **kwargs):
+        samplerate = samplerate or source_rate
+        super().__init__(samplerate, **kwargs)
+        self.name = name
+        self.audio = self._convert(np.asarray(audio, dtype=np.float32), source_rate)
+
+    def _convert(self, audio, source_rate):
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        if source_rate != self.samplerate:
+            channels = []
+            for channel in audio.T:
+                resampler = PolyphaseResampler(source_rate, self.samplerate)
+                channels.append(np.concatenate((resampler.process(channel), resampler.flush())))
+            audio = np.stack(channels, axis=1)
+        # Repeat the file's channels to fill the requested channel count.
+        audio = audio[:, np.arange(self.channels) % audio.shape[1]]
+        if np.issubdtype(self.dtype, np.integer):
+            scale = -float(np.iinfo(self.dtype).min)
+            info = np.iinfo(self.dtype)
+            audio = np.clip(np.rint(audio * scale), info.min, info.max)
+        return np.ascontiguousarray(audio, dtype=self.dtype)
+
+    def _blocks(self):
+        period = self.blocksize / self.samplerate
+        count = -(-len(self.audio) // self.blocksize)
+        for index in range(count):
+            block = self.audio[index * self.blocksize:(index + 1) * self.blocksize]
+            if len(block) < self.blocksize:
+                padded = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+                padded[:len(block)] = block
+                block = padded
+            yield index * period, block, SourceStatus()
+        self.finished.set()
+        if self.speed:
+            yield from self._silence(count * period)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Create a source from a WAV/FLAC file."""
+        import soundfile as sf
+
+        audio, rate = sf.read(path, dtype="float32", always_2d=True)
+        return cls(audio, rate, name=path, **kwargs)
+
+
+class ReplaySource(AudioSource):
+    """
+    Replays captured callback blocks with their original timing and status.
+
+    Unlike FileSource the blocks are delivered exactly as they were captured,
+    including their sizes, gaps and overflow flags, so a slow session can be
+    reproduced. The capture's sample rate, channel count and format win over
+    the requested ones; AudioRecorder must be configured to match.
+    """
+
+    def __init__(self, blocks, capture_rate, name="capture", **kwargs):
+        kwargs.pop("samplerate", None)
+        super().__init__(capture_rate, **kwargs)
+        self.name = name
+        self.blocks = list(blocks)
+        if self.blocks:
+            self.channels = self.blocks[0][1].shape[1]
+            self.dtype = self.blocks[0][1].dtype
+
+    def _blocks(self):
+        for offset, block, overflow in self.blocks:
+            yield offset, block, SourceStatus(bool(overflow))
+        self.finished.set()
+        if self.speed and self.blocks:
+            offset, block, _ = self.blocks[-1]
+            self.blocksize = len(block)
+            yield from self._silence(offset + len(block) / self.samplerate)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Create a source from a capture saved with save_capture()."""
+        with np.load(path) as capture:
+            audio = capture["audio"]
+            ends = np.cumsum(capture["frames"])
+            starts = ends - capture["frames"]
+            blocks = [
+                (float(offset), audio[start:end], bool(overflow))
+                for offset, start, end, overflow in zip(capture["times"], starts, ends, capture["overflows"])
+            ]
+            return cls(blocks, int(capture["samplerate"]), name=path, **kwargs)
+
+
+def save_capture(path, samplerate, blocks):
+    """
+    Save captured callback blocks for ReplaySource.load().
+
+    blocks is a sequence of (seconds since the first block, 2-D block,
+    input overflow flag). The file is an uncompressed .npz holding the
+    concatenated audio plus per-block frame counts, times and flags.
+    """
+    blocks = list(blocks)
+    np.savez(
+        path,
+        samplerate=samplerate,
+        audio=np.concatenate([block for _, block, _ in blocks]),
+        frames=np.array([len(block) for _, block, _ in blocks], dtype=np.int64),
+        times=np.array([offset for offset, _, _ in blocks], dtype=np.float64),
+        overflows=np.array([bool(overflow) for _, _, overflow in blocks]),
+    )
+
+
+class SourceFactory:
+    """
+    Opens a new source per stream, with the same arguments as sd.InputStream.
+
+    Each recording opens its own stream, so every recording starts at the
+    beginning of the file or capture. samplerate is the rate of the audio
+    itself (used by V2T_NATIVE_RATE).
+    """
+
+    def __init__(self, source_class, *args, samplerate=None, speed=1.0, description="", **kwargs):
+        self.source_class = source_class
+        self.args = args
+        self.kwargs = kwargs
+        self.samplerate = samplerate
+        self.speed = speed
+        self.description = description or source_class.__name__
+
+    def __call__(self, **stream_kwargs):
+        return self.source_class(*self.args, speed=self.speed, **self.kwargs, **stream_kwargs)
+
+    def describe(self):
+        return f"{self.description} (speed {self.speed or 'max'})"
+
+
+def synthetic_speech(seconds, peak=0.3, seed=0, samplerate=TARGET_SAMPLE_RATE):
+    """
+    Speech-like test signal: harmonic "syllables" with a varying pitch at
+    about 4 Hz, separated by short pauses, scaled to the given peak.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * samplerate)
+    t = np.arange(n) / samplerate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / samplerate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 2
+    pauses = (np.sin(2 * np.pi * 0.25 * t) > -0.7).astype(np.float64)
+    audio = voiced * syllables * pauses
+    current = float(np.max(np.abs(audio))) if n else 0.0
+    if current:
+        audio = audio * (peak / current)
+    return audio.astype(np.float32)
+
+
+def from_spec(spec, speed=1.0):
+    """
+    Build a SourceFactory from a V2T_AUDIO_SOURCE value, or return None for
+    the microphone. Accepted values:
+        "" or "mic"            - live input (sounddevice)
+        "file:PATH"            - WAV/FLAC file
+        "synthetic[:SECONDS]"  - generated speech-like signal (default 5 s)
+        "replay:PATH"          - capture saved with save_capture()
+    """
+    spec = (spec or "").strip()
+    kind, _, argument = spec.partition(":")
+    kind = kind.lower()
+    if kind in ("", "mic"):
+        return None
+    if kind == "file":
+        import soundfile as sf
+
+        audio, rate = sf.read(argument, dtype="float32", always_2d=True)
+        return SourceFactory(
+            FileSource, audio, rate, name=argument, samplerate=rate, speed=speed, description=f"File: {argument}",
+        )
+    if kind == "synthetic":
+        seconds = float(argument) if argument else 5.0
+        return SourceFactory(
+            FileSource, synthetic_speech(seconds), 16000, name="synthetic", samplerate=16000, speed=speed,
+            description=f"Synthetic speech ({seconds:g} s)",
+        )
+    if kind == "replay":
+        source = ReplaySource.load(argument)
+        return SourceFactory(
+            ReplaySource, source.blocks, source.samplerate, name=argument, samplerate=source.samplerate, speed=speed,
+            description=f"Replay: {argument}",
+        )
+    raise ValueError(f"Unknown audio source '{spec}' (expected mic, file:PATH, synthetic[:SECONDS] or replay:PATH)")
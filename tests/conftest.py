@@ -2,6 +2,7 @@
 
 import os
 import sys
+import time
 from pathlib import Path
 import pytest
 
@@ -22,3 +23,55 @@ def disable_gui_overlay():
             os.environ.pop("V2T_GUI", None)
         else:
             os.environ["V2T_GUI"] = original
+
+
+class FakeTranscriber:
+    """
+    Stands in for AudioTranscriber behind the daemon, HTTP and worker
+    servers. Each transcribe() reports a 1 ms preprocess and a 250 ms
+    decode span and records its call.
+    """
+
+    def __init__(self, text="hello", delay=0.0):
+        self.text = text
+        self.delay = delay
+        self.calls = []
+        self.audio = []
+        self.active = 0
+        self.overlapped = False
+        self.last_timings = {}
+
+    def get_model_name(self):
+        return "small.en"
+
+    def get_active_model_name(self):
+        return "base.en"
+
+    def get_thread_count(self):
+        return 4
+
+    def transcribe(self, audio_data, peak=None, normalize=True):
+        self.active += 1
+        self.overlapped |= self.active > 1
+        start = time.perf_counter()
+        time.sleep(self.delay)
+        self.calls.append((audio_data.dtype, len(audio_data), peak, normalize, audio_data.flags.writeable))
+        self.audio.append(audio_data)
+        self.last_timings = {"preprocess": (start, start + 0.001), "decode": (start + 0.001, start + 0.251)}
+        self.active -= 1
+        return self.text
+
+
+@pytest.fixture
+def fake_transcriber():
+    """The FakeTranscriber class, to create as many as a test needs."""
+    return FakeTranscriber
+
+
+@pytest.hookimpl(hookwrapper=True, trylast=True)
+def pytest_runtest_call(item):
+    """Write queued log records while the test's output is still captured."""
+    yield
+    import log
+
+    log.flush()
@@ -0,0 +1,112 @@
+"""Unit tests for audio_buffer.py - AudioBuffer class."""
+
+import numpy as np
+import pytest
+
+from audio_buffer import AudioBuffer
+
+
+class TestAudioBuffer:
+    """Tests for AudioBuffer."""
+
+    def test_new_buffer_is_empty(self):
+        """Test that a new buffer has no samples."""
+        buffer = AudioBuffer(capacity=4)
+
+        assert len(buffer) == 0
+        assert len(buffer.view()) == 0
+
+    def test_append_copies_blocks_in_order(self):
+        """Test that appended blocks are stored contiguously in order."""
+        buffer = AudioBuffer(capacity=8)
+        buffer.append(np.array([0.1, 0.2]))
+        buffer.append(np.array([0.3]))
+
+        np.testing.assert_array_almost_equal(buffer.view(), [0.1, 0.2, 0.3])
+        assert buffer.view().dtype == np.float32
+
+    def test_append_grows_past_capacity(self):
+        """Test that the buffer grows when blocks exceed the capacity."""
+        buffer = AudioBuffer(capacity=2)
+        for value in range(10):
+            buffer.append(np.array([value, value], dtype=np.float32))
+
+        assert len(buffer) == 20
+        assert buffer.capacity >= 20
+        np.testing.assert_array_equal(buffer.view()[::2], np.arange(10))
+
+    def test_view_is_contiguous_and_shares_memory(self):
+        """Test that view() returns a contiguous view, not a copy."""
+        buffer = AudioBuffer(capacity=8)
+        buffer.append(np.arange(6, dtype=np.float32))
+
+        view = buffer.view(1, 4)
+
+        np.testing.assert_array_equal(view, [1, 2, 3])
+        assert view.flags.c_contiguous
+        assert np.shares_memory(view, buffer.view())
+
+    def test_view_clamps_range(self):
+        """Test that view() clamps out-of-range bounds."""
+        buffer = AudioBuffer(capacity=8)
+        buffer.append(np.arange(4, dtype=np.float32))
+
+        np.testing.assert_array_equal(buffer.view(-3, 100), [0, 1, 2, 3])
+
+    def test_append_copies_input(self):
+        """Test that later changes to the input block do not affect the buffer."""
+        buffer = AudioBuffer(capacity=4)
+        block = np.array([0.5, 0.5], dtype=np.float32)
+        buffer.append(block)
+        block[0] = 9.0
+
+        assert buffer.view()[0] == pytest.approx(0.5)
+
+    def test_int16_buffer_quantizes_float_blocks(self):
+        """Test that float blocks are stored at int16 full scale and clipped."""
+        buffer = AudioBuffer(capacity=4, dtype=np.int16)
+        buffer.append(np.array([0.5, -1.0, 1.0, 0.0], dtype=np.float32))
+
+        view = buffer.view()
+
+        assert view.dtype == np.int16
+        np.testing.assert_array_equal(view, [16384, -32768, 32767, 0])
+
+    def test_spills_to_memmap_past_threshold(self, tmp_path):
+        """Test that the buffer moves to a memory-mapped file and keeps its samples."""
+        buffer = AudioBuffer(capacity=8, spill_bytes=64, spill_dir=tmp_path)
+        for start in range(0, 100, 10):
+            buffer.append(np.arange(start, start + 10, dtype=np.float32))
+
+        view = buffer.view(5, 95)
+
+        assert buffer.spilled
+        assert isinstance(view, np.memmap)
+        np.testing.assert_array_equal(view, np.arange(5, 95))
+
+    def test_stays_in_memory_below_threshold(self):
+        """Test that small recordings never touch the disk."""
+        buffer = AudioBuffer(capacity=8, spill_bytes=1024)
+        buffer.append(np.zeros(100, dtype=np.float32))
+
+        assert not buffer.spilled
+        assert not isinstance(buffer.view(), np.memmap)
+
+    def test_spill_file_is_removed(self, tmp_path):
+        """Test that the temporary spill file does not outlive the buffer."""
+        buffer = AudioBuffer(capacity=8, spill_bytes=64, spill_dir=tmp_path)
+        buffer.append(np.zeros(100, dtype=np.int16))
+
+        assert buffer.spilled
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spilled_buffer_releases_written_pages(self, tmp_path):
+        """Test that samples survive the periodic flush-and-release of written pages."""
+        buffer = AudioBuffer(capacity=8, spill_bytes=64, spill_dir=tmp_path)
+        buffer.RELEASE_BYTES = 4096
+        block = np.arange(1000, dtype=np.float32)
+        for _ in range(50):
+            buffer.append(block)
+
+        np.testing.assert_array_equal(buffer.view(49000), block)
+        np.testing.assert_array_equal(buffer.view(0, 1000), block)
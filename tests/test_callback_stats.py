@@ -0,0 +1,130 @@
+"""Unit tests for callback_stats.py - audio callback health counters."""
+
+import tracemalloc
+
+import pytest
+
+from callback_stats import CallbackStats
+
+
+class _Status:
+    def __init__(self, input_overflow=False):
+        self.input_overflow = input_overflow
+
+    def __bool__(self):
+        return self.input_overflow
+
+
+def _feed(stats, count, frames=160, period=0.01, duration=0.0002, start=100.0, status=None):
+    for i in range(count):
+        started = start + i * period
+        stats.record(frames, status, started, started + duration)
+
+
+class TestCallbackStats:
+    """Tests for CallbackStats."""
+
+    def test_new_stats_are_empty(self):
+        """Test that a fresh instance reports no callbacks and no timing."""
+        snapshot = CallbackStats(16000, 160).snapshot()
+
+        assert snapshot["callbacks"] == 0
+        assert snapshot["expected_frames"] == 0
+        assert "duration_p50_ms" not in snapshot
+        assert "period_ms" not in snapshot
+
+    def test_counts_frames_and_expected_frames(self):
+        """Test that a steady stream delivers exactly the expected frames."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 100)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["callbacks"] == 100
+        assert snapshot["frames"] == 16000
+        assert snapshot["expected_frames"] == 16000
+        assert snapshot["dropped_frames"] == 0
+
+    def test_gap_shows_up_as_dropped_frames(self):
+        """Test that a missing block is detected from the callback timestamps."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 10)
+        _feed(stats, 10, start=100.0 + 11 * 0.01)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["dropped_frames"] == 160
+        assert snapshot["jitter_max_ms"] == pytest.approx(10.0)
+
+    def test_status_flags_count_as_xruns(self):
+        """Test that status flags are counted, with overflows separately."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 3, status=_Status(input_overflow=True))
+        _feed(stats, 2, start=200.0)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["xruns"] == 3
+        assert snapshot["input_overflows"] == 3
+
+    def test_duration_percentiles_and_period(self):
+        """Test that callback durations and block period are reported in milliseconds."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 99, duration=0.0001)
+        _feed(stats, 1, duration=0.005, start=100.0 + 99 * 0.01)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["duration_p50_ms"] == pytest.approx(0.1)
+        assert snapshot["duration_max_ms"] == pytest.approx(5.0)
+        assert snapshot["period_ms"] == pytest.approx(10.0)
+        assert snapshot["jitter_ms"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_reset_keeps_session_totals(self):
+        """Test that reset() starts a new stream but keeps totals."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 5, status=_Status(input_overflow=True))
+        stats.reset()
+        _feed(stats, 2, start=300.0)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["callbacks"] == 2
+        assert snapshot["xruns"] == 0
+        assert snapshot["total_callbacks"] == 7
+        assert snapshot["total_xruns"] == 5
+
+    def test_ring_keeps_most_recent_history(self):
+        """Test that more callbacks than the ring holds still give valid percentiles."""
+        stats = CallbackStats(16000, 160, history=8)
+        _feed(stats, 50)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["callbacks"] == 50
+        assert snapshot["duration_p99_ms"] == pytest.approx(0.2)
+
+    def test_record_does_not_allocate_arrays(self):
+        """Test that recording a callback does not allocate NumPy memory."""
+        stats = CallbackStats(16000, 160, history=4096)
+        _feed(stats, 10)
+
+        tracemalloc.start()
+        try:
+            _feed(stats, 1000, start=200.0)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert peak < 4096 * 8
+
+    def test_summary_mentions_xruns_and_percentiles(self):
+        """Test the one-line summary."""
+        stats = CallbackStats(16000, 160)
+        _feed(stats, 10, status=_Status(input_overflow=True))
+
+        summary = stats.summary()
+
+        assert "10 callbacks" in summary
+        assert "10 xruns" in summary
+        assert "p50/p95/p99" in summary
@@ -1,9 +1,19 @@
 """Tests for configuration module."""
 
+import importlib
 import os
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def restore_config(monkeypatch):
+    """Reload config from the real environment so other modules see defaults."""
+    yield
+    monkeypatch.undo()
+    import config
+    importlib.reload(config)
+
+
 class TestSoundConfig:
     """Tests for sound configuration."""
 
@@ -51,3 +61,397 @@ class TestModelConfig:
         import config
         importlib.reload(config)
         assert config.MODEL == "large-v3"
+
+
+class TestFallbackModelConfig:
+    """Tests for automatic model downgrade configuration."""
+
+    def test_fallback_disabled_by_default(self, monkeypatch):
+        """Fallback model should be empty (disabled) by default."""
+        monkeypatch.delenv("V2T_FALLBACK_MODEL", raising=False)
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.FALLBACK_MODEL == ""
+
+    def test_rtf_thresholds_from_env(self, monkeypatch):
+        """RTF thresholds should be configurable via env vars."""
+        monkeypatch.setenv("V2T_RTF_DOWNGRADE", "0.8")
+        monkeypatch.setenv("V2T_RTF_UPGRADE", "0.3")
+        monkeypatch.setenv("V2T_RTF_WINDOW", "5")
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.RTF_DOWNGRADE == 0.8
+        assert config.RTF_UPGRADE == 0.3
+        assert config.RTF_WINDOW == 5
+
+
+class TestVadConfig:
+    """Tests for silence trimming configuration."""
+
+    def test_trim_enabled_by_default(self, monkeypatch):
+        """Silence trimming should be enabled by default."""
+        monkeypatch.delenv("V2T_VAD_TRIM", raising=False)
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.VAD_TRIM is True
+        assert config.VAD_PAD_MS == 300
+
+    def test_trim_can_be_disabled(self, monkeypatch):
+        """V2T_VAD_TRIM=0 should disable silence trimming."""
+        monkeypatch.setenv("V2T_VAD_TRIM", "0")
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.VAD_TRIM is False
+
+
+class TestDenoiseConfig:
+    """Tests for noise suppression configuration."""
+
+    def test_denoise_disabled_by_default(self, monkeypatch):
+        """Noise suppression should be opt-in."""
+        monkeypatch.delenv("V2T_DENOISE", raising=False)
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.DENOISE is False
+
+    def test_denoise_from_env(self, monkeypatch):
+        """V2T_DENOISE=1 should enable noise suppression."""
+        monkeypatch.setenv("V2T_DENOISE", "1")
+        monkeypatch.setenv("V2T_HIGHPASS_HZ", "120")
+        import importlib
+        import config
+        importlib.reload(config)
+        assert config.DENOISE is True
+        assert config.HIGHPASS_HZ == 120.0
+
+
+class TestNativeRateConfig:
+    """Tests for native-rate capture configuration."""
+
+    def test_native_rate_disabled_by_default(self, monkeypatch):
+        """Capture should ask PortAudio for 16 kHz unless enabled."""
+        monkeypatch.delenv("V2T_NATIVE_RATE", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.NATIVE_RATE is False
+
+    def test_native_rate_from_env(self, monkeypatch):
+        """V2T_NATIVE_RATE=1 should enable native-rate capture."""
+        monkeypatch.setenv("V2T_NATIVE_RATE", "1")
+        import config
+        importlib.reload(config)
+        assert config.NATIVE_RATE is True
+
+
+class TestCaptureDtypeConfig:
+    """Tests for the capture sample format."""
+
+    def test_capture_dtype_defaults_to_profile(self, monkeypatch):
+        """Without V2T_CAPTURE_DTYPE the capture profile picks the format."""
+        monkeypatch.delenv("V2T_CAPTURE_DTYPE", raising=False)
+        monkeypatch.delenv("V2T_CAPTURE_PROFILE", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.CAPTURE_DTYPE == ""
+        assert config.CAPTURE_PROFILE == "balanced"
+
+    def test_capture_dtype_from_env(self, monkeypatch):
+        """V2T_CAPTURE_DTYPE=int16 should select compact capture; unknown values are ignored."""
+        import config
+        monkeypatch.setenv("V2T_CAPTURE_DTYPE", "INT16")
+        importlib.reload(config)
+        assert config.CAPTURE_DTYPE == "int16"
+        monkeypatch.setenv("V2T_CAPTURE_DTYPE", "float64")
+        importlib.reload(config)
+        assert config.CAPTURE_DTYPE == ""
+
+
+class TestSpillConfig:
+    """Tests for disk spill configuration."""
+
+    def test_spill_defaults(self, monkeypatch):
+        """Recordings should spill past 64 MB to the system temp directory."""
+        monkeypatch.delenv("V2T_SPILL_MB", raising=False)
+        monkeypatch.delenv("V2T_SPILL_DIR", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.SPILL_MB == 64.0
+        assert config.SPILL_DIR is None
+
+    def test_spill_from_env(self, monkeypatch):
+        """V2T_SPILL_MB and V2T_SPILL_DIR should be read from the environment."""
+        monkeypatch.setenv("V2T_SPILL_MB", "0")
+        monkeypatch.setenv("V2T_SPILL_DIR", "/var/tmp")
+        import config
+        importlib.reload(config)
+        assert config.SPILL_MB == 0.0
+        assert config.SPILL_DIR == "/var/tmp"
+
+
+class TestChannelConfig:
+    """Tests for multi-channel capture configuration."""
+
+    def test_single_channel_by_default(self, monkeypatch):
+        """Capture should be mono with best-channel mode by default."""
+        monkeypatch.delenv("V2T_CHANNELS", raising=False)
+        monkeypatch.delenv("V2T_CHANNEL_MODE", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.CHANNELS == 1
+        assert config.CHANNEL_MODE == "best"
+
+    def test_channels_from_env(self, monkeypatch):
+        """V2T_CHANNELS and V2T_CHANNEL_MODE should be read from the environment."""
+        monkeypatch.setenv("V2T_CHANNELS", "4")
+        monkeypatch.setenv("V2T_CHANNEL_MODE", "MIX")
+        import config
+        importlib.reload(config)
+        assert config.CHANNELS == 4
+        assert config.CHANNEL_MODE == "mix"
+
+
+class TestAudioSourceConfig:
+    """Tests for the benchmark audio source configuration."""
+
+    def test_microphone_by_default(self, monkeypatch):
+        """The live microphone at real-time speed should be the default."""
+        monkeypatch.delenv("V2T_AUDIO_SOURCE", raising=False)
+        monkeypatch.delenv("V2T_SOURCE_SPEED", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.AUDIO_SOURCE == ""
+        assert config.SOURCE_SPEED == 1.0
+
+    def test_source_from_env(self, monkeypatch):
+        """V2T_AUDIO_SOURCE and V2T_SOURCE_SPEED should be read; negative speeds clamp to 0."""
+        monkeypatch.setenv("V2T_AUDIO_SOURCE", " synthetic:3 ")
+        monkeypatch.setenv("V2T_SOURCE_SPEED", "-1")
+        import config
+        importlib.reload(config)
+        assert config.AUDIO_SOURCE == "synthetic:3"
+        assert config.SOURCE_SPEED == 0.0
+
+
+class TestSessionConfig:
+    """Tests for the session flight recorder configuration."""
+
+    def test_session_recording_off_by_default(self, monkeypatch):
+        """No session file should be written unless V2T_SESSION_DIR is set."""
+        monkeypatch.delenv("V2T_SESSION_DIR", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.SESSION_DIR == ""
+
+    def test_session_dir_from_env(self, monkeypatch):
+        """V2T_SESSION_DIR should be read from the environment."""
+        monkeypatch.setenv("V2T_SESSION_DIR", "/tmp/v2t-sessions ")
+        import config
+        importlib.reload(config)
+        assert config.SESSION_DIR == "/tmp/v2t-sessions"
+
+
+class TestTraceConfig:
+    """Tests for the slow-utterance trace configuration."""
+
+    def test_defaults(self, monkeypatch):
+        """Dumps should be off by default with a 100-utterance ring."""
+        for name in ("V2T_TRACE_RING", "V2T_SLO_MS", "V2T_SLOW_DIR"):
+            monkeypatch.delenv(name, raising=False)
+        import config
+        importlib.reload(config)
+        assert config.TRACE_RING == 100
+        assert config.SLO_MS == 0
+        assert config.SLOW_DIR.endswith(os.path.join(".v2t", "slow"))
+
+    def test_from_env(self, monkeypatch):
+        """V2T_TRACE_RING, V2T_SLO_MS and V2T_SLOW_DIR should be read from the environment."""
+        monkeypatch.setenv("V2T_TRACE_RING", "20")
+        monkeypatch.setenv("V2T_SLO_MS", "1500")
+        monkeypatch.setenv("V2T_SLOW_DIR", "/var/tmp/v2t")
+        import config
+        importlib.reload(config)
+        assert config.TRACE_RING == 20
+        assert config.SLO_MS == 1500
+        assert config.SLOW_DIR == "/var/tmp/v2t"
+
+    def test_trace_export_off_by_default(self, monkeypatch):
+        """No trace file or collector should be used unless configured."""
+        monkeypatch.delenv("V2T_TRACE_FILE", raising=False)
+        monkeypatch.delenv("V2T_TRACE_OTLP", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.TRACE_FILE == ""
+        assert config.TRACE_OTLP == ""
+
+    def test_trace_export_from_env(self, monkeypatch):
+        """V2T_TRACE_FILE (with ~ expanded) and V2T_TRACE_OTLP should be read."""
+        monkeypatch.setenv("V2T_TRACE_FILE", "~/traces.jsonl")
+        monkeypatch.setenv("V2T_TRACE_OTLP", "http://localhost:4318/v1/traces")
+        import config
+        importlib.reload(config)
+        assert config.TRACE_FILE == os.path.expanduser("~/traces.jsonl")
+        assert config.TRACE_OTLP == "http://localhost:4318/v1/traces"
+
+
+class TestMetricsConfig:
+    """Tests for the metrics endpoint configuration."""
+
+    def test_metrics_off_by_default(self, monkeypatch):
+        """No metrics endpoint should be opened unless configured."""
+        monkeypatch.delenv("V2T_METRICS", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.METRICS == ""
+
+    def test_metrics_from_env(self, monkeypatch):
+        """V2T_METRICS should be read from the environment."""
+        monkeypatch.setenv("V2T_METRICS", " unix:/tmp/v2t.sock")
+        import config
+        importlib.reload(config)
+        assert config.METRICS == "unix:/tmp/v2t.sock"
+
+
+class TestProfileConfig:
+    """Tests for the built-in profiler configuration."""
+
+    def test_profile_off_by_default(self, monkeypatch):
+        """Profiling should be off with a window of 60 s and 5 ms samples."""
+        for name in ("V2T_PROFILE", "V2T_PROFILE_DIR", "V2T_PROFILE_WINDOW_S", "V2T_PROFILE_INTERVAL_MS"):
+            monkeypatch.delenv(name, raising=False)
+        import config
+        importlib.reload(config)
+        assert config.PROFILE == ""
+        assert config.PROFILE_DIR == os.path.expanduser("~/.v2t/profiles")
+        assert config.PROFILE_WINDOW_S == 60.0
+        assert config.PROFILE_INTERVAL_MS == 5.0
+
+    def test_profile_from_env(self, monkeypatch):
+        """Mode should be lowercased and the window and interval clamped."""
+        monkeypatch.setenv("V2T_PROFILE", " Sample ")
+        monkeypatch.setenv("V2T_PROFILE_DIR", "/tmp/profiles")
+        monkeypatch.setenv("V2T_PROFILE_WINDOW_S", "0")
+        monkeypatch.setenv("V2T_PROFILE_INTERVAL_MS", "0.1")
+        import config
+        importlib.reload(config)
+        assert config.PROFILE == "sample"
+        assert config.PROFILE_DIR == "/tmp/profiles"
+        assert config.PROFILE_WINDOW_S == 1.0
+        assert config.PROFILE_INTERVAL_MS == 1.0
+
+
+class TestLogConfig:
+    """Tests for the logging configuration."""
+
+    def test_log_defaults(self, monkeypatch):
+        """Logging should default to info-level text, 20 records/s per call site."""
+        for name in ("V2T_LOG_LEVEL", "V2T_LOG_FORMAT", "V2T_LOG_RATE"):
+            monkeypatch.delenv(name, raising=False)
+        import config
+        importlib.reload(config)
+        assert config.LOG_LEVEL == "INFO"
+        assert config.LOG_FORMAT == "text"
+        assert config.LOG_RATE == 20
+
+    def test_log_from_env(self, monkeypatch):
+        """Level and format should be normalized and the rate clamped at 0."""
+        monkeypatch.setenv("V2T_LOG_LEVEL", "debug")
+        monkeypatch.setenv("V2T_LOG_FORMAT", "JSON")
+        monkeypatch.setenv("V2T_LOG_RATE", "-5")
+        import config
+        importlib.reload(config)
+        assert config.LOG_LEVEL == "DEBUG"
+        assert config.LOG_FORMAT == "json"
+        assert config.LOG_RATE == 0
+
+
+class TestDaemonConfig:
+    """Tests for the transcription daemon configuration."""
+
+    def test_daemon_off_by_default(self, monkeypatch):
+        """Without V2T_DAEMON_SOCKET the model is loaded in-process."""
+        monkeypatch.delenv("V2T_DAEMON_SOCKET", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.DAEMON_SOCKET == ""
+
+    def test_daemon_socket_from_env(self, monkeypatch):
+        """V2T_DAEMON_SOCKET should be read with ~ expanded."""
+        monkeypatch.setenv("V2T_DAEMON_SOCKET", "~/v2t.sock")
+        import config
+        importlib.reload(config)
+        assert config.DAEMON_SOCKET == os.path.expanduser("~/v2t.sock")
+
+
+class TestHttpConfig:
+    """Tests for the HTTP transcription endpoint configuration."""
+
+    def test_http_off_by_default(self, monkeypatch):
+        """Without V2T_HTTP no endpoint is served; one request at a time, eight queued."""
+        for name in ("V2T_HTTP", "V2T_HTTP_CONCURRENCY", "V2T_HTTP_QUEUE", "V2T_HTTP_MAX_MB"):
+            monkeypatch.delenv(name, raising=False)
+        import config
+        importlib.reload(config)
+        assert config.HTTP == ""
+        assert config.HTTP_CONCURRENCY == 1
+        assert config.HTTP_QUEUE == 8
+        assert config.HTTP_MAX_MB == 25.0
+
+    def test_http_limits_are_clamped(self, monkeypatch):
+        """Concurrency is at least 1 and the queue at least 0."""
+        monkeypatch.setenv("V2T_HTTP", "8765")
+        monkeypatch.setenv("V2T_HTTP_CONCURRENCY", "0")
+        monkeypatch.setenv("V2T_HTTP_QUEUE", "-3")
+        import config
+        importlib.reload(config)
+        assert config.HTTP == "8765"
+        assert config.HTTP_CONCURRENCY == 1
+        assert config.HTTP_QUEUE == 0
+
+
+class TestWorkersConfig:
+    """Tests for the remote worker configuration."""
+
+    def test_workers_off_by_default(self, monkeypatch):
+        """Without V2T_WORKERS everything is decoded locally."""
+        for name in ("V2T_WORKERS", "V2T_WORKER_TIMEOUT_S", "V2T_WORKER_CHECK_S", "V2T_WORKER_PRELOAD"):
+            monkeypatch.delenv(name, raising=False)
+        import config
+        importlib.reload(config)
+        assert config.WORKERS == []
+        assert config.WORKER_TIMEOUT_S == 5.0
+        assert config.WORKER_CHECK_S == 5.0
+        assert config.WORKER_PRELOAD is True
+
+    def test_fallback_preload_can_be_disabled(self, monkeypatch):
+        """V2T_WORKER_PRELOAD=0 loads the local fallback model on first use instead."""
+        monkeypatch.setenv("V2T_WORKER_PRELOAD", "0")
+        import config
+        importlib.reload(config)
+        assert config.WORKER_PRELOAD is False
+
+    def test_worker_list_is_split_and_trimmed(self, monkeypatch):
+        """V2T_WORKERS is a comma-separated list; blanks are ignored."""
+        monkeypatch.setenv("V2T_WORKERS", " studio.lan:7070, ,render.lan:7071,")
+        import config
+        importlib.reload(config)
+        assert config.WORKERS == ["studio.lan:7070", "render.lan:7071"]
+
+
+class TestInstanceConfig:
+    """Tests for the single-instance configuration."""
+
+    def test_instance_dir_defaults_to_v2t_home(self, monkeypatch):
+        """The lock and control socket live in ~/.v2t unless V2T_INSTANCE_DIR says otherwise."""
+        monkeypatch.delenv("V2T_INSTANCE_DIR", raising=False)
+        import config
+        importlib.reload(config)
+        assert config.INSTANCE_DIR == os.path.expanduser("~/.v2t")
+
+        monkeypatch.setenv("V2T_INSTANCE_DIR", "~/v2t-test")
+        importlib.reload(config)
+        assert config.INSTANCE_DIR == os.path.expanduser("~/v2t-test")
@@ -0,0 +1,289 @@
+"""Unit tests for daemon.py - the shared transcription daemon and its client."""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def socket_path():
+    # AF_UNIX paths are limited to ~100 bytes, so stay out of pytest's long tmp paths.
+    directory = tempfile.mkdtemp(prefix="v2t-")
+    yield os.path.join(directory, "daemon.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def running(socket_path, fake_transcriber):
+    from daemon import TranscriptionDaemon
+
+    transcriber = fake_transcriber()
+    server = TranscriptionDaemon(transcriber, socket_path).start()
+    yield server, transcriber
+    server.stop()
+
+
+class TestDaemonRoundTrip:
+    """Tests for transcribing through the daemon."""
+
+    def test_float32_audio_round_trip(self, running, socket_path):
+        """Test that float32 audio reaches the model and the text and timings come back."""
+        from daemon import DaemonTranscriber
+
+        server, transcriber = running
+        client = DaemonTranscriber(socket_path)
+        text = client.transcribe(np.zeros(16000, dtype=np.float32), peak=0.5, normalize=False)
+
+        assert text == "hello"
+        assert transcriber.calls == [(np.dtype(np.float32), 16000, 0.5, False, True)]
+        start, end = client.last_timings["decode"]
+        assert end - start == pytest.approx(0.25)
+        assert client.last_timings["preprocess"][1] == pytest.approx(start)
+        assert server.requests == 1
+        client.close()
+
+    def test_int16_audio_and_missing_peak(self, running, socket_path):
+        """Test that int16 is sent as-is and an unknown peak stays None."""
+        from daemon import DaemonTranscriber
+
+        _, transcriber = running
+        client = DaemonTranscriber(socket_path)
+        client.transcribe(np.zeros(800, dtype=np.int16))
+        client.transcribe(np.zeros(10, dtype=np.float64))
+
+        assert transcriber.calls[0][:4] == (np.dtype(np.int16), 800, None, True)
+        assert transcriber.calls[1][:2] == (np.dtype(np.float32), 10)
+        client.close()
+
+    def test_empty_audio_is_not_sent(self, running, socket_path):
+        """Test that empty audio returns "" without a request."""
+        from daemon import DaemonTranscriber
+
+        server, _ = running
+        assert DaemonTranscriber(socket_path).transcribe(np.zeros(0, dtype=np.float32)) == ""
+        assert server.requests == 0
+
+    def test_info(self, running, socket_path):
+        """Test that the client reports the daemon's model and thread count."""
+        from daemon import DaemonTranscriber
+
+        client = DaemonTranscriber(socket_path)
+
+        assert client.get_model_name() == "small.en"
+        assert client.get_active_model_name() == "base.en"
+        assert client.get_thread_count() == 4
+        assert client._daemon_info()["pending"] == 0
+        client.close()
+
+    def test_clients_share_one_model_serially(self, socket_path, fake_transcriber):
+        """Test that concurrent clients are all answered and never decode at the same time."""
+        from daemon import DaemonTranscriber, TranscriptionDaemon
+
+        transcriber = fake_transcriber(delay=0.02)
+        server = TranscriptionDaemon(transcriber, socket_path).start()
+        results = []
+
+        def client():
+            results.append(DaemonTranscriber(socket_path).transcribe(np.zeros(1600, dtype=np.float32)))
+
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.stop()
+
+        assert results == ["hello"] * 4
+        assert not transcriber.overlapped
+
+
+class TestFlacPayload:
+    """Tests for the FLAC-compressed sample format."""
+
+    def test_quiet_float_audio_keeps_its_resolution(self):
+        """Test that quiet float audio is quantized relative to its peak and restored to scale."""
+        from daemon import decode_flac, encode_flac
+
+        t = np.arange(16000, dtype=np.float32) / 16000
+        audio = (0.01 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        decoded = decode_flac(encode_flac(audio))
+
+        assert decoded.dtype == np.float32
+        assert np.max(np.abs(decoded - audio)) < 0.01 / 30000
+
+    def test_int16_audio_is_lossless_and_smaller(self):
+        """Test that int16 audio round-trips exactly and compresses."""
+        from daemon import decode_flac, encode_flac
+
+        rng = np.random.default_rng(0)
+        # Low-passed noise, roughly as compressible as speech.
+        audio = np.convolve(rng.normal(0, 3000, 16000), np.ones(8) / 8, mode="same").astype(np.int16)
+        payload = encode_flac(audio)
+        decoded = decode_flac(payload)
+
+        assert np.array_equal(np.rint(decoded * 32768).astype(np.int16), audio)
+        assert len(payload) < audio.nbytes * 0.8
+
+    def test_compressing_client(self, running, socket_path):
+        """Test that compress=True sends FLAC and the model still gets float32 audio."""
+        from daemon import DaemonTranscriber
+
+        _, transcriber = running
+        client = DaemonTranscriber(socket_path, compress=True)
+        assert client.transcribe(np.full(1600, 0.25, dtype=np.float32), peak=0.25) == "hello"
+        client.close()
+
+        assert transcriber.calls == [(np.float32, 1600, 0.25, True, True)]
+
+    def test_bad_flac_payload_is_an_error(self, running):
+        """Test that an undecodable FLAC payload is answered with an error."""
+        from daemon import DTYPE_FLAC, OP_TRANSCRIBE, ProtocolError
+
+        server, _ = running
+        with pytest.raises(ProtocolError):
+            server.handle(OP_TRANSCRIBE, DTYPE_FLAC, 0, float("nan"), bytearray(b"\0\0\0\0garbage"))
+
+
+class TestDaemonFailures:
+    """Tests for unavailable daemons and bad requests."""
+
+    def test_unavailable_daemon_returns_empty_text(self, socket_path):
+        """Test that the client logs and returns "" when no daemon is listening."""
+        from daemon import DaemonTranscriber
+
+        client = DaemonTranscriber(socket_path)
+
+        assert client.transcribe(np.zeros(160, dtype=np.float32)) == ""
+        assert client.get_model_name() == f"daemon:{socket_path}"
+
+    def test_client_reconnects_after_daemon_restart(self, socket_path, fake_transcriber):
+        """Test that a kept-open connection to a restarted daemon is replaced."""
+        from daemon import DaemonTranscriber, TranscriptionDaemon
+
+        client = DaemonTranscriber(socket_path)
+        server = TranscriptionDaemon(fake_transcriber("one"), socket_path).start()
+        assert client.transcribe(np.zeros(160, dtype=np.float32)) == "one"
+        server.stop()
+        server = TranscriptionDaemon(fake_transcriber("two"), socket_path).start()
+        try:
+            assert client.transcribe(np.zeros(160, dtype=np.float32)) == "two"
+        finally:
+            client.close()
+            server.stop()
+
+    def test_bad_header_gets_an_error_and_is_disconnected(self, running, socket_path):
+        """Test that a request with the wrong magic is answered with an error and closed."""
+        from daemon import REQUEST, RESPONSE, STATUS_ERROR, recv_exact
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(REQUEST.pack(b"NOPE", 1, 1, 1, 0, 0.0, 0))
+            status, _, _, length = RESPONSE.unpack(recv_exact(sock, RESPONSE.size))
+            message = bytes(recv_exact(sock, length))
+            assert sock.recv(1) == b""
+
+        assert status == STATUS_ERROR
+        assert b"unsupported protocol" in message
+
+    def test_unknown_op_keeps_the_connection(self, running, socket_path):
+        """Test that a well-framed request with an unknown op gets an error but the connection stays usable."""
+        from daemon import MAGIC, OP_INFO, REQUEST, RESPONSE, STATUS_ERROR, STATUS_OK, VERSION, recv_exact
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(REQUEST.pack(MAGIC, VERSION, 99, 0, 0, 0.0, 0))
+            status, _, _, length = RESPONSE.unpack(recv_exact(sock, RESPONSE.size))
+            recv_exact(sock, length)
+            assert status == STATUS_ERROR
+            sock.sendall(REQUEST.pack(MAGIC, VERSION, OP_INFO, 0, 0, 0.0, 0))
+            status, _, _, _ = RESPONSE.unpack(recv_exact(sock, RESPONSE.size))
+            assert status == STATUS_OK
+
+
+class TestDaemonSocket:
+    """Tests for the socket file."""
+
+    def test_socket_is_owner_only_and_removed_on_stop(self, socket_path, fake_transcriber):
+        """Test that the socket is created 0600 and unlinked on stop."""
+        from daemon import TranscriptionDaemon
+
+        server = TranscriptionDaemon(fake_transcriber(), socket_path).start()
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        server.stop()
+
+        assert not os.path.exists(socket_path)
+
+    def test_socket_is_private_before_it_listens(self, tmp_path, monkeypatch, fake_transcriber):
+        """Test that the socket is made 0600 before it accepts connections, without touching the umask."""
+        from daemon import TranscriptionDaemon
+
+        real_chmod = os.chmod
+        refused = []
+
+        def chmod(path, mode):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except ConnectionRefusedError:
+                    refused.append(path)
+            real_chmod(path, mode)
+
+        def umask(mask):
+            raise AssertionError("the umask is process-wide")
+
+        monkeypatch.setattr(os, "chmod", chmod)
+        monkeypatch.setattr(os, "umask", umask)
+        path = str(tmp_path / "run" / "daemon.sock")
+        server = TranscriptionDaemon(fake_transcriber(), path).start()
+        try:
+            assert refused == [path]
+            assert os.stat(path).st_mode & 0o777 == 0o600
+            assert os.stat(tmp_path / "run").st_mode & 0o777 == 0o700
+        finally:
+            server.stop()
+
+    def test_stale_socket_is_replaced_but_live_one_is_not(self, socket_path, fake_transcriber):
+        """Test that a dead daemon's socket file is removed and a live daemon is detected."""
+        from daemon import TranscriptionDaemon
+
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+        server = TranscriptionDaemon(fake_transcriber(), socket_path).start()
+        try:
+            with pytest.raises(RuntimeError):
+                TranscriptionDaemon(fake_transcriber(), socket_path)
+        finally:
+            server.stop()
+
+    def test_serve_stops_on_shutdown(self, socket_path, monkeypatch, fake_transcriber):
+        """Test that serve() runs until shutdown and cleans up its socket."""
+        import daemon
+        import events
+
+        loops = []
+        original = events.EventLoop
+
+        def make_loop():
+            loop = original()
+            loops.append(loop)
+            return loop
+
+        monkeypatch.setattr(events, "EventLoop", make_loop)
+        thread = threading.Thread(target=daemon.serve, args=(socket_path, fake_transcriber()))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not (loops and os.path.exists(socket_path)) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert daemon.DaemonTranscriber(socket_path).get_model_name() == "small.en"
+        loops[0].shutdown_event.set()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
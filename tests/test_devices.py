@@ -0,0 +1,131 @@
+"""Unit tests for devices.py - DeviceManager."""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from devices import DeviceManager
+
+
+def _backend(*infos):
+    backend = MagicMock()
+    backend.query_devices.side_effect = lambda *args, **kwargs: dict(infos[min(backend.query_devices.call_count - 1, len(infos) - 1)])
+    return backend
+
+
+BUILTIN = {'name': 'MacBook Pro Microphone', 'index': 0, 'default_samplerate': 48000.0}
+HEADSET = {'name': 'AirPods', 'index': 3, 'default_samplerate': 24000.0}
+
+
+class TestDeviceManager:
+    """Tests for the cached device view."""
+
+    def test_default_input_is_queried_once(self):
+        """Test that repeated lookups are served from the cache."""
+        backend = _backend(BUILTIN)
+        manager = DeviceManager(backend)
+
+        assert manager.default_input_name() == 'MacBook Pro Microphone'
+        assert manager.default_input()['index'] == 0
+        backend.query_devices.assert_called_once_with(kind='input')
+
+    def test_query_errors_are_reported_in_the_name(self):
+        """Test that a failing query gives an 'Unknown (error: ...)' name."""
+        backend = MagicMock()
+        backend.query_devices.side_effect = Exception('No device')
+        manager = DeviceManager(backend)
+
+        assert manager.default_input() is None
+        assert manager.default_input_name() == 'Unknown (error: No device)'
+
+    def test_refresh_reinitializes_and_detects_change(self):
+        """Test that refresh() re-enumerates and returns the old and new device."""
+        backend = _backend(BUILTIN, HEADSET)
+        manager = DeviceManager(backend)
+        manager.default_input()
+
+        change = manager.refresh()
+
+        backend._terminate.assert_called_once()
+        backend._initialize.assert_called_once()
+        assert change == (BUILTIN, HEADSET)
+        assert manager.default_input_name() == 'AirPods'
+
+    def test_refresh_without_change_returns_none(self):
+        """Test that an unchanged default device is not reported."""
+        manager = DeviceManager(_backend(BUILTIN))
+        manager.default_input()
+
+        assert manager.refresh() is None
+
+    def test_device_list_is_cached_until_refresh(self):
+        """Test that devices() enumerates once per refresh."""
+        backend = MagicMock()
+        backend.query_devices.return_value = [BUILTIN]
+        manager = DeviceManager(backend)
+
+        manager.devices()
+        manager.devices()
+        assert backend.query_devices.call_count == 1
+
+        manager.refresh()
+        manager.devices()
+        assert backend.query_devices.call_count == 3
+
+    def test_background_thread_runs_ticks_when_woken(self):
+        """Test that start() runs on_tick on a thread and wake() triggers it early."""
+        manager = DeviceManager(MagicMock(), poll_interval=60)
+        ticked = threading.Event()
+
+        manager.start(ticked.set)
+        manager.wake()
+
+        try:
+            assert ticked.wait(2.0)
+        finally:
+            manager.stop()
+
+    def test_tick_return_value_schedules_the_next_tick(self):
+        """Test that on_tick returning a delay re-runs it, and None sleeps until woken."""
+        manager = DeviceManager(MagicMock())
+        ticks = []
+        done = threading.Event()
+
+        def tick():
+            ticks.append(1)
+            if len(ticks) == 3:
+                done.set()
+                return None
+            return 0.01
+
+        manager.start(tick)
+        manager.wake()
+        try:
+            assert done.wait(2.0)
+            threading.Event().wait(0.05)
+            assert len(ticks) == 3
+        finally:
+            manager.stop()
+
+    def test_zero_poll_interval_disables_periodic_refresh(self):
+        """Test that re-enumeration is never due without a poll interval."""
+        manager = DeviceManager(MagicMock(), poll_interval=0)
+
+        assert manager.poll_due() is None
+        assert DeviceManager(MagicMock(), poll_interval=60).poll_due() > 59
+
+    def test_queries_hold_the_portaudio_lock(self):
+        """Test that device queries wait while another thread holds PORTAUDIO_LOCK."""
+        from devices import PORTAUDIO_LOCK
+
+        manager = DeviceManager(_backend(BUILTIN))
+        result = []
+        with PORTAUDIO_LOCK:
+            thread = threading.Thread(target=lambda: result.append(manager.default_input_name()))
+            thread.start()
+            thread.join(0.1)
+            assert result == []
+        thread.join(2.0)
+
+        assert result == ['MacBook Pro Microphone']
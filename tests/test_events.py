@@ -0,0 +1,116 @@
+"""Unit tests for events.py - the self-pipe event loop."""
+
+import os
+import signal
+import threading
+import time
+
+
+class TestEventLoop:
+    """Tests for EventLoop."""
+
+    def test_dispatch_runs_handlers_for_posted_events(self):
+        """Test that posted events reach their handlers in order on dispatch()."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        seen = []
+        loop.on("done", seen.append)
+        loop.on("done", lambda value: seen.append(value * 10))
+        loop.post("done", 1)
+        loop.post("unhandled")
+        loop.post("done", 2)
+
+        assert loop.dispatch() is True
+        assert seen == [1, 10, 2, 20]
+        assert loop.stats()["events"] == 3
+
+    def test_handler_errors_are_logged_not_raised(self):
+        """Test that a failing handler does not stop later events."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        seen = []
+        loop.on("x", lambda value: 1 / value)
+        loop.on("y", seen.append)
+        loop.post("x", 0)
+        loop.post("y", "ok")
+        loop.dispatch()
+
+        assert seen == ["ok"]
+
+    def test_run_sleeps_until_woken_and_exits_on_shutdown(self):
+        """Test that an idle loop does not wake, and shutdown from another thread is noticed right away."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        seen = []
+        loop.on("work", seen.append)
+        thread = threading.Thread(target=loop.run)
+        thread.start()
+        time.sleep(0.2)
+        assert loop.wakeups == 0
+
+        loop.post("work", "a")
+        loop.shutdown_event.set()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert seen == ["a"]
+        assert loop.idle_wakeups == 0
+        assert 0 <= loop.shutdown_latency < 1.0
+
+    def test_run_returns_if_shutdown_was_already_requested(self):
+        """Test that run() returns immediately when shutdown came first."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        loop.shutdown_event.set()
+        loop.run()
+
+        assert loop.shutdown_event.is_set()
+        assert loop.stats()["shutdown_latency_ms"] is not None
+
+    def test_signals_wake_the_loop(self):
+        """Test that a signal wakes a loop blocked in select() and its handler can stop it."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        previous_handler = signal.signal(signal.SIGUSR1, lambda signum, frame: loop.shutdown_event.set())
+        previous_wakeup = loop.install_signal_wakeup()
+        timer = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGUSR1))
+        try:
+            timer.start()
+            loop.run()
+        finally:
+            timer.join()
+            loop.restore_signal_wakeup(previous_wakeup)
+            signal.signal(signal.SIGUSR1, previous_handler)
+
+        assert loop.shutdown_event.is_set()
+        assert loop.signals == 1
+
+    def test_signal_wakeup_needs_the_main_thread(self):
+        """Test that installing the signal wakeup off the main thread is a no-op."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(loop.install_signal_wakeup()))
+        thread.start()
+        thread.join()
+
+        assert results == [None]
+
+    def test_many_wakeups_do_not_block_posting(self):
+        """Test that posting never blocks even when nobody drains the pipe."""
+        from events import EventLoop
+
+        loop = EventLoop()
+        for i in range(100000):
+            loop.post("tick", i)
+        seen = []
+        loop.on("tick", seen.append)
+        loop.dispatch()
+
+        assert len(seen) == 100000
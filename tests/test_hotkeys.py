@@ -0,0 +1,74 @@
+"""Unit tests for hotkeys.py - keyboard listener to controller thread dispatch."""
+
+import threading
+
+
+class TestHotkeyDispatcher:
+    """Tests for HotkeyDispatcher."""
+
+    def test_events_are_handled_in_order_on_another_thread(self):
+        """Test that events reach the handler in order, with timestamps, off the calling thread."""
+        from hotkeys import HotkeyDispatcher
+
+        handled = []
+        dispatcher = HotkeyDispatcher(lambda kind, key, t: handled.append((kind, key, t, threading.get_ident())))
+        dispatcher.start()
+        for key in "abc":
+            dispatcher.press(key)
+            dispatcher.release(key)
+        dispatcher.stop()
+
+        assert [(kind, key) for kind, key, _, _ in handled] == [
+            ("press", "a"), ("release", "a"), ("press", "b"), ("release", "b"), ("press", "c"), ("release", "c"),
+        ]
+        timestamps = [t for _, _, t, _ in handled]
+        assert timestamps == sorted(timestamps)
+        assert all(thread != threading.get_ident() for _, _, _, thread in handled)
+
+    def test_commands_are_queued_with_key_events(self):
+        """Test that command() events are handled in order with key events but not counted as callbacks."""
+        from hotkeys import HotkeyDispatcher
+
+        handled = []
+        dispatcher = HotkeyDispatcher(lambda kind, key, t: handled.append((kind, key)))
+        dispatcher.press("a")
+        dispatcher.command("toggle")
+        dispatcher.command("mode", "toggle")
+        dispatcher.start()
+        dispatcher.stop()
+
+        assert handled == [("press", "a"), ("toggle", None), ("mode", "toggle")]
+        assert dispatcher.summary()["events"] == 1
+
+    def test_handler_errors_do_not_stop_the_controller(self):
+        """Test that an exception in the handler is logged and later events are still handled."""
+        from hotkeys import HotkeyDispatcher
+
+        handled = []
+
+        def handler(kind, key, timestamp):
+            if key == "bad":
+                raise RuntimeError("boom")
+            handled.append(key)
+
+        dispatcher = HotkeyDispatcher(handler).start()
+        dispatcher.press("bad")
+        dispatcher.press("good")
+        dispatcher.stop()
+
+        assert handled == ["good"]
+
+    def test_callback_times_are_measured(self):
+        """Test that time in the listener callbacks is observed and summarized."""
+        from hotkeys import HotkeyDispatcher
+
+        observed = []
+        dispatcher = HotkeyDispatcher(lambda *event: None)
+        dispatcher.callback_time = type("Sink", (), {"observe": lambda self, s: observed.append(s)})()
+        dispatcher.press("a")
+        dispatcher.release("a")
+
+        summary = dispatcher.summary()
+        assert len(observed) == 2
+        assert summary["events"] == 2
+        assert 0 <= summary["callback_mean_us"] <= summary["callback_max_us"]
@@ -0,0 +1,386 @@
+"""Unit tests for http_server.py - the HTTP transcription endpoint."""
+
+import http.client
+import io
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+
+def wav_bytes(seconds=0.5, samplerate=16000, channels=1):
+    import soundfile as sf
+
+    audio = np.zeros((int(seconds * samplerate), channels), dtype=np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, samplerate, format="WAV")
+    return buffer.getvalue()
+
+
+def multipart(fields, files, boundary="v2t-boundary"):
+    body = b""
+    for name, value in fields.items():
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for name, (filename, data) in files.items():
+        body += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: audio/wav\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return body + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def post(server, body, content_type, headers=None, path="/v1/audio/transcriptions"):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    try:
+        connection.request("POST", path, body=body, headers={"Content-Type": content_type, **(headers or {})})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def running(fake_transcriber):
+    from http_server import TranscriptionHTTPServer
+
+    transcriber = fake_transcriber()
+    server = TranscriptionHTTPServer(transcriber, "0").start()
+    yield server, transcriber
+    server.stop()
+
+
+class TestParseMultipart:
+    """Tests for the streaming multipart parser."""
+
+    def test_fields_and_file(self):
+        """Test that form fields and a file part are separated, across small reads."""
+        from http_server import parse_multipart
+
+        data = bytes(range(256)) * 300
+        body, _ = multipart({"response_format": "text"}, {"file": ("a.wav", data)})
+        stream = io.BytesIO(body)
+        # Reads of 7 bytes split the boundary at every possible offset.
+        fields, files = parse_multipart(lambda n: stream.read(min(n, 7)), "v2t-boundary", len(body))
+
+        assert fields == {"response_format": "text"}
+        filename, content_type, file = files["file"]
+        assert (filename, content_type) == ("a.wav", "audio/wav")
+        assert file.read() == data
+
+    def test_truncated_body_is_rejected(self):
+        """Test that a body cut off before the closing boundary is a 400."""
+        from http_server import RequestError, parse_multipart
+
+        body, _ = multipart({}, {"file": ("a.wav", b"x" * 1000)})
+        body = body[:500]
+        with pytest.raises(RequestError) as error:
+            parse_multipart(io.BytesIO(body).read, "v2t-boundary", len(body))
+        assert error.value.status == 400
+
+    def test_oversized_field_is_rejected(self):
+        """Test that a non-file field over the size limit is a 413."""
+        from http_server import RequestError, parse_multipart
+
+        body, _ = multipart({"prompt": "x" * 200}, {})
+        with pytest.raises(RequestError) as error:
+            parse_multipart(io.BytesIO(body).read, "v2t-boundary", len(body), max_field_bytes=100)
+        assert error.value.status == 413
+
+
+    def test_only_requested_files_are_kept_and_the_epilogue_is_consumed(self):
+        """Test that other file parts are skipped and the body is read to the end."""
+        from http_server import parse_multipart
+
+        body, _ = multipart({}, {"extra": ("b.wav", b"y" * 1000), "file": ("a.wav", b"x" * 1000)})
+        body += b"epilogue that is not part of the next request"
+        stream = io.BytesIO(body + b"NEXT")
+        fields, files = parse_multipart(
+            lambda n: stream.read(min(n, 7)), "v2t-boundary", len(body), file_names=("file",),
+        )
+
+        assert list(files) == ["file"]
+        assert files["file"][2].read() == b"x" * 1000
+        assert stream.read() == b"NEXT"
+
+
+class TestFairScheduler:
+    """Tests for round-robin slot scheduling."""
+
+    def test_waiting_clients_take_turns(self):
+        """Test that a client with many queued requests does not starve another."""
+        from http_server import FairScheduler
+
+        scheduler = FairScheduler(1)
+        assert scheduler.acquire("busy")
+        order = []
+        threads = []
+
+        def wait(client):
+            scheduler.acquire(client)
+            order.append(client)
+            scheduler.release()
+
+        for client in ("busy", "busy", "busy", "quiet"):
+            thread = threading.Thread(target=wait, args=(client,))
+            thread.start()
+            threads.append(thread)
+            while scheduler.waiting < len(threads):
+                time.sleep(0.001)
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+
+        assert order == ["busy", "quiet", "busy", "busy"]
+
+    def test_acquire_times_out(self):
+        """Test that acquire gives up after the timeout and leaves the queue."""
+        from http_server import FairScheduler
+
+        scheduler = FairScheduler(1)
+        scheduler.acquire("a")
+        assert not scheduler.acquire("b", timeout=0.01)
+        assert scheduler.waiting == 0
+
+
+class TestClientKey:
+    """Tests for telling local clients apart."""
+
+    def test_header_then_api_key_then_agent(self):
+        """Test that X-Client-ID wins, then the bearer key, then peer address plus User-Agent."""
+        from http_server import client_key
+
+        assert client_key({"X-Client-ID": "notes", "Authorization": "Bearer sk-1"}, "127.0.0.1") == "notes"
+        first = client_key({"Authorization": "Bearer sk-1"}, "127.0.0.1")
+        second = client_key({"Authorization": "Bearer sk-2"}, "127.0.0.1")
+        assert first.startswith("key:") and first != second
+        assert "sk-1" not in first
+        assert client_key({"User-Agent": "curl/8.5"}, "127.0.0.1") == "127.0.0.1 curl/8.5"
+        assert client_key({}, "127.0.0.1") == "127.0.0.1"
+
+
+class TestModelLock:
+    """Tests for the model lock shared by dictation and HTTP requests."""
+
+    def test_dictation_goes_ahead_of_waiting_requests(self):
+        """Test that a plain acquire waiting behind a decode is served before background() waiters."""
+        from http_server import ModelLock
+
+        lock = ModelLock()
+        order = []
+
+        def background():
+            with lock.background():
+                order.append("http")
+
+        def dictation():
+            with lock:
+                order.append("dictation")
+
+        lock.acquire()
+        waiting = threading.Thread(target=background)
+        waiting.start()
+        time.sleep(0.05)
+        urgent = threading.Thread(target=dictation)
+        urgent.start()
+        while not lock._urgent:
+            time.sleep(0.001)
+        lock.release()
+        for thread in (waiting, urgent):
+            thread.join(5)
+
+        assert order == ["dictation", "http"]
+        assert not lock.locked()
+
+
+class TestTranscriptionEndpoint:
+    """Tests for POST /v1/audio/transcriptions."""
+
+    def test_multipart_upload_returns_json_and_timings(self, running):
+        """Test that an uploaded WAV is transcribed and the response carries Server-Timing."""
+        server, transcriber = running
+        body, content_type = multipart({"model": "whisper-1"}, {"file": ("a.wav", wav_bytes())})
+        status, headers, payload = post(server, body, content_type)
+
+        assert status == 200
+        assert json.loads(payload) == {"text": "hello"}
+        assert len(transcriber.audio[0]) == 8000
+        timing = headers["Server-Timing"]
+        for name in ("upload", "queue", "audio", "preprocess", "decode", "total"):
+            assert f"{name};dur=" in timing
+        assert "decode;dur=250.00" in timing
+        assert server.requests == 1
+
+    def test_audio_is_resampled_to_mono_16k(self, running):
+        """Test that stereo 48 kHz uploads reach the model as 16 kHz mono."""
+        server, transcriber = running
+        body, content_type = multipart({}, {"file": ("a.wav", wav_bytes(1.0, 48000, channels=2))})
+        status, _, _ = post(server, body, content_type)
+
+        assert status == 200
+        assert transcriber.audio[0].ndim == 1
+        assert abs(len(transcriber.audio[0]) - 16000) <= 2
+
+    def test_text_and_verbose_formats(self, running):
+        """Test the text and verbose_json response formats."""
+        server, _ = running
+        body, content_type = multipart({"response_format": "text"}, {"file": ("a.wav", wav_bytes())})
+        status, headers, payload = post(server, body, content_type)
+        assert status == 200
+        assert headers["Content-Type"].startswith("text/plain")
+        assert payload == b"hello\n"
+
+        body, content_type = multipart({"response_format": "verbose_json"}, {"file": ("a.wav", wav_bytes())})
+        result = json.loads(post(server, body, content_type)[2])
+        assert result["duration"] == 0.5
+        assert result["model"] == "base.en"
+        assert "decode" in result["timings_ms"]
+
+    def test_raw_audio_body(self, running):
+        """Test that a bare audio body is accepted without multipart."""
+        server, _ = running
+        status, _, payload = post(server, wav_bytes(), "audio/wav")
+        assert status == 200
+        assert json.loads(payload) == {"text": "hello"}
+
+    def test_bad_requests(self, running):
+        """Test the error statuses for missing files, bad audio, bad formats and unknown paths."""
+        server, transcriber = running
+        body, content_type = multipart({"model": "whisper-1"}, {})
+        assert post(server, body, content_type)[0] == 400
+
+        body, content_type = multipart({}, {"file": ("a.wav", b"not audio")})
+        status, _, payload = post(server, body, content_type)
+        assert status == 400
+        assert "could not decode audio" in json.loads(payload)["error"]["message"]
+
+        body, content_type = multipart({"response_format": "srt"}, {"file": ("a.wav", wav_bytes())})
+        assert post(server, body, content_type)[0] == 400
+
+        assert post(server, b"", "audio/wav", path="/v1/other")[0] == 404
+        assert transcriber.audio == []
+
+    def test_invalid_content_length_is_a_bad_request(self, running):
+        """Test that a non-numeric Content-Length is a 400, not a server error."""
+        server, _ = running
+        connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        try:
+            connection.putrequest("POST", "/v1/audio/transcriptions")
+            connection.putheader("Content-Type", "audio/wav")
+            connection.putheader("Content-Length", "lots")
+            connection.endheaders()
+            assert connection.getresponse().status == 400
+        finally:
+            connection.close()
+
+    def test_keep_alive_request_after_an_epilogue(self, running):
+        """Test that bytes after the closing boundary are not read as the next request."""
+        server, transcriber = running
+        body, content_type = multipart({}, {"file": ("a.wav", wav_bytes())})
+        # Longer than one read, so it is still on the socket when the closing boundary is found.
+        body += b"GET / HTTP/1.1\r\n\r\n" * 10000
+        connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        try:
+            for _ in range(2):
+                connection.request("POST", "/v1/audio/transcriptions", body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                assert response.status == 200
+                assert json.loads(response.read()) == {"text": "hello"}
+        finally:
+            connection.close()
+        assert len(transcriber.audio) == 2
+
+    def test_upload_over_limit_is_rejected(self, fake_transcriber):
+        """Test that a Content-Length over max_bytes is a 413 without reading the body."""
+        from http_server import TranscriptionHTTPServer
+
+        server = TranscriptionHTTPServer(fake_transcriber(), "0", max_bytes=1000).start()
+        try:
+            status, _, _ = post(server, wav_bytes(), "audio/wav")
+        finally:
+            server.stop()
+        assert status == 413
+
+    def test_full_queue_returns_503(self, fake_transcriber):
+        """Test that requests beyond concurrency + queue_size are turned away with Retry-After."""
+        from http_server import TranscriptionHTTPServer
+
+        transcriber = fake_transcriber(delay=0.3)
+        server = TranscriptionHTTPServer(transcriber, "0", concurrency=1, queue_size=1).start()
+        body, content_type = multipart({}, {"file": ("a.wav", wav_bytes())})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(post(server, body, content_type))) for _ in range(2)]
+        try:
+            for thread in threads:
+                thread.start()
+            while server._in_flight < 2:
+                time.sleep(0.001)
+            status, headers, _ = post(server, body, content_type)
+            for thread in threads:
+                thread.join(5)
+        finally:
+            server.stop()
+
+        assert status == 503
+        assert headers["Retry-After"] == "1"
+        assert sorted(result[0] for result in results) == [200, 200]
+        assert server.rejected == 1
+
+    def test_shares_the_model_lock(self, fake_transcriber):
+        """Test that requests wait for a lock held by the model's other users."""
+        import re
+
+        from http_server import TranscriptionHTTPServer
+
+        lock = threading.Lock()
+        server = TranscriptionHTTPServer(fake_transcriber(), "0", lock=lock).start()
+        body, content_type = multipart({}, {"file": ("a.wav", wav_bytes())})
+        lock.acquire()
+        threading.Timer(0.1, lock.release).start()
+        try:
+            status, headers, _ = post(server, body, content_type)
+        finally:
+            server.stop()
+
+        assert status == 200
+        waited = float(re.search(r"model_wait;dur=([\d.]+)", headers["Server-Timing"]).group(1))
+        assert waited >= 50
+
+    def test_requests_wait_behind_dictation(self, fake_transcriber):
+        """Test that with a ModelLock, dictation queued during a request's decode goes first."""
+        from http_server import ModelLock, TranscriptionHTTPServer
+
+        order = []
+
+        class Transcriber(fake_transcriber):
+            def transcribe(self, audio_data, peak=None, normalize=True):
+                order.append("http")
+                return super().transcribe(audio_data, peak, normalize)
+
+        lock = ModelLock()
+        server = TranscriptionHTTPServer(Transcriber(delay=0.2), "0", lock=lock, concurrency=2).start()
+        body, content_type = multipart({}, {"file": ("a.wav", wav_bytes())})
+
+        def request(client):
+            post(server, body, content_type, headers={"X-Client-ID": client})
+
+        def dictation():
+            with lock:
+                order.append("dictation")
+
+        threads = [threading.Thread(target=request, args=(client,)) for client in ("a", "b")]
+        try:
+            threads[0].start()
+            while not lock.locked():
+                time.sleep(0.001)
+            threads[1].start()
+            time.sleep(0.05)
+            threads.append(threading.Thread(target=dictation))
+            threads[-1].start()
+            for thread in threads:
+                thread.join(5)
+        finally:
+            server.stop()
+
+        assert order == ["http", "dictation", "http"]
@@ -0,0 +1,152 @@
+"""Unit tests for instance.py - the single-instance lock and control socket."""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def directory():
+    # AF_UNIX paths are limited to ~100 bytes, so stay out of pytest's long tmp paths.
+    path = tempfile.mkdtemp(prefix="v2t-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class TestInstanceLock:
+    """Tests for the flock-based instance lock."""
+
+    def test_second_lock_fails_until_the_first_is_released(self, directory):
+        """Test that only one holder at a time gets the lock."""
+        from instance import InstanceLock
+
+        first, second = InstanceLock(directory), InstanceLock(directory)
+        assert first.acquire()
+        assert not second.acquire()
+        with open(first.path) as f:
+            assert f.read() == f"{os.getpid()}\n"
+        first.release()
+        assert second.acquire()
+        second.release()
+
+    def test_lock_is_released_when_the_holder_dies(self, directory):
+        """Test that a killed holder leaves no stale lock behind."""
+        from instance import InstanceLock
+
+        code = f"import sys, time; sys.path.insert(0, {os.getcwd()!r}); from instance import InstanceLock; "
+        code += f"assert InstanceLock({directory!r}).acquire(); print('locked', flush=True); time.sleep(60)"
+        holder = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE)
+        try:
+            assert holder.stdout.readline() == b"locked\n"
+            assert not InstanceLock(directory).acquire()
+        finally:
+            holder.kill()
+            holder.wait()
+        lock = InstanceLock(directory)
+        assert lock.acquire()
+        lock.release()
+
+
+class TestControlServer:
+    """Tests for commands sent to the running instance."""
+
+    def test_command_round_trip(self, directory):
+        """Test that send() reaches the handler and returns its reply."""
+        from instance import ControlServer, send
+
+        calls = []
+
+        def handler(command, args):
+            calls.append((command, args))
+            return {"mode": "toggle"}
+
+        path = os.path.join(directory, "instance.sock")
+        server = ControlServer(path, handler).start()
+        try:
+            assert send(path, "status") == {"mode": "toggle", "ok": True}
+            assert send(path, "config", {"env": {"V2T_MODE": "toggle"}})["ok"]
+        finally:
+            server.stop()
+
+        assert calls == [("status", {}), ("config", {"env": {"V2T_MODE": "toggle"}})]
+        assert not os.path.exists(path)
+
+    def test_errors_and_startup_are_reported(self, directory):
+        """Test that handler errors and commands before the app is ready come back as errors."""
+        from instance import ControlServer, send
+
+        def handler(command, args):
+            raise ValueError(f"unknown command {command!r}")
+
+        path = os.path.join(directory, "instance.sock")
+        server = ControlServer(path).start()
+        try:
+            assert send(path, "status") == {"ok": False, "error": "still starting"}
+            server.handler = handler
+            assert send(path, "dance") == {"ok": False, "error": "unknown command 'dance'"}
+        finally:
+            server.stop()
+
+    def test_old_socket_file_is_replaced(self, directory):
+        """Test that the lock holder replaces a socket file left by a crashed instance."""
+        from instance import ControlServer, send
+
+        path = os.path.join(directory, "instance.sock")
+        open(path, "w").close()
+        server = ControlServer(path, lambda command, args: {}).start()
+        try:
+            assert send(path, "status")["ok"]
+        finally:
+            server.stop()
+
+    def test_socket_is_private_before_it_listens(self, directory, monkeypatch):
+        """Test that the control socket is 0600 before it accepts connections and the umask is left alone."""
+        from instance import ControlServer
+
+        real_chmod = os.chmod
+        refused = []
+
+        def chmod(path, mode):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except ConnectionRefusedError:
+                    refused.append(mode)
+            real_chmod(path, mode)
+
+        def umask(mask):
+            raise AssertionError("the umask is process-wide")
+
+        monkeypatch.setattr(os, "chmod", chmod)
+        monkeypatch.setattr(os, "umask", umask)
+        path = os.path.join(directory, "instance.sock")
+        server = ControlServer(path).start()
+        try:
+            assert refused == [0o600]
+            assert os.stat(path).st_mode & 0o777 == 0o600
+        finally:
+            server.stop()
+
+    def test_send_waits_for_the_socket_to_appear(self, directory):
+        """Test that a launch racing the first one's startup retries until the socket is up."""
+        from instance import ControlServer, send
+
+        path = os.path.join(directory, "instance.sock")
+        servers = []
+        timer = threading.Timer(0.1, lambda: servers.append(ControlServer(path, lambda c, a: {}).start()))
+        timer.start()
+        started = time.monotonic()
+        try:
+            assert send(path, "status")["ok"]
+            assert time.monotonic() - started >= 0.09
+        finally:
+            timer.join()
+            for server in servers:
+                server.stop()
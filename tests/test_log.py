@@ -0,0 +1,131 @@
+"""Unit tests for log.py - queued structured logging with rate limiting."""
+
+import json
+import logging
+import queue
+
+
+def make_record(message="Hello", level=logging.INFO, lineno=10, **fields):
+    record = logging.LogRecord("v2t.test", level, "test_log.py", lineno, message, None, None)
+    record.fields = fields
+    return record
+
+
+class TestStructuredFormatter:
+    """Tests for text and JSON output."""
+
+    def test_text_has_level_logger_and_fields(self):
+        """Test that text lines carry level, logger name and quoted fields."""
+        from log import StructuredFormatter
+
+        line = StructuredFormatter().format(make_record("Transcribed", text="hello world", rate=16000))
+
+        assert line.endswith('INFO    test: Transcribed text="hello world" rate=16000')
+
+    def test_json_lines(self):
+        """Test that JSON output is one object per line with the fields merged in."""
+        from log import StructuredFormatter
+
+        entry = json.loads(StructuredFormatter(json_lines=True).format(make_record("Loaded", model="base.en")))
+
+        assert entry["level"] == "info"
+        assert entry["logger"] == "v2t.test"
+        assert entry["message"] == "Loaded"
+        assert entry["model"] == "base.en"
+
+
+class TestRateLimitFilter:
+    """Tests for per-call-site rate limiting."""
+
+    def test_limits_per_call_site_and_reports_suppressed(self):
+        """Test that records past the limit are dropped and counted on the next window's first record."""
+        from log import RateLimitFilter
+
+        limiter = RateLimitFilter(limit=2, interval=60)
+        passed = [limiter.filter(make_record()) for _ in range(5)]
+        other_site = limiter.filter(make_record(lineno=11))
+
+        assert passed == [True, True, False, False, False]
+        assert other_site is True
+
+        limiter.interval = 0
+        record = make_record()
+        assert limiter.filter(record)
+        assert record.fields["suppressed"] == 3
+
+    def test_zero_limit_disables(self):
+        """Test that a limit of 0 lets everything through."""
+        from log import RateLimitFilter
+
+        limiter = RateLimitFilter(limit=0)
+
+        assert all(limiter.filter(make_record()) for _ in range(100))
+
+
+class TestQueueHandler:
+    """Tests for the non-blocking queue handler."""
+
+    def test_full_queue_drops_and_reports(self):
+        """Test that a full queue drops records and the next queued record reports how many."""
+        from log import _QueueHandler
+
+        handler = _QueueHandler(queue.Queue(1))
+        handler.handle(make_record("first"))
+        handler.handle(make_record("second"))
+        handler.handle(make_record("third"))
+        assert handler.dropped == 2
+
+        handler.queue.get_nowait()
+        handler.handle(make_record("fourth"))
+
+        record = handler.queue.get_nowait()
+        assert record.getMessage() == "fourth"
+        assert record.fields["dropped"] == 2
+        assert handler.dropped == 0
+
+
+class TestLogger:
+    """Tests for the app logger."""
+
+    def test_records_are_written_by_the_background_thread(self, capsys):
+        """Test that log calls reach stdout once flushed, tagged with the logger name."""
+        import log
+
+        log.get_logger("unit").info("Recording started", samplerate=48000)
+        log.flush()
+
+        assert "unit: Recording started samplerate=48000" in capsys.readouterr().out
+
+    def test_records_point_at_the_caller(self):
+        """Test that records carry the caller's location, which the rate limit keys on."""
+        import log
+
+        logger = log.get_logger("unit")
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger._logger.addHandler(handler)
+        try:
+            logger.warning("Careful")
+        finally:
+            logger._logger.removeHandler(handler)
+
+        assert records[0].pathname == __file__
+        assert records[0].funcName == "test_records_point_at_the_caller"
+
+    def test_set_level_silences_info(self, capsys):
+        """Test that set_level() raises the threshold for every app logger."""
+        import log
+
+        previous = logging.getLogger("v2t").level
+        log.set_level("WARNING")
+        try:
+            log.get_logger("unit").info("Hidden")
+            log.get_logger("unit").warning("Shown")
+            log.flush()
+        finally:
+            logging.getLogger("v2t").setLevel(previous)
+
+        output = capsys.readouterr().out
+        assert "Hidden" not in output
+        assert "unit: Shown" in output
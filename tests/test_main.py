@@ -4,7 +4,7 @@ import threading
 import signal
 import time
 import os
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, call
 import numpy as np
 import pytest
 
@@ -129,6 +129,27 @@ class TestVoiceToTextAppShutdown:
         shutdown_thread.join()
         mock_listener_instance.stop.assert_called_once()
 
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_run_reports_capture_probe(self, mock_injector, mock_transcriber, mock_recorder, capsys):
+        """Test that run() probes the capture profile and runs the device monitor."""
+        import log
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.recorder.probe_capture.return_value = "balanced: 480 frames (30.0 ms), float32"
+        app.shutdown_event.set()
+
+        with patch('main.keyboard.Listener'):
+            app.run()
+        log.flush()
+
+        app.recorder.probe_capture.assert_called_once()
+        assert 'Capture profile profile="balanced: 480 frames' in capsys.readouterr().out
+        app.recorder.start_device_monitor.assert_called_once()
+        app.recorder.stop_device_monitor.assert_called_once()
+
     @patch('main.AudioRecorder')
     @patch('main.AudioTranscriber')
     @patch('main.TextInjector')
@@ -567,9 +588,38 @@ class TestProcessAudio:
         audio_data = np.array([0.1, 0.2, 0.3])
         app._process_audio(audio_data)
 
-        app.transcriber.transcribe.assert_called_once_with(audio_data)
+        app.transcriber.transcribe.assert_called_once_with(audio_data, peak=None, normalize=True)
         app.injector.type_text.assert_called_once_with("hello world")
 
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_slow_utterance_dump_has_the_captured_audio(
+        self, mock_injector, mock_transcriber, mock_recorder, tmp_path
+    ):
+        """Test that the dumped audio is not the buffer the transcriber normalized in place."""
+        import soundfile as sf
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.traces.slo_ms = 0.001
+        app.traces.dump_dir = str(tmp_path)
+
+        def normalize_in_place(audio, peak=None, normalize=True):
+            audio *= 4
+            return "hello"
+
+        app.transcriber.transcribe.side_effect = normalize_in_place
+        app.transcriber.get_active_model_name.return_value = "small.en"
+        app.transcriber.get_thread_count.return_value = 4
+        app.transcriber.last_timings = {}
+        audio_data = np.full(1600, 0.1, dtype=np.float32)
+        app._process_audio(audio_data)
+
+        wav = next(path for path in tmp_path.iterdir() if path.suffix == ".wav")
+        dumped, _ = sf.read(wav, dtype="float32")
+        assert dumped.max() == pytest.approx(0.1, abs=1e-3)
+
     @patch('main.AudioRecorder')
     @patch('main.AudioTranscriber')
     @patch('main.TextInjector')
@@ -622,6 +672,44 @@ class TestProcessAudio:
             call_kwargs = mock_thread.call_args
             assert call_kwargs.kwargs.get('daemon') is True
 
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    @patch('main.play_stop_sound')
+    def test_recorded_peak_is_passed_to_worker(self, mock_play_stop, mock_injector, mock_transcriber, mock_recorder):
+        """Test that the peak tracked while recording is handed to the transcription worker."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.is_recording = True
+        audio_data = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+        app.recorder.stop.return_value = audio_data
+        app.recorder.last_stats.peak = 0.3
+        app.recorder.last_stats.gain_controlled = False
+
+        with patch('main.threading.Thread') as mock_thread:
+            app.stop_recording_and_transcribe()
+
+        assert mock_thread.call_args.kwargs['args'] == (audio_data, 0.3, True)
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    @patch('main.play_stop_sound')
+    def test_agc_audio_is_not_normalized_again(self, mock_play_stop, mock_injector, mock_transcriber, mock_recorder):
+        """Test that audio leveled by the recorder's AGC skips peak normalization."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.is_recording = True
+        app.recorder.stop.return_value = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+        app.recorder.last_stats.gain_controlled = True
+
+        with patch('main.threading.Thread') as mock_thread:
+            app.stop_recording_and_transcribe()
+
+        assert mock_thread.call_args.kwargs['args'][2] is False
+
 
 class TestSignalHandler:
     """Tests for signal handling (SIGINT/Ctrl+C)."""
@@ -678,3 +766,492 @@ class TestSignalHandler:
         finally:
             signal.signal(signal.SIGINT, original_handler)
             sigint_thread.join()
+
+
+class TestSessionRecording:
+    """Tests for the session flight recorder hooks."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_no_session_by_default(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that no session file is written unless V2T_SESSION_DIR is set."""
+        from main import VoiceToTextApp
+
+        with patch('main.config.SESSION_DIR', ''):
+            app = VoiceToTextApp()
+
+        assert app.session is None
+        assert app.recorder.session is None
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_session_dir_opens_session(self, mock_injector, mock_transcriber, mock_recorder, tmp_path):
+        """Test that V2T_SESSION_DIR opens a session file shared with the recorder."""
+        from main import VoiceToTextApp
+
+        with patch('main.config.SESSION_DIR', str(tmp_path)):
+            app = VoiceToTextApp()
+        app.session.close()
+
+        assert app.recorder.session is app.session
+        assert app.session.path.startswith(str(tmp_path))
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    @patch('main.play_start_sound')
+    @patch('main.play_stop_sound')
+    def test_hotkeys_overlay_and_timings_are_recorded(self, mock_stop, mock_start, mock_injector, mock_transcriber, mock_recorder):
+        """Test that hotkey events, overlay states and stage timings go to the session."""
+        from main import VoiceToTextApp
+        from pynput import keyboard
+
+        session = Mock()
+        app = VoiceToTextApp(session=session)
+        app.recorder.stop.return_value = np.array([0.1, 0.2], dtype=np.float32)
+        app.recorder.last_stats = Mock(peak=0.2, gain_controlled=True, stage_seconds={"agc": 0.002})
+        app.transcriber.transcribe.return_value = "hi"
+        app.transcriber.last_timings = {"preprocess": (1.0, 1.001), "decode": (1.001, 1.2)}
+
+        with patch('main.threading.Thread') as mock_thread:
+            app.on_press(keyboard.Key.cmd_r, 10.0)
+            app.on_release(keyboard.Key.cmd_r, 11.0)
+            app._process_audio(*mock_thread.call_args.kwargs['args'])
+
+        session.hotkey.assert_any_call("press", 10.0)
+        session.hotkey.assert_any_call("release", 11.0)
+        session.overlay.assert_any_call("recording")
+        names = [call.args[0] for call in session.timing.call_args_list]
+        assert names == ["hotkey", "recorder_stop", "stage.agc", "queue_wait", "preprocess", "decode", "inject"]
+        assert session.timing.call_args_list[2].args[1] == pytest.approx(2.0)
+        assert session.timing.call_args_list[5].args[1] == pytest.approx(199.0)
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    @patch('main.play_start_sound')
+    def test_play_sounds_can_be_disabled(self, mock_start, mock_injector, mock_transcriber, mock_recorder):
+        """Test that play_sounds=False skips the feedback sounds (used by replay)."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp(play_sounds=False)
+        app.start_recording()
+
+        mock_start.assert_not_called()
+
+
+class TestUtteranceTraces:
+    """Tests for per-utterance traces."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    @patch('main.play_stop_sound')
+    def test_trace_collects_stages_and_context(self, mock_stop, mock_injector, mock_transcriber, mock_recorder):
+        """Test that an utterance's trace has its stage timings, audio length, model and queue depth."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.is_recording = True
+        app.recorder.stop.return_value = np.zeros(8000, dtype=np.float32)
+        app.recorder.last_stats = Mock(peak=0.2, gain_controlled=True, stage_seconds={"agc": 0.001})
+        app.transcriber.transcribe.return_value = "hi"
+        app.transcriber.get_active_model_name.return_value = "small.en"
+        app.transcriber.get_thread_count.return_value = 4
+        app.transcriber.last_timings = {"preprocess": (1.0, 1.001), "decode": (1.001, 1.2)}
+
+        with patch('main.threading.Thread') as mock_thread:
+            app.stop_recording_and_transcribe()
+            call = mock_thread.call_args.kwargs
+            app._process_audio(*call['args'], **call['kwargs'])
+
+        trace = app.traces.recent()[-1]
+        assert set(trace["stages_ms"]) == {
+            "hotkey", "recorder_stop", "stage.agc", "queue_wait", "preprocess", "decode", "inject",
+        }
+        assert [span["name"] for span in trace["spans"]] == [
+            "hotkey", "recorder_stop", "queue_wait", "preprocess", "decode", "inject",
+        ]
+        assert trace["audio_seconds"] == pytest.approx(0.5)
+        assert trace["model"] == "small.en"
+        assert trace["decode_threads"] == 4
+        assert trace["queue_depth"] == 1
+        assert trace["latency_ms"] >= 0
+
+
+class TestAppMetrics:
+    """Tests for the app's metrics registry."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_registry_reports_pipeline_state(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that queue depth, active transcriptions and xruns are read from the app."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.recorder.callback_stats.total_xruns = 3
+        app._active_transcriptions = 2
+
+        text = app.metrics.render()
+
+        assert "v2t_active_transcriptions 2.0" in text
+        assert "v2t_transcription_queue_depth 1.0" in text
+        assert "v2t_audio_xruns_total 3.0" in text
+        assert "v2t_process_resident_memory_bytes" in text
+        assert "v2t_utterances_total 0.0" in text
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_registry_reports_callback_health(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that callback timing percentiles, jitter and frame counts are exported in seconds."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.recorder.get_callback_stats.return_value = {
+            "frames": 15840, "expected_frames": 16000,
+            "duration_p50_ms": 0.05, "duration_p95_ms": 0.2, "duration_p99_ms": 1.5,
+            "jitter_ms": 0.4, "jitter_max_ms": 3.0,
+        }
+
+        text = app.metrics.render()
+
+        assert "v2t_audio_callback_duration_p50_seconds 5e-05" in text
+        assert "v2t_audio_callback_duration_p99_seconds 0.0015" in text
+        assert "v2t_audio_callback_jitter_seconds 0.0004" in text
+        assert "v2t_audio_callback_jitter_max_seconds 0.003" in text
+        assert "v2t_audio_frames_captured 15840.0" in text
+        assert "v2t_audio_frames_expected 16000.0" in text
+
+        app.recorder.get_callback_stats.return_value = {"frames": 0, "expected_frames": 0}
+        assert "v2t_audio_callback_duration_p95_seconds 0.0" in app.metrics.render()
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_overlay_frame_times_are_observed(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that the overlay reports paint times to the frame histogram."""
+        from main import VoiceToTextApp
+
+        overlay = Mock()
+        app = VoiceToTextApp(overlay=overlay)
+        overlay.on_frame(0.003)
+
+        assert 'v2t_overlay_frame_seconds_bucket{le="0.004"} 1.0' in app.metrics.render()
+
+
+class TestAppProfiling:
+    """Tests for V2T_PROFILE in the app."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_run_profiles_process_audio(self, mock_injector, mock_transcriber, mock_recorder, tmp_path, monkeypatch):
+        """Test that run() starts the profiler and writes the worker's pstats at exit."""
+        import config
+        import profiling
+        from main import VoiceToTextApp
+
+        monkeypatch.setattr(config, "PROFILE", "cprofile")
+        monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+        app = VoiceToTextApp()
+        app.transcriber.transcribe.return_value = "hello"
+        app.transcriber.last_timings = {}
+
+        def transcribe_and_shutdown():
+            time.sleep(0.1)
+            app._process_audio(np.zeros(1600, dtype=np.float32))
+            app.shutdown_event.set()
+
+        thread = threading.Thread(target=transcribe_and_shutdown)
+        thread.start()
+        with patch('main.keyboard.Listener'):
+            app.run()
+        thread.join()
+
+        assert profiling._active is None
+        assert [path.name.rsplit("-", 1)[1] for path in tmp_path.iterdir()] == ["process_audio.pstats"]
+
+
+class TestHotkeyDispatch:
+    """Tests for running the recording state machine off the keyboard listener thread."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_listener_callbacks_only_queue_events(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that the listener callbacks return before the recorder is touched and the controller starts it."""
+        from pynput import keyboard
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        started = threading.Event()
+        app.recorder.start.side_effect = lambda: started.wait(5)
+
+        app.hotkeys.press(keyboard.Key.cmd_r)
+        assert not app.recorder.start.called
+        app.hotkeys.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not app.recorder.start.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert app.recorder.start.called
+            # The listener stays responsive while the controller is busy opening the device.
+            app.hotkeys.release(keyboard.Key.cmd_r)
+        finally:
+            started.set()
+            app.hotkeys.stop()
+
+        app.recorder.stop.assert_called_once()
+        assert app.hotkeys.summary()["events"] == 2
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_release_latency_uses_the_event_timestamp(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that traces start at the key event, not when the controller got to it."""
+        from pynput import keyboard
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.recorder.stop.return_value = np.zeros(1600, dtype=np.float32)
+        app.recorder.last_stats = None
+        app.is_recording = True
+
+        with patch('main.threading.Thread') as mock_thread:
+            app._handle_hotkey("release", keyboard.Key.cmd_r, 42.0)
+
+        assert mock_thread.call_args.kwargs['kwargs']['trace'].released == 42.0
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_listener_times_are_exported(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that listener callback and dispatch times reach the metrics registry."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.hotkeys.start()
+        app.hotkeys.press("a")
+        app.hotkeys.stop()
+
+        text = app.metrics.render()
+        assert "v2t_hotkey_callback_seconds_count 1.0" in text
+        assert "v2t_hotkey_dispatch_seconds_count 1.0" in text
+
+
+class TestEventCore:
+    """Tests for the app's event loop."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_worker_completion_is_posted_to_the_loop(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that a finished utterance wakes the main loop and reaches its handler."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        app.transcriber.transcribe.return_value = ""
+        app.transcriber.last_timings = {}
+        finished = []
+        app.events.on("transcribed", finished.append)
+
+        app._process_audio(np.zeros(1600, dtype=np.float32))
+        app.events.dispatch()
+
+        assert len(finished) == 1
+        assert finished[0].finished is not None
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_headless_run_does_not_poll(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test that an idle headless run() sleeps without wakeups until shutdown."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        timer = threading.Timer(0.3, app.shutdown_event.set)
+        timer.start()
+        with patch('main.keyboard.Listener'):
+            app.run()
+        timer.join()
+
+        assert app.events.wakeups == 1
+        assert app.events.idle_wakeups == 0
+        assert app.events.shutdown_latency < 0.1
+        assert "v2t_event_wakeups_total 1.0" in app.metrics.render()
+
+
+class TestDaemonClient:
+    """Tests for using a shared transcription daemon."""
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_daemon_socket_replaces_the_local_model(self, mock_injector, mock_transcriber, mock_recorder, monkeypatch):
+        """Test that V2T_DAEMON_SOCKET makes the app a client instead of loading Whisper."""
+        import config
+        from daemon import DaemonTranscriber
+        from main import VoiceToTextApp
+
+        monkeypatch.setattr(config, "DAEMON_SOCKET", "/tmp/v2t-test.sock")
+        app = VoiceToTextApp()
+
+        assert isinstance(app.transcriber, DaemonTranscriber)
+        assert app.transcriber.path == "/tmp/v2t-test.sock"
+        mock_transcriber.assert_not_called()
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_workers_dispatch_with_a_lazy_local_fallback(self, mock_injector, mock_transcriber, mock_recorder, monkeypatch):
+        """Test that V2T_WORKERS makes a WorkerPool that leaves loading Whisper to start() or the first fallback."""
+        import config
+        from main import VoiceToTextApp
+        from workers import WorkerPool
+
+        monkeypatch.setattr(config, "DAEMON_SOCKET", "")
+        monkeypatch.setattr(config, "WORKERS", ["studio.lan:7070"])
+        monkeypatch.setattr(WorkerPool, "start", lambda self: self)
+        app = VoiceToTextApp()
+
+        assert isinstance(app.transcriber, WorkerPool)
+        assert [worker.address for worker in app.transcriber.workers] == ["studio.lan:7070"]
+        mock_transcriber.assert_not_called()
+        assert app.transcriber.preload is config.WORKER_PRELOAD
+        assert app.transcriber._local_transcriber() is mock_transcriber.return_value
+
+
+class TestSingleInstance:
+    """Tests for commands forwarded from a second launch."""
+
+    @patch('main.play_start_sound')
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_toggle_runs_on_the_hotkey_controller(self, mock_injector, mock_transcriber, mock_recorder, mock_sound):
+        """Test that a forwarded toggle is queued to the controller and starts recording even in push-to-talk."""
+        from main import VoiceToTextApp
+
+        app = VoiceToTextApp()
+        assert app.mode == "push_to_talk"
+        assert app.handle_command("toggle", {}) == {}
+        assert not app.recorder.start.called
+        app.hotkeys.start()
+        app.hotkeys.stop()
+
+        app.recorder.start.assert_called_once()
+        assert app.is_recording
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_status_and_quit(self, mock_injector, mock_transcriber, mock_recorder):
+        """Test the status reply and that quit requests shutdown."""
+        from main import VoiceToTextApp
+
+        mock_transcriber.return_value.get_model_name.return_value = "small.en"
+        app = VoiceToTextApp()
+        status = app.handle_command("status", {})
+
+        assert status["pid"] == os.getpid()
+        assert status["model"] == "small.en"
+        assert status["recording"] is False
+        assert app.handle_command("quit", {}) == {}
+        assert app.shutdown_event.is_set()
+        with pytest.raises(ValueError):
+            app.handle_command("dance", {})
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_forwarded_config_changes_mode_and_reports_the_rest(
+        self, mock_injector, mock_transcriber, mock_recorder, monkeypatch
+    ):
+        """Test that V2T_MODE is applied live and other changed settings need a restart."""
+        from main import VoiceToTextApp
+
+        monkeypatch.setenv("V2T_MODE", "push_to_talk")
+        monkeypatch.setenv("V2T_SOUND", "bloop")
+        app = VoiceToTextApp()
+        reply = app.handle_command("config", {"env": {
+            "V2T_MODE": "toggle", "V2T_SOUND": "bloop", "V2T_MODEL": "medium.en", "HOME": "/elsewhere",
+        }})
+        app.hotkeys.start()
+        app.hotkeys.stop()
+
+        assert reply["applied"] == ["V2T_MODE"]
+        assert reply["restart_required"] == ["V2T_MODEL"]
+        assert app.mode == "toggle"
+
+    @patch('main.AudioRecorder')
+    @patch('main.AudioTranscriber')
+    @patch('main.TextInjector')
+    def test_forwarded_mode_is_compared_with_the_current_mode(
+        self, mock_injector, mock_transcriber, mock_recorder, monkeypatch
+    ):
+        """Test that forwarding the startup mode after a change switches back and updates the overlay hint."""
+        from main import VoiceToTextApp
+
+        monkeypatch.setenv("V2T_MODE", "push_to_talk")
+        app = VoiceToTextApp()
+        app.overlay = Mock()
+        app.handle_command("config", {"env": {"V2T_MODE": "toggle"}})
+        app.hotkeys.start()
+        app.hotkeys.stop()
+        assert app.mode == "toggle"
+        reply = app.handle_command("config", {"env": {"V2T_MODE": "push_to_talk"}})
+        app.hotkeys.start()
+        app.hotkeys.stop()
+
+        assert reply["applied"] == ["V2T_MODE"]
+        assert app.mode == "push_to_talk"
+        assert app.overlay.set_mode_threadsafe.call_args_list == [call("toggle"), call("push_to_talk")]
+
+    def test_forward_command_sends_only_settings_that_are_set(self, monkeypatch):
+        """Test that a launch without V2T_MODE does not forward a default mode."""
+        import main
+
+        sent = []
+        monkeypatch.setattr(main, "send", lambda path, command, args: sent.append(args) or {"ok": True})
+        monkeypatch.delenv("V2T_MODE", raising=False)
+        monkeypatch.delenv("V2T_GUI", raising=False)
+        monkeypatch.setenv("V2T_SOUND", "warm")
+        assert main.forward_command("/tmp/instance.sock", "config") == 0
+
+        assert "V2T_MODE" not in sent[0]["env"]
+        assert "V2T_GUI" not in sent[0]["env"]
+        assert sent[0]["env"]["V2T_SOUND"] == "warm"
+
+    def test_forward_command_prints_the_reply(self, capsys, monkeypatch):
+        """Test that a second launch reports what the running instance did."""
+        import main
+
+        sent = []
+
+        def fake_send(path, command, args):
+            sent.append((path, command, args))
+            return {"ok": True, "pid": 42, "applied": ["V2T_MODE"], "restart_required": ["V2T_MODEL"]}
+
+        monkeypatch.setattr(main, "send", fake_send)
+        monkeypatch.setenv("V2T_MODE", "toggle")
+        assert main.forward_command("/tmp/instance.sock", "config") == 0
+
+        output = capsys.readouterr().out
+        assert "already running (pid 42)" in output
+        assert "Applied: V2T_MODE" in output
+        assert "Restart it to apply: V2T_MODEL" in output
+        assert sent[0][2]["env"]["V2T_MODE"] == "toggle"
+
+    def test_forward_command_reports_failures(self, capsys, monkeypatch):
+        """Test that an unreachable or refusing instance gives a non-zero exit status."""
+        import main
+
+        monkeypatch.setattr(main, "send", Mock(side_effect=ConnectionRefusedError("refused")))
+        assert main.forward_command("/tmp/instance.sock", "toggle") == 1
+        monkeypatch.setattr(main, "send", Mock(return_value={"ok": False, "error": "still starting"}))
+        assert main.forward_command("/tmp/instance.sock", "toggle") == 1
+        assert "could not toggle: still starting" in capsys.readouterr().out
@@ -0,0 +1,176 @@
+"""Unit tests for metrics.py - registry, Prometheus rendering and endpoint."""
+
+import http.client
+import socket
+import urllib.request
+
+import pytest
+
+
+class TestRegistry:
+    """Tests for counters, gauges, histograms and text rendering."""
+
+    def test_counter_and_gauge(self):
+        """Test that counters and gauges render with HELP and TYPE lines."""
+        from metrics import Registry
+
+        registry = Registry()
+        counter = registry.counter("v2t_things_total", "Things")
+        gauge = registry.gauge("v2t_level", "Level")
+        counter.inc()
+        counter.inc(2)
+        gauge.set(0.5)
+
+        text = registry.render()
+
+        assert "# HELP v2t_things_total Things\n# TYPE v2t_things_total counter\nv2t_things_total 3.0\n" in text
+        assert "# TYPE v2t_level gauge\nv2t_level 0.5\n" in text
+
+    def test_function_metrics_are_read_at_scrape_time(self):
+        """Test that function-backed metrics report the current value."""
+        from metrics import Registry
+
+        registry = Registry()
+        values = [1]
+        registry.gauge("v2t_depth", "Depth", function=lambda: values[0])
+        values[0] = 4
+
+        assert "v2t_depth 4.0" in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket boundaries (le is inclusive), sum and count."""
+        from metrics import Registry
+
+        registry = Registry()
+        histogram = registry.histogram("v2t_rtf", "RTF", (0.5, 1.0))
+        for value in (0.2, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+
+        text = registry.render()
+
+        assert 'v2t_rtf_bucket{le="0.5"} 2.0' in text
+        assert 'v2t_rtf_bucket{le="1.0"} 3.0' in text
+        assert 'v2t_rtf_bucket{le="+Inf"} 4.0' in text
+        assert "v2t_rtf_sum 4.4" in text
+        assert "v2t_rtf_count 4.0" in text
+
+    def test_failing_metric_does_not_break_scrape(self):
+        """Test that one broken function metric is skipped with a comment."""
+        from metrics import Registry
+
+        registry = Registry()
+        registry.gauge("v2t_broken", "Broken", function=lambda: 1 / 0)
+        registry.gauge("v2t_ok", "OK").set(1)
+
+        text = registry.render()
+
+        assert "# v2t_broken unavailable" in text
+        assert "v2t_ok 1.0" in text
+
+    def test_duplicate_names_are_rejected(self):
+        """Test that a metric name can only be registered once."""
+        from metrics import Registry
+
+        registry = Registry()
+        registry.counter("v2t_x_total", "X")
+
+        with pytest.raises(ValueError):
+            registry.gauge("v2t_x_total", "X")
+
+    def test_process_rss(self):
+        """Test that resident memory is reported in bytes."""
+        from metrics import process_rss_bytes
+
+        assert process_rss_bytes() > 1024 * 1024
+
+    def test_process_rss_without_proc(self, monkeypatch):
+        """Test that systems without /proc get the peak from getrusage rather than a subprocess."""
+        import metrics
+
+        def no_proc(*args, **kwargs):
+            raise FileNotFoundError("/proc/self/statm")
+
+        monkeypatch.setattr(metrics, "open", no_proc, raising=False)
+        assert metrics.process_rss_bytes() > 1024 * 1024
+
+
+class TestUtteranceMetrics:
+    """Tests for metrics fed from utterance traces."""
+
+    def test_export_updates_metrics(self):
+        """Test that a finished trace counts an utterance and observes RTF, injection and latency."""
+        from metrics import Registry, UtteranceMetrics
+        from tracing import UtteranceTrace
+
+        registry = Registry()
+        metrics = UtteranceMetrics(registry)
+        trace = UtteranceTrace(1, released=0.0)
+        trace.audio_seconds = 2.0
+        trace.span("decode", 0.1, 0.6)
+        trace.span("inject", 0.6, 0.62)
+        trace.finished = 0.7
+
+        metrics.export(trace)
+
+        text = registry.render()
+        assert "v2t_utterances_total 1.0" in text
+        assert "v2t_utterances_per_minute 1.0" in text
+        assert 'v2t_decode_rtf_bucket{le="0.2"} 0.0' in text
+        assert 'v2t_decode_rtf_bucket{le="0.3"} 1.0' in text
+        assert 'v2t_inject_seconds_bucket{le="0.025"} 1.0' in text
+        assert 'v2t_utterance_latency_seconds_bucket{le="0.75"} 1.0' in text
+
+    def test_per_minute_window(self):
+        """Test that utterances older than the window drop out of the rate."""
+        import time
+        from metrics import Registry, UtteranceMetrics
+        from tracing import UtteranceTrace
+
+        metrics = UtteranceMetrics(Registry(), window_seconds=0.01)
+        metrics.export(UtteranceTrace(1, released=0.0))
+        time.sleep(0.02)
+
+        assert metrics.per_minute() == 0
+
+
+class TestMetricsServer:
+    """Tests for the Prometheus endpoint."""
+
+    def test_http_endpoint(self):
+        """Test that /metrics serves the registry on localhost."""
+        from metrics import MetricsServer, Registry
+
+        registry = Registry()
+        registry.gauge("v2t_up", "Up").set(1)
+        server = MetricsServer(registry, "127.0.0.1:0").start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                body = response.read().decode()
+                content_type = response.headers["Content-Type"]
+        finally:
+            server.stop()
+
+        assert "v2t_up 1.0" in body
+        assert content_type.startswith("text/plain; version=0.0.4")
+
+    def test_unix_socket_endpoint(self, tmp_path):
+        """Test that the registry can be scraped over a Unix socket."""
+        from metrics import MetricsServer, Registry
+
+        registry = Registry()
+        registry.gauge("v2t_up", "Up").set(1)
+        path = str(tmp_path / "metrics.sock")
+        server = MetricsServer(registry, f"unix:{path}").start()
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(path)
+            sock.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+            sock.close()
+        finally:
+            server.stop()
+
+        assert response.startswith(b"HTTP/1.0 200")
+        assert b"v2t_up 1.0" in response
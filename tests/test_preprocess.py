@@ -0,0 +1,544 @@
+"""Unit tests for preprocess.py - incremental audio pre-processing."""
+
+import queue
+
+import numpy as np
+import pytest
+
+from preprocess import (
+    AudioPreprocessor,
+    AudioStats,
+    AutomaticGainControl,
+    ChannelSelector,
+    LinearResampler,
+    PolyphaseResampler,
+    SpectralGate,
+)
+
+
+class TestLinearResampler:
+    """Tests for the streaming LinearResampler (the benchmark's reference)."""
+
+    @pytest.mark.parametrize("rate", [44100, 48000, 8000])
+    def test_output_length_matches_rate_ratio(self, rate):
+        """Test that one second of input becomes one second at 16 kHz."""
+        resampler = LinearResampler(rate)
+        audio = np.zeros(rate, dtype=np.float32)
+
+        out = np.concatenate([resampler.process(audio[i:i + 1000]) for i in range(0, rate, 1000)])
+
+        assert abs(len(out) - 16000) <= 1
+
+    def test_blockwise_matches_whole_signal(self):
+        """Test that block boundaries do not change the output."""
+        t = np.arange(48000) / 48000
+        audio = np.sin(2 * np.pi * 300 * t).astype(np.float32)
+
+        whole = LinearResampler(48000).process(audio)
+        resampler = LinearResampler(48000)
+        blocks = np.concatenate([resampler.process(audio[i:i + 333]) for i in range(0, 48000, 333)])
+
+        np.testing.assert_allclose(blocks, whole[:len(blocks)], atol=1e-6)
+
+    def test_reset_restarts_phase(self):
+        """Test that reset() forgets carried state."""
+        resampler = LinearResampler(48000)
+        first = resampler.process(np.ones(100, dtype=np.float32))
+        resampler.reset()
+
+        assert len(resampler.process(np.ones(100, dtype=np.float32))) == len(first)
+
+
+def _resample(resampler, audio, block):
+    out = [resampler.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+    return np.concatenate(out + [resampler.flush()])
+
+
+class TestPolyphaseResampler:
+    """Tests for the streaming PolyphaseResampler."""
+
+    @pytest.mark.parametrize("rate", [44100, 48000, 22050, 8000])
+    def test_output_length_matches_rate_ratio(self, rate):
+        """Test that one second of input becomes exactly one second at 16 kHz."""
+        audio = np.zeros(rate, dtype=np.float32)
+
+        out = _resample(PolyphaseResampler(rate), audio, 1000)
+
+        assert len(out) == 16000
+        assert out.dtype == np.float32
+
+    @pytest.mark.parametrize("rate", [44100, 48000])
+    def test_blockwise_matches_whole_signal(self, rate):
+        """Test that block boundaries do not change the output."""
+        audio = np.random.default_rng(0).standard_normal(rate).astype(np.float32)
+
+        whole = _resample(PolyphaseResampler(rate), audio, len(audio))
+        blocks = _resample(PolyphaseResampler(rate), audio, 333)
+
+        np.testing.assert_allclose(blocks, whole, atol=1e-5)
+
+    @pytest.mark.parametrize("rate", [44100, 48000])
+    def test_passband_tone_is_preserved_and_aligned(self, rate):
+        """Test that an in-band tone matches the tone sampled directly at 16 kHz."""
+        audio = np.sin(2 * np.pi * 1000 * np.arange(rate) / rate).astype(np.float32)
+
+        out = _resample(PolyphaseResampler(rate), audio, 480)
+
+        expected = np.sin(2 * np.pi * 1000 * np.arange(16000) / 16000)
+        np.testing.assert_allclose(out[400:-400], expected[400:-400], atol=1e-3)
+
+    @pytest.mark.parametrize("rate", [44100, 48000])
+    def test_removes_tones_above_output_nyquist(self, rate):
+        """Test that a 10 kHz tone is filtered out instead of aliasing to 6 kHz."""
+        audio = np.sin(2 * np.pi * 10000 * np.arange(rate) / rate).astype(np.float32)
+
+        out = _resample(PolyphaseResampler(rate), audio, 480)
+
+        assert np.sqrt(np.mean(out[400:-400] ** 2)) < 1e-3
+
+    def test_reset_restarts_stream(self):
+        """Test that reset() forgets carried samples and position."""
+        resampler = PolyphaseResampler(48000)
+        audio = np.ones(4800, dtype=np.float32)
+        first = _resample(resampler, audio, 4800)
+        resampler.reset()
+
+        np.testing.assert_array_equal(_resample(resampler, audio, 4800), first)
+
+
+def _run_agc(agc, audio, block=512):
+    out = [agc.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+    out.append(agc.flush())
+    return np.concatenate(out)
+
+
+def _tone(amplitude, seconds=2.0):
+    t = np.arange(int(16000 * seconds)) / 16000
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+class TestAutomaticGainControl:
+    """Tests for the streaming AutomaticGainControl stage."""
+
+    def test_output_length_matches_input_after_flush(self):
+        """Test that lookahead delays output but flush() returns every sample."""
+        agc = AutomaticGainControl()
+        audio = _tone(0.1, seconds=1.003)
+
+        out = _run_agc(agc, audio, block=333)
+
+        assert len(out) == len(audio)
+        assert out.dtype == np.float32
+
+    def test_first_block_is_held_for_lookahead(self):
+        """Test that samples within the lookahead window are held back."""
+        agc = AutomaticGainControl(lookahead_ms=50)
+
+        assert len(agc.process(np.zeros(160 * 5, dtype=np.float32))) == 0
+        assert len(agc.process(np.zeros(160, dtype=np.float32))) == 160
+
+    def test_quiet_audio_is_boosted(self):
+        """Test that quiet speech is raised towards the target level."""
+        agc = AutomaticGainControl(target_rms=0.1, max_gain=20.0)
+
+        out = _run_agc(agc, _tone(0.01))
+
+        assert np.sqrt(np.mean(out[8000:] ** 2)) == pytest.approx(0.1, rel=0.1)
+
+    def test_loud_audio_is_attenuated(self):
+        """Test that loud audio is brought down towards the target level."""
+        agc = AutomaticGainControl(target_rms=0.1)
+
+        out = _run_agc(agc, _tone(0.8))
+
+        assert np.sqrt(np.mean(out[8000:] ** 2)) == pytest.approx(0.1, rel=0.1)
+
+    def test_click_does_not_clip_and_only_dips_briefly(self):
+        """Test that a single click is limited without spoiling the rest of the clip."""
+        agc = AutomaticGainControl(peak_limit=0.9, release_db_per_s=30.0)
+        audio = _tone(0.02, seconds=6.0)
+        audio[16000:16010] = 1.0
+
+        out = _run_agc(agc, audio)
+
+        assert np.abs(out).max() <= 0.9 + 1e-6
+        before = np.sqrt(np.mean(out[8000:15000] ** 2))
+        after = np.sqrt(np.mean(out[-16000:] ** 2))
+        assert after == pytest.approx(before, rel=0.05)
+
+    def test_blocksize_does_not_change_output(self):
+        """Test that the result is independent of the capture block size."""
+        audio = _tone(0.05)
+        audio[5000:5005] = 0.9
+
+        small = _run_agc(AutomaticGainControl(), audio, block=64)
+        large = _run_agc(AutomaticGainControl(), audio, block=4096)
+
+        np.testing.assert_allclose(small, large, atol=1e-5)
+
+    def test_reset_restores_initial_gain(self):
+        """Test that reset() clears held samples and gain state."""
+        agc = AutomaticGainControl()
+        agc.process(_tone(0.8, seconds=0.5))
+        agc.reset()
+
+        assert len(agc.flush()) == 0
+        assert agc._gain == agc.max_gain
+
+    def test_background_noise_is_not_leveled_up(self):
+        """Test that noise below the speech threshold is lifted no further than max_noise_rms."""
+        agc = AutomaticGainControl(target_rms=0.1, max_noise_rms=0.01)
+        out = _run_agc(agc, _noise(2.0, 0.002))
+
+        assert np.sqrt(np.mean(out ** 2)) <= 0.0105
+
+    def test_gain_is_held_through_trailing_noise(self):
+        """Test that the gain reached on speech does not keep rising once it stops."""
+        agc = AutomaticGainControl(target_rms=0.1, max_noise_rms=0.01)
+        out = _run_agc(agc, np.concatenate((_tone(0.05), _noise(2.0, 0.002))))
+
+        assert np.sqrt(np.mean(out[40000:] ** 2)) < 0.01
+
+
+def _noise(seconds, level, seed=1):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(16000 * seconds)) * level).astype(np.float32)
+
+
+class TestSpectralGate:
+    """Tests for the SpectralGate noise suppression stage."""
+
+    @pytest.mark.parametrize("length", [5, 300, 16000])
+    def test_passes_audio_through_without_profile(self, length):
+        """Test that overlap-add reconstructs the input when nothing is gated."""
+        gate = SpectralGate(highpass_hz=0, preroll_ms=60000)
+        audio = _noise(1.0, 0.1)[:length]
+
+        out = _run_agc(gate, audio, block=300)
+
+        assert len(out) == length
+        np.testing.assert_allclose(out, audio, atol=1e-5)
+
+    def test_highpass_removes_low_frequencies(self):
+        """Test that content below the cut-off is removed."""
+        gate = SpectralGate(highpass_hz=100, preroll_ms=60000)
+        t = np.arange(32000) / 16000
+        hum = (0.3 * np.sin(2 * np.pi * 40 * t)).astype(np.float32)
+
+        out = _run_agc(gate, hum)
+
+        assert np.sqrt(np.mean(out[2000:-2000] ** 2)) < 0.02
+
+    def test_learns_profile_from_preroll_and_suppresses_noise(self):
+        """Test that noise after the pre-roll is attenuated while speech is kept."""
+        gate = SpectralGate(preroll_ms=250)
+        noise = _noise(3.0, 0.03)
+        speech = _tone(0.3, seconds=1.0)
+        audio = noise.copy()
+        audio[32000:48000] += speech
+
+        out = _run_agc(gate, audio)
+
+        assert gate.noise_profile is not None
+        assert np.sqrt(np.mean(out[8000:32000] ** 2)) < 0.3 * 0.03
+        kept = np.sqrt(np.mean(out[33000:47000] ** 2))
+        assert kept == pytest.approx(np.sqrt(np.mean(speech ** 2)), rel=0.1)
+
+    def test_profile_survives_reset(self):
+        """Test that the noise profile is kept across recordings."""
+        gate = SpectralGate()
+        gate.learn_noise(_noise(0.5, 0.03))
+        profile = gate.noise_profile.copy()
+
+        gate.reset()
+
+        np.testing.assert_array_equal(gate.noise_profile, profile)
+
+    def test_learn_noise_blends_with_existing_profile(self):
+        """Test that new noise estimates are blended, not replaced."""
+        gate = SpectralGate(profile_blend=0.5)
+        gate.learn_noise(_noise(0.5, 0.01))
+        quiet = gate.noise_profile.mean()
+
+        gate.learn_noise(_noise(0.5, 0.03, seed=2))
+
+        assert quiet < gate.noise_profile.mean() < 3 * quiet
+
+
+def _two_channel_fixture(seed=0):
+    """Channel 1: steady loud noise. Channel 2: quiet floor, then a tone burst."""
+    rng = np.random.default_rng(seed)
+    n = 32000
+    noisy = 0.1 * rng.standard_normal(n)
+    clean = 0.002 * rng.standard_normal(n)
+    clean[8000:] += _tone(0.3, seconds=1.5)
+    return np.stack([noisy, clean], axis=1).astype(np.float32)
+
+
+def _select(selector, audio, block=480):
+    return np.concatenate([selector.process(audio[i:i + block]) for i in range(0, len(audio), block)])
+
+
+class TestChannelSelector:
+    """Tests for the SNR-driven ChannelSelector."""
+
+    def test_best_follows_channel_with_highest_snr(self):
+        """Test that best mode switches to the channel whose speech stands out."""
+        audio = _two_channel_fixture()
+        selector = ChannelSelector(2)
+
+        out = _select(selector, audio)
+
+        assert out.shape == (32000,)
+        assert out.dtype == np.float32
+        assert selector.selected == 1
+        assert selector.switches == 1
+        np.testing.assert_allclose(out[-4800:], audio[-4800:, 1])
+
+    def test_best_does_not_flap_between_similar_channels(self):
+        """Test that hysteresis keeps the choice when channels are alike."""
+        rng = np.random.default_rng(1)
+        speech = _tone(0.3, seconds=2.0)
+        audio = np.stack([speech + 0.01 * rng.standard_normal(32000), speech + 0.01 * rng.standard_normal(32000)], axis=1)
+        selector = ChannelSelector(2)
+
+        _select(selector, audio.astype(np.float32))
+
+        assert selector.switches <= 1
+
+    def test_mix_weights_channels_by_snr(self):
+        """Test that mix mode leans towards the cleaner channel."""
+        audio = _two_channel_fixture()
+        selector = ChannelSelector(2, mode="mix")
+
+        out = _select(selector, audio)
+
+        tail = out[-4800:]
+        assert np.abs(tail - audio[-4800:, 1]).mean() < np.abs(tail - audio[-4800:, 0]).mean()
+        assert selector.selected == 1
+
+    def test_unknown_mode_is_rejected(self):
+        """Test that an unknown mode raises ValueError."""
+        with pytest.raises(ValueError):
+            ChannelSelector(2, mode="loudest")
+
+    def test_reset_returns_to_first_channel(self):
+        """Test that reset() forgets the choice and the noise floors."""
+        selector = ChannelSelector(2)
+        _select(selector, _two_channel_fixture())
+        selector.reset()
+
+        assert selector.selected == 0
+        assert selector.switches == 0
+
+
+class TestAudioStats:
+    """Tests for AudioStats."""
+
+    def test_empty_stats(self):
+        """Test that empty stats report zero RMS and no speech."""
+        stats = AudioStats()
+
+        assert stats.rms == 0.0
+        assert stats.duration == 0.0
+        assert stats.has_speech is False
+
+
+class TestAudioPreprocessor:
+    """Tests for AudioPreprocessor."""
+
+    def test_process_updates_peak_and_rms(self):
+        """Test that statistics are updated block by block."""
+        preprocessor = AudioPreprocessor()
+        preprocessor.process(np.full((100, 1), 0.5, dtype=np.float32))
+        preprocessor.process(np.full((100, 1), -0.25, dtype=np.float32))
+
+        stats = preprocessor.stats
+        assert stats.samples == 200
+        assert stats.peak == pytest.approx(0.5)
+        assert stats.rms == pytest.approx(np.sqrt((0.25 + 0.0625) / 2))
+
+    def test_int16_storage_keeps_float_statistics(self):
+        """Test that int16 capture is stored as int16 with stats in float units."""
+        preprocessor = AudioPreprocessor(trim_silence=False, dtype=np.int16)
+        preprocessor.process(np.full((100, 1), 16384, dtype=np.int16))
+        preprocessor.process(np.full((100, 1), -8192, dtype=np.int16))
+
+        audio, stats = preprocessor.finish()
+
+        assert audio.dtype == np.int16
+        assert audio[0] == 16384 and audio[-1] == -8192
+        assert stats.peak == pytest.approx(0.5)
+        assert stats.rms == pytest.approx(np.sqrt((0.25 + 0.0625) / 2))
+
+    def test_int16_storage_quantizes_stage_output(self):
+        """Test that float stage output (e.g. AGC) is stored at int16 full scale."""
+        preprocessor = AudioPreprocessor(stages=[AutomaticGainControl()], trim_silence=False, dtype=np.int16)
+        preprocessor.process((_tone(0.01, seconds=1.0) * 32768).astype(np.int16))
+
+        audio, stats = preprocessor.finish()
+
+        assert audio.dtype == np.int16
+        # Leveled to 0.1 RMS; the stats describe the input, before AGC.
+        assert np.abs(audio).max() / 32768 == pytest.approx(0.1 * np.sqrt(2), rel=0.05)
+        assert stats.peak == pytest.approx(0.01, abs=1e-4)
+
+    def test_long_recordings_spill_to_disk(self, tmp_path):
+        """Test that the recording moves to a memmap past spill_bytes."""
+        preprocessor = AudioPreprocessor(trim_silence=False, spill_bytes=16000 * 4, spill_dir=tmp_path)
+        for _ in range(20):
+            preprocessor.process(np.full(1600, 0.1, dtype=np.float32))
+
+        audio, stats = preprocessor.finish()
+
+        assert isinstance(audio, np.memmap)
+        assert len(audio) == 32000
+        assert stats.peak == pytest.approx(0.1)
+
+    def test_channel_selector_reduces_multichannel_blocks(self):
+        """Test that int16 multi-channel blocks become one mono stream."""
+        selector = ChannelSelector(2)
+        preprocessor = AudioPreprocessor(trim_silence=False, channel_selector=selector)
+        audio = (_two_channel_fixture() * 32767).astype(np.int16)
+        for i in range(0, len(audio), 480):
+            preprocessor.process(audio[i:i + 480])
+
+        mono, stats = preprocessor.finish()
+
+        assert mono.shape == (32000,)
+        assert selector.selected == 1
+        assert "channels" in stats.stage_seconds
+
+    def test_process_detects_speech_boundaries(self):
+        """Test that the energy VAD marks the first and last speech blocks."""
+        preprocessor = AudioPreprocessor(pad_ms=0)
+        for value in (0.0, 0.0, 0.3, 0.0, 0.2, 0.0):
+            preprocessor.process(np.full(160, value, dtype=np.float32))
+
+        assert preprocessor.stats.speech_start == 320
+        assert preprocessor.stats.speech_end == 800
+
+    def test_finish_trims_to_speech_with_padding(self):
+        """Test that finish() returns speech plus padding as a view."""
+        preprocessor = AudioPreprocessor(pad_ms=10)
+        for value in (0.0, 0.0, 0.3, 0.0, 0.0):
+            preprocessor.process(np.full(1600, value, dtype=np.float32))
+
+        audio, stats = preprocessor.finish()
+
+        assert len(audio) == 1600 + 2 * 160
+        assert np.shares_memory(audio, preprocessor.buffer.view())
+
+    def test_finish_keeps_everything_without_speech(self):
+        """Test that nothing is trimmed when no speech was detected."""
+        preprocessor = AudioPreprocessor()
+        for _ in range(3):
+            preprocessor.process(np.zeros(1600, dtype=np.float32))
+
+        audio, _ = preprocessor.finish()
+
+        assert len(audio) == 4800
+
+    def test_finish_without_trimming(self):
+        """Test that trimming can be disabled."""
+        preprocessor = AudioPreprocessor(trim_silence=False)
+        for value in (0.0, 0.3, 0.0):
+            preprocessor.process(np.full(1600, value, dtype=np.float32))
+
+        audio, _ = preprocessor.finish()
+
+        assert len(audio) == 4800
+
+    def test_worker_thread_drains_queue(self):
+        """Test that the helper thread processes queued blocks before finish() returns."""
+        preprocessor = AudioPreprocessor(trim_silence=False)
+        source = queue.Queue()
+        preprocessor.start(source)
+        for _ in range(5):
+            source.put(np.full((160, 1), 0.1, dtype=np.float32))
+
+        audio, stats = preprocessor.finish()
+
+        assert len(audio) == 800
+        assert stats.samples == 800
+
+    def test_start_uses_fresh_buffer(self):
+        """Test that a new recording does not overwrite the previous result."""
+        preprocessor = AudioPreprocessor(trim_silence=False)
+        preprocessor.process(np.full(160, 0.1, dtype=np.float32))
+        first, _ = preprocessor.finish()
+
+        preprocessor.start(queue.Queue())
+        preprocessor.process(np.full(160, 0.9, dtype=np.float32))
+        preprocessor.finish()
+
+        assert first[0] == pytest.approx(0.1)
+
+    def test_resamples_other_rates(self):
+        """Test that a resampler stage is added for non-16 kHz input."""
+        preprocessor = AudioPreprocessor(samplerate=32000, trim_silence=False)
+        preprocessor.process(np.zeros(3200, dtype=np.float32))
+
+        audio, stats = preprocessor.finish()
+
+        assert abs(len(audio) - 1600) <= 1
+        assert stats.samplerate == 16000
+        assert isinstance(preprocessor.stages[0], PolyphaseResampler)
+
+    def test_resampler_can_be_chosen(self):
+        """Test that the resampler stage class can be overridden."""
+        preprocessor = AudioPreprocessor(samplerate=48000, resampler=LinearResampler)
+
+        assert isinstance(preprocessor.stages[0], LinearResampler)
+
+    def test_finish_flushes_lookahead_stages(self):
+        """Test that finish() emits the samples an AGC stage held back."""
+        preprocessor = AudioPreprocessor(stages=[AutomaticGainControl()], trim_silence=False)
+        preprocessor.process(_tone(0.1, seconds=0.5))
+
+        audio, stats = preprocessor.finish()
+
+        assert len(audio) == 8000
+        assert stats.gain_controlled is True
+
+    def test_trailing_noise_is_trimmed_with_agc(self):
+        """Test that the VAD sees the signal before AGC, so boosted noise is not taken for speech."""
+        preprocessor = AudioPreprocessor(stages=[AutomaticGainControl()], pad_ms=0)
+        audio = np.concatenate((_noise(1.0, 0.002), _tone(0.05, seconds=3.0), _noise(1.0, 0.002, seed=2)))
+        for i in range(0, len(audio), 1600):
+            preprocessor.process(audio[i:i + 1600])
+
+        trimmed, stats = preprocessor.finish()
+
+        assert stats.speech_start == pytest.approx(16000, abs=1600)
+        assert stats.speech_end == pytest.approx(64000, abs=1600)
+        assert len(trimmed) == pytest.approx(48000, abs=3200)
+        assert stats.peak == pytest.approx(0.05, rel=0.2)
+
+    def test_stage_cost_is_tracked_per_stage(self):
+        """Test that CPU time per stage is reported per second of audio."""
+        preprocessor = AudioPreprocessor(stages=[AutomaticGainControl()], trim_silence=False)
+        preprocessor.process(_tone(0.1, seconds=0.5))
+
+        _, stats = preprocessor.finish()
+
+        cost = stats.stage_cost()
+        assert set(cost) == {"agc"}
+        assert cost["agc"] >= 0.0
+
+    def test_custom_stages_run_in_order(self):
+        """Test that custom stages transform blocks before buffering."""
+        class Double:
+            def reset(self):
+                pass
+
+            def process(self, block):
+                return block * 2
+
+        preprocessor = AudioPreprocessor(stages=[Double()], trim_silence=False)
+        preprocessor.process(np.full(10, 0.1, dtype=np.float32))
+
+        audio, stats = preprocessor.finish()
+
+        assert audio[0] == pytest.approx(0.2)
+        assert stats.peak == pytest.approx(0.2)
@@ -0,0 +1,195 @@
+"""Unit tests for profiling.py - V2T_PROFILE sampling and cProfile capture."""
+
+import os
+import pstats
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stop_profiler():
+    yield
+    import profiling
+
+    profiling.stop()
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+class TestProfiled:
+    """Tests for the profiled() hook."""
+
+    def test_passthrough_when_off(self):
+        """Test that a hook calls straight through when no profiler runs."""
+        from profiling import profiled
+
+        @profiled("region")
+        def add(a, b=0):
+            return a + b
+
+        assert add(1, b=2) == 3
+        assert add.__name__ == "add"
+
+    def test_unknown_mode_is_rejected(self, tmp_path):
+        """Test that an unknown V2T_PROFILE mode raises ValueError."""
+        import profiling
+
+        with pytest.raises(ValueError):
+            profiling.start("perf", str(tmp_path))
+        assert profiling._active is None
+
+
+class TestSamplingProfiler:
+    """Tests for collapsed-stack sampling."""
+
+    def test_samples_only_inside_regions(self, tmp_path):
+        """Test that stacks are sampled inside hooks and written as collapsed stacks on stop."""
+        import profiling
+
+        @profiling.profiled("hot")
+        def hot():
+            return busy_loop(0.2)
+
+        profiler = profiling.start("sample", str(tmp_path), window_seconds=60, interval=0.001)
+        busy_loop(0.05)
+        hot()
+        profiling.stop()
+
+        assert profiler.samples > 0
+        assert len(profiler.files) == 1
+        with open(profiler.files[0]) as f:
+            lines = f.read().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert stack.startswith("hot;")
+            assert int(count) > 0
+        assert any("busy_loop (test_profiling.py:" in line for line in lines)
+
+    def test_window_writes_a_file_per_window(self, tmp_path):
+        """Test that each elapsed window is written to its own file."""
+        import profiling
+
+        profiler = profiling.SamplingProfiler(str(tmp_path), window_seconds=0.05, interval=0.001)
+        profiler._regions[threading.get_ident()] = "hot"
+        profiler.start()
+        busy_loop(0.2)
+        del profiler._regions[threading.get_ident()]
+        profiler.stop()
+
+        assert len(profiler.files) >= 1
+        assert all(os.path.exists(path) for path in profiler.files)
+
+    def test_quick_flushes_get_distinct_names(self, tmp_path):
+        """Test that windows flushed within the same second do not overwrite each other."""
+        from profiling import SamplingProfiler
+
+        profiler = SamplingProfiler(str(tmp_path))
+        for _ in range(3):
+            profiler._counts["hot;f"] = 1
+            profiler.flush()
+
+        assert len(set(profiler.files)) == 3
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in profiler.files)
+        assert all(f"-{os.getpid()}-" in path for path in profiler.files)
+
+    def test_nothing_written_without_samples(self, tmp_path):
+        """Test that an idle window writes no file."""
+        from profiling import SamplingProfiler
+
+        profiler = SamplingProfiler(str(tmp_path))
+        profiler.flush()
+
+        assert profiler.files == []
+        assert os.listdir(tmp_path) == []
+
+
+class TestCProfileProfiler:
+    """Tests for cProfile capture."""
+
+    def test_writes_pstats_per_region(self, tmp_path):
+        """Test that each region gets a pstats file with its calls."""
+        import profiling
+
+        @profiling.profiled("decode")
+        def decode():
+            return busy_loop(0.01)
+
+        @profiling.profiled("inject")
+        def inject():
+            return decode()
+
+        profiler = profiling.start("cprofile", str(tmp_path), window_seconds=60)
+        decode()
+        inject()
+        profiling.stop()
+
+        names = sorted(os.path.basename(path).rsplit("-", 1)[1] for path in profiler.files)
+        assert names == ["decode.pstats", "inject.pstats"]
+        stats = pstats.Stats(next(path for path in profiler.files if path.endswith("inject.pstats")))
+        functions = {name for _, _, name in stats.stats}
+        assert "busy_loop" in functions
+        assert profiler.skipped == 0
+
+    def test_concurrent_region_runs_unprofiled(self, tmp_path):
+        """Test that a region entered while another is profiled still runs and is counted as skipped."""
+        from profiling import CProfileProfiler
+
+        profiler = CProfileProfiler(str(tmp_path))
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            entered.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=profiler.call, args=("hold", hold, (), {}))
+        thread.start()
+        entered.wait(5)
+        try:
+            assert profiler.call("other", lambda x: x * 2, (21,), {}) == 42
+        finally:
+            release.set()
+            thread.join()
+
+        assert profiler.skipped == 1
+
+    def test_other_threads_are_not_recorded(self, tmp_path):
+        """Test that work on another thread during a profiled region stays out of its stats."""
+        import profiling
+
+        entered = threading.Event()
+        done = threading.Event()
+
+        def background_work():
+            entered.wait(5)
+            busy_loop(0.01)
+            done.set()
+
+        @profiling.profiled("overlay_tick")
+        def tick():
+            entered.set()
+            done.wait(5)
+
+        thread = threading.Thread(target=background_work)
+        thread.start()
+        profiler = profiling.start("cprofile", str(tmp_path), window_seconds=60)
+        try:
+            tick()
+        finally:
+            profiling.stop()
+            thread.join()
+
+        stats = pstats.Stats(profiler.files[0])
+        functions = {name for _, _, name in stats.stats}
+        assert "busy_loop" not in functions
+        assert "background_work" not in functions
+        assert "tick" in functions
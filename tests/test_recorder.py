@@ -74,6 +74,103 @@ class TestAudioRecorderInit:
         assert recorder.get_current_level() == 0.0
 
 
+class TestAudioRecorderCaptureProfile:
+    """Tests for capture profiles and the startup probe."""
+
+    @patch('recorder.sd')
+    def test_default_profile_is_balanced(self, mock_sd):
+        """Test that the balanced profile sets blocksize, latency and dtype."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+
+        assert recorder.profile == 'balanced'
+        assert recorder.blocksize == 480
+        assert recorder.latency == 0.06
+        assert recorder.dtype == np.float32
+
+    @patch('recorder.sd')
+    def test_profiles_set_stream_parameters(self, mock_sd):
+        """Test that the profile's blocksize, latency and dtype reach the InputStream."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(samplerate=48000, profile='low_latency')
+        recorder.start()
+
+        kwargs = mock_sd.InputStream.call_args.kwargs
+        assert kwargs['blocksize'] == 480
+        assert kwargs['latency'] == 'low'
+        assert kwargs['dtype'] == 'float32'
+
+    @patch('recorder.sd')
+    def test_power_saver_captures_int16(self, mock_sd):
+        """Test that power_saver uses long blocks and int16 samples."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(profile='power_saver')
+
+        assert recorder.blocksize == 1600
+        assert recorder.latency == 'high'
+        assert recorder.dtype == np.int16
+
+    @patch('recorder.config.CAPTURE_DTYPE', 'float32')
+    @patch('recorder.sd')
+    def test_capture_dtype_overrides_profile(self, mock_sd):
+        """Test that V2T_CAPTURE_DTYPE wins over the profile's sample format."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(profile='power_saver')
+
+        assert recorder.dtype == np.float32
+
+    @patch('recorder.sd')
+    def test_unknown_profile_falls_back_to_balanced(self, mock_sd):
+        """Test that an unknown profile name is replaced by balanced."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(profile='turbo')
+
+        assert recorder.profile == 'balanced'
+
+    @patch('recorder.sd')
+    def test_probe_reports_block_period_and_callback_duration(self, mock_sd):
+        """Test that probe_capture() measures callbacks from a short stream."""
+        from recorder import AudioRecorder
+
+        stream = MagicMock()
+        stream.latency = 0.03
+
+        def open_stream(**kwargs):
+            def start():
+                for _ in range(4):
+                    kwargs['callback'](np.zeros((480, 1), dtype=np.float32), 480, None, None)
+            stream.start.side_effect = start
+            return stream
+
+        mock_sd.InputStream.side_effect = open_stream
+
+        recorder = AudioRecorder()
+        summary = recorder.probe_capture(seconds=0)
+
+        assert summary.startswith('balanced: 480 frames (30.0 ms), float32')
+        assert 'latency 30.0 ms' in summary
+        assert 'block period' in summary
+        assert 'callback' in summary
+        assert recorder.q.empty()
+        stream.close.assert_called_once()
+
+    @patch('recorder.sd')
+    def test_probe_reports_failures(self, mock_sd):
+        """Test that a failing probe is reported instead of raised."""
+        from recorder import AudioRecorder
+
+        mock_sd.InputStream.side_effect = Exception('device busy')
+
+        recorder = AudioRecorder()
+
+        assert 'probe failed (device busy)' in recorder.probe_capture(seconds=0)
+
+
 class TestAudioRecorderStart:
     """Tests for AudioRecorder.start() method."""
 
@@ -194,7 +291,9 @@ class TestAudioRecorderStop:
 
         assert isinstance(result, np.ndarray)
         assert len(result) == 0
+        assert result.dtype == np.float32
 
+    @patch('recorder.config.AGC', False)
     @patch('recorder.sd')
     def test_stop_returns_concatenated_audio_data(self, mock_sd):
         """Test that stop() returns concatenated audio from queue."""
@@ -211,9 +310,213 @@ class TestAudioRecorderStop:
 
         result = recorder.stop()
 
-        expected = np.array([[0.1], [0.2], [0.3], [0.4]])
+        expected = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
         np.testing.assert_array_equal(result, expected)
 
+    @patch('recorder.sd')
+    def test_stop_returns_contiguous_1d_float32(self, mock_sd):
+        """Test that stop() hands over a contiguous 1-D float32 buffer."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.start()
+        recorder._callback(np.full((4, 1), 0.1, dtype=np.float32), 4, None, None)
+        recorder._callback(np.full((4, 1), 0.2, dtype=np.float32), 4, None, None)
+
+        result = recorder.stop()
+
+        assert result.shape == (8,)
+        assert result.dtype == np.float32
+        assert result.flags.c_contiguous
+
+    @patch('recorder.config.AGC', False)
+    @patch('recorder.sd')
+    def test_int16_mode_captures_and_stores_half_the_bytes(self, mock_sd):
+        """Test that int16 mode opens an int16 stream and returns int16 audio."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(dtype='int16')
+        recorder.preprocessor.trim_silence = False
+        recorder.start()
+        for _ in range(10):
+            recorder._callback(np.full((1600, 1), 8192, dtype=np.int16), 1600, None, None)
+        result = recorder.stop()
+
+        assert mock_sd.InputStream.call_args.kwargs['dtype'] == 'int16'
+        assert result.dtype == np.int16
+        assert result.nbytes == 16000 * 2
+        assert recorder.preprocessor.buffer.view().dtype == np.int16
+        assert recorder.last_stats.peak == pytest.approx(0.25)
+
+    @patch('recorder.config.SPILL_MB', 0.05)
+    @patch('recorder.config.AGC', False)
+    @patch('recorder.sd')
+    def test_long_recording_is_returned_from_spill_file(self, mock_sd):
+        """Test that recordings past V2T_SPILL_MB come back as a memmap view."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.preprocessor.trim_silence = False
+        recorder.start()
+        for _ in range(20):
+            recorder._callback(np.full((1600, 1), 0.2, dtype=np.float32), 1600, None, None)
+        result = recorder.stop()
+
+        assert isinstance(result, np.memmap)
+        assert len(result) == 32000
+        assert result[-1] == pytest.approx(0.2)
+
+    @patch('recorder.sd')
+    def test_int16_mode_scales_live_level(self, mock_sd):
+        """Test that the level meter treats int16 full scale as 1.0."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(dtype='int16')
+        recorder.recording = True
+        recorder._callback(np.full((160, 1), 3277, dtype=np.int16), 160, None, None)
+
+        assert recorder.get_current_level() == pytest.approx(0.8, rel=1e-3)
+
+    @patch('recorder.config.AGC', False)
+    @patch('recorder.sd')
+    def test_stop_keeps_first_channel_of_multichannel_audio(self, mock_sd):
+        """Test that stop() returns mono audio for multi-channel streams."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(channels=2)
+        recorder.start()
+        recorder.q.put(np.array([[0.1, 0.9], [0.2, 0.8]], dtype=np.float32))
+
+        result = recorder.stop()
+
+        np.testing.assert_array_equal(result, np.array([0.1, 0.2], dtype=np.float32))
+        assert result.flags.c_contiguous
+
+    @patch('recorder.sd')
+    def test_stop_allocates_one_buffer_per_utterance(self, mock_sd):
+        """Test that an utterance allocates roughly one copy of the recorded audio."""
+        import tracemalloc
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        block = np.full((1600, 1), 0.1, dtype=np.float32)
+        audio_bytes = 300 * block.nbytes
+
+        tracemalloc.start()
+        try:
+            recorder.start()
+            for _ in range(300):
+                recorder._callback(block, 1600, None, None)
+            result = recorder.stop()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert result.nbytes == audio_bytes
+        assert current < audio_bytes * 1.6
+        assert peak < audio_bytes * 3
+
+    @patch('recorder.config.AGC', False)
+    @patch('recorder.sd')
+    def test_stop_trims_silence_around_speech(self, mock_sd):
+        """Test that stop() trims leading/trailing silence detected while recording."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.preprocessor.trim_silence = True
+        recorder.preprocessor.pad_frames = 0
+        silence = np.zeros((1600, 1), dtype=np.float32)
+        speech = np.full((1600, 1), 0.2, dtype=np.float32)
+
+        recorder.start()
+        for block in (silence, silence, speech, speech, silence):
+            recorder._callback(block, 1600, None, None)
+        result = recorder.stop()
+
+        assert len(result) == 3200
+        assert recorder.last_stats.speech_start == 3200
+        assert recorder.last_stats.peak == pytest.approx(0.2)
+
+    @patch('recorder.config.AGC', True)
+    @patch('recorder.sd')
+    def test_stop_returns_gain_controlled_audio(self, mock_sd):
+        """Test that quiet audio is leveled by the AGC stage while recording."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.preprocessor.trim_silence = False
+        quiet = np.full((1600, 1), 0.01, dtype=np.float32)
+
+        recorder.start()
+        for _ in range(10):
+            recorder._callback(quiet, 1600, None, None)
+        result = recorder.stop()
+
+        assert len(result) == 16000
+        assert recorder.last_stats.gain_controlled is True
+        assert np.abs(result).max() == pytest.approx(0.1, rel=0.05)
+        # Peak is measured before AGC.
+        assert recorder.last_stats.peak == pytest.approx(0.01)
+
+    @patch('recorder.config.DENOISE', True)
+    @patch('recorder.sd')
+    def test_denoise_stage_runs_before_agc(self, mock_sd):
+        """Test that V2T_DENOISE inserts the spectral gate ahead of AGC."""
+        from recorder import AudioRecorder
+        from preprocess import AutomaticGainControl, SpectralGate
+
+        with patch('recorder.config.AGC', True):
+            recorder = AudioRecorder()
+
+        kinds = [type(stage) for stage in recorder.preprocessor.stages]
+        assert kinds == [SpectralGate, AutomaticGainControl]
+
+    @patch('recorder.sd')
+    def test_stop_resamples_to_16khz(self, mock_sd):
+        """Test that audio captured at another rate is handed over at 16 kHz."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(samplerate=48000)
+        recorder.start()
+        for _ in range(10):
+            recorder._callback(np.zeros((4800, 1), dtype=np.float32), 4800, None, None)
+        result = recorder.stop()
+
+        assert abs(len(result) - 16000) <= 1
+
+    @patch('recorder.config.NATIVE_RATE', True)
+    @patch('recorder.sd')
+    def test_native_rate_capture_resamples_to_16khz(self, mock_sd):
+        """Test that V2T_NATIVE_RATE captures at the device rate and resamples itself."""
+        from recorder import AudioRecorder
+        from preprocess import PolyphaseResampler
+
+        mock_sd.query_devices.return_value = {'name': 'USB Mic', 'default_samplerate': 48000.0}
+
+        recorder = AudioRecorder()
+        recorder.start()
+        for _ in range(10):
+            recorder._callback(np.zeros((4800, 1), dtype=np.float32), 4800, None, None)
+        result = recorder.stop()
+
+        assert mock_sd.InputStream.call_args.kwargs['samplerate'] == 48000
+        assert isinstance(recorder.preprocessor.stages[0], PolyphaseResampler)
+        assert len(result) == 16000
+
+    @patch('recorder.config.NATIVE_RATE', True)
+    @patch('recorder.sd')
+    def test_native_rate_falls_back_when_device_query_fails(self, mock_sd):
+        """Test that a failing device query keeps capturing at 16 kHz."""
+        from recorder import AudioRecorder
+        from preprocess import PolyphaseResampler
+
+        mock_sd.query_devices.side_effect = Exception("no device")
+
+        recorder = AudioRecorder()
+
+        assert recorder.samplerate == 16000
+        assert not any(isinstance(stage, PolyphaseResampler) for stage in recorder.preprocessor.stages)
+
     @patch('recorder.sd')
     def test_stop_returns_empty_array_when_queue_empty(self, mock_sd):
         """Test that stop() returns empty array when no audio recorded."""
@@ -339,6 +642,307 @@ class TestAudioRecorderCallback:
         assert queued_data[0, 0] != 999
 
 
+class TestAudioRecorderMultiChannel:
+    """Tests for multi-channel capture."""
+
+    @patch('recorder.config.CHANNELS', 4)
+    @patch('recorder.config.CHANNEL_MODE', 'mix')
+    @patch('recorder.sd')
+    def test_channels_from_config_add_selector(self, mock_sd):
+        """Test that V2T_CHANNELS opens N channels and adds a channel selector."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.start()
+
+        assert mock_sd.InputStream.call_args.kwargs['channels'] == 4
+        assert recorder.preprocessor.channel_selector.mode == 'mix'
+        assert recorder.preprocessor.channel_selector.channels == 4
+
+    @patch('recorder.config.AGC', False)
+    @patch('recorder.sd')
+    def test_multichannel_recording_is_returned_as_mono(self, mock_sd):
+        """Test that only one mono 16 kHz stream comes out of stop()."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(channels=2)
+        recorder.preprocessor.trim_silence = False
+        recorder.start()
+        block = np.zeros((1600, 2), dtype=np.float32)
+        block[:, 1] = 0.2
+        for _ in range(10):
+            recorder._callback(block, 1600, None, None)
+        result = recorder.stop()
+
+        assert result.shape == (16000,)
+
+    @patch('recorder.sd')
+    def test_single_channel_has_no_selector(self, mock_sd):
+        """Test that mono capture skips channel selection."""
+        from recorder import AudioRecorder
+
+        assert AudioRecorder().preprocessor.channel_selector is None
+
+
+class TestAudioRecorderDeviceMonitor:
+    """Tests for device caching and background stream handling."""
+
+    @patch('recorder.sd')
+    def test_device_info_is_cached(self, mock_sd):
+        """Test that the device name is not re-queried on every call."""
+        from recorder import AudioRecorder
+
+        mock_sd.query_devices.return_value = {'name': 'USB Mic'}
+
+        recorder = AudioRecorder()
+        recorder.get_input_device_info()
+        recorder.get_input_device_info()
+
+        mock_sd.query_devices.assert_called_once_with(kind='input')
+
+    @patch('recorder.sd')
+    def test_idle_tick_prepares_standby_stream_for_start(self, mock_sd):
+        """Test that start() uses the stream opened in the background."""
+        from recorder import AudioRecorder
+
+        mock_sd.query_devices.return_value = {'name': 'USB Mic', 'index': 1, 'default_samplerate': 48000.0}
+        recorder = AudioRecorder()
+        recorder._check_devices()
+        standby = mock_sd.InputStream.return_value
+        mock_sd.InputStream.reset_mock()
+
+        recorder.start()
+
+        mock_sd.InputStream.assert_not_called()
+        assert recorder.stream is standby
+        standby.start.assert_called_once()
+
+    @patch('recorder.sd')
+    def test_idle_tick_does_not_reinitialize_portaudio(self, mock_sd):
+        """Test that without V2T_DEVICE_POLL_S an idle tick only opens the standby stream and sleeps."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+
+        assert recorder._check_devices() is None
+        assert recorder._check_devices() is None
+
+        mock_sd._terminate.assert_not_called()
+        mock_sd.InputStream.assert_called_once()
+
+    @patch('recorder.sd')
+    def test_tick_waits_after_recording_activity(self, mock_sd):
+        """Test that a due periodic refresh does not re-initialize PortAudio right after a recording."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.devices.poll_interval = 60
+        recorder.devices._refreshed -= 60
+        recorder.start()
+        recorder.stop()
+
+        delay = recorder._check_devices()
+
+        mock_sd._terminate.assert_not_called()
+        assert 0 < delay <= recorder.DEVICE_SETTLE_SECONDS
+
+    @patch('recorder.config.NATIVE_RATE', True)
+    @patch('recorder.sd')
+    def test_device_change_reconfigures_native_rate(self, mock_sd):
+        """Test that plugging in a device with another native rate rebuilds the pipeline."""
+        from recorder import AudioRecorder
+
+        mock_sd.query_devices.return_value = {'name': 'Built-in', 'index': 0, 'default_samplerate': 48000.0}
+        recorder = AudioRecorder()
+        recorder.devices.poll_interval = 60
+        recorder.devices._refreshed -= 60
+        mock_sd.query_devices.return_value = {'name': 'Headset', 'index': 2, 'default_samplerate': 16000.0}
+
+        assert recorder._check_devices() == pytest.approx(60, abs=1)
+        mock_sd._terminate.assert_called_once()
+
+        from preprocess import PolyphaseResampler
+
+        assert recorder.samplerate == 16000
+        assert recorder.get_input_device_info() == 'Headset'
+        assert not any(isinstance(stage, PolyphaseResampler) for stage in recorder.preprocessor.stages)
+
+    @patch('recorder.sd')
+    def test_lost_stream_is_reopened_during_recording(self, mock_sd):
+        """Test that a stream whose device vanished is replaced without ending the recording."""
+        from recorder import AudioRecorder
+
+        lost = MagicMock()
+        lost.active = False
+        replacement = MagicMock()
+        mock_sd.InputStream.side_effect = [lost, replacement]
+
+        recorder = AudioRecorder()
+        recorder.start()
+        recorder._check_devices()
+
+        assert recorder.recording is True
+        assert recorder.stream is replacement
+        lost.close.assert_called_once()
+        replacement.start.assert_called_once()
+
+    @patch('recorder.sd')
+    def test_start_failure_reenumerates_and_retries(self, mock_sd):
+        """Test that a standby stream whose device vanished is replaced when start() fails."""
+        from recorder import AudioRecorder
+
+        stale = MagicMock()
+        stale.start.side_effect = RuntimeError("device unavailable")
+        fresh = MagicMock()
+        mock_sd.InputStream.side_effect = [stale, fresh]
+        recorder = AudioRecorder()
+        recorder._check_devices()
+
+        recorder.start()
+
+        mock_sd._terminate.assert_called_once()
+        stale.close.assert_called_once()
+        assert recorder.stream is fresh
+        assert recorder.recording is True
+
+    @patch('recorder.sd')
+    def test_start_uses_the_pipeline_of_a_concurrent_device_change(self, mock_sd):
+        """Test that a pipeline rebuilt by the monitor while start() waits for the lock is the one started."""
+        from devices import PORTAUDIO_LOCK
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        old = recorder.preprocessor
+        with PORTAUDIO_LOCK:
+            thread = threading.Thread(target=recorder.start)
+            thread.start()
+            thread.join(0.1)
+            # What _on_device_change does with V2T_NATIVE_RATE on the monitor thread.
+            recorder._configure(48000)
+        thread.join(5)
+        recorder.stop()
+
+        assert recorder.preprocessor is not old
+        assert old._thread is None
+        assert recorder.last_stats is recorder.preprocessor.stats
+
+    @patch('recorder.sd')
+    def test_session_totals_survive_reconfiguration(self, mock_sd):
+        """Test that the xrun and callback totals behind the Prometheus counters are kept across a rate change."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.callback_stats.record(512, "input overflow", 0.0, 0.001)
+        recorder._configure(48000)
+
+        assert recorder.callback_stats.total_xruns == 1
+        assert recorder.callback_stats.total_callbacks == 1
+        assert recorder.callback_stats.xruns == 0
+
+    @patch('recorder.config.NATIVE_RATE', True)
+    @patch('recorder.sd')
+    def test_start_failure_can_switch_to_the_new_device_rate(self, mock_sd):
+        """Test that a device change found when start() fails rebuilds the pipeline before it starts."""
+        from recorder import AudioRecorder
+
+        mock_sd.query_devices.return_value = {'name': 'Built-in', 'index': 0, 'default_samplerate': 48000.0}
+        stale = MagicMock()
+        stale.start.side_effect = RuntimeError("device unavailable")
+        mock_sd.InputStream.side_effect = [stale, MagicMock()]
+        recorder = AudioRecorder()
+        recorder._check_devices()
+        mock_sd.query_devices.return_value = {'name': 'Headset', 'index': 2, 'default_samplerate': 16000.0}
+
+        recorder.start()
+
+        assert recorder.samplerate == 16000
+        assert mock_sd.InputStream.call_args.kwargs['samplerate'] == 16000
+        assert recorder.preprocessor._thread is not None
+        recorder.stop()
+
+    @patch('recorder.sd')
+    def test_failed_start_leaves_recorder_idle(self, mock_sd):
+        """Test that a stream that cannot be started even after re-enumeration is reported."""
+        from recorder import AudioRecorder
+
+        mock_sd.InputStream.return_value.start.side_effect = RuntimeError("no input")
+        recorder = AudioRecorder()
+
+        with pytest.raises(RuntimeError):
+            recorder.start()
+
+        assert recorder.recording is False
+
+    @patch('recorder.sd')
+    def test_stream_lock_is_the_portaudio_lock(self, mock_sd):
+        """Test that stream changes share one lock with device queries and sounds."""
+        from devices import PORTAUDIO_LOCK
+        from recorder import AudioRecorder
+
+        assert AudioRecorder()._stream_lock is PORTAUDIO_LOCK
+
+
+class TestAudioRecorderCallbackHealth:
+    """Tests for callback health instrumentation."""
+
+    @patch('recorder.sd')
+    def test_callback_counts_status_instead_of_printing(self, mock_sd, capsys):
+        """Test that status flags are counted as xruns, not printed from the audio thread."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        status = MagicMock()
+        status.__bool__.return_value = True
+        status.input_overflow = True
+
+        recorder._callback(np.zeros((480, 1), dtype=np.float32), 480, None, status)
+
+        stats = recorder.get_callback_stats()
+        assert stats['xruns'] == 1
+        assert stats['input_overflows'] == 1
+        assert capsys.readouterr().out == ''
+
+    @patch('recorder.sd')
+    def test_stats_track_frames_per_recording(self, mock_sd):
+        """Test that start() begins a fresh count and stop() reports it."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder._callback(np.zeros((480, 1), dtype=np.float32), 480, None, None)
+        recorder.start()
+        for _ in range(3):
+            recorder._callback(np.zeros((480, 1), dtype=np.float32), 480, None, None)
+        recorder.stop()
+
+        stats = recorder.get_callback_stats()
+        assert stats['callbacks'] == 3
+        assert stats['frames'] == 1440
+        assert stats['total_callbacks'] == 4
+        assert 'duration_p50_ms' in stats
+
+    @pytest.mark.parametrize('dtype, value, level', [('float32', 0.05, 0.4), ('int16', 1638, 0.4)])
+    @patch('recorder.sd')
+    def test_level_meter_is_allocation_free(self, mock_sd, dtype, value, level):
+        """Test that the per-block meter allocates no audio-sized temporaries."""
+        import tracemalloc
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(dtype=dtype)
+        recorder.recording = True
+        block = np.full((4800, 1), value, dtype=dtype)
+        recorder._meter_rms(block)
+
+        tracemalloc.start()
+        try:
+            rms = recorder._meter_rms(block)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert rms * 8 == pytest.approx(level, rel=1e-3)
+        assert peak < block.nbytes // 10
+
+
 class TestAudioRecorderGetInputDeviceInfo:
     """Tests for AudioRecorder.get_input_device_info() method."""
 
@@ -367,3 +971,93 @@ class TestAudioRecorderGetInputDeviceInfo:
 
         assert "Unknown" in result
         assert "No device" in result
+
+
+class TestAudioRecorderSource:
+    """Tests for recording from a file source instead of the microphone."""
+
+    def make_source(self, seconds=1.0, rate=16000):
+        from sources import FileSource, SourceFactory, synthetic_speech
+
+        return SourceFactory(FileSource, synthetic_speech(seconds, samplerate=rate), rate, samplerate=rate, speed=0)
+
+    @patch('recorder.sd')
+    def test_records_file_through_callback(self, mock_sd):
+        """Test that a file source goes through the callback and pre-processing path."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(source=self.make_source())
+        recorder.start()
+        assert recorder.stream.finished.wait(5)
+        audio = recorder.stop()
+
+        mock_sd.InputStream.assert_not_called()
+        assert recorder.get_callback_stats()['frames'] >= 16000
+        assert 0 < len(audio) <= 16000 + recorder.blocksize
+        assert recorder.last_stats.peak > 0
+
+    @patch('recorder.sd')
+    def test_source_replaces_device_info_and_monitor(self, mock_sd):
+        """Test that a source is reported as the input and skips device monitoring."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder(source=self.make_source())
+        recorder.start_device_monitor()
+
+        assert recorder.get_input_device_info() == "FileSource (speed max)"
+        assert recorder.devices._thread is None
+        mock_sd.query_devices.assert_not_called()
+
+    @patch('recorder.config')
+    @patch('recorder.sd')
+    def test_native_rate_uses_source_rate(self, mock_sd, mock_config):
+        """Test that native-rate capture takes the file's own rate."""
+        from recorder import AudioRecorder
+
+        mock_config.NATIVE_RATE = True
+        mock_config.CAPTURE_PROFILE = "balanced"
+        mock_config.CAPTURE_DTYPE = ""
+        mock_config.CHANNELS = 1
+        mock_config.SPILL_MB = 0
+        mock_config.SPILL_DIR = None
+        mock_config.DENOISE = False
+        mock_config.DEVICE_POLL_SECONDS = 0
+
+        recorder = AudioRecorder(source=self.make_source(rate=48000))
+
+        assert recorder.samplerate == 48000
+
+    @patch('recorder.sd', None)
+    def test_missing_sounddevice_is_reported_on_open(self):
+        """Test that without sounddevice, opening the microphone raises a clear error."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+
+        with pytest.raises(RuntimeError):
+            recorder._open_stream(recorder._callback)
+
+
+class TestAudioRecorderSession:
+    """Tests for feeding the session flight recorder."""
+
+    @patch('recorder.sd')
+    def test_callback_copies_blocks_to_session(self, mock_sd):
+        """Test that recorded blocks and stream boundaries go to the session."""
+        from recorder import AudioRecorder
+
+        recorder = AudioRecorder()
+        recorder.session = Mock()
+        block = np.full((480, 1), 0.1, dtype=np.float32)
+
+        recorder._callback(block, 480, None, None)
+        recorder.session.audio.assert_not_called()
+
+        recorder.start()
+        recorder._callback(block, 480, None, None)
+        recorder.stop()
+
+        recorder.session.stream_started.assert_called_once_with(16000, 1, "float32")
+        recorder.session.audio.assert_called_once()
+        np.testing.assert_array_equal(recorder.session.audio.call_args[0][1], block)
+        recorder.session.stream_stopped.assert_called_once()
@@ -0,0 +1,107 @@
+"""Unit tests for session.py - session flight recorder file format."""
+
+import time
+
+import numpy as np
+import pytest
+
+
+class TestSessionRecorder:
+    """Tests for writing and reading session files."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that every record type is read back in order with its data."""
+        from session import SessionRecorder, read_session
+
+        path = tmp_path / "s.v2ts"
+        recorder = SessionRecorder(path, {"mode": "toggle"})
+        recorder.hotkey("press")
+        recorder.stream_started(16000, 2, "int16")
+        first = np.arange(320, dtype=np.int16).reshape(160, 2)
+        recorder.audio(time.perf_counter(), first, False)
+        recorder.audio(time.perf_counter() + 0.01, first + 1, True)
+        recorder.stream_stopped()
+        recorder.overlay("transcribing")
+        recorder.timing("decode", 123.5)
+        recorder.close()
+
+        session = read_session(path)
+
+        assert session.metadata["mode"] == "toggle"
+        assert "started" in session.metadata
+        assert [kind for _, kind, _ in session.events] == ["hotkey", "stream", "stream", "overlay", "timing"]
+        assert session.hotkeys()[0][1] == "press"
+        assert session.timings() == {"decode": [123.5]}
+        recording = session.recordings[0]
+        assert (recording["samplerate"], recording["channels"], recording["dtype"]) == (16000, 2, "int16")
+        (t0, block0, overflow0), (t1, block1, overflow1) = recording["blocks"]
+        np.testing.assert_array_equal(block0, first)
+        np.testing.assert_array_equal(block1, first + 1)
+        assert (overflow0, overflow1) == (False, True)
+        assert t0 == 0.0
+        assert t1 == pytest.approx(0.01, abs=0.005)
+
+    def test_truncated_file_keeps_complete_records(self, tmp_path):
+        """Test that a file cut off mid-record (e.g. by a crash) still reads."""
+        from session import SessionRecorder, read_session
+
+        path = tmp_path / "s.v2ts"
+        recorder = SessionRecorder(path)
+        recorder.hotkey("press")
+        recorder.timing("decode", 5.0)
+        recorder.close()
+        path.write_bytes(path.read_bytes()[:-3])
+
+        session = read_session(path)
+
+        assert session.hotkeys()[0][1] == "press"
+        assert session.timings() == {}
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a file without the session magic is rejected."""
+        from session import read_session
+
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"RIFF0000WAVE")
+
+        with pytest.raises(ValueError):
+            read_session(path)
+
+    def test_session_path_uses_start_time(self, tmp_path):
+        """Test that session files are named after the local start time."""
+        from session import session_path
+
+        path = session_path(str(tmp_path))
+
+        assert path.startswith(str(tmp_path))
+        assert path.endswith(".v2ts")
+        assert time.strftime("%Y%m%d") in path
+
+
+class TestReplay:
+    """Tests for replaying a session through VoiceToTextApp."""
+
+    def test_replays_hotkeys_and_audio(self, tmp_path):
+        """Test that replay drives the app through the recorded recordings and overlay states."""
+        from replay import replay
+        from session import SessionRecorder, read_session
+
+        path = tmp_path / "s.v2ts"
+        recorder = SessionRecorder(path, {"mode": "push_to_talk", "profile": "balanced"})
+        for _ in range(2):
+            recorder.hotkey("press")
+            recorder.stream_started(16000, 1, "float32")
+            for index in range(10):
+                block = np.full((480, 1), 0.2 if 2 < index < 8 else 0.0, dtype=np.float32)
+                recorder.audio(time.perf_counter(), block, False)
+            recorder.stream_stopped()
+            recorder.hotkey("release")
+        recorder.close()
+
+        output = replay(read_session(path), speed=0, decode=False, output=str(tmp_path / "replay.v2ts"))
+        replayed = read_session(output)
+
+        assert [action for _, action in replayed.hotkeys()] == ["press", "release"] * 2
+        assert len(replayed.recordings) == 2
+        assert sum(len(block) for _, block, _ in replayed.recordings[1]["blocks"]) == 4800
+        assert set(replayed.timings()) >= {"recorder_stop", "decode", "inject"}
@@ -51,3 +51,17 @@ class TestSoundsPackageExports:
         """Package should export SOUND_PROVIDERS dict."""
         from sounds import SOUND_PROVIDERS
         assert isinstance(SOUND_PROVIDERS, dict)
+
+    def test_sounds_hold_the_portaudio_lock(self, monkeypatch):
+        """Sounds should play while holding the lock shared with the recorder."""
+        import sounds
+        from devices import PORTAUDIO_LOCK
+
+        held = []
+        monkeypatch.setattr(sounds._provider, "play_start", lambda: held.append(PORTAUDIO_LOCK._is_owned()))
+        monkeypatch.setattr(sounds._provider, "play_stop", lambda: held.append(PORTAUDIO_LOCK._is_owned()))
+
+        sounds.play_start_sound()
+        sounds.play_stop_sound()
+
+        assert held == [True, True]
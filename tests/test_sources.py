@@ -0,0 +1,192 @@
+"""Unit tests for sources.py - file, synthetic and replay audio sources."""
+
+import threading
+
+import numpy as np
+import pytest
+
+
+def collect(source_class, *args, **kwargs):
+    """Run a source at full speed until it finishes; return the delivered blocks and statuses."""
+    blocks = []
+    statuses = []
+
+    def callback(indata, frames, time_info, status):
+        blocks.append(indata.copy())
+        statuses.append(status)
+
+    source = source_class(*args, speed=0, callback=callback, **kwargs)
+    source.start()
+    assert source.finished.wait(5)
+    source.stop()
+    return source, blocks, statuses
+
+
+class TestFileSource:
+    """Tests for FileSource."""
+
+    def test_delivers_audio_in_blocks(self):
+        """Test that the whole recording is delivered in blocksize blocks, padded at the end."""
+        from sources import FileSource
+
+        audio = np.linspace(-0.5, 0.5, 1000, dtype=np.float32)
+        source, blocks, statuses = collect(FileSource, audio, 16000, blocksize=160)
+
+        assert [len(block) for block in blocks] == [160] * 7
+        assert all(block.shape == (160, 1) for block in blocks)
+        np.testing.assert_array_equal(np.concatenate(blocks)[:1000, 0], audio)
+        assert not np.any(np.concatenate(blocks)[1000:])
+        assert not any(statuses)
+        assert not source.active
+
+    def test_resamples_to_requested_rate(self):
+        """Test that a 48 kHz recording is delivered at 16 kHz."""
+        from sources import FileSource
+
+        t = np.arange(48000) / 48000
+        audio = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+        _, blocks, _ = collect(FileSource, audio, 48000, samplerate=16000, blocksize=160)
+
+        delivered = np.concatenate(blocks)[:, 0]
+        assert 16000 <= len(delivered) < 16160
+        assert np.max(np.abs(delivered[1000:15000])) == pytest.approx(1.0, abs=0.02)
+
+    def test_converts_format_and_channels(self):
+        """Test int16 delivery with the mono file repeated on every channel."""
+        from sources import FileSource
+
+        audio = np.full(320, 0.5, dtype=np.float32)
+        _, blocks, _ = collect(FileSource, audio, 16000, channels=2, dtype="int16", blocksize=160)
+
+        assert blocks[0].dtype == np.int16
+        assert blocks[0].shape == (160, 2)
+        assert np.all(blocks[0] == 16384)
+
+    def test_real_time_pacing(self):
+        """Test that speed=1 paces blocks at the block period and keeps delivering silence."""
+        import time
+        from sources import FileSource
+
+        calls = []
+        done = threading.Event()
+
+        def callback(indata, frames, time_info, status):
+            calls.append(indata.copy())
+            if len(calls) == 8:
+                done.set()
+
+        source = FileSource(np.ones(800, dtype=np.float32), 16000, blocksize=160, callback=callback)
+        started = time.perf_counter()
+        source.start()
+        assert done.wait(5)
+        elapsed = time.perf_counter() - started
+        source.stop()
+
+        # 8 blocks of 10 ms: the 8th is due 70 ms after the first.
+        assert elapsed >= 0.06
+        assert source.finished.is_set()
+        assert not np.any(calls[7])
+
+    def test_stop_and_restart_resumes(self):
+        """Test that start() after stop() continues where the source left off."""
+        from sources import FileSource
+
+        blocks = []
+        source = FileSource(
+            np.arange(1600, dtype=np.float32) / 1600, 16000, blocksize=160, speed=0,
+            callback=lambda indata, *args: blocks.append(indata.copy()),
+        )
+        source.start()
+        source.finished.wait(5)
+        source.stop()
+        source.start()
+        source.stop()
+
+        assert len(blocks) == 10
+
+
+class TestReplaySource:
+    """Tests for ReplaySource and the capture file format."""
+
+    def make_blocks(self):
+        return [
+            (0.0, np.full((160, 1), 0.1, dtype=np.float32), False),
+            (0.01, np.full((160, 1), 0.2, dtype=np.float32), True),
+            (0.05, np.full((80, 1), 0.3, dtype=np.float32), False),
+        ]
+
+    def test_replays_blocks_and_status(self):
+        """Test that blocks are replayed as captured, including sizes and overflow flags."""
+        from sources import ReplaySource
+
+        _, blocks, statuses = collect(ReplaySource, self.make_blocks(), 16000)
+
+        assert [len(block) for block in blocks] == [160, 160, 80]
+        assert [bool(status) for status in statuses] == [False, True, False]
+        assert statuses[1].input_overflow
+        assert blocks[2][0, 0] == pytest.approx(0.3)
+
+    def test_capture_rate_wins_over_requested(self):
+        """Test that the capture's rate and format are kept."""
+        from sources import ReplaySource
+
+        source = ReplaySource(self.make_blocks(), 48000, samplerate=16000, dtype="int16")
+
+        assert source.samplerate == 48000
+        assert source.dtype == np.float32
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test that save_capture() output loads back into the same blocks."""
+        from sources import ReplaySource, save_capture
+
+        path = tmp_path / "capture.npz"
+        save_capture(path, 16000, self.make_blocks())
+        source = ReplaySource.load(path)
+
+        assert source.samplerate == 16000
+        assert [offset for offset, _, _ in source.blocks] == [0.0, 0.01, 0.05]
+        assert [overflow for _, _, overflow in source.blocks] == [False, True, False]
+        np.testing.assert_array_equal(source.blocks[2][1], self.make_blocks()[2][1])
+
+
+class TestFromSpec:
+    """Tests for V2T_AUDIO_SOURCE parsing."""
+
+    def test_microphone(self):
+        """Test that an empty spec or 'mic' means the live microphone."""
+        from sources import from_spec
+
+        assert from_spec("") is None
+        assert from_spec("mic") is None
+
+    def test_synthetic(self):
+        """Test that 'synthetic:SECONDS' opens a FileSource of that length."""
+        from sources import FileSource, from_spec
+
+        factory = from_spec("synthetic:2", speed=0)
+        source = factory(samplerate=16000, channels=1, dtype="float32", blocksize=160, latency=0.06, callback=None)
+
+        assert isinstance(source, FileSource)
+        assert len(source.audio) == 32000
+        assert source.speed == 0
+        assert factory.samplerate == 16000
+        assert "Synthetic" in factory.describe()
+
+    def test_replay(self, tmp_path):
+        """Test that 'replay:PATH' loads a saved capture."""
+        from sources import ReplaySource, from_spec, save_capture
+
+        path = tmp_path / "capture.npz"
+        save_capture(path, 48000, [(0.0, np.zeros((480, 1), dtype=np.float32), False)])
+        factory = from_spec(f"replay:{path}")
+        source = factory(samplerate=48000, channels=1, dtype="float32", blocksize=480, latency=0.06, callback=None)
+
+        assert isinstance(source, ReplaySource)
+        assert factory.samplerate == 48000
+
+    def test_unknown_spec_raises(self):
+        """Test that an unknown source kind is rejected."""
+        from sources import from_spec
+
+        with pytest.raises(ValueError):
+            from_spec("tape:/dev/st0")
@@ -0,0 +1,206 @@
+"""Unit tests for tracing.py - utterance trace ring and slow-utterance dumps."""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+
+class TestUtteranceTrace:
+    """Tests for UtteranceTrace."""
+
+    def test_stages_accumulate(self):
+        """Test that repeated stages add up and latency is measured from release."""
+        from tracing import UtteranceTrace
+
+        trace = UtteranceTrace(1, released=10.0)
+        trace.add("decode", 100.0)
+        trace.add("decode", 50.0)
+        assert trace.latency_ms is None
+
+        trace.finished = 10.4
+
+        assert trace.stages == {"decode": 150.0}
+        assert trace.latency_ms == pytest.approx(400.0)
+        assert trace.to_dict()["stages_ms"] == {"decode": 150.0}
+
+
+class TestTraceRecorder:
+    """Tests for TraceRecorder."""
+
+    def test_ring_is_bounded(self):
+        """Test that only the last `capacity` traces are kept, oldest first."""
+        from tracing import TraceRecorder
+
+        recorder = TraceRecorder(capacity=3)
+        for _ in range(5):
+            recorder.finish(recorder.start())
+
+        assert [trace["id"] for trace in recorder.recent()] == [3, 4, 5]
+
+    def test_fast_utterance_is_not_dumped(self, tmp_path):
+        """Test that utterances within the SLO leave no files."""
+        from tracing import TraceRecorder
+
+        recorder = TraceRecorder(slo_ms=10_000, dump_dir=str(tmp_path))
+
+        assert recorder.finish(recorder.start(), np.zeros(160, dtype=np.float32)) is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_slow_utterance_dumps_audio_and_traces(self, tmp_path):
+        """Test that an SLO breach writes the audio and the trace with recent history."""
+        from tracing import TraceRecorder
+
+        recorder = TraceRecorder(slo_ms=50, dump_dir=str(tmp_path / "slow"))
+        recorder.finish(recorder.start())
+        trace = recorder.start(released=time.perf_counter() - 0.2)
+        trace.add("decode", 180.0)
+        trace.model = "small.en"
+        trace.queue_depth = 2
+
+        path = recorder.finish(trace, np.full(1600, 0.1, dtype=np.float32))
+
+        report = json.loads(open(path).read())
+        assert report["slo_ms"] == 50
+        assert report["trace"]["id"] == 2
+        assert report["trace"]["latency_ms"] >= 200
+        assert report["trace"]["stages_ms"] == {"decode": 180.0}
+        assert report["trace"]["queue_depth"] == 2
+        assert [entry["id"] for entry in report["recent"]] == [1, 2]
+        assert (tmp_path / "slow" / path.rsplit("/", 1)[1].replace(".json", ".wav")).exists()
+        assert recorder.dumps == 1
+
+    def test_dumps_disabled_without_slo(self, tmp_path):
+        """Test that slo_ms=0 never dumps."""
+        from tracing import TraceRecorder
+
+        recorder = TraceRecorder(slo_ms=0, dump_dir=str(tmp_path))
+        trace = recorder.start(released=time.perf_counter() - 10)
+
+        assert recorder.finish(trace, np.zeros(16, dtype=np.float32)) is None
+
+
+def make_trace(utterance_id=1):
+    from tracing import UtteranceTrace
+
+    trace = UtteranceTrace(utterance_id, released=100.0)
+    trace.span("recorder_stop", 100.0, 100.01)
+    trace.span("decode", 100.02, 100.3)
+    trace.finished = 100.35
+    return trace
+
+
+class TestSpans:
+    """Tests for utterance IDs and spans."""
+
+    def test_span_ids_and_offsets(self):
+        """Test that traces get unique 128-bit IDs and spans are relative to the release."""
+        trace = make_trace()
+        data = trace.to_dict()
+
+        assert len(data["trace_id"]) == 32
+        assert data["trace_id"] != make_trace().trace_id
+        assert data["spans"][1]["name"] == "decode"
+        assert data["spans"][1]["start_ms"] == pytest.approx(20.0)
+        assert data["spans"][1]["duration_ms"] == pytest.approx(280.0)
+        assert data["stages_ms"]["decode"] == pytest.approx(280.0)
+
+
+class TestJsonlExporter:
+    """Tests for the rotating JSONL trace file."""
+
+    def test_appends_one_line_per_utterance(self, tmp_path):
+        """Test that each finished trace becomes one JSON line."""
+        from tracing import JsonlExporter, TraceRecorder
+
+        exporter = JsonlExporter(str(tmp_path / "traces.jsonl"))
+        recorder = TraceRecorder(exporters=[exporter])
+        for _ in range(2):
+            recorder.finish(recorder.start())
+        exporter.close()
+
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2]
+
+    def test_rotates_by_size(self, tmp_path):
+        """Test that the file rotates into numbered backups."""
+        from tracing import JsonlExporter
+
+        exporter = JsonlExporter(str(tmp_path / "traces.jsonl"), max_bytes=600, backups=2)
+        for index in range(10):
+            exporter.export(make_trace(index))
+        exporter.close()
+
+        names = sorted(path.name for path in tmp_path.iterdir())
+        assert names == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+
+    def test_export_errors_do_not_break_finish(self):
+        """Test that a failing exporter is reported, not raised."""
+        from tracing import TraceRecorder
+
+        class Broken:
+            def export(self, trace):
+                raise OSError("disk full")
+
+        recorder = TraceRecorder(exporters=[Broken()])
+        recorder.finish(recorder.start())
+
+        assert len(recorder.recent()) == 1
+
+
+class TestOtlpExporter:
+    """Tests for the OTLP/HTTP JSON payload."""
+
+    def test_payload_has_root_and_child_spans(self):
+        """Test that spans share the trace ID and hang off an utterance root span."""
+        from tracing import OtlpExporter
+
+        trace = make_trace()
+        payload = OtlpExporter("http://localhost:4318/v1/traces").payload(trace)
+
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        root = spans[0]
+        assert [span["name"] for span in spans] == ["utterance", "recorder_stop", "decode"]
+        assert {span["traceId"] for span in spans} == {trace.trace_id}
+        assert all(span["parentSpanId"] == root["spanId"] for span in spans[1:])
+        duration = int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])
+        assert duration == pytest.approx(350e6, rel=1e-3)
+
+    def test_exporters_from_config(self, tmp_path):
+        """Test that only the configured exporters are created."""
+        from tracing import JsonlExporter, OtlpExporter, exporters_from_config
+
+        assert exporters_from_config("", "") == []
+        exporters = exporters_from_config(str(tmp_path / "t.jsonl"), "http://localhost:4318/v1/traces")
+        assert [type(exporter) for exporter in exporters] == [JsonlExporter, OtlpExporter]
+        exporters[0].close()
+
+
+class TestTraceStats:
+    """Tests for the trace_stats.py summary."""
+
+    def test_summarizes_spans_in_pipeline_order(self, tmp_path):
+        """Test percentiles per span, in pipeline order, with the total last."""
+        from trace_stats import read_traces, summarize
+
+        path = tmp_path / "traces.jsonl"
+        lines = [json.dumps(make_trace(index).to_dict()) for index in range(4)]
+        path.write_text("\n".join(lines) + "\n{\"truncated\n")
+
+        rows = summarize(read_traces([str(path)]))
+
+        assert [row[0] for row in rows] == ["recorder_stop", "decode", "total"]
+        name, count, p50, p95, p99, maximum = rows[1]
+        assert count == 4
+        assert p50 == pytest.approx(280.0)
+        assert rows[2][2] == pytest.approx(350.0)
+
+    def test_trace_files_include_backups_oldest_first(self, tmp_path):
+        """Test that rotated backups are read before the current file."""
+        from trace_stats import trace_files
+
+        for name in ("t.jsonl", "t.jsonl.1", "t.jsonl.2"):
+            (tmp_path / name).write_text("")
+
+        assert [p.rsplit("/", 1)[1] for p in trace_files(str(tmp_path / "t.jsonl"))] == ["t.jsonl.2", "t.jsonl.1", "t.jsonl"]
@@ -79,6 +79,38 @@ class TestAudioTranscriberGetModelName:
         assert result == "medium.en"
 
 
+class TestAudioTranscriberGetThreadCount:
+    """Tests for AudioTranscriber.get_thread_count() method."""
+
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile')
+    @patch('transcriber.os.path.exists')
+    def test_reads_thread_count_from_model_params(self, mock_exists, mock_isfile, mock_model, mock_config):
+        """Test that the decoder thread count comes from the model parameters."""
+        mock_isfile.return_value = False
+        mock_exists.return_value = False
+        mock_model.return_value.get_params.return_value = {"n_threads": 4}
+
+        from transcriber import AudioTranscriber
+
+        assert AudioTranscriber().get_thread_count() == 4
+
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile')
+    @patch('transcriber.os.path.exists')
+    def test_unknown_thread_count_is_none(self, mock_exists, mock_isfile, mock_model, mock_config):
+        """Test that a binding without get_params() reports None."""
+        mock_isfile.return_value = False
+        mock_exists.return_value = False
+        mock_model.return_value.get_params.side_effect = AttributeError
+
+        from transcriber import AudioTranscriber
+
+        assert AudioTranscriber().get_thread_count() is None
+
+
 class TestAudioTranscriberTranscribe:
     """Tests for AudioTranscriber.transcribe() method."""
 
@@ -175,7 +207,7 @@ class TestAudioTranscriberTranscribe:
         transcriber.transcribe(quiet_audio)
 
         call_args = mock_model_instance.transcribe.call_args[0][0]
-        assert np.max(np.abs(call_args)) > np.max(np.abs(quiet_audio))
+        assert np.max(np.abs(call_args)) == pytest.approx(0.5)
 
     @patch('transcriber.config')
     @patch('transcriber.Model')
@@ -271,3 +303,322 @@ class TestAudioTranscriberTranscribe:
 
         call_args = mock_model_instance.transcribe.call_args[0][0]
         np.testing.assert_array_almost_equal(call_args, loud_audio)
+
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile')
+    @patch('transcriber.os.path.exists')
+    def test_transcribe_normalizes_recorder_buffer_in_place(self, mock_exists, mock_isfile, mock_model, mock_config):
+        """Test that a contiguous 1-D float32 buffer is passed through without copies."""
+        mock_config.MODEL = "tiny.en"
+        mock_isfile.return_value = False
+        mock_exists.return_value = False
+
+        mock_model_instance = MagicMock()
+        mock_model_instance.transcribe.return_value = []
+        mock_model.return_value = mock_model_instance
+
+        from transcriber import AudioTranscriber
+
+        transcriber = AudioTranscriber()
+
+        audio = np.array([0.01, -0.02, 0.04], dtype=np.float32)
+        transcriber.transcribe(audio)
+
+        call_args = mock_model_instance.transcribe.call_args[0][0]
+        assert call_args is audio
+        np.testing.assert_array_almost_equal(audio, [0.125, -0.25, 0.5])
+
+
+class TestPrepareAudio:
+    """Tests for the zero-copy prepare_audio() helper."""
+
+    def test_mono_column_is_flattened_as_view(self):
+        """Test that a contiguous (n, 1) float32 array is flattened without a copy."""
+        from transcriber import prepare_audio
+
+        audio = np.full((4, 1), 0.6, dtype=np.float32)
+
+        result = prepare_audio(audio)
+
+        assert result.shape == (4,)
+        assert np.shares_memory(result, audio)
+
+    def test_non_float32_input_is_copied_once(self):
+        """Test that other dtypes are converted to contiguous float32."""
+        from transcriber import prepare_audio
+
+        audio = np.array([[0.6], [0.7]], dtype=np.float64)
+
+        result = prepare_audio(audio)
+
+        assert result.dtype == np.float32
+        assert result.flags.c_contiguous
+        assert not np.shares_memory(result, audio)
+
+    def test_read_only_input_is_not_modified(self):
+        """Test that read-only buffers are copied instead of normalized in place."""
+        from transcriber import prepare_audio
+
+        audio = np.array([0.1, 0.2], dtype=np.float32)
+        audio.flags.writeable = False
+
+        result = prepare_audio(audio)
+
+        np.testing.assert_array_almost_equal(audio, [0.1, 0.2])
+        np.testing.assert_array_almost_equal(result, [0.25, 0.5])
+
+    def test_silence_is_left_untouched(self):
+        """Test that all-zero audio is not scaled."""
+        from transcriber import prepare_audio
+
+        audio = np.zeros(8, dtype=np.float32)
+
+        result = prepare_audio(audio)
+
+        assert not np.any(result)
+
+    def test_known_peak_skips_scan(self):
+        """Test that a peak tracked while recording is used for normalization."""
+        from transcriber import prepare_audio
+
+        audio = np.array([0.1, 0.2], dtype=np.float32)
+
+        result = prepare_audio(audio, peak=0.4)
+
+        np.testing.assert_array_almost_equal(result, [0.125, 0.25])
+
+    def test_normalize_false_leaves_audio_unchanged(self):
+        """Test that AGC-leveled audio is not peak-normalized again."""
+        from transcriber import prepare_audio
+
+        audio = np.array([0.1, 0.2], dtype=np.float32)
+
+        result = prepare_audio(audio, normalize=False)
+
+        np.testing.assert_array_almost_equal(result, [0.1, 0.2])
+
+    def test_int16_input_is_converted_and_normalized_in_one_step(self):
+        """Test that int16 PCM becomes float32 scaled to a 0.5 peak."""
+        from transcriber import prepare_audio
+
+        audio = np.array([3277, -1638], dtype=np.int16)
+
+        result = prepare_audio(audio)
+
+        assert result.dtype == np.float32
+        assert result.flags.c_contiguous
+        np.testing.assert_allclose(result, [0.5, -1638 / 3277 * 0.5], rtol=1e-4)
+
+    def test_int16_input_uses_known_peak(self):
+        """Test that a peak in float units is honoured for int16 input."""
+        from transcriber import prepare_audio
+
+        audio = np.array([8192, 0], dtype=np.int16)
+
+        result = prepare_audio(audio, peak=0.4)
+
+        np.testing.assert_allclose(result, [0.25 * 0.5 / 0.4, 0.0], rtol=1e-6)
+
+    def test_int16_input_without_normalization_is_scaled_to_full_scale(self):
+        """Test that normalize=False only converts int16 to [-1, 1) float32."""
+        from transcriber import prepare_audio
+
+        audio = np.array([16384, -32768], dtype=np.int16)
+
+        result = prepare_audio(audio, normalize=False)
+
+        np.testing.assert_array_equal(result, [0.5, -1.0])
+
+    def test_normalization_allocates_no_audio_sized_buffers(self):
+        """Test that preparing recorder output allocates far less than the audio itself."""
+        import tracemalloc
+        from transcriber import prepare_audio
+
+        audio = np.full(16000 * 30, 0.05, dtype=np.float32)
+
+        tracemalloc.start()
+        try:
+            prepare_audio(audio)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert peak < audio.nbytes // 100
+
+
+class TestRealTimeFactorMonitor:
+    """Tests for RealTimeFactorMonitor."""
+
+    def test_record_returns_rtf(self):
+        """Test that record returns decode time divided by audio duration."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor()
+
+        assert monitor.record("small.en", 1.0, 4.0) == pytest.approx(0.25)
+
+    def test_record_ignores_short_clips(self):
+        """Test that clips shorter than the minimum are not counted."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor()
+
+        assert monitor.record("small.en", 0.5, 0.2) is None
+        assert monitor.rolling("small.en") is None
+
+    def test_rolling_is_mean_over_window(self):
+        """Test that rolling RTF only covers the last window of utterances."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(window=2)
+        monitor.record("small.en", 4.0, 2.0)
+        monitor.record("small.en", 1.0, 2.0)
+        monitor.record("small.en", 2.0, 2.0)
+
+        assert monitor.rolling("small.en") == pytest.approx(0.75)
+
+    def test_should_downgrade_requires_full_window_above_threshold(self):
+        """Test that a single slow decode does not trigger a downgrade."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(downgrade_rtf=1.0, window=3)
+        monitor.record("small.en", 4.0, 2.0)
+        monitor.record("small.en", 4.0, 2.0)
+        assert monitor.should_downgrade("small.en") is False
+
+        monitor.record("small.en", 1.0, 2.0)
+        assert monitor.should_downgrade("small.en") is False
+
+    def test_should_downgrade_when_rtf_stays_high(self):
+        """Test that a window of slow decodes triggers a downgrade."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(downgrade_rtf=1.0, window=2)
+        monitor.record("small.en", 4.0, 2.0)
+        monitor.record("small.en", 3.0, 2.0)
+
+        assert monitor.should_downgrade("small.en") is True
+
+    def test_should_upgrade_scales_by_rtf_at_switch(self):
+        """Test that the upgrade estimate scales by both models' RTF around the switch."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(upgrade_rtf=0.5, window=1)
+        monitor.record("small.en", 4.0, 2.0)
+        monitor.switched("small.en", "base.en")
+        # Same load: base.en runs 4x faster than small.en.
+        monitor.record("base.en", 1.0, 2.0)
+        assert monitor.should_upgrade("base.en", "small.en") is False
+
+        # Load drops by 10x on base.en, so small.en is estimated at 0.2.
+        monitor.record("base.en", 0.1, 2.0)
+
+        assert monitor.estimate("base.en", "small.en") == pytest.approx(0.2)
+        assert monitor.should_upgrade("base.en", "small.en") is True
+
+    def test_should_upgrade_without_switch_history(self):
+        """Test that no upgrade is suggested before any switch happened."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(window=1)
+        monitor.record("base.en", 0.1, 2.0)
+
+        assert monitor.should_upgrade("base.en", "small.en") is False
+
+    def test_switched_starts_fresh_window(self):
+        """Test that switching forgets stale measurements of the new model."""
+        from transcriber import RealTimeFactorMonitor
+
+        monitor = RealTimeFactorMonitor(window=1)
+        monitor.record("base.en", 4.0, 2.0)
+        monitor.switched("small.en", "base.en")
+
+        assert monitor.rolling("base.en") is None
+        assert monitor.should_downgrade("base.en") is False
+
+
+class TestAudioTranscriberModelSwitching:
+    """Tests for automatic model downgrade and upgrade."""
+
+    def _make_transcriber(self, mock_config, mock_model, fallback="base.en"):
+        mock_config.MODEL = "small.en"
+        mock_config.FALLBACK_MODEL = fallback
+        mock_config.RTF_DOWNGRADE = 1.0
+        mock_config.RTF_UPGRADE = 0.5
+        mock_config.RTF_WINDOW = 1
+
+        segment = MagicMock()
+        segment.text = "hello"
+        mock_model.return_value.transcribe.return_value = [segment]
+
+        from transcriber import AudioTranscriber
+
+        return AudioTranscriber()
+
+    @patch('transcriber.time.perf_counter')
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile', return_value=False)
+    @patch('transcriber.os.path.exists', return_value=False)
+    def test_downgrades_to_fallback_when_slow(
+        self, mock_exists, mock_isfile, mock_model, mock_config, mock_clock
+    ):
+        """Test that a slow decode loads the fallback model and switches to it."""
+        transcriber = self._make_transcriber(mock_config, mock_model)
+        mock_clock.side_effect = [0.0, 0.0, 0.0, 4.0]
+
+        with patch('transcriber.threading.Thread') as mock_thread:
+            transcriber.transcribe(np.zeros(32000, dtype=np.float32))
+            target = mock_thread.call_args.kwargs['target']
+        target()
+
+        assert mock_model.call_args[0][0] == "base.en"
+        assert transcriber.get_active_model_name() == "base.en"
+        assert transcriber.get_model_name() == "small.en"
+
+    @patch('transcriber.time.perf_counter')
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile', return_value=False)
+    @patch('transcriber.os.path.exists', return_value=False)
+    def test_does_not_downgrade_without_fallback(
+        self, mock_exists, mock_isfile, mock_model, mock_config, mock_clock
+    ):
+        """Test that no switch happens when no fallback model is configured."""
+        transcriber = self._make_transcriber(mock_config, mock_model, fallback="")
+        mock_clock.side_effect = [0.0, 0.0, 0.0, 4.0]
+
+        with patch('transcriber.threading.Thread') as mock_thread:
+            transcriber.transcribe(np.zeros(32000, dtype=np.float32))
+
+        mock_thread.assert_not_called()
+        assert transcriber.get_active_model_name() == "small.en"
+
+    @patch('transcriber.time.perf_counter')
+    @patch('transcriber.config')
+    @patch('transcriber.Model')
+    @patch('transcriber.os.path.isfile', return_value=False)
+    @patch('transcriber.os.path.exists', return_value=False)
+    def test_upgrades_back_when_headroom_returns(
+        self, mock_exists, mock_isfile, mock_model, mock_config, mock_clock
+    ):
+        """Test that the configured model is restored once load drops."""
+        transcriber = self._make_transcriber(mock_config, mock_model)
+        audio = np.zeros(32000, dtype=np.float32)
+        # A slow decode (RTF 2.0) switches down.
+        mock_clock.side_effect = [0.0, 0.0, 0.0, 4.0]
+        with patch('transcriber.threading.Thread') as mock_thread:
+            transcriber.transcribe(audio)
+            mock_thread.call_args.kwargs['target']()
+        assert transcriber.get_active_model_name() == "base.en"
+
+        # base.en under the same load (RTF 0.5 -> small.en estimated 2.0) stays down.
+        mock_clock.side_effect = [0.0, 0.0, 0.0, 1.0]
+        transcriber.transcribe(audio)
+        assert transcriber.get_active_model_name() == "base.en"
+
+        # base.en idle (RTF 0.05 -> small.en estimated 0.2) switches back up.
+        mock_clock.side_effect = [0.0, 0.0, 0.0, 0.1]
+        transcriber.transcribe(audio)
+        assert transcriber.get_active_model_name() == "small.en"
@@ -0,0 +1,207 @@
+"""Unit tests for workers.py - dispatching utterances to remote workers over TCP."""
+
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def workers():
+    """Start worker servers on free localhost ports; yields a start(transcriber) function."""
+    from workers import WorkerServer
+
+    started = []
+
+    def start(transcriber):
+        server = WorkerServer(transcriber, "127.0.0.1:0").start()
+        started.append(server)
+        return server, "%s:%d" % server.address
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return "127.0.0.1:%d" % sock.getsockname()[1]
+
+
+class TestParseAddress:
+    """Tests for worker address parsing."""
+
+    def test_forms(self):
+        """Test HOST:PORT, PORT, HOST and bracketed IPv6 addresses."""
+        from workers import DEFAULT_PORT, parse_address
+
+        assert parse_address("studio.lan:7000") == ("studio.lan", 7000)
+        assert parse_address("7000") == ("127.0.0.1", 7000)
+        assert parse_address("studio.lan") == ("studio.lan", DEFAULT_PORT)
+        assert parse_address("[::1]:7000") == ("::1", 7000)
+
+
+class TestWorkerPool:
+    """Tests for WorkerPool with several workers on localhost."""
+
+    def test_remote_transcription_over_tcp(self, workers, fake_transcriber):
+        """Test that audio reaches a worker compressed and text and timings come back."""
+        from workers import WorkerPool
+
+        transcriber = fake_transcriber("remote")
+        server, address = workers(transcriber)
+        local = fake_transcriber("local")
+        pool = WorkerPool([address], lambda: local)
+        pool.check()
+
+        assert pool.transcribe(np.zeros(16000, dtype=np.float32), peak=0.5) == "remote"
+        assert transcriber.calls == [(np.float32, 16000, 0.5, True, True)]
+        assert local.calls == []
+        start, end = pool.last_timings["decode"]
+        assert end - start == pytest.approx(0.25)
+        assert pool.get_active_model_name() == f"base.en@{address}"
+        assert pool.get_thread_count() == 4
+        assert pool.stats() == {"remote": 1, "fallbacks": 0, "healthy": 1, "workers": 1}
+        pool.close()
+
+    def test_least_loaded_worker_is_chosen(self, workers, fake_transcriber):
+        """Test that concurrent utterances spread over the workers instead of queueing on one."""
+        from workers import WorkerPool
+
+        transcribers = [fake_transcriber(str(i), delay=0.2) for i in range(3)]
+        addresses = [workers(transcriber)[1] for transcriber in transcribers]
+        pool = WorkerPool(addresses, lambda: fake_transcriber("local"))
+        pool.check()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(pool.transcribe(np.zeros(1600, dtype=np.float32))))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(5)
+        pool.close()
+
+        assert sorted(results) == ["0", "1", "2"]
+
+    def test_reported_load_steers_dispatch(self, workers, fake_transcriber):
+        """Test that a worker busy with other clients' audio is passed over."""
+        from workers import WorkerPool
+
+        busy, idle = fake_transcriber("busy"), fake_transcriber("idle")
+        busy_server, busy_address = workers(busy)
+        _, idle_address = workers(idle)
+        pool = WorkerPool([busy_address, idle_address], lambda: fake_transcriber("local"))
+        busy_server.pending = 3
+        pool.check()
+
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "idle"
+        pool.close()
+
+    def test_unhealthy_worker_is_skipped(self, workers, fake_transcriber):
+        """Test that a worker that fails its health check gets no audio."""
+        from workers import WorkerPool
+
+        _, address = workers(fake_transcriber("up"))
+        pool = WorkerPool([closed_port(), address], lambda: fake_transcriber("local"))
+        pool.check()
+
+        assert [worker.healthy for worker in pool.workers] == [False, True]
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "up"
+        pool.close()
+
+    def test_refused_connection_tries_the_next_worker(self, workers, fake_transcriber):
+        """Test that a worker that went away since the last check is skipped right away."""
+        from workers import WorkerPool
+
+        _, address = workers(fake_transcriber("up"))
+        pool = WorkerPool([closed_port(), address], lambda: fake_transcriber("local"))
+        pool.workers[1].load = 1  # Make the dead worker the first choice.
+
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "up"
+        assert not pool.workers[0].healthy
+        pool.close()
+
+    def test_request_error_keeps_the_worker_healthy(self, workers, fake_transcriber):
+        """Test that an error for one utterance moves on to the next worker without marking the first unhealthy."""
+        from workers import WorkerPool
+
+        class Failing(fake_transcriber):
+            def transcribe(self, audio_data, peak=None, normalize=True):
+                raise ValueError("could not decode")
+
+        _, failing_address = workers(Failing())
+        _, address = workers(fake_transcriber("up"))
+        pool = WorkerPool([failing_address, address], lambda: fake_transcriber("local"))
+        pool.workers[1].load = 1  # Make the failing worker the first choice.
+
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "up"
+        assert [worker.healthy for worker in pool.workers] == [True, True]
+        assert pool.workers[0].failures == 1
+        pool.close()
+
+    def test_timeout_falls_back_to_local_decode(self, workers, fake_transcriber):
+        """Test that a worker slower than the timeout is abandoned for the local model."""
+        from workers import WorkerPool
+
+        slow = fake_transcriber("slow", delay=0.5)
+        _, address = workers(slow)
+        local = fake_transcriber("local")
+        created = []
+        pool = WorkerPool([address], lambda: created.append(local) or local, timeout=0.05)
+
+        started = time.perf_counter()
+        # 800 samples add 50 ms to the timeout.
+        assert pool.transcribe(np.zeros(800, dtype=np.float32)) == "local"
+        assert time.perf_counter() - started < 0.4
+        assert created == [local]
+        assert pool.stats()["fallbacks"] == 1
+        assert pool.get_active_model_name() == "base.en"
+        pool.close()
+
+    def test_no_workers_available_uses_local_model_once(self, fake_transcriber):
+        """Test that the local fallback is created lazily and reused."""
+        from workers import WorkerPool
+
+        created = []
+        pool = WorkerPool([closed_port()], lambda: created.append(1) or fake_transcriber("local"))
+        pool.check()
+
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "local"
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "local"
+        assert created == [1]
+        pool.close()
+
+    def test_fallback_is_preloaded_in_background(self, fake_transcriber):
+        """Test that start() loads the local model when preload is set, before any fallback."""
+        from workers import WorkerPool
+
+        loaded = threading.Event()
+        local = fake_transcriber("local")
+        pool = WorkerPool([closed_port()], lambda: loaded.set() or local, preload=True).start()
+
+        assert loaded.wait(5)
+        assert pool.transcribe(np.zeros(1600, dtype=np.float32)) == "local"
+        assert pool.get_active_model_name() == "base.en"
+        pool.close()
+
+    def test_health_checks_run_in_background(self, workers, fake_transcriber):
+        """Test that start() probes the workers and a recovered worker is used again."""
+        from workers import WorkerPool
+
+        _, address = workers(fake_transcriber("up"))
+        pool = WorkerPool([address], lambda: fake_transcriber("local"), check_interval=0.01)
+        pool.workers[0].healthy = False
+        pool.start()
+        deadline = time.monotonic() + 5
+        while not pool.workers[0].healthy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pool.close()
+
+        assert pool.workers[0].info["model"] == "small.en"
+        assert pool.get_model_name() == "workers(small.en)"
@@ -0,0 +1,94 @@
+"""
+Summarize utterance traces written with V2T_TRACE_FILE.
+
+Prints p50, p95, p99 and max milliseconds for each span (hotkey,
+recorder_stop, queue_wait, preprocess, decode, inject) and for the whole
+release-to-inject latency. By default it reads the configured trace file and
+its rotated backups.
+
+    uv run python trace_stats.py
+    uv run python trace_stats.py ~/.v2t/traces.jsonl --last 200
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+import config
+
+SPAN_ORDER = ("hotkey", "recorder_stop", "queue_wait", "preprocess", "decode", "inject")
+
+
+def trace_files(path):
+    """The trace file and its rotated backups, oldest first."""
+    backups = sorted(glob.glob(f"{glob.escape(path)}.[0-9]*"), key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_traces(paths):
+    traces = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    traces.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # A line cut off by a crash.
+    return traces
+
+
+def summarize(traces):
+    """Return rows of (name, count, p50, p95, p99, max) in milliseconds."""
+    durations = {}
+    for trace in traces:
+        for span in trace.get("spans", ()):
+            durations.setdefault(span["name"], []).append(span["duration_ms"])
+        if trace.get("latency_ms") is not None:
+            durations.setdefault("total", []).append(trace["latency_ms"])
+
+    order = [name for name in SPAN_ORDER if name in durations]
+    order += sorted(name for name in durations if name not in SPAN_ORDER and name != "total")
+    if "total" in durations:
+        order.append("total")
+    rows = []
+    for name in order:
+        values = np.asarray(durations[name])
+        p50, p95, p99 = np.percentile(values, (50, 95, 99))
+        rows.append((name, len(values), p50, p95, p99, values.max()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Trace files (default: V2T_TRACE_FILE and its backups)")
+    parser.add_argument("--last", type=int, help="Only the most recent N utterances")
+    args = parser.parse_args()
+
+    if args.files:
+        paths = args.files
+    elif config.TRACE_FILE:
+        paths = trace_files(config.TRACE_FILE)
+    else:
+        parser.error("no trace files given and V2T_TRACE_FILE is not set")
+
+    traces = read_traces(paths)
+    if args.last:
+        traces = traces[-args.last:]
+    if not traces:
+        print("No traces found.")
+        return
+
+    print(f"{len(traces)} utterances, {traces[0].get('time')} - {traces[-1].get('time')}")
+    print(f"{'span':16} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, count, p50, p95, p99, maximum in summarize(traces):
+        print(f"{name:16} {count:>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {maximum:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import collections
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import urllib.request
+
+from log import get_logger
+from preprocess import TARGET_SAMPLE_RATE
+
+log = get_logger("tracing")
+
+
+class UtteranceTrace:
+    """
+    Timings and context for one utterance, from hotkey release to injected text.
+
+    Spans are (name, start, end) perf_counter pairs for the steps after the
+    release (hotkey, recorder_stop, queue_wait, preprocess, decode, inject);
+    stages holds their durations plus CPU time spent while recording.
+    """
+
+    def __init__(self, utterance_id, released):
+        self.id = utterance_id
+        # OpenTelemetry-style 128-bit ID, unique across app restarts.
+        self.trace_id = os.urandom(16).hex()
+        self.released = released
+        self.wall_time = time.time()
+        self.finished = None
+        self.queued = None
+        self.spans = []
+        self.stages = {}
+        self.audio_seconds = 0.0
+        self.model = None
+        # Decoder threads (when the binding reports them) and Python threads
+        # alive in the process, for spotting CPU contention.
+        self.decode_threads = None
+        self.threads = None
+        self.queue_depth = None
+
+    def add(self, name, ms):
+        """Add milliseconds spent in a stage (repeated stages accumulate)."""
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def span(self, name, start, end):
+        """Add a timed span (perf_counter start and end)."""
+        self.spans.append((name, start, end))
+        self.add(name, (end - start) * 1000)
+
+    def wall_clock(self, timestamp):
+        """Convert a perf_counter timestamp of this utterance to Unix time."""
+        return self.wall_time + (timestamp - self.released)
+
+    @property
+    def latency_ms(self):
+        """Release-to-inject latency, once the utterance has finished."""
+        if self.finished is None:
+            return None
+        return (self.finished - self.released) * 1000
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "trace_id": self.trace_id,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.wall_time)),
+            "latency_ms": self.latency_ms,
+            "audio_seconds": self.audio_seconds,
+            "model": self.model,
+            "decode_threads": self.decode_threads,
+            "threads": self.threads,
+            "queue_depth": self.queue_depth,
+            "stages_ms": dict(self.stages),
+            "spans": [
+                {"name": name, "start_ms": (start - self.released) * 1000, "duration_ms": (end - start) * 1000}
+                for name, start, end in self.spans
+            ],
+        }
+
+
+class TraceRecorder:
+    """
+    Keeps the last `capacity` utterance traces in memory and dumps slow ones.
+
+    Traces are small dicts of timings, so memory stays bounded by capacity;
+    audio is never kept in the ring. When an utterance's release-to-inject
+    latency exceeds slo_ms, its audio (WAV) and a JSON file with its trace
+    and the recent traces before it are written to dump_dir, so tail-latency
+    regressions can be diagnosed without tracing all the time.
+    """
+
+    def __init__(self, capacity=100, slo_ms=0, dump_dir=None, exporters=()):
+        self.slo_ms = slo_ms
+        self.dump_dir = dump_dir
+        # Each finished trace is passed to every exporter's export().
+        self.exporters = list(exporters)
+        self._traces = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.dumps = 0
+
+    @property
+    def dumping(self):
+        """True if slow utterances are dumped, i.e. finish() may need their audio."""
+        return bool(self.slo_ms and self.dump_dir)
+
+    def start(self, released=None):
+        """Begin a trace for an utterance whose hotkey was released at `released` (perf_counter)."""
+        with self._lock:
+            utterance_id = self._next_id
+            self._next_id += 1
+        return UtteranceTrace(utterance_id, time.perf_counter() if released is None else released)
+
+    def finish(self, trace, audio=None):
+        """Close a trace; returns the dump path if it breached the SLO, else None."""
+        trace.finished = time.perf_counter()
+        with self._lock:
+            self._traces.append(trace)
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                log.error("Could not export trace", exporter=type(exporter).__name__, error=e)
+        if self.dumping and trace.latency_ms > self.slo_ms:
+            return self._dump(trace, audio)
+        return None
+
+    def recent(self):
+        """Return the traces in the ring, oldest first, as dicts."""
+        with self._lock:
+            traces = list(self._traces)
+        return [trace.to_dict() for trace in traces]
+
+    def _dump(self, trace, audio):
+        stem = os.path.join(self.dump_dir, time.strftime("slow-%Y%m%d-%H%M%S", time.localtime(trace.wall_time)))
+        stem = f"{stem}-{trace.id}"
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            report = {"slo_ms": self.slo_ms, "trace": trace.to_dict(), "recent": self.recent()}
+            with open(stem + ".json", "w") as f:
+                json.dump(report, f, indent=2)
+            if audio is not None and len(audio):
+                import soundfile as sf
+
+                sf.write(stem + ".wav", audio, TARGET_SAMPLE_RATE)
+        except Exception as e:
+            log.error("Could not write slow utterance dump", error=e)
+            return None
+        self.dumps += 1
+        log.warning(
+            "Slow utterance", id=trace.id, latency_ms=round(trace.latency_ms), slo_ms=self.slo_ms, dump=stem + ".json",
+        )
+        return stem + ".json"
+
+
+class JsonlExporter:
+    """
+    Appends one JSON line per utterance to a size-rotated trace file
+    (path, path.1, ... path.N), using logging's RotatingFileHandler.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backups=3):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._logger = logging.Logger(f"v2t.traces.{path}")
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(handler)
+
+    def export(self, trace):
+        self._logger.info(json.dumps(trace.to_dict()))
+
+    def close(self):
+        for handler in self._logger.handlers:
+            handler.close()
+
+
+class OtlpExporter:
+    """
+    Sends each utterance as OTLP/HTTP JSON spans to a local collector
+    (e.g. http://localhost:4318/v1/traces): one root "utterance" span with a
+    child per step. Requests go out on a background thread; failures are
+    logged and dropped.
+    """
+
+    def __init__(self, endpoint, service_name="v2t", timeout=2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def payload(self, trace):
+        root_id = os.urandom(8).hex()
+
+        def span(name, start, end, span_id, parent=""):
+            return {
+                "traceId": trace.trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent,
+                "name": name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(trace.wall_clock(start) * 1e9)),
+                "endTimeUnixNano": str(int(trace.wall_clock(end) * 1e9)),
+            }
+
+        root = span("utterance", trace.released, trace.finished, root_id)
+        root["attributes"] = [
+            {"key": "v2t.utterance_id", "value": {"intValue": str(trace.id)}},
+            {"key": "v2t.audio_seconds", "value": {"doubleValue": trace.audio_seconds}},
+            {"key": "v2t.model", "value": {"stringValue": str(trace.model)}},
+            {"key": "v2t.queue_depth", "value": {"intValue": str(trace.queue_depth or 0)}},
+        ]
+        spans = [root] + [span(name, start, end, os.urandom(8).hex(), root_id) for name, start, end in trace.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "v2t"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, trace):
+        body = json.dumps(self.payload(trace)).encode()
+        threading.Thread(target=self._send, args=(body,), daemon=True).start()
+
+    def _send(self, body):
+        request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            log.error("Could not send trace", endpoint=self.endpoint, error=e)
+
+
+def exporters_from_config(trace_file, otlp_endpoint):
+    """Build the exporters enabled by V2T_TRACE_FILE and V2T_TRACE_OTLP."""
+    exporters = []
+    if trace_file:
+        try:
+            exporters.append(JsonlExporter(trace_file))
+        except OSError as e:
+            log.warning("Trace file disabled", error=e)
+    if otlp_endpoint:
+        exporters.append(OtlpExporter(otlp_endpoint))
+    return exporters
@@ -1,7 +1,141 @@
 from pywhispercpp.model import Model
+from collections import deque
 import numpy as np
 import os
+import threading
+import time
 import config
+from log import get_logger
+
+log = get_logger("transcriber")
+
+SAMPLE_RATE = 16000
+
+# Clips shorter than this are dominated by fixed per-call overhead and would
+# make the real-time factor look worse than it is.
+MIN_RTF_AUDIO_SECONDS = 1.0
+
+
+def prepare_audio(audio_data, peak=None, normalize=True):
+    """
+    Return audio as a contiguous 1-D float32 buffer, normalized in place.
+
+    Flattening a contiguous (n, 1) array is a view and float32 input is not
+    converted, so recorder output costs no copies. Quiet audio is scaled to a
+    0.5 peak (conservative, to avoid clipping) in a single in-place pass.
+    Integer PCM (the recorder's int16 mode) is converted to float32 and
+    normalized together in one vectorized pass. Pass the peak (in float
+    units, full scale 1.0) when it is already known (AudioRecorder tracks it
+    while recording) to skip the scan, or normalize=False when the audio was
+    already leveled by the recorder's AGC stage.
+    """
+    audio_data = np.asarray(audio_data)
+
+    # Flatten to 1D if needed (sounddevice returns (n, channels))
+    if audio_data.ndim > 1:
+        audio_data = audio_data.reshape(-1)
+
+    if audio_data.dtype.kind == "i":
+        scale = 1.0 / -float(np.iinfo(audio_data.dtype).min)
+        if normalize:
+            if peak is None:
+                peak = max(int(audio_data.max()), -int(audio_data.min())) * scale
+            if 0 < peak < 0.5:
+                scale *= 0.5 / peak
+        return np.multiply(audio_data, scale, dtype=np.float32)
+
+    # pywhispercpp expects contiguous float32 audio
+    if audio_data.dtype != np.float32 or not audio_data.flags.c_contiguous or not audio_data.flags.writeable:
+        audio_data = np.array(audio_data, dtype=np.float32, order="C")
+
+    if not normalize:
+        return audio_data
+
+    # Normalize audio if it's too quiet; max()/min() avoid an abs() temporary.
+    if peak is None:
+        max_val = max(float(audio_data.max()), -float(audio_data.min()))
+    else:
+        max_val = float(peak)
+    if 0 < max_val < 0.5:
+        np.multiply(audio_data, 0.5 / max_val, out=audio_data)
+
+    return audio_data
+
+
+class RealTimeFactorMonitor:
+    """
+    Rolling real-time factor (decode time / audio duration) per model.
+
+    Decides when to switch between the configured model and a smaller fallback
+    with hysteresis: downgrade only when every utterance in the window is above
+    the downgrade threshold, upgrade only when the configured model is estimated
+    to run below the (lower) upgrade threshold, and never switch again until a
+    full window has been measured on the new model.
+    """
+
+    def __init__(self, downgrade_rtf=1.0, upgrade_rtf=0.5, window=3):
+        self.downgrade_rtf = downgrade_rtf
+        self.upgrade_rtf = upgrade_rtf
+        self.window = max(1, int(window))
+        self._samples = {}
+        # RTF of each model measured around the last switch, i.e. under the
+        # same load. Their ratio turns the running model's RTF into an
+        # estimate for the model we are not running.
+        self._anchors = {}
+        self._pending_anchor = set()
+
+    def record(self, model_name, decode_seconds, audio_seconds):
+        """Record one decode and return its RTF (None if the clip is too short)."""
+        if audio_seconds < MIN_RTF_AUDIO_SECONDS:
+            return None
+        rtf = decode_seconds / audio_seconds
+        samples = self._samples.setdefault(model_name, deque(maxlen=self.window))
+        samples.append(rtf)
+        if model_name in self._pending_anchor:
+            self._pending_anchor.discard(model_name)
+            self._anchors[model_name] = rtf
+        return rtf
+
+    def rolling(self, model_name):
+        """Return the mean RTF over the window for a model, or None."""
+        samples = self._samples.get(model_name)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+    def _full_window(self, model_name):
+        samples = self._samples.get(model_name)
+        if samples is None or len(samples) < self.window:
+            return None
+        return samples
+
+    def should_downgrade(self, model_name):
+        """True when the model stayed above the downgrade threshold for a full window."""
+        samples = self._full_window(model_name)
+        return samples is not None and min(samples) > self.downgrade_rtf
+
+    def estimate(self, current_name, target_name):
+        """Estimate the target model's RTF from the running model's window."""
+        samples = self._full_window(current_name)
+        current_anchor = self._anchors.get(current_name)
+        target_anchor = self._anchors.get(target_name)
+        if samples is None or not current_anchor or target_anchor is None:
+            return None
+        return max(samples) * (target_anchor / current_anchor)
+
+    def should_upgrade(self, current_name, target_name):
+        """True when the target model is estimated to run below the upgrade threshold."""
+        estimate = self.estimate(current_name, target_name)
+        return estimate is not None and estimate < self.upgrade_rtf
+
+    def switched(self, from_name, to_name):
+        """Anchor both models around a switch and start a fresh window."""
+        rolling = self.rolling(from_name)
+        if rolling is not None:
+            self._anchors[from_name] = rolling
+        self._samples.pop(to_name, None)
+        self._pending_anchor.add(to_name)
+
 
 class AudioTranscriber:
     def __init__(self):
@@ -16,54 +150,143 @@ class AudioTranscriber:
             model_path = os.path.join(project_root, "models", "whisper-cpp", "ggml-model.bin")
 
         if os.path.exists(model_path):
-            print(f"Loading Whisper model from '{model_path}'...", flush=True)
+            log.info("Loading Whisper model", path=model_path)
             self.model = Model(model_path, print_realtime=False, print_progress=False, redirect_whispercpp_logs_to=None)
         else:
-            print(f"Downloading Whisper model '{self.model_name}'...", flush=True)
+            log.info("Downloading Whisper model", model=self.model_name)
             self.model = Model(self.model_name, print_realtime=False, print_progress=False, redirect_whispercpp_logs_to=None)
 
-        print("Model loaded.", flush=True)
+        log.info("Model loaded")
+
+        # Optional smaller model for automatic downgrade under load.
+        self.fallback_model_name = config.FALLBACK_MODEL or None
+        self.rtf_monitor = RealTimeFactorMonitor(
+            downgrade_rtf=config.RTF_DOWNGRADE,
+            upgrade_rtf=config.RTF_UPGRADE,
+            window=config.RTF_WINDOW,
+        )
+        self._models = {self.model_name: self.model}
+        self._active_model_name = self.model_name
+        self._models_lock = threading.Lock()
+        self._fallback_loading = False
+        # perf_counter (start, end) of the last transcribe() call's steps.
+        self.last_timings = {}
 
     def get_model_name(self):
         """Return the configured model name."""
         return self.model_name
 
-    def transcribe(self, audio_data):
+    def get_active_model_name(self):
+        """Return the name of the model currently used for decoding."""
+        with self._models_lock:
+            return self._active_model_name
+
+    def get_thread_count(self):
+        """Return the decoder thread count of the active model, if the binding exposes it."""
+        _, model = self._active_model()
+        try:
+            return int(model.get_params()["n_threads"])
+        except Exception:
+            return None
+
+    def _active_model(self):
+        with self._models_lock:
+            return self._active_model_name, self._models[self._active_model_name]
+
+    def _load_fallback_model(self):
+        """Load the fallback model (runs on a background thread) and switch to it."""
+        name = self.fallback_model_name
+        try:
+            log.info("Loading fallback Whisper model", model=name)
+            model = Model(name, print_realtime=False, print_progress=False, redirect_whispercpp_logs_to=None)
+        except Exception as e:
+            log.error("Fallback model failed to load", model=name, error=e)
+            with self._models_lock:
+                self._fallback_loading = False
+            return
+
+        with self._models_lock:
+            self._models[name] = model
+            self._fallback_loading = False
+        self._switch_model(name, "fallback model loaded")
+
+    def _switch_model(self, name, reason):
+        with self._models_lock:
+            previous = self._active_model_name
+            if previous == name:
+                return
+            self._active_model_name = name
+        self.rtf_monitor.switched(previous, name)
+        log.info("Switching Whisper model", previous=previous, model=name, reason=reason)
+
+    def _update_model_choice(self, model_name):
+        """Apply the RTF monitor's downgrade/upgrade decision after a decode."""
+        fallback = self.fallback_model_name
+        if not fallback or fallback == self.model_name:
+            return
+
+        if model_name == self.model_name:
+            if not self.rtf_monitor.should_downgrade(model_name):
+                return
+            rtf = self.rtf_monitor.rolling(model_name)
+            reason = f"RTF {rtf:.2f} above {self.rtf_monitor.downgrade_rtf:.2f}"
+            with self._models_lock:
+                loaded = fallback in self._models
+                start_loading = not loaded and not self._fallback_loading
+                if start_loading:
+                    self._fallback_loading = True
+            if loaded:
+                self._switch_model(fallback, reason)
+            elif start_loading:
+                log.warning("Decoding is falling behind", reason=reason)
+                threading.Thread(target=self._load_fallback_model, daemon=True).start()
+        elif model_name == fallback:
+            if not self.rtf_monitor.should_upgrade(fallback, self.model_name):
+                return
+            estimate = self.rtf_monitor.estimate(fallback, self.model_name)
+            self._switch_model(
+                self.model_name,
+                f"estimated RTF {estimate:.2f} below {self.rtf_monitor.upgrade_rtf:.2f}",
+            )
+
+    def transcribe(self, audio_data, peak=None, normalize=True):
         """
         Transcribe audio data (numpy array).
         Returns the transcribed text string.
+
+        A contiguous 1-D float32 buffer (what AudioRecorder.stop() returns) is
+        used as-is and normalized in place, so the caller hands over ownership.
+        Other shapes and dtypes (e.g. int16 from the recorder's compact mode)
+        are converted with a single copy. peak is the known absolute peak of
+        the audio in float units, if any; normalize=False skips peak
+        normalization for audio already leveled by AGC.
         """
+        self.last_timings = {}
         if len(audio_data) == 0:
             return ""
 
-        # Flatten to 1D if needed (sounddevice returns (n, channels))
-        if audio_data.ndim > 1:
-            audio_data = audio_data.flatten()
-
-        # pywhispercpp expects float32 audio
-        if audio_data.dtype != np.float32:
-            audio_data = audio_data.astype(np.float32)
-
-        # Normalize audio if it's too quiet
-        max_val = np.max(np.abs(audio_data))
-        if max_val > 0:
-            # Normalize to 0.5 peak (conservative) to avoid clipping if it was just quiet
-            # Or just scale it up if it's very low.
-            # Let's try simple peak normalization if max < 0.5
-            if max_val < 0.5:
-                audio_data = audio_data / max_val * 0.5
+        start = time.perf_counter()
+        audio_data = prepare_audio(audio_data, peak, normalize)
+        self.last_timings["preprocess"] = (start, time.perf_counter())
 
         # pywhispercpp transcribe returns a list of segments
         try:
-            segments = self.model.transcribe(audio_data)
+            model_name, model = self._active_model()
+            start = time.perf_counter()
+            segments = model.transcribe(audio_data)
             text = []
             for segment in segments:
                 text.append(segment.text)
-            return "".join(text).strip()
+            decode_seconds = time.perf_counter() - start
+            self.last_timings["decode"] = (start, start + decode_seconds)
         except Exception as e:
-            print(f"Transcription error: {e}", flush=True)
+            log.exception("Transcription error", error=e)
             return ""
 
+        self.rtf_monitor.record(model_name, decode_seconds, len(audio_data) / SAMPLE_RATE)
+        self._update_model_choice(model_name)
+        return "".join(text).strip()
+
 if __name__ == "__main__":
     # Test the transcriber (needs a dummy audio or real one)
     # We can generate a silent buffer to test model loading and interface
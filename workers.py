@@ -0,0 +1,263 @@
+"""
+Remote transcription workers over TCP.
+
+A workstation runs `python main.py --worker HOST:PORT`, which serves its
+loaded model with the daemon protocol (daemon.py) on a TCP port. A thin
+laptop sets V2T_WORKERS to a list of such addresses and VoiceToTextApp
+uses a WorkerPool in place of a local model:
+
+    V2T_WORKERS=studio.lan:7070,render.lan:7070 ./start.sh
+
+The pool sends each utterance, FLAC-compressed, to the least-loaded healthy
+worker. Health and load (the worker's pending transcriptions) are checked
+in the background every few seconds on separate short-lived connections.
+If no worker is healthy, or the chosen one does not answer in time, the
+utterance is decoded locally. The local model is preloaded in the
+background at startup (V2T_WORKER_PRELOAD), so the first fallback does
+not also pay for loading it.
+
+The protocol is unauthenticated: only listen on trusted networks.
+"""
+
+import json
+import socket
+import socketserver
+import threading
+import time
+
+from daemon import OP_INFO, DaemonTranscriber, TranscriptionDaemon, _DaemonHandler
+from log import get_logger
+from preprocess import TARGET_SAMPLE_RATE
+
+log = get_logger("workers")
+
+DEFAULT_PORT = 7070
+
+
+def parse_address(address, default_host="127.0.0.1"):
+    """Split "HOST:PORT", "PORT" or "HOST" into (host, port)."""
+    address = address.strip()
+    if ":" not in address and not address.isdigit():
+        return address, DEFAULT_PORT
+    host, _, port = address.rpartition(":")
+    return host.strip("[]") or default_host, int(port)
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class WorkerServer(TranscriptionDaemon):
+    """TranscriptionDaemon listening on a TCP address ("HOST:PORT" or "PORT")."""
+
+    def _listen(self):
+        return _TCPServer(parse_address(self.path), _DaemonHandler)
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def _wake(self):
+        host, port = self.address
+        try:
+            socket.create_connection(("127.0.0.1" if host in ("0.0.0.0", "") else host, port), 1.0).close()
+        except OSError:
+            pass
+
+    def _cleanup(self):
+        pass
+
+
+class WorkerClient(DaemonTranscriber):
+    """DaemonTranscriber for a worker on TCP; sends FLAC-compressed audio."""
+
+    def __init__(self, address, timeout=60.0):
+        super().__init__(address, timeout, compress=True)
+
+    def _connect(self):
+        sock = socket.create_connection(parse_address(self.path), self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def probe(self, timeout):
+        """Fetch the worker's info on a new connection, so a long decode on ours doesn't block it."""
+        probe = WorkerClient(self.path, timeout)
+        try:
+            _, _, body = probe._request(OP_INFO)
+        finally:
+            probe.close()
+        return json.loads(body)
+
+
+class _Worker:
+    def __init__(self, address, timeout):
+        self.address = address
+        self.client = WorkerClient(address, timeout)
+        # Optimistic until the first health check says otherwise.
+        self.healthy = True
+        self.load = 0
+        self.in_flight = 0
+        self.rtt = 0.0
+        self.info = {}
+        self.failures = 0
+
+
+class WorkerPool:
+    """
+    AudioTranscriber stand-in that dispatches to remote workers.
+
+    addresses are "HOST:PORT" strings. local is called with no arguments to
+    create the local fallback transcriber: in the background when start()
+    is called if preload is set, otherwise the first time it is needed.
+    A request is given timeout seconds plus the audio's duration, since a
+    worker slower than real time is no better than decoding locally.
+    Health checks run every check_interval seconds once start() is called.
+    """
+
+    def __init__(self, addresses, local, timeout=5.0, check_interval=5.0, check_timeout=1.0, preload=False):
+        self.timeout = timeout
+        self.preload = preload
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.workers = [_Worker(address, timeout) for address in addresses]
+        self.last_timings = {}
+        self.remote = 0
+        self.fallbacks = 0
+        self._local_factory = local
+        self._local = None
+        self._last = None
+        self._lock = threading.Lock()
+        self._local_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.workers:
+            self._thread = threading.Thread(target=self._run_checks, name="worker-health", daemon=True)
+            self._thread.start()
+        if self.preload:
+            threading.Thread(target=self._preload, name="worker-fallback", daemon=True).start()
+        else:
+            log.info("Local fallback model not preloaded; the first fallback will load it")
+        return self
+
+    def _preload(self):
+        try:
+            self._local_transcriber()
+        except Exception as e:
+            log.error("Could not preload the local fallback model", error=e)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        for worker in self.workers:
+            worker.client.close()
+
+    def _run_checks(self):
+        while True:
+            self.check()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def check(self):
+        """Probe every worker once and update its health, load and round-trip time."""
+        for worker in self.workers:
+            start = time.perf_counter()
+            try:
+                info = worker.client.probe(self.check_timeout)
+            except (OSError, RuntimeError, ValueError) as e:
+                if worker.healthy:
+                    log.warning("Worker unavailable", worker=worker.address, error=e)
+                with self._lock:
+                    worker.healthy = False
+                continue
+            with self._lock:
+                if not worker.healthy:
+                    log.info("Worker available", worker=worker.address, model=info.get("active_model"))
+                worker.healthy = True
+                worker.info = info
+                worker.load = info.get("pending", 0)
+                worker.rtt = time.perf_counter() - start
+
+    def _candidates(self):
+        """Healthy workers, least loaded (their queue plus what we have sent) first."""
+        with self._lock:
+            healthy = [worker for worker in self.workers if worker.healthy]
+            return sorted(healthy, key=lambda worker: (worker.load + worker.in_flight, worker.rtt))
+
+    def _local_transcriber(self):
+        with self._local_lock:
+            if self._local is None:
+                log.info("Loading the local model for fallback")
+                self._local = self._local_factory()
+            return self._local
+
+    def transcribe(self, audio_data, peak=None, normalize=True):
+        self.last_timings = {}
+        if len(audio_data) == 0:
+            return ""
+        timeout = self.timeout + len(audio_data) / TARGET_SAMPLE_RATE
+        for worker in self._candidates():
+            with self._lock:
+                worker.in_flight += 1
+            try:
+                text = worker.client.request_transcription(audio_data, peak, normalize, timeout)
+            except OSError as e:
+                with self._lock:
+                    worker.healthy = False
+                    worker.failures += 1
+                log.warning("Worker request failed", worker=worker.address, error=e)
+                if isinstance(e, TimeoutError):
+                    # The time budget is spent; don't wait on another worker.
+                    break
+                continue
+            except RuntimeError as e:
+                # The worker answered with an error for this utterance (e.g.
+                # audio it could not decode); it stays in rotation.
+                with self._lock:
+                    worker.failures += 1
+                log.warning("Worker could not transcribe the utterance", worker=worker.address, error=e)
+                continue
+            finally:
+                with self._lock:
+                    worker.in_flight -= 1
+            self.last_timings = worker.client.last_timings
+            self._last = worker
+            self.remote += 1
+            return text
+
+        self.fallbacks += 1
+        if self._local is None:
+            log.warning("Falling back to the local model before it has loaded; waiting for it")
+        local = self._local_transcriber()
+        text = local.transcribe(audio_data, peak=peak, normalize=normalize)
+        self.last_timings = local.last_timings
+        self._last = None
+        return text
+
+    def get_model_name(self):
+        names = sorted({str(worker.info.get("model")) for worker in self.workers if worker.info})
+        return f"workers({', '.join(names) or '?'})"
+
+    def get_active_model_name(self):
+        worker = self._last
+        if worker is None:
+            return self._local.get_active_model_name() if self._local is not None else self.get_model_name()
+        return f"{worker.info.get('active_model', '?')}@{worker.address}"
+
+    def get_thread_count(self):
+        worker = self._last
+        if worker is None:
+            return self._local.get_thread_count() if self._local is not None else None
+        return worker.info.get("threads")
+
+    def stats(self):
+        return {
+            "remote": self.remote,
+            "fallbacks": self.fallbacks,
+            "healthy": sum(worker.healthy for worker in self.workers),
+            "workers": len(self.workers),
+        }